@@ -1,16 +1,22 @@
 
 
+locals {
+  # パラメータグループのファミリーはメジャーバージョンから決める（aurora-postgresql16 など）
+  aurora_engine_version = "16.2"
+  aurora_family         = "aurora-postgresql${split(".", local.aurora_engine_version)[0]}"
+}
+
 # Aurora Cluster
 resource "aws_rds_cluster" "main" {
   cluster_identifier              = "${var.project_name}-${var.environment}-cluster"
   engine                         = "aurora-postgresql"
-  engine_version                 = "16.2"
+  engine_version                 = local.aurora_engine_version
   database_name                  = var.db_name
   master_username                = var.db_master_username
   master_password                = var.db_master_password
   
-  # デフォルトのパラメータグループを使用
-  # db_cluster_parameter_group_name = 省略（デフォルト使用）
+  # デフォルトのパラメータグループを使用（scaling_strategy が blue-green の場合は論理レプリケーションを有効にしたもの）
+  db_cluster_parameter_group_name = var.scaling_strategy == "blue-green" ? aws_rds_cluster_parameter_group.blue_green[0].name : null
   
   db_subnet_group_name            = aws_db_subnet_group.aurora.name
   vpc_security_group_ids          = [aws_security_group.aurora.id]
@@ -38,6 +44,23 @@ resource "aws_rds_cluster" "main" {
   })
 }
 
+# Blue/Green デプロイ用のクラスターパラメータグループ（scaling_strategy が blue-green の場合のみ）
+# Aurora PostgreSQL の Blue/Green デプロイはブルーからグリーンへの論理レプリケーションを使う
+# 静的パラメータのため、有効にするには Writer の再起動が必要
+resource "aws_rds_cluster_parameter_group" "blue_green" {
+  count  = var.scaling_strategy == "blue-green" ? 1 : 0
+  name   = "${var.project_name}-${var.environment}-blue-green"
+  family = local.aurora_family
+
+  parameter {
+    name         = "rds.logical_replication"
+    value        = "1"
+    apply_method = "pending-reboot"
+  }
+
+  tags = var.tags
+}
+
 # Writer Instance
 resource "aws_rds_cluster_instance" "writer" {
   identifier                   = "${var.project_name}-${var.environment}-writer"
@@ -102,4 +125,25 @@ resource "aws_rds_cluster_instance" "autoscaling_reader_initial" {
     Name = "${var.project_name}-${var.environment}-reader-as-${count.index + 1}"
     Role = "autoscaling-reader"
   })
-}
\ No newline at end of file
+}
+
+# カスタム Reader エンドポイント（スケーリング中の Reader を除外リストに入れて、接続を他の Reader に逃がす）
+# 除外リストはスケーリングのワークフロー（drain-reader）が変更するため、Terraform では管理しない
+# アプリケーションの読み取りはクラスターの Reader エンドポイントの代わりにこのエンドポイントを使う
+resource "aws_rds_cluster_endpoint" "reader_drain" {
+  cluster_identifier          = aws_rds_cluster.main.id
+  cluster_endpoint_identifier = "${var.project_name}-${var.environment}-reader"
+  custom_endpoint_type        = "READER"
+  excluded_members            = []
+
+  lifecycle {
+    ignore_changes = [excluded_members, static_members]
+  }
+
+  tags = var.tags
+
+  depends_on = [
+    aws_rds_cluster_instance.dedicated_reader,
+    aws_rds_cluster_instance.autoscaling_reader_initial
+  ]
+}
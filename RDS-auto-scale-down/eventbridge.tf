@@ -31,6 +31,117 @@ resource "aws_lambda_permission" "schedule_scaling_eventbridge" {
   source_arn    = aws_cloudwatch_event_rule.schedule_scaling.arn
 }
 
+# EventBridge Rule for scheduled scale-up
+# スケールダウン（schedule_scaling）とは別のルール。デフォルトでは無効化
+# update-schedule の deadline で、期限（scale_up_deadline）までに終わる開始時刻に更新して有効化する
+resource "aws_cloudwatch_event_rule" "schedule_scale_up" {
+  name                = "${var.project_name}-${var.environment}-schedule-scale-up"
+  description         = "Trigger Aurora scale-up so that it finishes before the deadline (disabled by default)"
+  schedule_expression = "cron(0 21 * * ? *)"  # デフォルト値（update-scheduleで上書きされる）
+  state               = "DISABLED"  # デフォルトでは無効化
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "schedule_scale_up_target" {
+  rule      = aws_cloudwatch_event_rule.schedule_scale_up.name
+  target_id = "ScheduleScaleUpTarget"
+  arn       = aws_lambda_function.schedule_scaling.arn
+
+  input = jsonencode({
+    clusterIdentifier = aws_rds_cluster.main.cluster_identifier
+    targetClass       = var.scale_up_target_class
+    direction         = "up"
+    deadline          = var.scale_up_deadline
+  })
+}
+
+resource "aws_lambda_permission" "schedule_scale_up_eventbridge" {
+  statement_id  = "AllowExecutionFromScaleUpRule"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.schedule_scaling.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.schedule_scale_up.arn
+}
+
+# EventBridge Rule for RDS events (イベント駆動モードの完了通知)
+# インスタンスタイプの変更完了・フェイルオーバー完了のイベントで待機中のタスクを完了させる
+resource "aws_cloudwatch_event_rule" "rds_completion_events" {
+  name        = "${var.project_name}-${var.environment}-rds-completion-events"
+  description = "Forward RDS modification / failover completion events to the scaling workflow"
+
+  event_pattern = jsonencode({
+    source        = ["aws.rds"]
+    "detail-type" = ["RDS DB Instance Event", "RDS DB Cluster Event"]
+    detail = {
+      EventCategories = ["configuration change", "failover"]
+    }
+  })
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "rds_completion_events_target" {
+  rule      = aws_cloudwatch_event_rule.rds_completion_events.name
+  target_id = "RdsEventHandlerTarget"
+  arn       = aws_lambda_function.rds_event_handler.arn
+}
+
+resource "aws_lambda_permission" "rds_event_handler_eventbridge" {
+  statement_id  = "AllowExecutionFromEventBridge"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.rds_event_handler.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.rds_completion_events.arn
+}
+
+# EventBridge Rule for aborted / timed-out scaling executions
+# 中止・タイムアウトした実行はステートマシンの中で Application Auto Scaling を再開できないため、実行ステータスの変更イベントで再開する（カスタム Reader エンドポイントの除外リストも戻す）
+resource "aws_cloudwatch_event_rule" "scaling_execution_ended" {
+  name        = "${var.project_name}-${var.environment}-scaling-execution-ended"
+  description = "Resume Application Auto Scaling and release drained readers when a scaling execution is aborted or times out"
+
+  event_pattern = jsonencode({
+    source        = ["aws.states"]
+    "detail-type" = ["Step Functions Execution Status Change"]
+    detail = {
+      status          = ["ABORTED", "TIMED_OUT"]
+      stateMachineArn = [aws_sfn_state_machine.aurora_scaling.arn]
+    }
+  })
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "scaling_execution_ended_target" {
+  rule      = aws_cloudwatch_event_rule.scaling_execution_ended.name
+  target_id = "ManageAutoScalingTarget"
+  arn       = aws_lambda_function.manage_autoscaling.arn
+}
+
+# 中止・タイムアウトした実行でカスタム Reader エンドポイントから外したままの Reader を戻す
+resource "aws_cloudwatch_event_target" "scaling_execution_ended_drain_target" {
+  rule      = aws_cloudwatch_event_rule.scaling_execution_ended.name
+  target_id = "DrainReaderTarget"
+  arn       = aws_lambda_function.drain_reader.arn
+}
+
+resource "aws_lambda_permission" "drain_reader_eventbridge" {
+  statement_id  = "AllowExecutionFromEventBridge"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.drain_reader.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.scaling_execution_ended.arn
+}
+
+resource "aws_lambda_permission" "manage_autoscaling_eventbridge" {
+  statement_id  = "AllowExecutionFromEventBridge"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.manage_autoscaling.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.scaling_execution_ended.arn
+}
+
 # SSM Parameter for target class configuration (オプション: 使わない場合は削除可能)
 # EventBridgeルールの入力パラメータで設定できるため、必須ではありません
 # 現在は使用していないためコメントアウト
@@ -32,6 +32,8 @@ resource "aws_iam_policy" "lambda_rds_management" {
         Action = [
           "rds:DescribeDBClusters",
           "rds:DescribeDBInstances",
+          "rds:DescribeDBClusterParameters",
+          "rds:DescribeOrderableDBInstanceOptions",
           "rds:ListTagsForResource"
         ]
         Resource = "*"
@@ -58,6 +60,78 @@ resource "aws_iam_policy" "lambda_rds_management" {
         ]
       },
       {
+        # カスタム Reader エンドポイントの除外リストの変更（drain-reader）
+        Effect = "Allow"
+        Action = [
+          "rds:DescribeDBClusterEndpoints",
+          "rds:ModifyDBClusterEndpoint"
+        ]
+        Resource = [
+          "arn:aws:rds:${var.region}:*:cluster:${var.project_name}-${var.environment}-*",
+          "arn:aws:rds:${var.region}:*:cluster-endpoint:${var.project_name}-${var.environment}-*"
+        ]
+      },
+      {
+        # readerStrategy: "replace" での Reader の作成・削除（AutoScaling Reader の識別子はプロジェクトの接頭辞を持たない）
+        Effect = "Allow"
+        Action = [
+          "rds:CreateDBInstance",
+          "rds:DeleteDBInstance",
+          "rds:AddTagsToResource"
+        ]
+        Resource = [
+          "arn:aws:rds:${var.region}:*:cluster:${var.project_name}-${var.environment}-*",
+          "arn:aws:rds:${var.region}:*:db:*",
+          "arn:aws:rds:${var.region}:*:pg:*"
+        ]
+      },
+      {
+        # scalingStrategy: "blue-green" でのグリーン環境の作成・スイッチオーバーと、切り替え前のクラスター（-old1, -old2, ...）の削除
+        # デプロイの識別子（bgd-...）は RDS が決めるため、デプロイのARNは制限できない
+        Effect = "Allow"
+        Action = [
+          "rds:CreateBlueGreenDeployment",
+          "rds:DescribeBlueGreenDeployments",
+          "rds:SwitchoverBlueGreenDeployment",
+          "rds:DeleteBlueGreenDeployment"
+        ]
+        Resource = "*"
+      },
+      {
+        # グリーン環境の作成はソースのクラスター・インスタンスへの作成系の権限も必要とする
+        Effect = "Allow"
+        Action = [
+          "rds:CreateDBCluster",
+          "rds:CreateDBInstance",
+          "rds:AddTagsToResource"
+        ]
+        Resource = [
+          "arn:aws:rds:${var.region}:*:cluster:${var.project_name}-${var.environment}-*",
+          "arn:aws:rds:${var.region}:*:db:*",
+          "arn:aws:rds:${var.region}:*:cluster-pg:*",
+          "arn:aws:rds:${var.region}:*:pg:*",
+          "arn:aws:rds:${var.region}:*:subgrp:*"
+        ]
+      },
+      {
+        # 切り替え前のクラスター（blue_green_delete_old_cluster = true の場合のみ）と、中止時のグリーン環境（DeleteTarget）の削除
+        # スイッチオーバーで RDS が -old<N> を付けたクラスター・インスタンス（残した -old1 がある場合は -old2, ...）と、-green- を含むグリーン環境に限る（最終スナップショットの作成を含む）
+        Effect = "Allow"
+        Action = [
+          "rds:DeleteDBCluster",
+          "rds:DeleteDBInstance",
+          "rds:CreateDBClusterSnapshot"
+        ]
+        Resource = [
+          "arn:aws:rds:${var.region}:*:cluster:${var.project_name}-${var.environment}-*-old*",
+          "arn:aws:rds:${var.region}:*:db:*-old*",
+          "arn:aws:rds:${var.region}:*:cluster:${var.project_name}-${var.environment}-*-green-*",
+          "arn:aws:rds:${var.region}:*:db:*-green-*",
+          "arn:aws:rds:${var.region}:*:cluster-snapshot:${var.project_name}-${var.environment}-*-old*-final-*"
+        ]
+      },
+      {
+        # 実行中の Reader の Application Auto Scaling の一時停止・再開（manage-autoscaling）にも使う
         Effect = "Allow"
         Action = [
           "application-autoscaling:RegisterScalableTarget",
@@ -73,6 +147,7 @@ resource "aws_iam_policy" "lambda_rds_management" {
         Action = [
           "cloudwatch:PutMetricData",
           "cloudwatch:GetMetricStatistics",
+          "cloudwatch:GetMetricData",
           "cloudwatch:ListMetrics"
         ]
         Resource = "*"
@@ -102,6 +177,35 @@ resource "aws_iam_policy" "lambda_rds_management" {
         ]
         Resource = "arn:aws:states:${var.region}:*:stateMachine:${var.project_name}-${var.environment}-aurora-scaling"
       },
+      {
+        Effect = "Allow"
+        Action = [
+          "states:SendTaskSuccess",
+          "states:SendTaskFailure"
+        ]
+        # タスクトークンによる呼び出しはリソースARNで制限できない
+        Resource = "*"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:GetItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = "arn:aws:dynamodb:${var.region}:*:table/${var.project_name}-${var.environment}-scaling-task-tokens"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:Query"
+        ]
+        # リサイズ・フェイルオーバーの所要時間の履歴（サンプルと見積もり用の要約）
+        Resource = "arn:aws:dynamodb:${var.region}:*:table/${var.project_name}-${var.environment}-scaling-duration-history"
+      },
       {
         Effect = "Allow"
         Action = [
@@ -117,7 +221,10 @@ resource "aws_iam_policy" "lambda_rds_management" {
           "events:ListTargetsByRule",
           "events:DescribeRule"
         ]
-        Resource = "arn:aws:events:${var.region}:*:rule/${var.project_name}-${var.environment}-schedule-scaling"
+        Resource = [
+          "arn:aws:events:${var.region}:*:rule/${var.project_name}-${var.environment}-schedule-scaling",
+          "arn:aws:events:${var.region}:*:rule/${var.project_name}-${var.environment}-schedule-scale-up"
+        ]
       }
     ]
   })
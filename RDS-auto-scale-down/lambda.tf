@@ -60,6 +60,76 @@ data "archive_file" "update_schedule" {
   output_path = "${path.module}/.terraform/lambda_zips/update_schedule.zip"
 }
 
+data "archive_file" "check_failover_status" {
+  type        = "zip"
+  source_file = "${path.module}/lambda_functions/check_failover_status/index.py"
+  output_path = "${path.module}/.terraform/lambda_zips/check_failover_status.zip"
+}
+
+data "archive_file" "rds_event_handler" {
+  type        = "zip"
+  source_file = "${path.module}/lambda_functions/rds_event_handler/index.py"
+  output_path = "${path.module}/.terraform/lambda_zips/rds_event_handler.zip"
+}
+
+data "archive_file" "plan_reader_waves" {
+  type        = "zip"
+  source_file = "${path.module}/lambda_functions/plan_reader_waves/index.py"
+  output_path = "${path.module}/.terraform/lambda_zips/plan_reader_waves.zip"
+}
+
+data "archive_file" "manage_autoscaling" {
+  type        = "zip"
+  source_file = "${path.module}/lambda_functions/manage_autoscaling/index.py"
+  output_path = "${path.module}/.terraform/lambda_zips/manage_autoscaling.zip"
+}
+
+data "archive_file" "rollback_cluster" {
+  type        = "zip"
+  source_file = "${path.module}/lambda_functions/rollback_cluster/index.py"
+  output_path = "${path.module}/.terraform/lambda_zips/rollback_cluster.zip"
+}
+
+data "archive_file" "check_failover_readiness" {
+  type        = "zip"
+  source_file = "${path.module}/lambda_functions/check_failover_readiness/index.py"
+  output_path = "${path.module}/.terraform/lambda_zips/check_failover_readiness.zip"
+}
+
+data "archive_file" "drain_reader" {
+  type        = "zip"
+  source_file = "${path.module}/lambda_functions/drain_reader/index.py"
+  output_path = "${path.module}/.terraform/lambda_zips/drain_reader.zip"
+}
+
+data "archive_file" "replace_instance" {
+  type        = "zip"
+  source_file = "${path.module}/lambda_functions/replace_instance/index.py"
+  output_path = "${path.module}/.terraform/lambda_zips/replace_instance.zip"
+}
+
+data "archive_file" "blue_green_deployment" {
+  type        = "zip"
+  source_file = "${path.module}/lambda_functions/blue_green_deployment/index.py"
+  output_path = "${path.module}/.terraform/lambda_zips/blue_green_deployment.zip"
+}
+
+# 共通モジュール（scaling_common）のパッケージング
+# Lambdaレイヤーは /opt/python に展開されるため python/ 配下に配置している
+data "archive_file" "common_layer" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_functions/common_layer"
+  output_path = "${path.module}/.terraform/lambda_zips/common_layer.zip"
+}
+
+# Lambdaレイヤー: 共通モジュール
+resource "aws_lambda_layer_version" "scaling_common" {
+  filename            = data.archive_file.common_layer.output_path
+  layer_name          = "${var.project_name}-${var.environment}-scaling-common"
+  source_code_hash    = data.archive_file.common_layer.output_base64sha256
+  compatible_runtimes = ["python3.11"]
+}
+
 
 
 # 1. 通知用Lambdaのロール
@@ -130,6 +200,7 @@ resource "aws_lambda_function" "modify_instance" {
   handler          = "index.lambda_handler"
   source_code_hash = data.archive_file.modify_instance.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
   timeout          = 60
 
   # VPC接続 (RDSアクセスに必須)
@@ -140,7 +211,14 @@ resource "aws_lambda_function" "modify_instance" {
 
   environment {
     variables = {
-      ENVIRONMENT = var.environment
+      ENVIRONMENT              = var.environment
+      METRICS_NAMESPACE        = "AuroraScaling/${var.environment}"
+      TASK_TOKEN_TABLE         = aws_dynamodb_table.task_tokens.name
+      # 所要時間の履歴（開始・完了の記録、保持期間・キーごとのサンプル数の上限）
+      DURATION_HISTORY_TABLE          = aws_dynamodb_table.duration_history.name
+      DURATION_HISTORY_RETENTION_DAYS = var.duration_history_retention_days
+      DURATION_HISTORY_MAX_SAMPLES    = var.duration_history_max_samples
+      SLOW_DURATION_FACTOR            = var.slow_duration_factor
     }
   }
 
@@ -160,7 +238,8 @@ resource "aws_lambda_function" "check_instance_status" {
   handler          = "index.lambda_handler"
   source_code_hash = data.archive_file.check_instance_status.output_base64sha256
   runtime          = "python3.11"
-  timeout          = 30
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
+  timeout          = 60
 
   # VPC接続 (RDSアクセスに必須)
   vpc_config {
@@ -170,7 +249,13 @@ resource "aws_lambda_function" "check_instance_status" {
 
   environment {
     variables = {
-      ENVIRONMENT = var.environment
+      ENVIRONMENT              = var.environment
+      METRICS_NAMESPACE        = "AuroraScaling/${var.environment}"
+      # 所要時間の履歴（開始・完了の記録、保持期間・キーごとのサンプル数の上限）
+      DURATION_HISTORY_TABLE          = aws_dynamodb_table.duration_history.name
+      DURATION_HISTORY_RETENTION_DAYS = var.duration_history_retention_days
+      DURATION_HISTORY_MAX_SAMPLES    = var.duration_history_max_samples
+      SLOW_DURATION_FACTOR            = var.slow_duration_factor
     }
   }
 
@@ -190,6 +275,7 @@ resource "aws_lambda_function" "failover_cluster" {
   handler          = "index.lambda_handler"
   source_code_hash = data.archive_file.failover_cluster.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
   timeout          = 60
 
   # VPC接続 (RDSアクセスに必須)
@@ -200,7 +286,51 @@ resource "aws_lambda_function" "failover_cluster" {
 
   environment {
     variables = {
-      ENVIRONMENT = var.environment
+      ENVIRONMENT              = var.environment
+      METRICS_NAMESPACE        = "AuroraScaling/${var.environment}"
+      TASK_TOKEN_TABLE         = aws_dynamodb_table.task_tokens.name
+      # 所要時間の履歴（開始・完了の記録、保持期間・キーごとのサンプル数の上限）
+      DURATION_HISTORY_TABLE          = aws_dynamodb_table.duration_history.name
+      DURATION_HISTORY_RETENTION_DAYS = var.duration_history_retention_days
+      DURATION_HISTORY_MAX_SAMPLES    = var.duration_history_max_samples
+      SLOW_DURATION_FACTOR            = var.slow_duration_factor
+    }
+  }
+
+  tags = var.tags
+
+  depends_on = [
+    aws_iam_role_policy_attachment.lambda_rds_management,
+    aws_iam_role_policy_attachment.lambda_vpc_execution
+  ]
+}
+
+# Lambda関数: CheckFailoverStatus (VPC接続あり)
+resource "aws_lambda_function" "check_failover_status" {
+  filename         = data.archive_file.check_failover_status.output_path
+  function_name    = "${var.project_name}-${var.environment}-check-failover-status"
+  role             = aws_iam_role.lambda_scaling.arn
+  handler          = "index.lambda_handler"
+  source_code_hash = data.archive_file.check_failover_status.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
+  timeout          = 60
+
+  # VPC接続 (RDSアクセスに必須)
+  vpc_config {
+    subnet_ids         = aws_subnet.lambda[*].id
+    security_group_ids = [aws_security_group.lambda.id]
+  }
+
+  environment {
+    variables = {
+      ENVIRONMENT              = var.environment
+      METRICS_NAMESPACE        = "AuroraScaling/${var.environment}"
+      # 所要時間の履歴（開始・完了の記録、保持期間・キーごとのサンプル数の上限）
+      DURATION_HISTORY_TABLE          = aws_dynamodb_table.duration_history.name
+      DURATION_HISTORY_RETENTION_DAYS = var.duration_history_retention_days
+      DURATION_HISTORY_MAX_SAMPLES    = var.duration_history_max_samples
+      SLOW_DURATION_FACTOR            = var.slow_duration_factor
     }
   }
 
@@ -221,6 +351,7 @@ resource "aws_lambda_function" "send_notification" {
   handler          = "index.lambda_handler"
   source_code_hash = data.archive_file.send_notification.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
   timeout          = 30
 
 
@@ -247,6 +378,244 @@ resource "aws_lambda_function" "get_cluster_instances" {
   handler          = "index.lambda_handler"
   source_code_hash = data.archive_file.get_cluster_instances.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
+  timeout          = 60
+
+  # VPC接続 (RDSアクセスに必須)
+  vpc_config {
+    subnet_ids         = aws_subnet.lambda[*].id
+    security_group_ids = [aws_security_group.lambda.id]
+  }
+
+  environment {
+    variables = {
+      ENVIRONMENT       = var.environment
+      METRICS_NAMESPACE = "AuroraScaling/${var.environment}"
+    }
+  }
+
+  tags = var.tags
+
+  depends_on = [
+    aws_iam_role_policy_attachment.lambda_rds_management,
+    aws_iam_role_policy_attachment.lambda_vpc_execution
+  ]
+}
+
+# Lambda関数: PlanReaderWaves (VPC接続あり)
+resource "aws_lambda_function" "plan_reader_waves" {
+  filename         = data.archive_file.plan_reader_waves.output_path
+  function_name    = "${var.project_name}-${var.environment}-plan-reader-waves"
+  role             = aws_iam_role.lambda_scaling.arn
+  handler          = "index.lambda_handler"
+  source_code_hash = data.archive_file.plan_reader_waves.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
+  timeout          = 60
+
+  # VPC接続 (RDSアクセスに必須)
+  vpc_config {
+    subnet_ids         = aws_subnet.lambda[*].id
+    security_group_ids = [aws_security_group.lambda.id]
+  }
+
+  environment {
+    variables = {
+      ENVIRONMENT               = var.environment
+      WAVE_MAX_READERS          = var.reader_wave_max_readers
+      WAVE_MAX_CAPACITY_PERCENT = var.reader_wave_max_capacity_percent
+      REPLACE_WAVE_MAX_READERS  = var.replace_wave_max_readers
+    }
+  }
+
+  tags = var.tags
+
+  depends_on = [
+    aws_iam_role_policy_attachment.lambda_rds_management,
+    aws_iam_role_policy_attachment.lambda_vpc_execution
+  ]
+}
+
+# Lambda関数: ReplaceInstance (VPC接続あり)
+# readerStrategy: "replace" の場合に、AutoScaling Reader を変更先のインスタンスタイプの新しいインスタンスに置き換える
+resource "aws_lambda_function" "replace_instance" {
+  filename         = data.archive_file.replace_instance.output_path
+  function_name    = "${var.project_name}-${var.environment}-replace-instance"
+  role             = aws_iam_role.lambda_scaling.arn
+  handler          = "index.lambda_handler"
+  source_code_hash = data.archive_file.replace_instance.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
+  timeout          = 60
+
+  # VPC接続 (RDSアクセスに必須)
+  vpc_config {
+    subnet_ids         = aws_subnet.lambda[*].id
+    security_group_ids = [aws_security_group.lambda.id]
+  }
+
+  environment {
+    variables = {
+      ENVIRONMENT              = var.environment
+      METRICS_NAMESPACE        = "AuroraScaling/${var.environment}"
+      # 所要時間の履歴の要約（ポーリング間隔の見積もり）
+      DURATION_HISTORY_TABLE   = aws_dynamodb_table.duration_history.name
+    }
+  }
+
+  tags = var.tags
+
+  depends_on = [
+    aws_iam_role_policy_attachment.lambda_rds_management,
+    aws_iam_role_policy_attachment.lambda_vpc_execution
+  ]
+}
+
+# Lambda関数: CheckFailoverReadiness (VPC接続あり)
+# フェイルオーバーの前に、Writer の書き込み・接続数とフェイルオーバー先のレプリカラグが落ち着くのを待つ
+resource "aws_lambda_function" "check_failover_readiness" {
+  filename         = data.archive_file.check_failover_readiness.output_path
+  function_name    = "${var.project_name}-${var.environment}-check-failover-readiness"
+  role             = aws_iam_role.lambda_scaling.arn
+  handler          = "index.lambda_handler"
+  source_code_hash = data.archive_file.check_failover_readiness.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
+  timeout          = 60
+
+  # VPC接続 (RDSアクセスに必須)
+  vpc_config {
+    subnet_ids         = aws_subnet.lambda[*].id
+    security_group_ids = [aws_security_group.lambda.id]
+  }
+
+  environment {
+    variables = {
+      ENVIRONMENT                      = var.environment
+      METRICS_NAMESPACE                = "AuroraScaling/${var.environment}"
+      FAILOVER_GATE_MAX_WAIT_SECONDS   = var.failover_gate_max_wait_seconds
+      FAILOVER_GATE_MAX_REPLICA_LAG_MS = var.failover_gate_max_replica_lag_ms
+      FAILOVER_GATE_BASELINE_MINUTES   = var.failover_gate_baseline_minutes
+      FAILOVER_GATE_BURST_RATIO        = var.failover_gate_burst_ratio
+    }
+  }
+
+  tags = var.tags
+
+  depends_on = [
+    aws_iam_role_policy_attachment.lambda_rds_management,
+    aws_iam_role_policy_attachment.lambda_vpc_execution
+  ]
+}
+
+# Lambda関数: DrainReader (VPC接続あり)
+# 変更する Reader をカスタム Reader エンドポイントから外し、接続が減るのを待つ（変更の完了後に戻す）
+resource "aws_lambda_function" "drain_reader" {
+  filename         = data.archive_file.drain_reader.output_path
+  function_name    = "${var.project_name}-${var.environment}-drain-reader"
+  role             = aws_iam_role.lambda_scaling.arn
+  handler          = "index.lambda_handler"
+  source_code_hash = data.archive_file.drain_reader.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
+  timeout          = 60
+
+  # VPC接続 (RDSアクセスに必須)
+  vpc_config {
+    subnet_ids         = aws_subnet.lambda[*].id
+    security_group_ids = [aws_security_group.lambda.id]
+  }
+
+  environment {
+    variables = {
+      ENVIRONMENT                = var.environment
+      METRICS_NAMESPACE          = "AuroraScaling/${var.environment}"
+      DRAIN_ENDPOINT_IDENTIFIER  = aws_rds_cluster_endpoint.reader_drain.cluster_endpoint_identifier
+      DRAIN_CONNECTION_THRESHOLD = var.reader_drain_connection_threshold
+      DRAIN_TIMEOUT_SECONDS      = var.reader_drain_timeout_seconds
+    }
+  }
+
+  tags = var.tags
+
+  depends_on = [
+    aws_iam_role_policy_attachment.lambda_rds_management,
+    aws_iam_role_policy_attachment.lambda_vpc_execution
+  ]
+}
+
+# Lambda関数: ManageAutoScaling（実行中の Reader の Application Auto Scaling の一時停止・再開）
+# Application Auto Scaling のAPIのみ使用するため VPC接続なし
+resource "aws_lambda_function" "manage_autoscaling" {
+  filename         = data.archive_file.manage_autoscaling.output_path
+  function_name    = "${var.project_name}-${var.environment}-manage-autoscaling"
+  role             = aws_iam_role.lambda_scaling.arn
+  handler          = "index.lambda_handler"
+  source_code_hash = data.archive_file.manage_autoscaling.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
+  timeout          = 60
+
+  environment {
+    variables = {
+      ENVIRONMENT       = var.environment
+      METRICS_NAMESPACE = "AuroraScaling/${var.environment}"
+    }
+  }
+
+  tags = var.tags
+
+  depends_on = [
+    aws_iam_role_policy_attachment.lambda_rds_management
+  ]
+}
+
+# Lambda関数: RollbackCluster (VPC接続あり)
+# 実行前のインスタンスタイプ・Writer の保存と、ロールバックの次の手順の判定
+resource "aws_lambda_function" "rollback_cluster" {
+  filename         = data.archive_file.rollback_cluster.output_path
+  function_name    = "${var.project_name}-${var.environment}-rollback-cluster"
+  role             = aws_iam_role.lambda_scaling.arn
+  handler          = "index.lambda_handler"
+  source_code_hash = data.archive_file.rollback_cluster.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
+  timeout          = 60
+
+  # VPC接続 (RDSアクセスに必須)
+  vpc_config {
+    subnet_ids         = aws_subnet.lambda[*].id
+    security_group_ids = [aws_security_group.lambda.id]
+  }
+
+  environment {
+    variables = {
+      ENVIRONMENT                        = var.environment
+      METRICS_NAMESPACE                  = "AuroraScaling/${var.environment}"
+      ROLLBACK_SNAPSHOT_PREFIX           = var.rollback_snapshot_prefix
+      ROLLBACK_WAVE_MAX_READERS          = var.rollback_wave_max_readers
+      ROLLBACK_WAVE_MAX_CAPACITY_PERCENT = var.rollback_wave_max_capacity_percent
+    }
+  }
+
+  tags = var.tags
+
+  depends_on = [
+    aws_iam_role_policy_attachment.lambda_rds_management,
+    aws_iam_role_policy_attachment.lambda_vpc_execution
+  ]
+}
+
+# Lambda関数: BlueGreenDeployment (VPC接続あり)
+# scalingStrategy: "blue-green" の場合に、Blue/Green デプロイで変更先のインスタンスタイプのクラスターに切り替える
+resource "aws_lambda_function" "blue_green_deployment" {
+  filename         = data.archive_file.blue_green_deployment.output_path
+  function_name    = "${var.project_name}-${var.environment}-blue-green-deployment"
+  role             = aws_iam_role.lambda_scaling.arn
+  handler          = "index.lambda_handler"
+  source_code_hash = data.archive_file.blue_green_deployment.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
   timeout          = 60
 
   # VPC接続 (RDSアクセスに必須)
@@ -257,7 +626,13 @@ resource "aws_lambda_function" "get_cluster_instances" {
 
   environment {
     variables = {
-      ENVIRONMENT = var.environment
+      ENVIRONMENT                           = var.environment
+      METRICS_NAMESPACE                     = "AuroraScaling/${var.environment}"
+      DURATION_HISTORY_TABLE                = aws_dynamodb_table.duration_history.name
+      BLUE_GREEN_SWITCHOVER_TIMEOUT_SECONDS = var.blue_green_switchover_timeout_seconds
+      # 切り替え前のクラスター（-old1）の削除はオプトイン（デフォルト false: 残す）
+      BLUE_GREEN_DELETE_OLD_CLUSTER         = var.blue_green_delete_old_cluster
+      BLUE_GREEN_FINAL_SNAPSHOT             = var.blue_green_final_snapshot
     }
   }
 
@@ -277,6 +652,7 @@ resource "aws_lambda_function" "schedule_scaling" {
   handler          = "index.lambda_handler"
   source_code_hash = data.archive_file.schedule_scaling.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
   timeout          = 900
 
   # VPC接続 (RDSアクセスに必須)
@@ -288,10 +664,35 @@ resource "aws_lambda_function" "schedule_scaling" {
   environment {
     variables = {
       ENVIRONMENT              = var.environment
+      METRICS_NAMESPACE        = "AuroraScaling/${var.environment}"
       CLUSTER_IDENTIFIER       = aws_rds_cluster.main.cluster_identifier
       STEP_FUNCTION_ARN        = aws_sfn_state_machine.aurora_scaling.arn
       GET_INSTANCES_FUNCTION_NAME = aws_lambda_function.get_cluster_instances.function_name
       EVENTBRIDGE_RULE_NAME   = aws_cloudwatch_event_rule.schedule_scaling.name
+      FLEET_MAX_CONCURRENCY   = var.fleet_max_concurrency
+      # プランモード（所要時間の見込み・ウェーブ分割）で使用
+      DURATION_HISTORY_TABLE    = aws_dynamodb_table.duration_history.name
+      WAVE_MAX_READERS          = var.reader_wave_max_readers
+      WAVE_MAX_CAPACITY_PERCENT = var.reader_wave_max_capacity_percent
+      # targetClass: "auto" の場合の変更先の推奨（CloudWatch メトリクス）
+      RECOMMENDATION_LOOKBACK_DAYS     = var.recommendation_lookback_days
+      RECOMMENDATION_OFF_PEAK_WINDOW   = var.recommendation_off_peak_window
+      RECOMMENDATION_CANDIDATE_CLASSES = join(",", var.recommendation_candidate_classes)
+      RECOMMENDATION_HEADROOM_PERCENT  = var.recommendation_headroom_percent
+      # 変更先のインスタンスタイプの事前確認（describe_orderable_db_instance_options の結果のインデックス）
+      ORDERABILITY_INDEX_PARAMETER = aws_ssm_parameter.orderable_classes.name
+      ORDERABILITY_CACHE_TTL_HOURS = var.orderability_cache_ttl_hours
+      # オンデマンドのロールバック（rollback: true）で実行前のスナップショットと次の手順を確認する
+      ROLLBACK_SNAPSHOT_PREFIX           = var.rollback_snapshot_prefix
+      ROLLBACK_WAVE_MAX_READERS          = var.rollback_wave_max_readers
+      ROLLBACK_WAVE_MAX_CAPACITY_PERCENT = var.rollback_wave_max_capacity_percent
+      # スケールアップ（direction: "up"）と期限（deadline）までの余裕の見積もり
+      SCALE_UP_TARGET_CLASS          = var.scale_up_target_class
+      SCALE_UP_EVENTBRIDGE_RULE_NAME = aws_cloudwatch_event_rule.schedule_scale_up.name
+      DEADLINE_ESTIMATE_PERCENTILE   = var.deadline_estimate_percentile
+      FAILOVER_GATE_MAX_WAIT_SECONDS = var.failover_gate_max_wait_seconds
+      # 変更の方法（in-place / blue-green）の既定値（イベントの scalingStrategy で上書きできる）
+      SCALING_STRATEGY = var.scaling_strategy
     }
   }
 
@@ -311,7 +712,8 @@ resource "aws_lambda_function" "update_schedule" {
   handler          = "index.lambda_handler"
   source_code_hash = data.archive_file.update_schedule.output_base64sha256
   runtime          = "python3.11"
-  timeout          = 30
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
+  timeout          = 60
 
   environment {
     variables = {
@@ -319,6 +721,17 @@ resource "aws_lambda_function" "update_schedule" {
       PROJECT_NAME         = var.project_name
       CLUSTER_IDENTIFIER   = aws_rds_cluster.main.cluster_identifier
       EVENTBRIDGE_RULE_NAME = aws_cloudwatch_event_rule.schedule_scaling.name
+      # scheduleTime: "auto"（負荷の低い時間帯の検索）で使用
+      SCHEDULE_WINDOW_LOOKBACK_DAYS = var.schedule_window_lookback_days
+      DURATION_HISTORY_TABLE        = aws_dynamodb_table.duration_history.name
+      WAVE_MAX_READERS              = var.reader_wave_max_readers
+      WAVE_MAX_CAPACITY_PERCENT     = var.reader_wave_max_capacity_percent
+      # direction: "up"（スケールアップ）と deadline（期限から開始時刻を逆算）で使用
+      SCALE_UP_TARGET_CLASS          = var.scale_up_target_class
+      SCALE_UP_EVENTBRIDGE_RULE_NAME = aws_cloudwatch_event_rule.schedule_scale_up.name
+      DEADLINE_ESTIMATE_PERCENTILE   = var.deadline_estimate_percentile
+      DEADLINE_MARGIN_MINUTES        = var.deadline_margin_minutes
+      FAILOVER_GATE_MAX_WAIT_SECONDS = var.failover_gate_max_wait_seconds
     }
   }
 
@@ -329,9 +742,152 @@ resource "aws_lambda_function" "update_schedule" {
   ]
 }
 
+# Lambda関数: RdsEventHandler (VPC接続なし)
+# RDSイベントを受け取り、待機中の Step Functions タスクを完了させる（DynamoDB / Step Functions APIのみ使用）
+resource "aws_lambda_function" "rds_event_handler" {
+  filename         = data.archive_file.rds_event_handler.output_path
+  function_name    = "${var.project_name}-${var.environment}-rds-event-handler"
+  role             = aws_iam_role.lambda_scaling.arn
+  handler          = "index.lambda_handler"
+  source_code_hash = data.archive_file.rds_event_handler.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.scaling_common.arn]
+  timeout          = 60
+
+  environment {
+    variables = {
+      ENVIRONMENT      = var.environment
+      TASK_TOKEN_TABLE = aws_dynamodb_table.task_tokens.name
+      # 完了イベントの時刻を所要時間の履歴の開始の記録に残す
+      DURATION_HISTORY_TABLE = aws_dynamodb_table.duration_history.name
+    }
+  }
+
+  tags = var.tags
+
+  depends_on = [
+    aws_iam_role_policy_attachment.lambda_rds_management
+  ]
+}
+
+# イベント駆動モード（completionMode = "event"）で待機中のタスクトークン
+# キー: instance#<インスタンスID>#modify / cluster#<クラスターID>#failover
+resource "aws_dynamodb_table" "task_tokens" {
+  name         = "${var.project_name}-${var.environment}-scaling-task-tokens"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "resourceKey"
+
+  attribute {
+    name = "resourceKey"
+    type = "S"
+  }
+
+  # 完了イベントが届かなかったトークンは自動的に削除する
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+# リサイズ・フェイルオーバーの所要時間の履歴（開始・完了の記録とサンプル）
+# 開始: historyKey = start#instance#<インスタンスID> / start#cluster#<クラスターID>#failover、sampleKey = start
+# サンプル: historyKey = <クラスターID>#<エンジンバージョン>#<変更前->変更後 / failover>、sampleKey = <完了時刻>#<リソースID>
+# 要約（見積もり用、scaling_common.resize_history）: historyKey = summary、sampleKey = <変更前->変更後 / failover / blue-green-*>、
+#   samples = 直近の所要時間のリスト（list_append で追加するため、同時に記録しても失われない）
+resource "aws_dynamodb_table" "duration_history" {
+  name         = "${var.project_name}-${var.environment}-scaling-duration-history"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "historyKey"
+  range_key    = "sampleKey"
+
+  attribute {
+    name = "historyKey"
+    type = "S"
+  }
+
+  attribute {
+    name = "sampleKey"
+    type = "S"
+  }
+
+  # 保持期間（duration_history_retention_days）を過ぎたサンプルと、完了を確認できなかった開始の記録は自動的に削除する
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+# 注文可能なインスタンスタイプの確認結果（schedule-scaling の事前確認で使用、エンジン・バージョン・タイプごと）
+# 形式: {"aurora-postgresql/15.4/db.t4g.medium": {"orderable": true, "checkedAt": 1737212400}}
+resource "aws_ssm_parameter" "orderable_classes" {
+  name        = "/aurora-scaling/orderable-classes"
+  description = "Cached describe-orderable-db-instance-options results keyed by engine, version and instance class"
+  type        = "String"
+  value       = "{}"
+
+  # 値は運用中に更新されるため、Terraformでは初期値のみ管理する
+  lifecycle {
+    ignore_changes = [value]
+  }
+
+  tags = var.tags
+}
+
 # SNSトピック
 resource "aws_sns_topic" "aurora_alerts" {
   name = "${var.project_name}-${var.environment}-aurora-scaling-alerts"
   
+  tags = var.tags
+}
+
+# 過去の同じ変更より大幅に遅いリサイズ・フェイルオーバー（SLOW_DURATION_FACTOR × p90 超、EMFの SlowResizes / SlowFailovers）
+resource "aws_cloudwatch_metric_alarm" "slow_resize" {
+  alarm_name          = "${var.project_name}-${var.environment}-slow-resize"
+  alarm_description   = "A resize or failover took much longer than past samples of the same transition"
+  comparison_operator = "GreaterThanThreshold"
+  evaluation_periods  = 1
+  threshold           = 0
+  treat_missing_data  = "notBreaching"
+  alarm_actions       = [aws_sns_topic.aurora_alerts.arn]
+
+  metric_query {
+    id          = "slow"
+    expression  = "FILL(resizes, 0) + FILL(failovers, 0)"
+    label       = "Slow resizes and failovers"
+    return_data = true
+  }
+
+  metric_query {
+    id = "resizes"
+
+    metric {
+      namespace   = "AuroraScaling/${var.environment}"
+      metric_name = "SlowResizes"
+      period      = 3600
+      stat        = "Sum"
+      dimensions = {
+        ClusterIdentifier = aws_rds_cluster.main.cluster_identifier
+      }
+    }
+  }
+
+  metric_query {
+    id = "failovers"
+
+    metric {
+      namespace   = "AuroraScaling/${var.environment}"
+      metric_name = "SlowFailovers"
+      period      = 3600
+      stat        = "Sum"
+      dimensions = {
+        ClusterIdentifier = aws_rds_cluster.main.cluster_identifier
+      }
+    }
+  }
+
   tags = var.tags
 }
\ No newline at end of file
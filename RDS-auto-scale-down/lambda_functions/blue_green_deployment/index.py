@@ -0,0 +1,444 @@
+import hashlib
+import json
+import logging
+import os
+from botocore.exceptions import ClientError
+from scaling_common import clock
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.emf import emit, with_emf_metrics
+from scaling_common.polling import clamp_poll_seconds, elapsed_seconds_since, eta_poll_seconds
+from scaling_common.resize_history import (
+    BLUE_GREEN_PROVISION_KEY, BLUE_GREEN_SWITCHOVER_KEY, append_resize_history, expected_blue_green_seconds, load_resize_history
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+rds = LazyClient('rds')
+dynamodb = LazyClient('dynamodb')
+
+ACTIONS = ('create', 'check', 'switchover', 'cleanup', 'abort')
+
+# Blue/Green デプロイの名前の上限（RDS）
+MAX_DEPLOYMENT_NAME_LENGTH = 60
+
+# グリーン環境の作成に失敗したステータス（スイッチオーバーできない）
+PROVISION_FAILED_STATUSES = ('INVALID_CONFIGURATION', 'PROVISIONING_FAILED')
+# スイッチオーバーを開始済みのステータス（グリーン環境は削除できない）
+SWITCHOVER_STARTED_STATUSES = ('SWITCHOVER_IN_PROGRESS', 'SWITCHOVER_COMPLETED')
+
+# スイッチオーバーのタイムアウト（秒）の既定値（RDS の既定値と同じ。超えた場合は RDS が切り替えを取り消す）
+DEFAULT_SWITCHOVER_TIMEOUT_SECONDS = 300
+
+# Aurora PostgreSQL の Blue/Green デプロイに必要なクラスターパラメータ（ブルーからグリーンへの論理レプリケーション）
+LOGICAL_REPLICATION_PARAMETER = 'rds.logical_replication'
+
+# ブルー環境の削除の確認の間隔（インスタンスの削除を待ってからクラスターを削除する）
+CLEANUP_POLL_SECONDS = 60
+
+@with_emf_metrics
+@with_api_metrics
+def lambda_handler(event, context):
+    """
+    Blue/Green デプロイでクラスターのインスタンスタイプを変更する（scalingStrategy: "blue-green"）
+    インスタンスごとの変更とフェイルオーバーの代わりに、1回のスイッチオーバーで変更先のタイプのクラスターに切り替える
+    デプロイの名前はクラスターと実行名から決める（再実行・中止で同じデプロイを参照するため）
+
+    action: "create" ... 全インスタンスが targetClass のグリーン環境を作成する（作成済みの場合は作成しない）
+      クラスターパラメータグループで論理レプリケーションが有効（適用済み）でない場合は作成せずにエラー
+    action: "check" ... グリーン環境の作成・スイッチオーバーの状態を確認する
+      readyForSwitchover: デプロイと全メンバーが AVAILABLE で、グリーン環境の全インスタンスが targetClass で available
+    action: "switchover" ... SwitchoverTimeout（BLUE_GREEN_SWITCHOVER_TIMEOUT_SECONDS）を指定してスイッチオーバーする
+      タイムアウトまでにレプリケーションが追いつかない場合は RDS が切り替えを取り消す（SWITCHOVER_FAILED、ブルー環境のまま）
+    action: "cleanup" ... スイッチオーバーの完了後に、デプロイと切り替え前のクラスター（ブルー環境、-old1。残した -old1 がある場合は -old2, ...）を削除する
+      クラスターの削除は BLUE_GREEN_DELETE_OLD_CLUSTER が true の場合のみ（デフォルトは残す）
+      クラスターは作成時の DbClusterResourceId で特定する（スイッチオーバーで識別子が変わるため）
+    action: "abort" ... スイッチオーバーの前の失敗時に、デプロイとグリーン環境を削除する
+    """
+    try:
+        cluster_identifier = event.get('clusterIdentifier')
+        execution_name = event.get('executionName')
+        action = event.get('action')
+
+        if not cluster_identifier or not execution_name:
+            logger.error("Missing required parameters: clusterIdentifier or executionName")
+            raise ValueError("Missing required parameters: clusterIdentifier or executionName")
+        if action not in ACTIONS:
+            raise ValueError(f"Invalid action: {action}. Use one of {', '.join(ACTIONS)}")
+        if action in ('create', 'check') and not event.get('targetClass'):
+            raise ValueError("Missing required parameter: targetClass")
+
+        name = deployment_name(cluster_identifier, execution_name)
+
+        if action == 'create':
+            return create_deployment(event, cluster_identifier, name)
+        if action == 'check':
+            return check_deployment(event, cluster_identifier, name)
+        if action == 'switchover':
+            return switchover_deployment(event, cluster_identifier, name)
+        if action == 'cleanup':
+            return cleanup_blue(event, cluster_identifier, name)
+        return abort_deployment(event, cluster_identifier, name)
+
+    except ClientError as e:
+        logger.error(f"AWS Client Error: {str(e)}")
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise e
+
+
+def deployment_name(cluster_identifier, execution_name):
+    """
+    実行ごとのデプロイの名前（同じ実行からは常に同じ名前）
+    例: aurora-prod-cluster-bg-3f2a9c01de
+    """
+    digest = hashlib.sha1(f"{cluster_identifier}/{execution_name}".encode()).hexdigest()[:10]
+    suffix = f"-bg-{digest}"
+    return cluster_identifier[:MAX_DEPLOYMENT_NAME_LENGTH - len(suffix)].rstrip('-') + suffix
+
+
+def find_deployment(name):
+    deployments = rds.describe_blue_green_deployments(
+        Filters=[{'Name': 'blue-green-deployment-name', 'Values': [name]}]
+    ).get('BlueGreenDeployments', [])
+    return deployments[0] if deployments else None
+
+
+def require_deployment(name):
+    deployment = find_deployment(name)
+    if deployment is None:
+        raise ValueError(f"Blue/green deployment {name} not found")
+    return deployment
+
+
+def deployment_result(deployment, cluster_identifier, **values):
+    return {
+        'clusterIdentifier': cluster_identifier,
+        'blueGreenDeploymentIdentifier': deployment['BlueGreenDeploymentIdentifier'],
+        'blueGreenDeploymentName': deployment['BlueGreenDeploymentName'],
+        'status': deployment['Status'],
+        **values
+    }
+
+
+def create_deployment(event, cluster_identifier, name):
+    """
+    グリーン環境を作成する（同じ名前のデプロイがあれば再利用する）
+    同じクラスターに別のデプロイ（前回の実行の残りなど）がある場合はエラー（RDS はソースごとに1つのみ作成できる）
+    """
+    target_class = event['targetClass']
+    cluster = rds.describe_db_clusters(DBClusterIdentifier=cluster_identifier)['DBClusters'][0]
+
+    deployment = find_deployment(name)
+    created = deployment is None
+    if deployment is not None:
+        logger.info(f"Blue/green deployment {name} already exists ({deployment['Status']})")
+    else:
+        others = [
+            d for d in rds.describe_blue_green_deployments(
+                Filters=[{'Name': 'source', 'Values': [cluster['DBClusterArn']]}]
+            ).get('BlueGreenDeployments', [])
+            if d['Status'] not in ('DELETING', 'SWITCHOVER_COMPLETED')
+        ]
+        if others:
+            raise ValueError(
+                f"Cluster {cluster_identifier} already has blue/green deployment {others[0]['BlueGreenDeploymentName']} "
+                f"({others[0]['Status']}); delete it before scaling with scalingStrategy: blue-green"
+            )
+        # 論理レプリケーションが無効なまま作成すると、作成時のエラーか PROVISIONING_FAILED まで待つことになるため先に確認する
+        replication_error = logical_replication_error(cluster)
+        if replication_error:
+            raise ValueError(replication_error)
+        logger.info(f"Creating blue/green deployment {name} for {cluster_identifier} with every instance at {target_class}")
+        deployment = rds.create_blue_green_deployment(
+            BlueGreenDeploymentName=name,
+            Source=cluster['DBClusterArn'],
+            TargetDBInstanceClass=target_class,
+            Tags=[{'Key': 'ScalingExecution', 'Value': event['executionName']}]
+        )['BlueGreenDeployment']
+
+    expected = expected_blue_green_seconds(load_resize_history(dynamodb), BLUE_GREEN_PROVISION_KEY)
+    if created:
+        emit(
+            event,
+            {'BlueGreenDeployments': 1, 'ExpectedBlueGreenProvisionSeconds': expected},
+            dimensions={'ClusterIdentifier': cluster_identifier},
+            properties={'blueGreenDeploymentName': name, 'targetClass': target_class}
+        )
+
+    return deployment_result(
+        deployment,
+        cluster_identifier,
+        created=created,
+        sourceClusterResourceId=cluster['DbClusterResourceId'],
+        targetClass=target_class,
+        expectedProvisionSeconds=expected
+    )
+
+
+def logical_replication_error(cluster):
+    """
+    クラスターパラメータグループで rds.logical_replication = 1 が適用済みか（問題がなければ None、あればエラーメッセージ）
+    静的パラメータのため、パラメータグループを変更しても Writer を再起動するまでは適用されない（pending-reboot）
+    """
+    cluster_identifier = cluster['DBClusterIdentifier']
+    group = cluster.get('DBClusterParameterGroup')
+    value = None
+    paginator = rds.get_paginator('describe_db_cluster_parameters')
+    for page in paginator.paginate(DBClusterParameterGroupName=group):
+        for parameter in page.get('Parameters', []):
+            if parameter['ParameterName'] == LOGICAL_REPLICATION_PARAMETER:
+                value = parameter.get('ParameterValue')
+    if value != '1':
+        return (
+            f"Cluster {cluster_identifier} uses parameter group {group} without {LOGICAL_REPLICATION_PARAMETER} = 1, "
+            f"which blue/green deployments require; set scaling_strategy = \"blue-green\" in Terraform and reboot the writer"
+        )
+    pending = [
+        m['DBInstanceIdentifier'] for m in cluster.get('DBClusterMembers', [])
+        if m.get('IsClusterWriter') and m.get('DBClusterParameterGroupStatus', 'in-sync') != 'in-sync'
+    ]
+    if pending:
+        return (
+            f"{LOGICAL_REPLICATION_PARAMETER} in parameter group {group} is not applied to writer {pending[0]} of cluster "
+            f"{cluster_identifier} yet; reboot the writer before scaling with scalingStrategy: blue-green"
+        )
+    return None
+
+
+def green_instances(deployment):
+    """
+    グリーン環境のクラスターのインスタンス（作成中はまだ一部しか見つからない場合がある）
+    """
+    target = deployment.get('Target')
+    if not target:
+        return []
+    paginator = rds.get_paginator('describe_db_instances')
+    return [
+        instance
+        for page in paginator.paginate(Filters=[{'Name': 'db-cluster-id', 'Values': [target]}])
+        for instance in page.get('DBInstances', [])
+    ]
+
+
+def check_deployment(event, cluster_identifier, name):
+    """
+    スイッチオーバーの前はグリーン環境の準備、開始後はスイッチオーバーの完了を確認する
+    完了した時点（readyForSwitchover / switchoverComplete）の経過時間を所要時間の履歴（要約）とメトリクスに記録する
+    """
+    target_class = event['targetClass']
+    deployment = require_deployment(name)
+    status = deployment['Status']
+    elapsed = elapsed_seconds_since(event.get('phaseStartTime'))
+    history = load_resize_history(dynamodb)
+
+    if status in SWITCHOVER_STARTED_STATUSES or status == 'SWITCHOVER_FAILED':
+        complete = status == 'SWITCHOVER_COMPLETED'
+        if complete:
+            logger.info(f"Switchover of {name} completed in about {elapsed} seconds")
+            record_duration(event, cluster_identifier, BLUE_GREEN_SWITCHOVER_KEY, 'BlueGreenSwitchoverSeconds', elapsed)
+        elif status == 'SWITCHOVER_FAILED':
+            logger.error(f"Switchover of {name} failed; the blue environment is still serving: {json.dumps(deployment.get('StatusDetails'))}")
+        return deployment_result(
+            deployment,
+            cluster_identifier,
+            readyForSwitchover=False,
+            switchoverComplete=complete,
+            failed=status == 'SWITCHOVER_FAILED',
+            greenInstances=[],
+            laggingInstanceIds=[],
+            phaseElapsedSeconds=elapsed,
+            nextPollSeconds=0 if complete else eta_poll_seconds(elapsed, expected_blue_green_seconds(history, BLUE_GREEN_SWITCHOVER_KEY))
+        )
+
+    instances = green_instances(deployment)
+    lagging = [
+        i['DBInstanceIdentifier'] for i in instances
+        if i['DBInstanceStatus'] != 'available' or i['DBInstanceClass'] != target_class
+    ]
+    members_available = all(d.get('Status') == 'AVAILABLE' for d in deployment.get('SwitchoverDetails', []))
+    ready = status == 'AVAILABLE' and members_available and bool(instances) and not lagging
+    failed = status in PROVISION_FAILED_STATUSES
+
+    if ready:
+        logger.info(f"Green environment of {name} is ready at {target_class} after about {elapsed} seconds")
+        record_duration(event, cluster_identifier, BLUE_GREEN_PROVISION_KEY, 'BlueGreenProvisionSeconds', elapsed)
+    elif failed:
+        logger.error(f"Blue/green deployment {name} is {status}: {deployment.get('StatusDetails')}")
+    else:
+        logger.info(f"Blue/green deployment {name} is {status} after {elapsed} seconds (not ready: {lagging})")
+
+    return deployment_result(
+        deployment,
+        cluster_identifier,
+        readyForSwitchover=ready,
+        switchoverComplete=False,
+        failed=failed,
+        greenInstances=[
+            {'instanceId': i['DBInstanceIdentifier'], 'class': i['DBInstanceClass'], 'status': i['DBInstanceStatus']}
+            for i in instances
+        ],
+        laggingInstanceIds=lagging,
+        phaseElapsedSeconds=elapsed,
+        nextPollSeconds=0 if ready else eta_poll_seconds(elapsed, expected_blue_green_seconds(history, BLUE_GREEN_PROVISION_KEY))
+    )
+
+
+def record_duration(event, cluster_identifier, key, metric_name, seconds):
+    emit(event, {metric_name: seconds}, dimensions={'ClusterIdentifier': cluster_identifier})
+    append_resize_history(dynamodb, [{'transition': key, 'durationSeconds': seconds}])
+
+
+def switchover_deployment(event, cluster_identifier, name):
+    """
+    スイッチオーバーを開始する（開始済みの場合は開始しない）
+    """
+    deployment = require_deployment(name)
+    status = deployment['Status']
+    timeout = int(os.environ.get('BLUE_GREEN_SWITCHOVER_TIMEOUT_SECONDS', DEFAULT_SWITCHOVER_TIMEOUT_SECONDS))
+
+    started = False
+    if status in SWITCHOVER_STARTED_STATUSES:
+        logger.info(f"Switchover of {name} is already {status}")
+    elif status != 'AVAILABLE':
+        raise ValueError(f"Blue/green deployment {name} is {status}; switchover requires AVAILABLE")
+    else:
+        logger.info(f"Switching over {name} with a {timeout} second timeout")
+        deployment = rds.switchover_blue_green_deployment(
+            BlueGreenDeploymentIdentifier=deployment['BlueGreenDeploymentIdentifier'],
+            SwitchoverTimeout=timeout
+        )['BlueGreenDeployment']
+        started = True
+
+    expected = expected_blue_green_seconds(load_resize_history(dynamodb), BLUE_GREEN_SWITCHOVER_KEY)
+    if started:
+        emit(
+            event,
+            {'BlueGreenSwitchovers': 1, 'ExpectedSwitchoverSeconds': expected},
+            dimensions={'ClusterIdentifier': cluster_identifier},
+            properties={'blueGreenDeploymentName': name, 'switchoverTimeoutSeconds': timeout}
+        )
+
+    return deployment_result(
+        deployment,
+        cluster_identifier,
+        started=started,
+        switchoverTimeoutSeconds=timeout,
+        nextPollSeconds=eta_poll_seconds(0, expected)
+    )
+
+
+def cleanup_blue(event, cluster_identifier, name):
+    """
+    スイッチオーバーの完了後に、デプロイとブルー環境（切り替え前のクラスター）を削除する
+    インスタンスの削除を待ってからクラスターを削除する（BLUE_GREEN_FINAL_SNAPSHOT が true の場合は最終スナップショットを作成）
+    BLUE_GREEN_DELETE_OLD_CLUSTER が true でない場合（デフォルト）、削除保護が有効な場合はクラスターを残す（cleanupComplete: true, retained: true）
+    """
+    resource_id = event.get('sourceClusterResourceId')
+    if not resource_id:
+        raise ValueError("Missing required parameter: sourceClusterResourceId")
+
+    deployment = find_deployment(name)
+    if deployment is not None:
+        if deployment['Status'] != 'SWITCHOVER_COMPLETED':
+            raise ValueError(f"Blue/green deployment {name} is {deployment['Status']}; refusing to delete the blue environment before switchover")
+        # スイッチオーバー後はグリーン環境（現在のクラスター）を削除しないよう DeleteTarget を指定しない
+        logger.info(f"Deleting blue/green deployment {name}")
+        rds.delete_blue_green_deployment(BlueGreenDeploymentIdentifier=deployment['BlueGreenDeploymentIdentifier'])
+
+    clusters = rds.describe_db_clusters(
+        Filters=[{'Name': 'db-cluster-resource-id', 'Values': [resource_id]}]
+    ).get('DBClusters', [])
+    if not clusters:
+        logger.info(f"Blue cluster {resource_id} is already deleted")
+        return cleanup_result(event, cluster_identifier, name, None, True)
+
+    old_cluster = clusters[0]
+    old_identifier = old_cluster['DBClusterIdentifier']
+    if old_identifier == cluster_identifier:
+        raise ValueError(f"Cluster {resource_id} is still {cluster_identifier}; refusing to delete the serving cluster")
+    # クラスターの削除は運用者が明示的に有効にした場合のみ行う
+    if os.environ.get('BLUE_GREEN_DELETE_OLD_CLUSTER', 'false').lower() != 'true':
+        logger.info(f"Keeping blue cluster {old_identifier} (BLUE_GREEN_DELETE_OLD_CLUSTER is not true)")
+        return cleanup_result(event, cluster_identifier, name, old_identifier, True, retained=True)
+    if old_cluster.get('DeletionProtection'):
+        logger.warning(f"Blue cluster {old_identifier} has deletion protection enabled; delete it manually")
+        return cleanup_result(event, cluster_identifier, name, old_identifier, True, retained=True)
+    if old_cluster['Status'] == 'deleting':
+        return cleanup_result(event, cluster_identifier, name, old_identifier, True)
+
+    paginator = rds.get_paginator('describe_db_instances')
+    instances = [
+        instance
+        for page in paginator.paginate(Filters=[{'Name': 'db-cluster-id', 'Values': [old_identifier]}])
+        for instance in page.get('DBInstances', [])
+    ]
+    deleted = []
+    for instance in instances:
+        if instance['DBInstanceStatus'] == 'deleting':
+            continue
+        try:
+            rds.delete_db_instance(DBInstanceIdentifier=instance['DBInstanceIdentifier'])
+            deleted.append(instance['DBInstanceIdentifier'])
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'InvalidDBInstanceState':
+                raise
+            # 切り替え直後の再起動中など。次の確認で削除する
+            logger.info(f"Instance {instance['DBInstanceIdentifier']} cannot be deleted yet: {str(e)}")
+    if deleted:
+        logger.info(f"Deleting instances of blue cluster {old_identifier}: {deleted}")
+
+    if instances:
+        return cleanup_result(event, cluster_identifier, name, old_identifier, False, deletedInstanceIds=deleted,
+                              remainingInstanceIds=[i['DBInstanceIdentifier'] for i in instances])
+
+    params = {'DBClusterIdentifier': old_identifier, 'SkipFinalSnapshot': True}
+    snapshot_identifier = None
+    if os.environ.get('BLUE_GREEN_FINAL_SNAPSHOT', 'true').lower() == 'true':
+        snapshot_identifier = f"{old_identifier}-final-{clock.now().strftime('%Y%m%d%H%M%S')}"
+        params = {'DBClusterIdentifier': old_identifier, 'SkipFinalSnapshot': False, 'FinalDBSnapshotIdentifier': snapshot_identifier}
+    logger.info(f"Deleting blue cluster {old_identifier} (final snapshot: {snapshot_identifier})")
+    rds.delete_db_cluster(**params)
+    emit(event, {'BlueClustersDeleted': 1}, dimensions={'ClusterIdentifier': cluster_identifier},
+         properties={'oldClusterIdentifier': old_identifier, 'finalSnapshotIdentifier': snapshot_identifier})
+
+    return cleanup_result(event, cluster_identifier, name, old_identifier, True, finalSnapshotIdentifier=snapshot_identifier)
+
+
+def cleanup_result(event, cluster_identifier, name, old_identifier, complete, **values):
+    return {
+        'clusterIdentifier': cluster_identifier,
+        'blueGreenDeploymentName': name,
+        'oldClusterIdentifier': old_identifier,
+        'cleanupComplete': complete,
+        'retained': False,
+        'deletedInstanceIds': [],
+        'finalSnapshotIdentifier': None,
+        'phaseElapsedSeconds': elapsed_seconds_since(event.get('phaseStartTime')),
+        'nextPollSeconds': 0 if complete else clamp_poll_seconds(CLEANUP_POLL_SECONDS),
+        **values
+    }
+
+
+def abort_deployment(event, cluster_identifier, name):
+    """
+    スイッチオーバーの前の失敗時に、デプロイとグリーン環境を削除する（ブルー環境は変更されていない）
+    スイッチオーバーを開始済みの場合は削除しない（aborted: false）
+    """
+    deployment = find_deployment(name)
+    if deployment is None:
+        logger.info(f"Blue/green deployment {name} does not exist; nothing to abort")
+        return {'clusterIdentifier': cluster_identifier, 'blueGreenDeploymentName': name, 'aborted': False, 'status': None}
+
+    status = deployment['Status']
+    if status in SWITCHOVER_STARTED_STATUSES:
+        logger.warning(f"Blue/green deployment {name} is {status}; not deleting the green environment")
+        return deployment_result(deployment, cluster_identifier, aborted=False)
+
+    logger.info(f"Deleting blue/green deployment {name} ({status}) and its green environment")
+    rds.delete_blue_green_deployment(BlueGreenDeploymentIdentifier=deployment['BlueGreenDeploymentIdentifier'], DeleteTarget=True)
+    emit(event, {'BlueGreenAborts': 1}, dimensions={'ClusterIdentifier': cluster_identifier},
+         properties={'blueGreenDeploymentName': name, 'status': status})
+    return deployment_result(deployment, cluster_identifier, aborted=True)
@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+from datetime import timedelta
+from botocore.exceptions import ClientError
+from scaling_common import clock
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.emf import emit, with_emf_metrics
+from scaling_common.metric_data import get_metric_series, metric_query, percentile
+from scaling_common.polling import elapsed_seconds_since
+from scaling_common.topology import get_cluster_writer_state
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+rds = LazyClient('rds')
+cloudwatch = LazyClient('cloudwatch')
+
+# メトリクスの集計期間（RDS の標準のメトリクスは1分ごと）
+METRIC_PERIOD_SECONDS = 60
+# 負荷の確認の間隔（新しいデータポイントが届く間隔）
+READINESS_POLL_SECONDS = 60
+# 書き込み・接続数の上限の下限
+MIN_BURST_LIMIT = 1
+
+# フェイルオーバーの前に確認する条件
+# Writer の書き込み（WriteIOPS）と接続数（DatabaseConnections）は、直近 FAILOVER_GATE_BASELINE_MINUTES 分の
+# 中央値の FAILOVER_GATE_BURST_RATIO 倍以下で「静か」とみなす（クラスターごとの負荷の水準に合わせ、揺らぎでは待たないため）
+# フェイルオーバー先のレプリカラグ（AuroraReplicaLag）は FAILOVER_GATE_MAX_REPLICA_LAG_MS 以下
+CONDITIONS = (
+    # (名前, メトリクス, 統計, 対象)
+    ('replicaLagMs', 'AuroraReplicaLag', 'Maximum', 'target'),
+    ('writeIops', 'WriteIOPS', 'Average', 'writer'),
+    ('connections', 'DatabaseConnections', 'Maximum', 'writer'),
+)
+
+@with_emf_metrics
+@with_api_metrics
+def lambda_handler(event, context):
+    """
+    フェイルオーバーの前に、Writer の書き込み・接続数とフェイルオーバー先のレプリカラグが落ち着いているか確認する
+    （書き込みが集中している間のフェイルオーバーは、中断されるトランザクションと再接続が最も多くなるため）
+
+    3つのメトリクスを1回の GetMetricData でまとめて取得し、全ての条件を満たせば ready: true
+    FAILOVER_GATE_MAX_WAIT_SECONDS（フェーズの開始から）を過ぎた場合は、条件を満たしていなくても ready: true（timedOut: true）
+    データポイントがないメトリクスは判定に使わない（フェイルオーバーを止めない）
+    ready: true の時点の条件をメトリクス（EMF）と結果に残す
+    """
+    try:
+        cluster_identifier = event.get('clusterIdentifier')
+        target_instance_id = event.get('targetInstanceId')
+
+        if not cluster_identifier or not target_instance_id:
+            logger.error("Missing required parameters: clusterIdentifier or targetInstanceId")
+            raise ValueError("Missing required parameters: clusterIdentifier or targetInstanceId")
+
+        max_wait_seconds = int(os.environ.get('FAILOVER_GATE_MAX_WAIT_SECONDS', 600))
+        elapsed = elapsed_seconds_since(event.get('phaseStartTime'))
+
+        if max_wait_seconds <= 0:
+            logger.info("Failover gate is disabled (FAILOVER_GATE_MAX_WAIT_SECONDS = 0)")
+            return readiness_result(cluster_identifier, target_instance_id, None, True, False, {}, elapsed, max_wait_seconds)
+
+        state = get_cluster_writer_state(rds, cluster_identifier)
+        writer_instance_id = state['writerInstanceId']
+        if writer_instance_id == target_instance_id:
+            # 既にフェイルオーバー先が Writer（failover-cluster もフェイルオーバーしない）
+            logger.info(f"{target_instance_id} is already the writer; no failover gate needed")
+            return readiness_result(cluster_identifier, target_instance_id, writer_instance_id, True, False, {}, elapsed, max_wait_seconds)
+
+        conditions = evaluate_conditions(writer_instance_id, target_instance_id)
+
+        waiting_on = [name for name, condition in conditions.items() if not condition['quiet']]
+        timed_out = bool(waiting_on) and elapsed >= max_wait_seconds
+        ready = not waiting_on or timed_out
+        if timed_out:
+            logger.warning(f"Failover gate timed out after {elapsed} seconds waiting on {waiting_on}: {json.dumps(conditions)}")
+        elif waiting_on:
+            logger.info(f"Waiting for a quiet moment before failover ({elapsed} seconds, waiting on {waiting_on}): {json.dumps(conditions)}")
+        else:
+            logger.info(f"Quiet moment for failover after {elapsed} seconds: {json.dumps(conditions)}")
+
+        if ready:
+            emit(
+                event,
+                {
+                    'FailoverGateWaitSeconds': elapsed,
+                    'FailoverGateTimeouts': 1 if timed_out else 0,
+                    'ReplicaLagAtFailover': conditions['replicaLagMs']['value'],
+                    'WriteIopsAtFailover': conditions['writeIops']['value'],
+                    'ConnectionsAtFailover': conditions['connections']['value']
+                },
+                dimensions={'ClusterIdentifier': cluster_identifier},
+                properties={'writerInstanceId': writer_instance_id, 'targetInstanceId': target_instance_id, 'conditions': conditions}
+            )
+
+        return readiness_result(cluster_identifier, target_instance_id, writer_instance_id, ready, timed_out, conditions, elapsed, max_wait_seconds)
+
+    except ClientError as e:
+        logger.error(f"AWS Client Error: {str(e)}")
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise e
+
+
+def evaluate_conditions(writer_instance_id, target_instance_id):
+    """
+    条件ごとの直近の値と上限
+    戻り値: {名前: {"value": 値, "limit": 上限, "quiet": bool}}（データポイントがない場合は value: None, quiet: true）
+    """
+    baseline_minutes = int(os.environ.get('FAILOVER_GATE_BASELINE_MINUTES', 60))
+    burst_ratio = float(os.environ.get('FAILOVER_GATE_BURST_RATIO', 1.5))
+    max_replica_lag_ms = float(os.environ.get('FAILOVER_GATE_MAX_REPLICA_LAG_MS', 100))
+
+    instances = {'writer': writer_instance_id, 'target': target_instance_id}
+    queries = [
+        metric_query(name.lower(), metric_name, stat, {'DBInstanceIdentifier': instances[role]}, METRIC_PERIOD_SECONDS)
+        for name, metric_name, stat, role in CONDITIONS
+    ]
+    end_time = clock.now().replace(second=0, microsecond=0)
+    series = get_metric_series(cloudwatch, queries, end_time - timedelta(minutes=baseline_minutes), end_time)
+
+    conditions = {}
+    for name, _, _, _ in CONDITIONS:
+        _, values = series.get(name.lower(), ([], []))
+        value = values[-1] if values else None
+        if name == 'replicaLagMs':
+            limit = max_replica_lag_ms
+        elif values:
+            # ほぼ無負荷のクラスター（中央値 0）でも、1 以下は静かとみなす
+            limit = max(percentile(sorted(values), 50) * burst_ratio, MIN_BURST_LIMIT)
+        else:
+            limit = None
+        conditions[name] = {
+            'value': value,
+            'limit': limit,
+            'quiet': value is None or limit is None or value <= limit
+        }
+    return conditions
+
+
+def readiness_result(cluster_identifier, target_instance_id, writer_instance_id, ready, timed_out, conditions, elapsed, max_wait_seconds):
+    return {
+        'clusterIdentifier': cluster_identifier,
+        'writerInstanceId': writer_instance_id,
+        'targetInstanceId': target_instance_id,
+        'ready': ready,
+        'timedOut': timed_out,
+        'conditions': conditions,
+        'elapsedSeconds': elapsed,
+        'nextPollSeconds': max(1, min(READINESS_POLL_SECONDS, max_wait_seconds - elapsed))
+    }
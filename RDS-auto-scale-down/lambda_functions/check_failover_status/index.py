@@ -0,0 +1,122 @@
+import logging
+from botocore.exceptions import ClientError
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.duration_history import (
+    DynamoDBDurationHistoryStore, failover_start_key, finish_and_assess, history_settings
+)
+from scaling_common.emf import emit, with_emf_metrics
+from scaling_common.polling import elapsed_seconds_since, failover_poll_seconds, next_poll_seconds
+from scaling_common.resize_history import append_resize_history, load_resize_history, expected_failover_seconds
+from scaling_common.topology import get_cluster_writer_state
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+rds = LazyClient('rds')
+dynamodb = LazyClient('dynamodb')
+history_store = DynamoDBDurationHistoryStore(dynamodb)
+
+# フェイルオーバーが開始されていないと判断するまでの時間: 過去の所要時間の p90 と下限の大きい方
+# （中央値では約半数のフェイルオーバーが完了前に該当し、2回目の FailoverDBCluster を要求しかねないため）
+FAILOVER_RETRY_PERCENTILE = 90
+MIN_FAILOVER_RETRY_SECONDS = 300
+
+@with_emf_metrics
+@with_api_metrics
+def lambda_handler(event, context):
+    """
+    フェイルオーバーの完了を確認する
+    describe_db_clusters でクラスターのWriterが指定したインスタンスに切り替わったかを確認する
+    （インスタンスが available であることだけでは、Writerの切り替わりは確認できない）
+    完了した場合は、failover_cluster が記録した開始からの所要時間を履歴に記録する
+    """
+    try:
+        cluster_identifier = event.get('clusterIdentifier')
+        target_instance_id = event.get('targetInstanceId')
+
+        if not cluster_identifier or not target_instance_id:
+            logger.error("Missing required parameters: clusterIdentifier or targetInstanceId")
+            raise ValueError("Missing required parameters: clusterIdentifier or targetInstanceId")
+
+        # フェーズの開始時刻（オプション）: フェイルオーバーの経過時間
+        phase_elapsed_seconds = elapsed_seconds_since(event.get('phaseStartTime'))
+
+        state = get_cluster_writer_state(rds, cluster_identifier)
+        cluster_status = state['clusterStatus']
+        writer_instance_id = state['writerInstanceId']
+        writer_switched = writer_instance_id == target_instance_id
+        failover_complete = writer_switched and cluster_status == 'available'
+
+        emit(
+            event,
+            {
+                'PhaseElapsedSeconds': phase_elapsed_seconds,
+                'FailoverDurationSeconds': phase_elapsed_seconds if failover_complete and event.get('phaseStartTime') else None
+            },
+            dimensions={'ClusterIdentifier': cluster_identifier},
+            properties={'clusterStatus': cluster_status, 'writerInstanceId': writer_instance_id, 'targetInstanceId': target_instance_id}
+        )
+
+        if failover_complete:
+            record_failover_finish(event, cluster_identifier)
+
+        history = load_resize_history(dynamodb)
+        expected_seconds = expected_failover_seconds(history) if not failover_complete else 0
+        retry_after_seconds = max(MIN_FAILOVER_RETRY_SECONDS, expected_failover_seconds(history, rank=FAILOVER_RETRY_PERCENTILE))
+
+        # フェイルオーバーが開始されていない（クラスターは available のまま、Writerも元のまま）場合は、
+        # 見込み時間（p90、下限あり）を過ぎた時点でフェイルオーバーの再実行が必要と判断する
+        failover_required = (
+            not writer_switched
+            and cluster_status == 'available'
+            and target_instance_id in state['memberInstanceIds']
+            and phase_elapsed_seconds >= retry_after_seconds
+        )
+        if failover_required:
+            logger.warning(f"Failover to {target_instance_id} has not started after {phase_elapsed_seconds} seconds")
+
+        return {
+            'clusterIdentifier': cluster_identifier,
+            'clusterStatus': cluster_status,
+            'writerInstanceId': writer_instance_id,
+            'targetInstanceId': target_instance_id,
+            'writerSwitched': writer_switched,
+            'failoverComplete': failover_complete,
+            'failoverRequired': failover_required,
+            'phaseElapsedSeconds': phase_elapsed_seconds,
+            'nextPollSeconds': next_poll_seconds([
+                failover_poll_seconds(cluster_status, writer_switched, phase_elapsed_seconds, expected_seconds)
+            ])
+        }
+
+    except ClientError as e:
+        logger.error(f"AWS Client Error: {str(e)}")
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise e
+
+
+def record_failover_finish(event, cluster_identifier):
+    """
+    フェイルオーバーの所要時間を履歴に記録し、遅いフェイルオーバー（SlowFailovers）をEMFで出力する
+    """
+    if not history_store.enabled:
+        return None
+    sample = finish_and_assess(history_store, failover_start_key(cluster_identifier), history_settings())
+    if sample is None:
+        return None
+    append_resize_history(dynamodb, [sample])
+    emit(
+        event,
+        {'SlowFailovers': 1 if sample['slow'] else 0},
+        dimensions={'ClusterIdentifier': cluster_identifier},
+        dimension_sets=[['ClusterIdentifier']],
+        properties={
+            'recordedDurationSeconds': sample['durationSeconds'],
+            'engineVersion': sample['engineVersion'],
+            'slowThresholdSeconds': sample['slowThresholdSeconds']
+        }
+    )
+    return sample
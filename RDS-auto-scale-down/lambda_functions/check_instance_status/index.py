@@ -1,19 +1,32 @@
 import json
-import boto3
 import logging
 from botocore.exceptions import ClientError
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.duration_history import (
+    DynamoDBDurationHistoryStore, finish_and_assess, history_settings, instance_start_key
+)
+from scaling_common.emf import emit, with_emf_metrics
+from scaling_common.polling import elapsed_seconds_since, instance_poll_seconds, next_poll_seconds
+from scaling_common.resize_history import append_resize_history, load_resize_history, expected_resize_seconds
+from scaling_common.scaling_plan import assess_progress
+from scaling_common.topology import SKIPPED_STATUSES, classify_topology, describe_cluster_instances
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-rds = boto3.client('rds')
+rds = LazyClient('rds')
+dynamodb = LazyClient('dynamodb')
+history_store = DynamoDBDurationHistoryStore(dynamodb)
 
+@with_emf_metrics
+@with_api_metrics
 def lambda_handler(event, context):
 
     
     # --- 入力値の取得と後方互換性の確保 ---
     instance_ids = event.get('instanceIds', [])
-    if not instance_ids:
+    if not instance_ids and not event.get('clusterIdentifier'):
         instance_id = event.get('instanceId')
         if instance_id:
             instance_ids = [instance_id]
@@ -25,13 +38,16 @@ def lambda_handler(event, context):
     # ターゲットインスタンスタイプ（オプション）
     target_class = event.get('targetClass')
 
-    logger.info(f"Checking status for instances: {instance_ids}, targetClass: {target_class}")
+    # フェーズの開始時刻（オプション）: 経過時間から次回ポーリングまでの待機時間を見積もる
+    phase_elapsed_seconds = elapsed_seconds_since(event.get('phaseStartTime'))
 
-    results = []
-    all_available = True
-    all_correct_class = True
+    history_cache = {}
 
     try:
+        # クラスター単位の確認（最終確認）: 全メンバーを1回の describe（ページング）で確認し、ロールごとの判定を返す
+        if event.get('clusterIdentifier'):
+            return verify_cluster(event, target_class, phase_elapsed_seconds, history_cache)
+
         # describe_db_instances は複数のインスタンスIDを直接指定できないため、
         # Filters パラメータを使用してフィルタリングする
         response = rds.describe_db_instances(
@@ -46,56 +62,24 @@ def lambda_handler(event, context):
         # 取得した結果を、IDをキーにした辞書に格納し直す（後で使いやすくするため）
         instance_map = {inst['DBInstanceIdentifier']: inst for inst in response['DBInstances']}
 
-        # --- メモリ上のデータ（辞書）を使ってループ処理 ---
-        for instance_id in instance_ids:
-            
-            # APIの応答にインスタンスIDが含まれているか確認
-            if instance_id not in instance_map:
-                logger.warning(f"Instance {instance_id} not found in describe_db_instances response.")
-                all_available = False # 状況が不明なため
-                results.append({
-                    'instanceId': instance_id, 
-                    'status': 'not_found', 
-                    'available': False
-                })
-            else:
-                # メモリ上のマップからインスタンス情報を取得
-                instance = instance_map[instance_id]
-                status = instance['DBInstanceStatus']
-                instance_class = instance['DBInstanceClass']
-                
-                # インスタンスタイプがターゲットと一致しているかチェック
-                correct_class = True
-                if target_class:
-                    correct_class = (instance_class == target_class)
-                    if not correct_class:
-                        all_correct_class = False
-                        logger.warning(f"Instance {instance_id} class mismatch: expected {target_class}, got {instance_class}")
-                
-                instance_result = {
-                    'instanceId': instance_id,
-                    'status': status,
-                    'instanceClass': instance_class,
-                    'available': status == 'available',
-                    'correctClass': correct_class
-                }
-                
-                # 1つでも 'available' でなければ、マスターフラグを False にする
-                if status != 'available':
-                    all_available = False
-                
-                # ターゲットタイプが指定されている場合、タイプが一致していない場合も False にする
-                if target_class and not correct_class:
-                    all_available = False
-                    
-                results.append(instance_result)
-                logger.info(f"Checked Instance {instance_id}: status={status}, class={instance_class}, correctClass={correct_class}")
+        results, poll_candidates = check_instances(
+            instance_ids, instance_map, target_class, phase_elapsed_seconds, history_cache,
+            ignore_missing=event.get('ignoreMissing', False)
+        )
+        checked = [r for r in results if not r.get('removed')]
+        all_available = all(r['available'] and r.get('correctClass', True) for r in checked)
+        emit_check_metrics(event, target_class, results, all_available, phase_elapsed_seconds)
+        record_resize_finishes(event, target_class, checked)
 
         return {
             'instances': results,
             'allAvailable': all_available,
-            'allCorrectClass': all_correct_class if target_class else True,
-            'checkedCount': len(results)
+            'allCorrectClass': all(r.get('correctClass', True) for r in checked) if target_class else True,
+            'modifyRequired': any(r.get('modifyRequired') for r in checked),
+            'removedInstanceIds': [r['instanceId'] for r in results if r.get('removed')],
+            'checkedCount': len(results),
+            'phaseElapsedSeconds': phase_elapsed_seconds,
+            'nextPollSeconds': next_poll_seconds(poll_candidates)
         }
 
     except ClientError as e:
@@ -104,4 +88,216 @@ def lambda_handler(event, context):
         raise e
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-        raise e
\ No newline at end of file
+        raise e
+
+
+def check_instances(instance_ids, instance_map, target_class, phase_elapsed_seconds, history_cache, ignore_missing=False):
+    """
+    describe_db_instances の結果（ID -> インスタンス情報）から各インスタンスの状態を判定する
+    ignore_missing の場合、見つからないインスタンス（AutoScaling のスケールインで削除された Reader）は removed として判定の対象外にする
+    戻り値: (インスタンスごとの結果, 次回ポーリングまでの待機時間の候補)
+    """
+    results = []
+    poll_candidates = []
+
+    # --- メモリ上のデータ（辞書）を使ってループ処理 ---
+    for instance_id in instance_ids:
+        
+        # APIの応答にインスタンスIDが含まれているか確認
+        if instance_id not in instance_map and ignore_missing:
+            results.append({
+                'instanceId': instance_id,
+                'status': 'not_found',
+                'available': False,
+                'removed': True
+            })
+            continue
+
+        if instance_id not in instance_map:
+            results.append({
+                'instanceId': instance_id, 
+                'status': 'not_found', 
+                'available': False
+            })
+            poll_candidates.append(instance_poll_seconds('not_found', False, phase_elapsed_seconds, 0))
+            continue
+
+        # メモリ上のマップからインスタンス情報を取得
+        instance = instance_map[instance_id]
+        status = instance['DBInstanceStatus']
+        instance_class = instance['DBInstanceClass']
+        
+        # インスタンスタイプがターゲットと一致しているかチェック
+        correct_class = True
+        if target_class:
+            correct_class = (instance_class == target_class)
+        
+        # 変更要求が受け付けられていない（available でタイプ未変更、保留中の変更もない）場合は再要求が必要
+        pending_class = instance.get('PendingModifiedValues', {}).get('DBInstanceClass')
+        needs_modify = status == 'available' and not correct_class and pending_class != target_class
+        if needs_modify:
+            logger.warning(f"Instance {instance_id} has no pending modification to {target_class}; modification must be requested again")
+        
+        results.append({
+            'instanceId': instance_id,
+            'status': status,
+            'instanceClass': instance_class,
+            'available': status == 'available',
+            'correctClass': correct_class,
+            'modifyRequired': needs_modify
+        })
+            
+        # 変更中のインスタンス（置き換えで作成中のインスタンスを含む）は、過去の所要時間の見込みから次回ポーリングまでの待機時間を決める
+        expected_seconds = 0
+        if status in ('modifying', 'creating') and target_class:
+            if 'history' not in history_cache:
+                history_cache['history'] = load_resize_history(dynamodb)
+            expected_seconds = expected_resize_seconds(history_cache['history'], instance_class, target_class)
+        poll_candidates.append(instance_poll_seconds(status, correct_class, phase_elapsed_seconds, expected_seconds))
+
+    return results, poll_candidates
+
+
+def record_resize_finishes(event, target_class, results):
+    """
+    変更先のタイプで available になったインスタンスの所要時間を履歴に記録する（modify_instance が開始を記録したもののみ）
+    記録したサンプルは履歴の要約（見積もり用、変更ごとの直近20件）にも追加し、所要時間と遅いリサイズ（SlowResizes）をEMFで出力する
+    """
+    if not target_class or not history_store.enabled:
+        return []
+    settings = history_settings()
+    samples = []
+    for r in results:
+        if not (r['available'] and r.get('correctClass')):
+            continue
+        sample = finish_and_assess(history_store, instance_start_key(r['instanceId']), settings)
+        if sample is None:
+            continue
+        samples.append(sample)
+        emit(
+            event,
+            {'ResizeDurationSeconds': sample['durationSeconds'], 'SlowResizes': 1 if sample['slow'] else 0},
+            dimensions={'InstanceClassTransition': sample['transition'], 'ClusterIdentifier': sample['clusterIdentifier']},
+            dimension_sets=[['Phase', 'InstanceClassTransition'], ['InstanceClassTransition'], ['ClusterIdentifier']],
+            properties={
+                'instanceId': sample['resourceId'],
+                'engineVersion': sample['engineVersion'],
+                'slowThresholdSeconds': sample['slowThresholdSeconds']
+            }
+        )
+    append_resize_history(dynamodb, samples)
+    return samples
+
+
+def emit_check_metrics(event, target_class, results, all_available, phase_elapsed_seconds, properties=None):
+    """
+    確認結果をEMFで出力する（フェーズが完了した確認では、フェーズの所要時間 PhaseDurationSeconds も出力する）
+    """
+    checked = [r for r in results if not r.get('removed')]
+    emit(
+        event,
+        {
+            'InstancesChecked': len(checked),
+            'InstancesLagging': len([r for r in checked if not (r['available'] and r.get('correctClass', True))]),
+            'InstancesRemoved': len(results) - len(checked),
+            'PhaseElapsedSeconds': phase_elapsed_seconds,
+            'PhaseDurationSeconds': phase_elapsed_seconds if all_available and event.get('phaseStartTime') else None
+        },
+        dimensions={'TargetClass': target_class},
+        properties=dict(properties or {}, instances=[
+            {'instanceId': r['instanceId'], 'status': r['status'], 'instanceClass': r.get('instanceClass')} for r in results
+        ])
+    )
+
+
+def verify_cluster(event, target_class, phase_elapsed_seconds, history_cache):
+    """
+    クラスター単位の確認: クラスターの全メンバーを describe_db_instances（db-cluster-id フィルタ、ページング）で
+    まとめて取得し、ロール（writer / dedicatedReader / autoScalingReader）ごとの判定と、
+    完了していないインスタンス（laggingInstanceIds）を返す
+
+    ロールは入力の writerInstanceId / dedicatedReaderInstanceId / autoScalingReaderInstanceIds で判定する
+    （フェイルオーバー後にタグから分類し直すと Writer / Dedicated Reader が入れ替わるため）
+    入力にないクラスターメンバー（実行中に追加された AutoScaling Reader）は autoScalingReader として確認し、
+    クラスターから削除された AutoScaling Reader は removedInstanceIds として判定の対象外にする
+    ロールが入力にない場合は、クラスター構成から分類する
+    """
+    cluster_identifier = event['clusterIdentifier']
+
+    instances = describe_cluster_instances(rds, cluster_identifier)
+
+    if event.get('writerInstanceId') or event.get('dedicatedReaderInstanceId'):
+        writer_instance_id = event.get('writerInstanceId')
+        dedicated_reader_instance_id = event.get('dedicatedReaderInstanceId')
+        auto_scaling_reader_ids = list(event.get('autoScalingReaderInstanceIds', []))
+    else:
+        response = rds.describe_db_clusters(DBClusterIdentifier=cluster_identifier)
+        topology = classify_topology(response['DBClusters'][0], instances)
+        writer_instance_id = topology['writerInstanceId']
+        dedicated_reader_instance_id = topology['dedicatedReaderInstanceId']
+        auto_scaling_reader_ids = topology['autoScalingReaderInstanceIds']
+
+    instance_map = {
+        inst['DBInstanceIdentifier']: inst
+        for inst in instances
+        if inst.get('DBInstanceStatus') not in SKIPPED_STATUSES
+    }
+
+    # 入力にないクラスターメンバーは AutoScaling Reader として確認する
+    known_ids = {writer_instance_id, dedicated_reader_instance_id, *auto_scaling_reader_ids}
+    additional_ids = sorted(instance_id for instance_id in instance_map if instance_id not in known_ids)
+    removed_ids = [instance_id for instance_id in auto_scaling_reader_ids if instance_id not in instance_map]
+    auto_scaling_reader_ids = [instance_id for instance_id in auto_scaling_reader_ids if instance_id in instance_map] + additional_ids
+
+    role_groups = {
+        'writer': [writer_instance_id] if writer_instance_id else [],
+        'dedicatedReader': [dedicated_reader_instance_id] if dedicated_reader_instance_id else [],
+        'autoScalingReader': auto_scaling_reader_ids
+    }
+
+    results = []
+    poll_candidates = []
+    roles = {}
+    for role, instance_ids in role_groups.items():
+        role_results, role_polls = check_instances(instance_ids, instance_map, target_class, phase_elapsed_seconds, history_cache)
+        results.extend(role_results)
+        poll_candidates.extend(role_polls)
+        lagging = [r['instanceId'] for r in role_results if not (r['available'] and r.get('correctClass', True))]
+        roles[role] = {
+            'complete': not lagging,
+            'checkedCount': len(role_results),
+            'laggingInstanceIds': lagging
+        }
+
+    lagging_ids = [instance_id for verdict in roles.values() for instance_id in verdict['laggingInstanceIds']]
+
+    # 再実行の開始位置（Writer / Dedicated Reader が未完了の場合は、フェイルオーバーのフェーズも再確認する）
+    progress = assess_progress(
+        {'writerInstanceId': None, 'instances': {
+            r['instanceId']: {'instanceClass': r.get('instanceClass'), 'status': r['status']} for r in results
+        }},
+        target_class,
+        writer_instance_id,
+        dedicated_reader_instance_id,
+        auto_scaling_reader_ids
+    )
+
+    emit_check_metrics(
+        event, target_class, results, not lagging_ids, phase_elapsed_seconds,
+        properties={
+            'roles': roles, 'laggingInstanceIds': lagging_ids, 'removedInstanceIds': removed_ids, 'additionalInstanceIds': additional_ids
+        }
+    )
+
+    return {
+        'clusterIdentifier': cluster_identifier,
+        'allAvailable': not lagging_ids,
+        'roles': roles,
+        'laggingInstanceIds': lagging_ids,
+        'removedInstanceIds': removed_ids,
+        'progress': progress,
+        'instances': results,
+        'checkedCount': len(results),
+        'phaseElapsedSeconds': phase_elapsed_seconds,
+        'nextPollSeconds': next_poll_seconds(poll_candidates)
+    }
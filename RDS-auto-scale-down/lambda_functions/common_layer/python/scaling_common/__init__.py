@@ -0,0 +1,4 @@
+"""
+Auroraスケーリング用Lambda関数の共通モジュール
+Lambdaレイヤー（/opt/python）として各Lambda関数に配布される
+"""
@@ -0,0 +1,327 @@
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from scaling_common import aws_clients, clock
+
+logger = logging.getLogger()
+
+# AWS API呼び出しの共通レイヤー（scaling_common.aws_clients.LazyClient 経由の全呼び出しに適用）
+# - API（サービス:オペレーション）ごとのトークンバケットで呼び出しレートを制限する
+# - スロットリング・一時的なエラーはジッター付きの指数バックオフでリトライし、スロットリング時はレートを下げる
+#   （変更系のオペレーションは、スロットリングと接続の確立前のエラーのみリトライする）
+# - リトライは Lambda の残り時間（context.get_remaining_time_in_millis()）に収まる場合のみ行う
+#   （タイムアウトで強制終了されると、エラーの内容も apiMetrics も残らないため）
+# - オペレーションごとの呼び出し回数・リトライ回数・レイテンシを集計し、Lambda関数の出力（apiMetrics）に含める
+
+THROTTLING_ERROR_CODES = [
+    'Throttling', 'ThrottlingException', 'TooManyRequestsException', 'RequestLimitExceeded',
+    'ProvisionedThroughputExceededException', 'RequestThrottledException'
+]
+TRANSIENT_ERROR_CODES = [
+    'InternalFailure', 'InternalError', 'InternalServerError', 'ServiceUnavailable',
+    'RequestTimeout', 'RequestTimeoutException'
+]
+
+# 接続の確立前に失敗したエラー（リクエストは送信されていないため、どのオペレーションでもリトライしてよい）
+CONNECT_ERROR_TYPES = ('EndpointConnectionError', 'ConnectTimeoutError')
+# 応答を受け取れなかったエラー（リクエストが適用済みの可能性がある）
+READ_ERROR_TYPES = ('ConnectionClosedError', 'ReadTimeoutError')
+# 再実行しても結果が変わらない読み取り系のオペレーション（boto3 のメソッド名の接頭辞）
+# それ以外（failover_db_cluster, create_db_instance など）は一時的なエラー・読み取りタイムアウトではリトライしない
+# （1回目が適用済みの場合、再実行が DBInstanceAlreadyExists などで失敗したり、2回目のフェイルオーバーになるため）
+IDEMPOTENT_OPERATION_PREFIXES = ('describe_', 'get_', 'list_')
+IDEMPOTENT_OPERATIONS = ('query', 'scan', 'batch_get_item')
+
+# リトライ設定（環境変数 AWS_CLIENT_MAX_ATTEMPTS で上書き可能、初回を含む試行回数）
+DEFAULT_MAX_ATTEMPTS = 5
+BASE_BACKOFF_SECONDS = 0.2
+MAX_BACKOFF_SECONDS = 10
+# Lambda のタイムアウトの前に、エラーを返してログ・メトリクスを出力するために残しておく秒数
+DEADLINE_MARGIN_SECONDS = 2
+
+# トークンバケット（1秒あたりの呼び出し回数）
+# AWS_CLIENT_RATE_LIMITS で上書き可能（例: {"rds": 8, "rds:DescribeDBInstances": 4}）
+DEFAULT_RATE_PER_SECOND = 10.0
+DEFAULT_BURST = 10
+# スロットリング時はレートを半分に下げ（下限あり）、成功するたびに少しずつ元のレートに戻す
+THROTTLE_RATE_FACTOR = 0.5
+MIN_RATE_PER_SECOND = 0.5
+RATE_RECOVERY_PER_SUCCESS = 0.5
+
+_lock = threading.Lock()
+_buckets = {}
+_metrics = {}
+# 実行中の Lambda 呼び出しのリトライの期限（clock.time() の値、None = 期限なし）
+_deadline = {'time': None}
+
+
+def error_code(error):
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code')
+
+
+def is_throttling_error(error):
+    return error_code(error) in THROTTLING_ERROR_CODES
+
+
+def is_idempotent_operation(operation):
+    return operation.startswith(IDEMPOTENT_OPERATION_PREFIXES) or operation in IDEMPOTENT_OPERATIONS
+
+
+def is_retryable_error(error, operation=None):
+    """
+    リトライしてよいエラーか
+    スロットリングと接続の確立前のエラーは常にリトライする
+    一時的なサービスエラー（5xx）・応答の読み取りのタイムアウトは、読み取り系のオペレーションのみリトライする
+    operation を省略した場合は読み取り系として扱う
+    """
+    if is_throttling_error(error) or type(error).__name__ in CONNECT_ERROR_TYPES:
+        return True
+    if operation is not None and not is_idempotent_operation(operation):
+        return False
+    if error_code(error) in TRANSIENT_ERROR_CODES:
+        return True
+    status = (getattr(error, 'response', None) or {}).get('ResponseMetadata', {}).get('HTTPStatusCode')
+    if status and status >= 500:
+        return True
+    return type(error).__name__ in READ_ERROR_TYPES
+
+
+def rate_limits():
+    try:
+        return json.loads(os.environ.get('AWS_CLIENT_RATE_LIMITS') or '{}')
+    except json.JSONDecodeError:
+        logger.warning("AWS_CLIENT_RATE_LIMITS is not valid JSON; using default rate limits")
+        return {}
+
+
+def max_attempts():
+    return max(1, int(os.environ.get('AWS_CLIENT_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)))
+
+
+class TokenBucket:
+    """
+    呼び出しレートを制限するトークンバケット（スロットリング時にレートを下げる）
+    """
+
+    def __init__(self, rate, burst):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated_at = clock.time()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """
+        トークンを1つ取得する（不足している場合は補充されるまで待つ）。待った秒数を返す
+        """
+        with self._lock:
+            now = clock.time()
+            self._refill(now)
+            self.tokens -= 1
+            wait_seconds = 0 if self.tokens >= 0 else -self.tokens / self.rate
+        if wait_seconds > 0:
+            clock.sleep(wait_seconds)
+        return wait_seconds
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(MIN_RATE_PER_SECOND, self.rate * THROTTLE_RATE_FACTOR)
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + RATE_RECOVERY_PER_SUCCESS)
+
+
+def bucket_for(service, operation):
+    key = f"{service}:{operation}"
+    bucket = _buckets.get(key)
+    if bucket is None:
+        with _lock:
+            bucket = _buckets.get(key)
+            if bucket is None:
+                limits = rate_limits()
+                rate = limits.get(key, limits.get(service, DEFAULT_RATE_PER_SECOND))
+                bucket = TokenBucket(rate, max(1, min(DEFAULT_BURST, int(rate * 2) or 1)))
+                _buckets[key] = bucket
+    return bucket
+
+
+def record(service, operation, latency_seconds, retried=False, throttled=False, failed=False, waited_seconds=0):
+    key = f"{service}:{operation}"
+    with _lock:
+        entry = _metrics.setdefault(key, {
+            'calls': 0, 'retries': 0, 'throttled': 0, 'errors': 0,
+            'totalLatencyMs': 0.0, 'maxLatencyMs': 0.0, 'rateLimitWaitMs': 0.0
+        })
+        entry['calls'] += 1
+        entry['retries'] += 1 if retried else 0
+        entry['throttled'] += 1 if throttled else 0
+        entry['errors'] += 1 if failed else 0
+        entry['totalLatencyMs'] += latency_seconds * 1000
+        entry['maxLatencyMs'] = max(entry['maxLatencyMs'], latency_seconds * 1000)
+        entry['rateLimitWaitMs'] += waited_seconds * 1000
+
+
+def set_deadline(context):
+    """
+    リトライの期限を Lambda の残り時間から設定する（context が残り時間を返さない場合は期限なし）
+    """
+    remaining_millis = getattr(context, 'get_remaining_time_in_millis', None)
+    _deadline['time'] = clock.time() + remaining_millis() / 1000 - DEADLINE_MARGIN_SECONDS if remaining_millis else None
+
+
+def clear_deadline():
+    _deadline['time'] = None
+
+
+def retry_fits_deadline(delay):
+    """
+    バックオフの後の1回の試行が、最長（接続・読み取りのタイムアウト）でもリトライの期限までに終わるか
+    """
+    if _deadline['time'] is None:
+        return True
+    attempt_seconds = aws_clients.connect_timeout_seconds() + aws_clients.read_timeout_seconds()
+    return clock.time() + delay + attempt_seconds <= _deadline['time']
+
+
+def backoff_seconds(attempt):
+    """
+    指数バックオフ（フルジッター）
+    """
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * (2 ** attempt)))
+
+
+def call(service, operation, func, *args, **kwargs):
+    """
+    AWS API を1回呼び出す（トークンバケットでのレート制限、リトライ、メトリクスの記録を含む）
+    operation はメトリクス・レート制限のキー（boto3 のメソッド名、例: describe_db_instances）
+    """
+    bucket = bucket_for(service, operation)
+    attempts = max_attempts()
+    for attempt in range(1, attempts + 1):
+        waited = bucket.acquire()
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            latency = time.perf_counter() - started
+            throttled = is_throttling_error(e)
+            if throttled:
+                bucket.on_throttle()
+            retry = is_retryable_error(e, operation) and attempt < attempts
+            delay = backoff_seconds(attempt) if retry else 0
+            if retry and not retry_fits_deadline(delay):
+                logger.warning(f"{service}.{operation} failed with {error_code(e) or type(e).__name__} (attempt {attempt}/{attempts}); "
+                               f"not retrying because another attempt could exceed the Lambda timeout")
+                retry = False
+            record(service, operation, latency, retried=attempt > 1, throttled=throttled, failed=not retry, waited_seconds=waited)
+            if not retry:
+                raise
+            logger.warning(f"{service}.{operation} failed with {error_code(e) or type(e).__name__} (attempt {attempt}/{attempts}), retrying in {delay:.2f}s")
+            clock.sleep(delay)
+            continue
+        bucket.on_success()
+        record(service, operation, time.perf_counter() - started, retried=attempt > 1, waited_seconds=waited)
+        return result
+
+
+# ページングのトークンの項目名（ここにないサービスは NextToken）
+PAGINATION_TOKEN_KEYS = {
+    'rds': 'Marker',
+    'stepfunctions': 'nextToken'
+}
+
+
+class Paginator:
+    """
+    LazyClient.get_paginator の戻り値（各ページの取得を call 経由で行う）
+    RDS の describe_* は Marker、Step Functions は nextToken、その他のサービスは NextToken でページングする
+    """
+
+    def __init__(self, service, operation, method):
+        self.service = service
+        self.operation = operation
+        self.method = method
+        self.token_key = PAGINATION_TOKEN_KEYS.get(service, 'NextToken')
+
+    def paginate(self, **kwargs):
+        token = None
+        while True:
+            params = dict(kwargs)
+            if token:
+                params[self.token_key] = token
+            page = call(self.service, self.operation, self.method, **params)
+            yield page
+            token = page.get(self.token_key)
+            if not token:
+                break
+
+
+def api_metrics():
+    """
+    オペレーションごとのメトリクス（呼び出し回数・リトライ・スロットリング・エラー・レイテンシ）と合計
+    """
+    with _lock:
+        operations = {
+            key: dict(entry, totalLatencyMs=round(entry['totalLatencyMs'], 1), maxLatencyMs=round(entry['maxLatencyMs'], 1),
+                      rateLimitWaitMs=round(entry['rateLimitWaitMs'], 1))
+            for key, entry in sorted(_metrics.items())
+        }
+    return {
+        'calls': sum(entry['calls'] for entry in operations.values()),
+        'retries': sum(entry['retries'] for entry in operations.values()),
+        'throttled': sum(entry['throttled'] for entry in operations.values()),
+        'operations': operations
+    }
+
+
+def reset_metrics():
+    with _lock:
+        _metrics.clear()
+
+
+def reset():
+    """
+    メトリクスとトークンバケットを破棄する（ローカル検証用）
+    """
+    with _lock:
+        _metrics.clear()
+        _buckets.clear()
+    clear_deadline()
+
+
+def with_api_metrics(handler):
+    """
+    lambda_handler 用のデコレーター: 呼び出しごとにメトリクスを集計し、出力（dict）に apiMetrics として含める
+    例外の場合はメトリクスをログに出力する。リトライの期限は context の残り時間から設定する
+    """
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        reset_metrics()
+        set_deadline(context)
+        try:
+            result = handler(event, context)
+        except Exception:
+            logger.info(f"API metrics: {json.dumps(api_metrics())}")
+            raise
+        finally:
+            clear_deadline()
+        metrics = api_metrics()
+        logger.info(f"API metrics: {json.dumps(metrics)}")
+        if isinstance(result, dict):
+            result['apiMetrics'] = metrics
+        return result
+
+    return wrapper
@@ -0,0 +1,107 @@
+import functools
+import os
+import threading
+
+# boto3 / botocore の import とクライアント生成は初回利用時まで遅延させる
+# （VPC内のLambdaではコールドスタート時の初期化時間の大部分を占めるため）
+
+# リトライは scaling_common.api_calls で行う（botocore のリトライは無効にし、二重にリトライしないようにする）
+BOTOCORE_TOTAL_MAX_ATTEMPTS = 1
+
+# タイムアウト（秒）: VPCエンドポイント経由の接続が詰まった場合に Lambda のタイムアウトまで待たないようにする
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 5
+DEFAULT_READ_TIMEOUT_SECONDS = 20
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def endpoint_url_for(service):
+    """
+    サービスごとのエンドポイントURL（AWS_ENDPOINT_URL_<SERVICE> 環境変数、未設定なら None = 既定のエンドポイント）
+    例: AWS_ENDPOINT_URL_RDS, AWS_ENDPOINT_URL_STEPFUNCTIONS
+    """
+    return os.environ.get(f"AWS_ENDPOINT_URL_{service.upper().replace('-', '_')}") or None
+
+
+def connect_timeout_seconds():
+    return int(os.environ.get('AWS_CLIENT_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT_SECONDS))
+
+
+def read_timeout_seconds():
+    return int(os.environ.get('AWS_CLIENT_READ_TIMEOUT', DEFAULT_READ_TIMEOUT_SECONDS))
+
+
+def client_config():
+    from botocore.config import Config
+
+    return Config(
+        retries={'mode': 'standard', 'total_max_attempts': BOTOCORE_TOTAL_MAX_ATTEMPTS},
+        connect_timeout=connect_timeout_seconds(),
+        read_timeout=read_timeout_seconds()
+    )
+
+
+def get_client(service):
+    """
+    boto3 クライアントを返す（初回呼び出し時に生成し、コンテナ再利用時はキャッシュを使う）
+    """
+    client = _clients.get(service)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(service)
+        if client is None:
+            import boto3
+
+            client = boto3.client(
+                service,
+                endpoint_url=endpoint_url_for(service),
+                config=client_config()
+            )
+            _clients[service] = client
+    return client
+
+
+def set_client(service, client):
+    """
+    クライアントを差し替える（ローカル検証・ベンチマーク用）
+    """
+    _clients[service] = client
+
+
+def reset_clients():
+    _clients.clear()
+
+
+# API呼び出しではないクライアントのメソッド（api_calls.call を経由しない）
+NON_API_METHODS = {'can_paginate', 'close', 'generate_presigned_post', 'generate_presigned_url', 'get_waiter'}
+
+
+class LazyClient:
+    """
+    モジュールのグローバル変数として定義し、属性に最初にアクセスした時点でクライアントを生成する
+    例: rds = LazyClient('rds') -> rds.describe_db_instances(...) の呼び出し時に boto3.client('rds') を生成
+    API呼び出し（ページングを含む）は scaling_common.api_calls を経由する（レート制限・リトライ・メトリクス）
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def get_paginator(self, operation):
+        from scaling_common.api_calls import Paginator
+
+        return Paginator(self.service, operation, getattr(get_client(self.service), operation))
+
+    def __getattr__(self, name):
+        attribute = getattr(get_client(self.service), name)
+        if name.startswith('_') or name in NON_API_METHODS or not callable(attribute):
+            return attribute
+
+        from scaling_common.api_calls import call
+
+        return functools.partial(call, self.service, name, attribute)
+
+    def __repr__(self):
+        return f"LazyClient({self.service!r})"
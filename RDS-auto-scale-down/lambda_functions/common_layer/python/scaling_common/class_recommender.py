@@ -0,0 +1,302 @@
+import logging
+import os
+from datetime import timedelta, timezone
+
+from scaling_common.instance_classes import capacity_units, instance_spec
+from scaling_common.metric_data import get_metric_series, metric_query, percentile, time_range
+
+logger = logging.getLogger()
+
+# targetClass にこの値を指定すると、メトリクスから変更先のインスタンスタイプを決める
+AUTO_TARGET_CLASS = 'auto'
+
+# 推奨できない場合（メトリクス不足など）の変更先
+DEFAULT_TARGET_CLASS = 'db.t4g.medium'
+
+# 候補のインスタンスタイプ（小さい順に評価する）
+DEFAULT_CANDIDATE_CLASSES = 'db.t4g.medium,db.t4g.large,db.r6g.large,db.r6g.xlarge,db.r6g.2xlarge'
+
+# 取得するメトリクス: (キー, メトリクス名, 統計)
+# FreeableMemory は最小値（空きが最も少ない時点）、それ以外は平均・最大値を使う
+METRICS = [
+    ('cpu', 'CPUUtilization', 'Average'),
+    ('freeableMemory', 'FreeableMemory', 'Minimum'),
+    ('connections', 'DatabaseConnections', 'Maximum'),
+    ('replicaLag', 'AuroraReplicaLag', 'Maximum')
+]
+
+METRIC_PERIOD_SECONDS = 300
+
+DEFAULT_LOOKBACK_DAYS = 14
+DEFAULT_OFF_PEAK_WINDOW = '00:00-07:00'   # JST
+DEFAULT_HEADROOM_PERCENT = 30
+DEFAULT_REPLICA_LAG_THRESHOLD_MS = 2000
+
+# 夜ごとのパーセンタイル（FreeableMemory は空きの少ない側を見るため下側）
+LOAD_PERCENTILE = 95
+FREEABLE_MEMORY_PERCENTILE = 5
+
+# 1晩として扱うのに必要なデータポイント数（5分間隔で30分）と、推奨に必要な晩の数
+MIN_POINTS_PER_NIGHT = 6
+MIN_NIGHTS = 3
+
+# Aurora PostgreSQL のパラメータグループのデフォルト値
+#   shared_buffers  = DBInstanceClassMemory / 12038（8KBページ数）
+#   max_connections = LEAST(DBInstanceClassMemory / 9531392, 5000)
+SHARED_BUFFERS_RATIO = 8192 / 12038
+CONNECTION_MEMORY_BYTES = 9531392
+MAX_CONNECTIONS_LIMIT = 5000
+# max_connections のうち使ってよい割合
+CONNECTION_UTILIZATION_LIMIT = 0.8
+
+GIB = 1024 ** 3
+JST = timezone(timedelta(hours=9))
+
+
+def recommender_config():
+    """
+    環境変数から推奨の設定を読み込む
+    """
+    candidates = os.environ.get('RECOMMENDATION_CANDIDATE_CLASSES') or DEFAULT_CANDIDATE_CLASSES
+    return {
+        'lookbackDays': int(os.environ.get('RECOMMENDATION_LOOKBACK_DAYS', DEFAULT_LOOKBACK_DAYS)),
+        'offPeakWindow': os.environ.get('RECOMMENDATION_OFF_PEAK_WINDOW') or DEFAULT_OFF_PEAK_WINDOW,
+        'candidateClasses': [c.strip() for c in candidates.split(',') if c.strip()],
+        'headroomPercent': float(os.environ.get('RECOMMENDATION_HEADROOM_PERCENT', DEFAULT_HEADROOM_PERCENT)),
+        'replicaLagThresholdMs': float(os.environ.get('RECOMMENDATION_REPLICA_LAG_THRESHOLD_MS', DEFAULT_REPLICA_LAG_THRESHOLD_MS)),
+        'fallbackClass': os.environ.get('TARGET_CLASS') or DEFAULT_TARGET_CLASS
+    }
+
+
+def parse_window(window):
+    """
+    "HH:MM-HH:MM"（JST）を開始・終了の分（0時からの経過分）に変換する
+    開始 > 終了 の場合は日をまたぐ時間帯（例: 22:00-06:00）
+    """
+    def to_minutes(value):
+        hours, minutes = value.strip().split(':')
+        return int(hours) * 60 + int(minutes)
+
+    start, end = window.split('-')
+    return to_minutes(start), to_minutes(end)
+
+
+def night_of(timestamp, window):
+    """
+    タイムスタンプが時間帯に含まれる場合はその晩の日付（JST、時間帯が始まった日）、含まれない場合は None
+    """
+    local = timestamp.astimezone(JST)
+    minutes = local.hour * 60 + local.minute
+    start, end = window
+    if start <= end:
+        return local.date() if start <= minutes < end else None
+    if minutes >= start:
+        return local.date()
+    if minutes < end:
+        return local.date() - timedelta(days=1)
+    return None
+
+
+def nightly_percentiles(timestamps, values, window, p):
+    """
+    時間帯（オフピーク）のデータポイントを晩ごとにまとめ、晩ごとのパーセンタイルを返す
+    データポイントが MIN_POINTS_PER_NIGHT に満たない晩は除く
+    """
+    nights = {}
+    for timestamp, value in zip(timestamps, values):
+        night = night_of(timestamp, window)
+        if night is not None:
+            nights.setdefault(night, []).append(value)
+    return {
+        night: percentile(sorted(points), p)
+        for night, points in nights.items()
+        if len(points) >= MIN_POINTS_PER_NIGHT
+    }
+
+
+def metric_query_id(index, key):
+    return f"m{index}_{key}"
+
+
+def fetch_instance_metrics(cloudwatch, instance_ids, lookback_days):
+    """
+    インスタンスごとのメトリクスの時系列を GetMetricData でまとめて取得する（scaling_common.metric_data）
+    戻り値: {インスタンスID: {キー: (timestamps, values)}}
+    """
+    instance_ids = list(instance_ids)
+    queries = [
+        metric_query(metric_query_id(index, key), metric_name, stat, {'DBInstanceIdentifier': instance_id}, METRIC_PERIOD_SECONDS)
+        for index, instance_id in enumerate(instance_ids)
+        for key, metric_name, stat in METRICS
+    ]
+    start_time, end_time = time_range(lookback_days, METRIC_PERIOD_SECONDS)
+    series = get_metric_series(cloudwatch, queries, start_time, end_time)
+
+    return {
+        instance_id: {
+            key: series.get(metric_query_id(index, key), ([], []))
+            for key, _, _ in METRICS
+        }
+        for index, instance_id in enumerate(instance_ids)
+    }
+
+
+def summarize_instance(metrics, window):
+    """
+    インスタンスのオフピークの負荷（晩ごとのパーセンタイルのうち最も厳しい晩の値）
+    """
+    summary = {}
+    for key, _, _ in METRICS:
+        timestamps, values = metrics.get(key, ([], []))
+        if key == 'freeableMemory':
+            nights = nightly_percentiles(timestamps, values, window, FREEABLE_MEMORY_PERCENTILE)
+            summary[key] = min(nights.values()) if nights else None
+        else:
+            nights = nightly_percentiles(timestamps, values, window, LOAD_PERCENTILE)
+            summary[key] = max(nights.values()) if nights else None
+        if key == 'cpu':
+            summary['nights'] = len(nights)
+    return summary
+
+
+def instance_requirements(instance_class, summary):
+    """
+    現在のインスタンスタイプとオフピークの負荷から、必要なキャパシティ（ヘッドルーム前）を求める
+      cpuVcpus:         使用している vCPU（CPU使用率 × 現在の vCPU 数）
+      workMemoryGiB:    shared_buffers 以外に使用しているメモリ
+      connections:      接続数
+    """
+    spec = instance_spec(instance_class)
+    requirements = {'cpuVcpus': spec['vcpus'] * summary['cpu'] / 100}
+    if summary.get('freeableMemory') is not None:
+        used_gib = spec['memoryGiB'] - summary['freeableMemory'] / GIB
+        requirements['workMemoryGiB'] = max(0.0, used_gib - spec['memoryGiB'] * SHARED_BUFFERS_RATIO)
+    if summary.get('connections') is not None:
+        requirements['connections'] = summary['connections']
+    return requirements
+
+
+def max_connections(instance_class):
+    memory_bytes = instance_spec(instance_class)['memoryGiB'] * GIB
+    return min(int(memory_bytes / CONNECTION_MEMORY_BYTES), MAX_CONNECTIONS_LIMIT)
+
+
+def evaluate_candidate(candidate_class, requirements, headroom):
+    """
+    候補のインスタンスタイプが必要なキャパシティ（+ ヘッドルーム）を満たすか
+    満たさない項目のリストを返す（空なら満たす）
+    """
+    spec = instance_spec(candidate_class)
+    shortfalls = []
+    if spec['sustainedVcpus'] < requirements['cpuVcpus'] * headroom:
+        shortfalls.append('cpu')
+    if spec['memoryGiB'] * (1 - SHARED_BUFFERS_RATIO) < requirements.get('workMemoryGiB', 0) * headroom:
+        shortfalls.append('memory')
+    if max_connections(candidate_class) * CONNECTION_UTILIZATION_LIMIT < requirements.get('connections', 0):
+        shortfalls.append('connections')
+    return shortfalls
+
+
+def class_size_key(instance_class):
+    spec = instance_spec(instance_class)
+    return (spec['memoryGiB'], spec['vcpus'], spec['sustainedVcpus'])
+
+
+def recommend_target_class(topology, instance_metrics, config):
+    """
+    クラスターのオフピークの負荷を満たす最小のインスタンスタイプを推奨する
+    1. インスタンスごとにオフピークの時間帯の晩ごとのパーセンタイル（p95、FreeableMemory は p5）を求め、最も厳しい晩の値を使う
+    2. 全インスタンスの必要キャパシティの最大値（変更後は全インスタンスが同じタイプになるため）を満たす最小の候補を選ぶ
+    3. レプリカラグが閾値を超えている場合は、現在の Writer のタイプより小さくしない
+    現在の Writer のタイプより大きいタイプは推奨しない（スケールダウンの処理のため）
+    Writer のメトリクスが不足している場合は fallbackClass（TARGET_CLASS）を返す
+    """
+    window = parse_window(config['offPeakWindow'])
+    headroom = 1 + config['headroomPercent'] / 100
+    writer_id = topology.get('writerInstanceId')
+    instances = topology.get('instances', {})
+    writer_class = instances.get(writer_id, {}).get('instanceClass')
+
+    recommendation = {
+        'window': config['offPeakWindow'],
+        'lookbackDays': config['lookbackDays'],
+        'headroomPercent': config['headroomPercent'],
+        'instances': {}
+    }
+
+    requirements = {'cpuVcpus': 0.0, 'workMemoryGiB': 0.0, 'connections': 0}
+    max_replica_lag = None
+    for instance_id, details in sorted(instances.items()):
+        summary = summarize_instance(instance_metrics.get(instance_id, {}), window)
+        recommendation['instances'][instance_id] = summary
+        if summary['nights'] < MIN_NIGHTS or summary['cpu'] is None:
+            continue
+        for key, value in instance_requirements(details.get('instanceClass'), summary).items():
+            requirements[key] = max(requirements[key], value)
+        if summary.get('replicaLag') is not None:
+            max_replica_lag = max(max_replica_lag or 0, summary['replicaLag'])
+
+    writer_summary = recommendation['instances'].get(writer_id)
+    if not writer_summary or writer_summary['nights'] < MIN_NIGHTS:
+        nights = writer_summary['nights'] if writer_summary else 0
+        recommendation.update({
+            'targetClass': config['fallbackClass'],
+            'source': 'fallback',
+            'reason': f"Not enough off-peak metrics for writer {writer_id} ({nights} of {MIN_NIGHTS} nights)"
+        })
+        return recommendation
+
+    recommendation['requirements'] = {
+        'cpuVcpus': round(requirements['cpuVcpus'], 3),
+        'workMemoryGiB': round(requirements['workMemoryGiB'], 3),
+        'connections': requirements['connections'],
+        'replicaLagMs': max_replica_lag
+    }
+
+    lag_limited = max_replica_lag is not None and max_replica_lag > config['replicaLagThresholdMs']
+    evaluated = []
+    chosen = None
+    for candidate in sorted(config['candidateClasses'], key=class_size_key):
+        shortfalls = evaluate_candidate(candidate, requirements, headroom)
+        if lag_limited and writer_class and capacity_units(candidate) < capacity_units(writer_class):
+            shortfalls.append('replicaLag')
+        evaluated.append({'instanceClass': candidate, 'shortfalls': shortfalls})
+        if not shortfalls and chosen is None:
+            chosen = candidate
+    recommendation['candidates'] = evaluated
+
+    if chosen is None or (writer_class and class_size_key(chosen) > class_size_key(writer_class)):
+        recommendation.update({
+            'targetClass': writer_class or config['fallbackClass'],
+            'source': 'current-class',
+            'reason': 'No smaller candidate covers the off-peak load; keeping the current writer class'
+        })
+        return recommendation
+
+    recommendation.update({
+        'targetClass': chosen,
+        'source': 'metrics',
+        'reason': f"Smallest candidate covering the off-peak load with {config['headroomPercent']:g}% headroom"
+    })
+    return recommendation
+
+
+def recommend_target_classes(cloudwatch, topologies, config=None):
+    """
+    複数クラスターの推奨をまとめて求める（全クラスターのインスタンスのメトリクスを一括取得する）
+    戻り値: {クラスター識別子: 推奨}
+    """
+    config = config or recommender_config()
+    instance_ids = sorted({
+        instance_id
+        for topology in topologies.values()
+        for instance_id in topology.get('instances', {})
+    })
+    instance_metrics = fetch_instance_metrics(cloudwatch, instance_ids, config['lookbackDays']) if instance_ids else {}
+
+    recommendations = {}
+    for cluster_identifier, topology in topologies.items():
+        recommendation = recommend_target_class(topology, instance_metrics, config)
+        logger.info(f"Recommended target class for {cluster_identifier}: {recommendation['targetClass']} ({recommendation['reason']})")
+        recommendations[cluster_identifier] = recommendation
+    return recommendations
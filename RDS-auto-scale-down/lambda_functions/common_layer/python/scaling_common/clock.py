@@ -0,0 +1,32 @@
+import time as _time
+from datetime import datetime, timezone
+
+# 現在時刻の取得元（UNIX時間の秒を返す関数）と待機（秒数を受け取る関数）
+# ローカルのシミュレーター（scripts/simulate_scaling.py）では仮想時計に差し替える
+_source = {'time': _time.time, 'sleep': _time.sleep}
+
+
+def time():
+    return _source['time']()
+
+
+def sleep(seconds):
+    _source['sleep'](seconds)
+
+
+def now():
+    """
+    現在時刻（UTC、タイムゾーン付き）
+    """
+    return datetime.fromtimestamp(time(), timezone.utc)
+
+
+def set_time_source(func, sleep_func=None):
+    _source['time'] = func
+    if sleep_func is not None:
+        _source['sleep'] = sleep_func
+
+
+def reset_time_source():
+    _source['time'] = _time.time
+    _source['sleep'] = _time.sleep
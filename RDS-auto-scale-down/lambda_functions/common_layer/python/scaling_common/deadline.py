@@ -0,0 +1,125 @@
+import logging
+import math
+import os
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger()
+
+JST = timezone(timedelta(hours=9))
+
+# 期限までに終わらせる場合の所要時間の見込み: 過去のリサイズ履歴のパーセンタイル（中央値では半分の実行が期限を過ぎるため）
+DEFAULT_ESTIMATE_PERCENTILE = 90
+# 見込みに加える余裕（分）
+DEFAULT_MARGIN_MINUTES = 15
+# 開始時刻は5分単位で切り捨てる
+START_ROUNDING_MINUTES = 5
+
+# "HH:MM"（毎日）の期限は、現在時刻の前後12時間以内の日時として扱う（期限を過ぎてから実行された場合も遅れを判定するため）
+DAILY_WINDOW_HOURS = 12
+
+
+def deadline_settings():
+    """
+    期限から開始時刻を逆算する設定（環境変数）
+    failoverGateSeconds: フェイルオーバーの前に負荷が落ち着くのを待つ最大の時間（フェイルオーバーする場合のみ加える）
+    """
+    return {
+        'percentile': float(os.environ.get('DEADLINE_ESTIMATE_PERCENTILE', DEFAULT_ESTIMATE_PERCENTILE)),
+        'marginSeconds': int(float(os.environ.get('DEADLINE_MARGIN_MINUTES', DEFAULT_MARGIN_MINUTES)) * 60),
+        'failoverGateSeconds': max(0, int(os.environ.get('FAILOVER_GATE_MAX_WAIT_SECONDS', 0)))
+    }
+
+
+def parse_deadline(deadline):
+    """
+    期限（JST）を解析する
+    "HH:MM" -> ("daily", 0時からの分)、"YYYY-MM-DD HH:MM" -> ("once", JST の datetime)
+    """
+    try:
+        if ' ' in deadline:
+            return 'once', datetime.strptime(deadline, '%Y-%m-%d %H:%M').replace(tzinfo=JST)
+        hour, minute = map(int, deadline.split(':'))
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(deadline)
+        return 'daily', hour * 60 + minute
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid deadline: {deadline}. Use 'HH:MM' (JST, daily) or 'YYYY-MM-DD HH:MM' (JST)")
+
+
+def deadline_at(deadline, now):
+    """
+    期限の日時（UTC）。"HH:MM" の場合は now の前後 DAILY_WINDOW_HOURS 時間以内の日時
+    """
+    kind, value = parse_deadline(deadline)
+    if kind == 'once':
+        return value.astimezone(timezone.utc)
+
+    local_now = now.astimezone(JST)
+    candidate = local_now.replace(hour=value // 60, minute=value % 60, second=0, microsecond=0)
+    if candidate <= local_now - timedelta(hours=DAILY_WINDOW_HOURS):
+        candidate += timedelta(days=1)
+    elif candidate > local_now + timedelta(hours=DAILY_WINDOW_HOURS):
+        candidate -= timedelta(days=1)
+    return candidate.astimezone(timezone.utc)
+
+
+def deadline_budget(plans, settings):
+    """
+    期限までに確保する時間（秒）: 所要時間の見込み + フェイルオーバーの前の待機の上限 + 余裕
+    plans: build_scaling_plan の結果のリスト（フリートモードでは最も時間のかかるクラスター）
+    """
+    estimated = max((plan['estimatedDurationSeconds'] for plan in plans), default=0)
+    failover_gate = settings['failoverGateSeconds'] if any(plan['failoverRequired'] for plan in plans) else 0
+    return {
+        'estimatedDurationSeconds': estimated,
+        'failoverGateSeconds': failover_gate,
+        'marginSeconds': settings['marginSeconds'],
+        'estimatePercentile': settings['percentile'],
+        'budgetSeconds': estimated + failover_gate + settings['marginSeconds']
+    }
+
+
+def start_for_deadline(deadline, plans, settings, now):
+    """
+    期限までに終わる開始時刻（JST）を逆算する
+    戻り値の scheduleTime は update-schedule の形式（"HH:MM" は毎日、"YYYY-MM-DD HH:MM" は1回のみ）
+    開始時刻は START_ROUNDING_MINUTES 分単位で切り捨てる
+    毎日の期限で見込みが24時間以上の場合、1回のみの期限で開始時刻が過ぎている場合は ValueError
+    """
+    kind, _ = parse_deadline(deadline)
+    budget = deadline_budget(plans, settings)
+    budget_minutes = math.ceil(budget['budgetSeconds'] / 60)
+
+    if kind == 'daily':
+        if budget_minutes >= 24 * 60:
+            raise ValueError(f"Scaling needs about {budget_minutes} minutes, which does not fit a daily deadline")
+        _, deadline_minutes = parse_deadline(deadline)
+        start_minutes = (deadline_minutes - budget_minutes) % (24 * 60)
+        start_minutes -= start_minutes % START_ROUNDING_MINUTES
+        schedule_time = f"{start_minutes // 60:02d}:{start_minutes % 60:02d}"
+    else:
+        start = deadline_at(deadline, now).astimezone(JST) - timedelta(minutes=budget_minutes)
+        start -= timedelta(minutes=start.minute % START_ROUNDING_MINUTES)
+        if start.astimezone(timezone.utc) < now:
+            raise ValueError(f"Scaling needs about {budget_minutes} minutes and cannot finish by {deadline} JST when started now")
+        schedule_time = start.strftime('%Y-%m-%d %H:%M')
+
+    logger.info(f"Start at {schedule_time} JST to finish by {deadline} JST: {budget}")
+    return dict(budget, deadline=deadline, scheduleTime=schedule_time)
+
+
+def deadline_slack(deadline, plan, settings, now):
+    """
+    今開始した場合の期限までの余裕（秒、負の場合は期限に間に合わない見込み）
+    余裕には settings の marginSeconds を含めない
+    """
+    at = deadline_at(deadline, now)
+    budget = deadline_budget([plan], settings)
+    expected_finish = now + timedelta(seconds=budget['estimatedDurationSeconds'] + budget['failoverGateSeconds'])
+    return {
+        'deadline': deadline,
+        'deadlineAt': at.isoformat(),
+        'expectedFinishAt': expected_finish.isoformat(),
+        'slackSeconds': int((at - expected_finish).total_seconds()),
+        'estimatePercentile': settings['percentile']
+    }
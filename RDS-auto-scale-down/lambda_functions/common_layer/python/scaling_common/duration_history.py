@@ -0,0 +1,318 @@
+import logging
+import os
+
+from botocore.exceptions import ClientError
+
+from scaling_common import clock
+from scaling_common.metric_data import percentile
+from scaling_common.resize_history import FAILOVER_KEY
+
+logger = logging.getLogger()
+
+# 所要時間のサンプルの保持期間（日）: DynamoDB の TTL（expiresAt）で削除する
+DEFAULT_RETENTION_DAYS = 180
+# 履歴のキーごとに保持するサンプルの上限（超えた分は古い順に削除する）
+DEFAULT_MAX_SAMPLES_PER_KEY = 100
+# 完了を確認できなかった開始の記録（変更の取り消し・インスタンスの削除など）は1日で削除する
+START_TTL_SECONDS = 24 * 60 * 60
+
+# 直近の同じキーのサンプルの p90 のこの倍数を超えた場合は、遅いリサイズ・フェイルオーバーとして記録する
+DEFAULT_SLOW_FACTOR = 2.0
+# 遅いかどうかを判定するのに必要な過去のサンプル数
+MIN_SAMPLES_FOR_SLOW = 5
+
+START_SORT_KEY = 'start'
+
+
+def default_table_name():
+    # 所要時間の履歴を保存するDynamoDBテーブル（Terraformで環境変数に設定する、空の場合は記録しない）
+    return os.environ.get('DURATION_HISTORY_TABLE', '')
+
+
+def history_settings():
+    """
+    履歴の保持・判定の設定（環境変数）
+    """
+    return {
+        'retentionDays': int(os.environ.get('DURATION_HISTORY_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)),
+        'maxSamples': max(1, int(os.environ.get('DURATION_HISTORY_MAX_SAMPLES', DEFAULT_MAX_SAMPLES_PER_KEY))),
+        'slowFactor': float(os.environ.get('SLOW_DURATION_FACTOR', DEFAULT_SLOW_FACTOR))
+    }
+
+
+def history_key(cluster_identifier, engine_version, transition):
+    """
+    サンプルのキー: <クラスター>#<エンジンバージョン>#<db.r6g.large->db.t4g.medium / failover>
+    """
+    return f"{cluster_identifier}#{engine_version or 'unknown'}#{transition}"
+
+
+def instance_start_key(instance_id):
+    return f"start#instance#{instance_id}"
+
+
+def failover_start_key(cluster_identifier):
+    return f"start#cluster#{cluster_identifier}#{FAILOVER_KEY}"
+
+
+def sample_sort_key(finished_at, resource_id):
+    # 完了時刻（秒、ゼロ埋め）の順に並ぶようにする
+    return f"{int(finished_at):012d}#{resource_id}"
+
+
+def build_sample(start, finished_at):
+    """
+    開始の記録と完了時刻からサンプルを作る
+    """
+    return {
+        'historyKey': start['historyKey'],
+        'transition': start['transition'],
+        'clusterIdentifier': start['clusterIdentifier'],
+        'engineVersion': start['engineVersion'],
+        'resourceId': start['resourceId'],
+        'executionName': start.get('executionName'),
+        'startedAt': start['startedAt'],
+        'finishedAt': int(finished_at),
+        'durationSeconds': max(0, int(finished_at) - start['startedAt'])
+    }
+
+
+class DynamoDBDurationHistoryStore:
+    """
+    リサイズ・フェイルオーバーの開始と完了を DynamoDB に記録する
+    キー: historyKey（パーティション）+ sampleKey（ソート）
+      - 開始: historyKey = start#instance#<id> / start#cluster#<id>#failover、sampleKey = start
+      - サンプル: historyKey = <クラスター>#<エンジンバージョン>#<変更>、sampleKey = <完了時刻>#<リソースID>
+    """
+
+    def __init__(self, dynamodb, table_name=None):
+        self.dynamodb = dynamodb
+        self._table_name = table_name
+
+    @property
+    def table_name(self):
+        # コンテナの初期化時ではなく呼び出し時の環境変数を使う
+        return self._table_name if self._table_name is not None else default_table_name()
+
+    @property
+    def enabled(self):
+        return bool(self.table_name)
+
+    def record_start(self, start_key, start):
+        """
+        開始を記録する（同じリソースの開始が残っている場合は上書きする = 変更の再要求からの所要時間）
+        start: historyKey / transition / clusterIdentifier / engineVersion / resourceId / executionName
+        """
+        started_at = int(clock.time())
+        item = {
+            'historyKey': {'S': start_key},
+            'sampleKey': {'S': START_SORT_KEY},
+            'targetHistoryKey': {'S': start['historyKey']},
+            'startedAt': {'N': str(started_at)},
+            'expiresAt': {'N': str(started_at + START_TTL_SECONDS)}
+        }
+        for name in ('transition', 'clusterIdentifier', 'engineVersion', 'resourceId', 'executionName'):
+            if start.get(name):
+                item[name] = {'S': str(start[name])}
+        self.dynamodb.put_item(TableName=self.table_name, Item=item)
+
+    def mark_finished(self, start_key):
+        """
+        完了の時刻を開始の記録に残す（RDSの完了イベントを受け取った時点。サンプルの保存は record_finish で行う）
+        開始の記録がない場合は何もしない（False）
+        """
+        try:
+            self.dynamodb.update_item(
+                TableName=self.table_name,
+                Key={'historyKey': {'S': start_key}, 'sampleKey': {'S': START_SORT_KEY}},
+                UpdateExpression='SET finishedAt = if_not_exists(finishedAt, :now)',
+                ConditionExpression='attribute_exists(historyKey)',
+                ExpressionAttributeValues={':now': {'N': str(int(clock.time()))}}
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def record_finish(self, start_key, settings):
+        """
+        開始の記録を取り出してサンプルを保存する（開始の記録がない場合は None）
+        完了イベントの時刻（mark_finished）があればその時刻、なければ現在時刻を完了とする
+        保存後、キーごとのサンプル数が上限を超えた分を古い順に削除する
+        """
+        response = self.dynamodb.delete_item(
+            TableName=self.table_name,
+            Key={'historyKey': {'S': start_key}, 'sampleKey': {'S': START_SORT_KEY}},
+            ReturnValues='ALL_OLD'
+        )
+        item = response.get('Attributes')
+        if not item:
+            return None
+
+        start = {name: value['S'] for name, value in item.items() if 'S' in value}
+        start['historyKey'] = start.pop('targetHistoryKey')
+        start['startedAt'] = int(item['startedAt']['N'])
+        start.setdefault('engineVersion', 'unknown')
+        finished_at = int(item['finishedAt']['N']) if 'finishedAt' in item else clock.time()
+        sample = build_sample(start, finished_at)
+
+        expires_at = sample['finishedAt'] + settings['retentionDays'] * 24 * 60 * 60
+        sample_item = {
+            'historyKey': {'S': sample['historyKey']},
+            'sampleKey': {'S': sample_sort_key(sample['finishedAt'], sample['resourceId'])},
+            'durationSeconds': {'N': str(sample['durationSeconds'])},
+            'startedAt': {'N': str(sample['startedAt'])},
+            'finishedAt': {'N': str(sample['finishedAt'])},
+            'expiresAt': {'N': str(expires_at)}
+        }
+        for name in ('transition', 'clusterIdentifier', 'engineVersion', 'resourceId', 'executionName'):
+            if sample.get(name):
+                sample_item[name] = {'S': str(sample[name])}
+        self.dynamodb.put_item(TableName=self.table_name, Item=sample_item)
+
+        self.compact(sample['historyKey'], settings['maxSamples'])
+        return sample
+
+    def _query(self, key, projection=None):
+        items = []
+        kwargs = {
+            'TableName': self.table_name,
+            'KeyConditionExpression': 'historyKey = :key',
+            'ExpressionAttributeValues': {':key': {'S': key}},
+            'ScanIndexForward': True
+        }
+        if projection:
+            kwargs['ProjectionExpression'] = projection
+        while True:
+            response = self.dynamodb.query(**kwargs)
+            items.extend(response.get('Items', []))
+            if not response.get('LastEvaluatedKey'):
+                return items
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def samples(self, key):
+        """
+        キーのサンプル（完了時刻の古い順）
+        """
+        return [
+            {
+                'sampleKey': item['sampleKey']['S'],
+                'durationSeconds': int(item['durationSeconds']['N']),
+                'finishedAt': int(item['finishedAt']['N'])
+            }
+            for item in self._query(key, 'sampleKey, durationSeconds, finishedAt')
+        ]
+
+    def compact(self, key, max_samples):
+        """
+        キーのサンプルを新しい max_samples 件まで減らす
+        """
+        sort_keys = [item['sampleKey']['S'] for item in self._query(key, 'sampleKey')]
+        for sort_key in sort_keys[:max(0, len(sort_keys) - max_samples)]:
+            self.dynamodb.delete_item(
+                TableName=self.table_name,
+                Key={'historyKey': {'S': key}, 'sampleKey': {'S': sort_key}}
+            )
+
+
+class InMemoryDurationHistoryStore:
+    """
+    DynamoDBDurationHistoryStore のローカル代替（AWSなしでの記録・保持の検証用）
+    """
+
+    def __init__(self):
+        self.starts = {}
+        self.items = {}
+        self.enabled = True
+
+    def record_start(self, start_key, start):
+        self.starts[start_key] = dict(start, startedAt=int(clock.time()))
+
+    def mark_finished(self, start_key):
+        if start_key not in self.starts:
+            return False
+        self.starts[start_key].setdefault('finishedAt', int(clock.time()))
+        return True
+
+    def record_finish(self, start_key, settings):
+        start = self.starts.pop(start_key, None)
+        if start is None:
+            return None
+        finished_at = start.pop('finishedAt', None) or clock.time()
+        sample = build_sample(dict(start, engineVersion=start.get('engineVersion') or 'unknown'), finished_at)
+        self.items.setdefault(sample['historyKey'], {})[sample_sort_key(sample['finishedAt'], sample['resourceId'])] = sample
+        self.compact(sample['historyKey'], settings['maxSamples'])
+        return sample
+
+    def samples(self, key):
+        return [
+            {'sampleKey': sort_key, 'durationSeconds': sample['durationSeconds'], 'finishedAt': sample['finishedAt']}
+            for sort_key, sample in sorted(self.items.get(key, {}).items())
+        ]
+
+    def compact(self, key, max_samples):
+        samples = self.items.get(key, {})
+        for sort_key in sorted(samples)[:max(0, len(samples) - max_samples)]:
+            del samples[sort_key]
+
+
+def duration_stats(durations, ranks=(50, 90, 95)):
+    """
+    所要時間のパーセンタイル（秒）: {'count', 'p50', 'p90', 'p95', 'max'}
+    """
+    values = sorted(durations)
+    stats = {'count': len(values), 'max': values[-1] if values else None}
+    for rank in ranks:
+        value = percentile(values, rank)
+        stats[f"p{rank}"] = round(value, 1) if value is not None else None
+    return stats
+
+
+def slow_threshold(store, key, exclude_sort_key, settings):
+    """
+    遅いと判定する所要時間（秒）: 同じキーの過去のサンプルの p90 × slowFactor
+    過去のサンプルが MIN_SAMPLES_FOR_SLOW 件に満たない場合は None（判定しない）
+    """
+    previous = [s['durationSeconds'] for s in store.samples(key) if s['sampleKey'] != exclude_sort_key]
+    if len(previous) < MIN_SAMPLES_FOR_SLOW:
+        return None
+    return duration_stats(previous, ranks=(90,))['p90'] * settings['slowFactor']
+
+
+def finish_and_assess(store, start_key, settings):
+    """
+    完了を記録し、遅いかどうかの判定を加えたサンプルを返す（開始の記録がない場合は None）
+    記録に失敗しても処理は継続する（履歴は見積もり・調整用のため）
+    """
+    try:
+        sample = store.record_finish(start_key, settings)
+        if sample is None:
+            return None
+        threshold = slow_threshold(
+            store, sample['historyKey'], sample_sort_key(sample['finishedAt'], sample['resourceId']), settings
+        )
+    except Exception as e:
+        logger.warning(f"Failed to record the finish of {start_key}: {str(e)}")
+        return None
+
+    sample['slowThresholdSeconds'] = round(threshold, 1) if threshold is not None else None
+    sample['slow'] = threshold is not None and sample['durationSeconds'] > threshold
+    if sample['slow']:
+        logger.warning(
+            f"{sample['transition']} of {sample['resourceId']} took {sample['durationSeconds']} seconds "
+            f"(threshold {sample['slowThresholdSeconds']} seconds from past samples of {sample['historyKey']})"
+        )
+    else:
+        logger.info(f"Recorded {sample['transition']} of {sample['resourceId']}: {sample['durationSeconds']} seconds")
+    return sample
+
+
+def start_safely(store, start_key, start):
+    """
+    開始を記録する（記録に失敗しても変更・フェイルオーバーは続ける）
+    """
+    try:
+        store.record_start(start_key, start)
+    except Exception as e:
+        logger.warning(f"Failed to record the start of {start_key}: {str(e)}")
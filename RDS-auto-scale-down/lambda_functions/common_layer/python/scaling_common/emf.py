@@ -0,0 +1,139 @@
+import functools
+import json
+import os
+
+from scaling_common import api_calls, clock
+from scaling_common.polling import elapsed_seconds_since
+
+# CloudWatch Embedded Metric Format（EMF）のメトリクス出力
+# 標準出力に1行のJSONとして書き出すと、CloudWatch Logs がメトリクスとして取り込む（PutMetricData の呼び出しは不要）
+# 同じJSONがログとしても残るため、Logs Insights で executionName・インスタンスIDなどのプロパティでも検索できる
+
+DEFAULT_NAMESPACE = 'AuroraScaling'
+
+# メトリクスの単位（ここにないメトリクスは Count）
+UNITS = {
+    'SecondsSinceExecutionStart': 'Seconds',
+    'PhaseElapsedSeconds': 'Seconds',
+    'PhaseDurationSeconds': 'Seconds',
+    'FailoverDurationSeconds': 'Seconds',
+    'ResizeDurationSeconds': 'Seconds',
+    'ExpectedResizeSeconds': 'Seconds',
+    'ExpectedFailoverSeconds': 'Seconds',
+    'BlueGreenProvisionSeconds': 'Seconds',
+    'BlueGreenSwitchoverSeconds': 'Seconds',
+    'ExpectedBlueGreenProvisionSeconds': 'Seconds',
+    'ExpectedSwitchoverSeconds': 'Seconds',
+    'EstimatedDurationSeconds': 'Seconds',
+    'DeadlineSlackSeconds': 'Seconds',
+    'DrainSeconds': 'Seconds',
+    'FailoverGateWaitSeconds': 'Seconds',
+    'ReplicaLagAtFailover': 'Milliseconds',
+    'WriteIopsAtFailover': 'Count/Second',
+    'ApiLatency': 'Milliseconds',
+    'ApiMaxLatency': 'Milliseconds',
+    'ApiRateLimitWait': 'Milliseconds'
+}
+
+# EMFの出力先（1行のJSONを受け取る関数）
+# ローカル検証（scripts/check_emf_metrics.py、シミュレーター）では出力を集める関数に差し替える
+_sink = {'write': lambda line: print(line, flush=True)}
+
+
+def set_sink(func):
+    _sink['write'] = func
+
+
+def reset_sink():
+    _sink['write'] = lambda line: print(line, flush=True)
+
+
+def namespace():
+    return os.environ.get('METRICS_NAMESPACE', DEFAULT_NAMESPACE)
+
+
+def emit(event, metrics, dimensions=None, dimension_sets=None, properties=None):
+    """
+    EMFのレコードを1件出力する
+    event: Lambda関数の入力（phase / clusterIdentifier / executionName / startTime を共通の項目として使う）
+    metrics: {メトリクス名: 値}（値が None のメトリクスは出力しない）
+    dimensions: 追加のディメンション {名前: 値}
+    dimension_sets: ディメンションの組み合わせ（省略時は Phase、Phase + 追加のディメンションそれぞれ）
+    properties: メトリクスにしない項目（ログとしてのみ残る）
+    """
+    dimension_values = {}
+    if event.get('phase'):
+        dimension_values['Phase'] = str(event['phase'])
+    for name, value in (dimensions or {}).items():
+        if value is not None:
+            dimension_values[name] = str(value)
+
+    if dimension_sets is None:
+        base = ['Phase'] if 'Phase' in dimension_values else []
+        dimension_sets = [base] if base else []
+        dimension_sets += [base + [name] for name in dimension_values if name != 'Phase']
+    dimension_sets = [
+        dimension_set for dimension_set in dimension_sets
+        if dimension_set and all(name in dimension_values for name in dimension_set)
+    ] or [[]]
+
+    values = {name: value for name, value in metrics.items() if value is not None}
+    if event.get('startTime'):
+        values.setdefault('SecondsSinceExecutionStart', elapsed_seconds_since(event['startTime']))
+
+    record = {
+        '_aws': {
+            'Timestamp': int(clock.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace(),
+                'Dimensions': dimension_sets,
+                'Metrics': [{'Name': name, 'Unit': UNITS.get(name, 'Count')} for name in values]
+            }]
+        }
+    }
+    record.update(properties or {})
+    for key in ('executionName', 'startTime', 'clusterIdentifier'):
+        if event.get(key) and key not in record:
+            record[key] = event[key]
+    record.update(dimension_values)
+    record.update(values)
+
+    _sink['write'](json.dumps(record, default=str))
+    return record
+
+
+def with_emf_metrics(handler):
+    """
+    lambda_handler 用のデコレーター: 呼び出しごとに AWS API のメトリクス（呼び出し回数・リトライ・レイテンシ）と
+    実行開始からの経過時間を FunctionName / Phase ごとに出力する（例外で終了した場合は Errors = 1）
+    scaling_common.api_calls.with_api_metrics の外側に付ける
+    """
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        failed = True
+        try:
+            result = handler(event, context)
+            failed = False
+            return result
+        finally:
+            summary = api_calls.api_metrics()
+            operations = summary['operations'].values()
+            function_name = getattr(context, 'function_name', None) or handler.__module__
+            emit(
+                event if isinstance(event, dict) else {},
+                {
+                    'Invocations': 1,
+                    'Errors': 1 if failed else 0,
+                    'ApiCalls': summary['calls'],
+                    'ApiRetries': summary['retries'],
+                    'ApiThrottles': summary['throttled'],
+                    'ApiLatency': round(sum(entry['totalLatencyMs'] for entry in operations), 1),
+                    'ApiMaxLatency': max((entry['maxLatencyMs'] for entry in operations), default=0),
+                    'ApiRateLimitWait': round(sum(entry['rateLimitWaitMs'] for entry in operations), 1)
+                },
+                dimensions={'FunctionName': function_name},
+                dimension_sets=[['FunctionName'], ['FunctionName', 'Phase']],
+                properties={'apiOperations': summary['operations']}
+            )
+
+    return wrapper
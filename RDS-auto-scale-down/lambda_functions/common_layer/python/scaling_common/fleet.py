@@ -0,0 +1,125 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from scaling_common.topology import classify_topology
+
+logger = logging.getLogger()
+
+# describe_* の Filters に指定できる値の数の上限
+FILTER_VALUES_LIMIT = 100
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def chunked(values, size):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def describe_clusters(rds, cluster_identifiers=None):
+    """
+    クラスターの一覧を取得する（ページングを最後まで辿る）
+    cluster_identifiers を指定した場合は db-cluster-id フィルタでまとめて取得する
+    """
+    paginator = rds.get_paginator('describe_db_clusters')
+    if not cluster_identifiers:
+        return [
+            cluster
+            for page in paginator.paginate()
+            for cluster in page.get('DBClusters', [])
+        ]
+
+    clusters = []
+    for chunk in chunked(list(cluster_identifiers), FILTER_VALUES_LIMIT):
+        for page in paginator.paginate(Filters=[{'Name': 'db-cluster-id', 'Values': chunk}]):
+            clusters.extend(page.get('DBClusters', []))
+    return clusters
+
+
+def describe_fleet_instances(rds, cluster_identifiers):
+    """
+    複数クラスターのインスタンスを db-cluster-id フィルタでまとめて取得し、クラスターごとに分ける
+    API呼び出しはクラスター数ではなくページ数に比例する
+    """
+    instances_by_cluster = {cluster_identifier: [] for cluster_identifier in cluster_identifiers}
+    paginator = rds.get_paginator('describe_db_instances')
+
+    for chunk in chunked(list(cluster_identifiers), FILTER_VALUES_LIMIT):
+        for page in paginator.paginate(Filters=[{'Name': 'db-cluster-id', 'Values': chunk}]):
+            for instance in page.get('DBInstances', []):
+                cluster_identifier = instance.get('DBClusterIdentifier')
+                if cluster_identifier in instances_by_cluster:
+                    instances_by_cluster[cluster_identifier].append(instance)
+
+    return instances_by_cluster
+
+
+def matches_selector(cluster, selector):
+    """
+    クラスターがフリートの選択条件に一致するか
+    - clusterIdentifiers: クラスター識別子の明示的なリスト
+    - namePrefix: クラスター識別子のプレフィックス
+    - tags: タグのキーと値（すべて一致する場合のみ対象。値に "*" を指定した場合はキーの存在のみ確認）
+    """
+    cluster_identifier = cluster['DBClusterIdentifier']
+
+    identifiers = selector.get('clusterIdentifiers')
+    if identifiers and cluster_identifier not in identifiers:
+        return False
+
+    name_prefix = selector.get('namePrefix')
+    if name_prefix and not cluster_identifier.startswith(name_prefix):
+        return False
+
+    required_tags = selector.get('tags') or {}
+    if required_tags:
+        tags = {tag['Key']: tag['Value'] for tag in cluster.get('TagList', [])}
+        for key, value in required_tags.items():
+            if key not in tags or (value != '*' and tags[key] != value):
+                return False
+
+    return True
+
+
+def resolve_fleet_topologies(rds, selector):
+    """
+    選択条件に一致するクラスターの構成（Writer / Dedicated Reader / AutoScaling Reader）をまとめて解決する
+    戻り値: {クラスター識別子: トポロジー}（クラスター識別子の昇順）
+    """
+    if not any(selector.get(key) for key in ('clusterIdentifiers', 'namePrefix', 'tags')):
+        raise ValueError("Fleet selector requires clusterIdentifiers, namePrefix or tags")
+
+    clusters = [
+        cluster
+        for cluster in describe_clusters(rds, selector.get('clusterIdentifiers'))
+        if matches_selector(cluster, selector)
+    ]
+    logger.info(f"Fleet selector {selector} matched {len(clusters)} clusters")
+
+    cluster_identifiers = sorted(cluster['DBClusterIdentifier'] for cluster in clusters)
+    instances_by_cluster = describe_fleet_instances(rds, cluster_identifiers) if cluster_identifiers else {}
+
+    cluster_map = {cluster['DBClusterIdentifier']: cluster for cluster in clusters}
+    return {
+        cluster_identifier: classify_topology(cluster_map[cluster_identifier], instances_by_cluster[cluster_identifier])
+        for cluster_identifier in cluster_identifiers
+    }
+
+
+def run_bounded(tasks, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    tasks（キー -> 引数なしの関数）を上限付きのワーカープールで実行する
+    戻り値: {キー: {'result': 結果} または {'error': 例外}}
+    """
+    outcomes = {}
+    if not tasks:
+        return outcomes
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+        futures = {key: executor.submit(task) for key, task in tasks.items()}
+        for key, future in futures.items():
+            try:
+                outcomes[key] = {'result': future.result()}
+            except Exception as e:
+                outcomes[key] = {'error': e}
+    return outcomes
@@ -0,0 +1,86 @@
+import re
+
+# インスタンスサイズごとの相対キャパシティ（medium = 1 を基準とした単位）
+SIZE_CAPACITY_UNITS = {
+    'micro': 0.25,
+    'small': 0.5,
+    'medium': 1,
+    'large': 2,
+    'xlarge': 4
+}
+
+# 不明なインスタンスタイプに使用するキャパシティ
+DEFAULT_CAPACITY_UNITS = 1
+
+
+def capacity_units(instance_class):
+    """
+    インスタンスタイプの相対キャパシティを返す
+    例: db.t4g.medium -> 1, db.r6g.large -> 2, db.r6g.2xlarge -> 8
+    """
+    if not instance_class:
+        return DEFAULT_CAPACITY_UNITS
+
+    size = instance_class.split('.')[-1]
+    if size in SIZE_CAPACITY_UNITS:
+        return SIZE_CAPACITY_UNITS[size]
+
+    # "Nxlarge" 形式（2xlarge, 16xlarge など）
+    match = re.match(r'^(\d+)xlarge$', size)
+    if match:
+        return int(match.group(1)) * SIZE_CAPACITY_UNITS['xlarge']
+
+    return DEFAULT_CAPACITY_UNITS
+
+
+# インスタンスサイズごとの vCPU 数（"Nxlarge" は N * 4）
+SIZE_VCPUS = {
+    'micro': 2,
+    'small': 2,
+    'medium': 2,
+    'large': 2,
+    'xlarge': 4
+}
+
+# ファミリーごとの vCPU あたりのメモリ（GiB）: r = メモリ最適化、x = メモリ拡張
+FAMILY_MEMORY_GIB_PER_VCPU = {
+    'r': 8,
+    'x': 16
+}
+
+# バースト可能（T系）のインスタンスタイプのメモリ（GiB）とベースライン性能（vCPU あたりの割合）
+BURSTABLE_MEMORY_GIB = {
+    'micro': 1,
+    'small': 2,
+    'medium': 4,
+    'large': 8
+}
+BURSTABLE_BASELINE_RATIO = 0.2
+
+
+def instance_spec(instance_class):
+    """
+    インスタンスタイプの vCPU 数・メモリ（GiB）・持続可能なCPU（vCPU 換算、T系はベースライン性能）を返す
+    例: db.r6g.large -> 2 vCPU / 16 GiB、db.t4g.medium -> 2 vCPU / 4 GiB（持続 0.4 vCPU）
+    不明なファミリーは r（メモリ最適化）として扱う
+    """
+    parts = (instance_class or '').split('.')
+    family = parts[1] if len(parts) >= 3 else ''
+    size = parts[-1]
+
+    match = re.match(r'^(\d+)xlarge$', size)
+    vcpus = int(match.group(1)) * SIZE_VCPUS['xlarge'] if match else SIZE_VCPUS.get(size, SIZE_VCPUS['large'])
+
+    if family.startswith('t'):
+        return {
+            'vcpus': vcpus,
+            'memoryGiB': BURSTABLE_MEMORY_GIB.get(size, BURSTABLE_MEMORY_GIB['large']),
+            'sustainedVcpus': round(vcpus * BURSTABLE_BASELINE_RATIO, 2),
+            'burstable': True
+        }
+    return {
+        'vcpus': vcpus,
+        'memoryGiB': vcpus * FAMILY_MEMORY_GIB_PER_VCPU.get(family[:1], FAMILY_MEMORY_GIB_PER_VCPU['r']),
+        'sustainedVcpus': vcpus,
+        'burstable': False
+    }
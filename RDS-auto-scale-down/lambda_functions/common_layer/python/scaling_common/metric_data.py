@@ -0,0 +1,78 @@
+import logging
+import math
+from datetime import timedelta
+
+from scaling_common import clock
+
+logger = logging.getLogger()
+
+NAMESPACE = 'AWS/RDS'
+MAX_QUERIES_PER_REQUEST = 500   # GetMetricData の MetricDataQueries の上限
+
+
+def metric_query(query_id, metric_name, stat, dimensions, period_seconds):
+    """
+    GetMetricData のクエリ（Id は小文字で始まる英数字と _ のみ）
+    dimensions: {"DBInstanceIdentifier": "..."} / {"DBClusterIdentifier": "..."}
+    """
+    return {
+        'Id': query_id,
+        'MetricStat': {
+            'Metric': {
+                'Namespace': NAMESPACE,
+                'MetricName': metric_name,
+                'Dimensions': [{'Name': name, 'Value': value} for name, value in dimensions.items()]
+            },
+            'Period': period_seconds,
+            'Stat': stat
+        },
+        'ReturnData': True
+    }
+
+
+def time_range(lookback_days, period_seconds):
+    """
+    現在時刻を期間の境界に切り捨てた終了時刻と、lookback_days 日前の開始時刻
+    """
+    end_time = clock.now().replace(second=0, microsecond=0)
+    end_time -= timedelta(minutes=end_time.minute % max(1, period_seconds // 60))
+    if period_seconds >= 3600:
+        end_time = end_time.replace(minute=0)
+    return end_time - timedelta(days=lookback_days), end_time
+
+
+def percentile(values, p):
+    """
+    パーセンタイル（線形補間、values はソート済み）
+    """
+    if not values:
+        return None
+    rank = (len(values) - 1) * p / 100
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def get_metric_series(cloudwatch, queries, start_time, end_time):
+    """
+    メトリクスの時系列を GetMetricData でまとめて取得する
+    1回の呼び出しに最大 MAX_QUERIES_PER_REQUEST 件のクエリを詰め、NextToken でページングした結果を Id ごとに結合する
+    戻り値: {Id: (timestamps, values)}（古い順）
+    """
+    series = {}
+    for offset in range(0, len(queries), MAX_QUERIES_PER_REQUEST):
+        batch = queries[offset:offset + MAX_QUERIES_PER_REQUEST]
+        paginator = cloudwatch.get_paginator('get_metric_data')
+        for page in paginator.paginate(
+            MetricDataQueries=batch,
+            StartTime=start_time,
+            EndTime=end_time,
+            ScanBy='TimestampAscending'
+        ):
+            for result in page.get('MetricDataResults', []):
+                timestamps, values = series.setdefault(result['Id'], ([], []))
+                timestamps.extend(result.get('Timestamps', []))
+                values.extend(result.get('Values', []))
+
+    logger.info(f"Fetched {len(queries)} metric series ({start_time.isoformat()} - {end_time.isoformat()})")
+    return series
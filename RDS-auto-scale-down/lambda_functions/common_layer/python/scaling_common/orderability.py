@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+
+from scaling_common import clock
+
+logger = logging.getLogger()
+
+# 注文可能なインスタンスタイプの確認結果を保存しているSSMパラメータ
+# 形式: {"aurora-postgresql/15.4/db.t4g.medium": {"orderable": true, "checkedAt": 1737212400}, ...}
+DEFAULT_INDEX_PARAMETER = '/aurora-scaling/orderable-classes'
+
+# 確認結果の有効期間（エンジンのバージョンごとに注文可能なタイプは頻繁には変わらない）
+DEFAULT_TTL_HOURS = 168
+
+# describe_orderable_db_instance_options の MaxRecords の下限
+MIN_MAX_RECORDS = 20
+
+# コンテナ再利用時にSSMを毎回呼び出さないためのキャッシュ
+_cache = {'index': None}
+
+
+def index_key(engine, engine_version, instance_class):
+    return f"{engine}/{engine_version}/{instance_class}"
+
+
+def ttl_seconds():
+    return float(os.environ.get('ORDERABILITY_CACHE_TTL_HOURS', DEFAULT_TTL_HOURS)) * 3600
+
+
+def load_orderability_index(ssm):
+    """
+    注文可能なインスタンスタイプの確認結果をSSMパラメータから読み込む
+    取得できない場合は空のインデックス（= 全て describe_orderable_db_instance_options で確認する）を返す
+    """
+    if _cache['index'] is not None:
+        return _cache['index']
+
+    parameter_name = os.environ.get('ORDERABILITY_INDEX_PARAMETER', DEFAULT_INDEX_PARAMETER)
+    index = {}
+    try:
+        response = ssm.get_parameter(Name=parameter_name)
+        index = json.loads(response['Parameter']['Value'])
+    except Exception as e:
+        logger.warning(f"Orderability index not available from {parameter_name}, checking with the RDS API: {str(e)}")
+
+    _cache['index'] = index
+    return index
+
+
+def save_orderability_index(ssm, index):
+    """
+    確認結果をSSMパラメータに保存する（有効期限切れの項目は削除する）
+    保存できなくても事前確認の結果は変わらないため、警告のみ
+    """
+    now = clock.time()
+    index = {key: entry for key, entry in index.items() if now - entry.get('checkedAt', 0) < ttl_seconds()}
+    _cache['index'] = index
+
+    parameter_name = os.environ.get('ORDERABILITY_INDEX_PARAMETER', DEFAULT_INDEX_PARAMETER)
+    try:
+        ssm.put_parameter(Name=parameter_name, Value=json.dumps(index, sort_keys=True), Type='String', Overwrite=True)
+    except Exception as e:
+        logger.warning(f"Failed to save orderability index to {parameter_name}: {str(e)}")
+
+
+def describe_orderable(rds, engine, engine_version, instance_class):
+    """
+    エンジン・バージョンでインスタンスタイプが注文可能か（describe_orderable_db_instance_options）
+    1件でも見つかれば注文可能（Marker によるページングは結果が見つかるまで辿る）
+    """
+    marker = None
+    while True:
+        params = {
+            'Engine': engine,
+            'EngineVersion': engine_version,
+            'DBInstanceClass': instance_class,
+            'MaxRecords': MIN_MAX_RECORDS
+        }
+        if marker:
+            params['Marker'] = marker
+
+        response = rds.describe_orderable_db_instance_options(**params)
+        if response.get('OrderableDBInstanceOptions'):
+            return True
+
+        marker = response.get('Marker')
+        if not marker:
+            return False
+
+
+def check_orderable_classes(rds, ssm, requests):
+    """
+    (エンジン, バージョン, インスタンスタイプ) ごとに注文可能か確認する
+    有効期間内の確認結果はインデックスを使い、それ以外だけ RDS API で確認してインデックスに保存する
+    確認できなかった組み合わせ（API エラー）は None（事前確認では止めない）
+    戻り値: {(engine, engine_version, instance_class): True / False / None}
+    """
+    index = load_orderability_index(ssm)
+    now = clock.time()
+    results = {}
+    updated = False
+
+    for engine, engine_version, instance_class in sorted(set(requests)):
+        request = (engine, engine_version, instance_class)
+        key = index_key(*request)
+        entry = index.get(key)
+        if entry and now - entry.get('checkedAt', 0) < ttl_seconds():
+            results[request] = entry['orderable']
+            continue
+
+        try:
+            orderable = describe_orderable(rds, engine, engine_version, instance_class)
+        except Exception as e:
+            logger.warning(f"Could not check whether {instance_class} is orderable for {engine} {engine_version}: {str(e)}")
+            results[request] = None
+            continue
+
+        logger.info(f"Orderability of {instance_class} for {engine} {engine_version}: {orderable}")
+        index[key] = {'orderable': orderable, 'checkedAt': int(now)}
+        results[request] = orderable
+        updated = True
+
+    if updated:
+        save_orderability_index(ssm, index)
+    return results
+
+
+def orderability_error(cluster_identifier, topology, target_class):
+    """
+    注文できないインスタンスタイプの場合のエラーメッセージ
+    """
+    return (
+        f"Instance class {target_class} is not orderable for {topology.get('engine')} {topology.get('engineVersion')} "
+        f"(cluster {cluster_identifier}); choose a class listed by describe-orderable-db-instance-options"
+    )
+
+
+def preflight_target_classes(rds, ssm, clusters):
+    """
+    クラスターごとに変更先のインスタンスタイプが注文可能か確認する（Step Functions の実行前の事前確認）
+    clusters: {クラスター識別子: (トポロジー, 変更先のインスタンスタイプ)}
+    戻り値: {クラスター識別子: 注文できない場合のエラーメッセージ（問題がない・確認できない場合は None）}
+    エンジン・バージョンが不明なクラスターは確認しない
+    """
+    requests = {
+        cluster_identifier: (topology['engine'], topology['engineVersion'], target_class)
+        for cluster_identifier, (topology, target_class) in clusters.items()
+        if topology.get('engine') and topology.get('engineVersion')
+    }
+    results = check_orderable_classes(rds, ssm, requests.values())
+
+    errors = {}
+    for cluster_identifier, (topology, target_class) in clusters.items():
+        request = requests.get(cluster_identifier)
+        errors[cluster_identifier] = None
+        if request is not None and results[request] is False:
+            errors[cluster_identifier] = orderability_error(cluster_identifier, topology, target_class)
+    return errors
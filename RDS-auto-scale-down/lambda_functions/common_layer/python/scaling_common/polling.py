@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+
+from scaling_common import clock
+
+# 次回ポーリングまでの待機時間の下限・上限（秒）
+MIN_POLL_SECONDS = 15
+MAX_POLL_SECONDS = 600
+
+# 見込み時間のどこまでを一度に待つか（見込みより早く終わる場合に取りこぼさないため）
+ETA_FACTOR = 0.8
+
+# ステータスごとの待機時間（秒）
+REBOOTING_POLL_SECONDS = 20     # 再起動中: 完了間近
+PENDING_POLL_SECONDS = 30       # available だがタイプ未変更: 変更開始待ち
+UNKNOWN_POLL_SECONDS = 60       # その他のステータス（backing-up など）
+OVERDUE_MIN_POLL_SECONDS = 30   # 見込み時間を過ぎた場合
+OVERDUE_MAX_POLL_SECONDS = 120
+
+
+def parse_timestamp(value):
+    """
+    Step Functions のタイムスタンプ（例: 2025-01-18T15:00:00.123Z）を datetime に変換する
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def elapsed_seconds_since(start_time, now=None):
+    """
+    start_time からの経過秒数（start_time がない場合は 0）
+    """
+    started_at = parse_timestamp(start_time)
+    if started_at is None:
+        return 0
+    now = now or clock.now()
+    return max(0, int((now - started_at).total_seconds()))
+
+
+def clamp_poll_seconds(seconds):
+    return int(min(MAX_POLL_SECONDS, max(MIN_POLL_SECONDS, seconds)))
+
+
+def eta_poll_seconds(elapsed_seconds, expected_seconds):
+    """
+    見込み時間に対する経過時間から次回ポーリングまでの待機時間を決める
+    """
+    remaining = expected_seconds - elapsed_seconds
+    if remaining > 0:
+        return clamp_poll_seconds(remaining * ETA_FACTOR)
+    # 見込みを過ぎている場合は、見込み時間に比例した短い間隔でポーリングする
+    return clamp_poll_seconds(min(OVERDUE_MAX_POLL_SECONDS, max(OVERDUE_MIN_POLL_SECONDS, expected_seconds * 0.1)))
+
+
+def instance_poll_seconds(status, correct_class, elapsed_seconds, expected_seconds):
+    """
+    1台のインスタンスについて次回ポーリングまでの待機時間を返す（完了済みなら None）
+    ステータスは modifying -> rebooting -> available と遷移する（置き換えで作成したインスタンスは creating -> available）
+    """
+    if status == 'available' and correct_class:
+        return None
+    if status in ('modifying', 'creating'):
+        return eta_poll_seconds(elapsed_seconds, expected_seconds)
+    if status == 'rebooting':
+        return REBOOTING_POLL_SECONDS
+    if status == 'available':
+        return PENDING_POLL_SECONDS
+    return UNKNOWN_POLL_SECONDS
+
+
+def next_poll_seconds(poll_candidates):
+    """
+    各インスタンスの待機時間のうち最短のものを返す（全て完了済みなら 0）
+    """
+    pending = [seconds for seconds in poll_candidates if seconds is not None]
+    if not pending:
+        return 0
+    return clamp_poll_seconds(min(pending))
+
+
+def failover_poll_seconds(cluster_status, writer_switched, elapsed_seconds, expected_seconds):
+    """
+    フェイルオーバーについて次回ポーリングまでの待機時間を返す（完了済みなら None）
+    Writerが切り替わり、クラスターが available に戻った時点で完了とする
+    """
+    if writer_switched and cluster_status == 'available':
+        return None
+    if writer_switched:
+        # Writerは切り替わり済みでクラスターのステータスの戻り待ち: 完了間近
+        return REBOOTING_POLL_SECONDS
+    return eta_poll_seconds(elapsed_seconds, expected_seconds)
@@ -0,0 +1,175 @@
+import logging
+import os
+from collections import defaultdict
+from botocore.exceptions import ClientError
+from scaling_common import clock
+from scaling_common.metric_data import percentile
+
+logger = logging.getLogger()
+
+# 履歴の要約は所要時間の履歴のテーブル（DURATION_HISTORY_TABLE、scaling_common.duration_history）に保存する
+# 項目: historyKey = SUMMARY_HISTORY_KEY、sampleKey = <変更>（db.r6g.large->db.t4g.medium / failover / blue-green-provision など）、
+#   samples = 所要時間（秒）のリスト（古い順）
+# 読み込み: {"db.r6g.large->db.t4g.medium": [540, 610, ...], "failover": [35, 42, ...], "blue-green-provision": [1650, ...]}
+SUMMARY_HISTORY_KEY = 'summary'
+
+# 履歴がない場合の所要時間の見込み（秒）
+DEFAULT_RESIZE_SECONDS = 600
+DEFAULT_FAILOVER_SECONDS = 60
+DEFAULT_BLUE_GREEN_SECONDS = {
+    'blue-green-provision': 1800,   # グリーン環境の作成（クラスターのクローン + 全インスタンスの作成）
+    'blue-green-switchover': 60     # スイッチオーバー
+}
+
+FAILOVER_KEY = 'failover'
+BLUE_GREEN_PROVISION_KEY = 'blue-green-provision'
+BLUE_GREEN_SWITCHOVER_KEY = 'blue-green-switchover'
+
+# 変更（from -> to）・フェイルオーバーごとに見積もりに使う直近のサンプル数
+SUMMARY_MAX_SAMPLES = 20
+
+# コンテナ再利用時にDynamoDBを毎回呼び出さないためのキャッシュ
+CACHE_TTL_SECONDS = 300
+_cache = {'loadedAt': 0, 'history': None}
+
+
+def summary_table_name():
+    # 空の場合は履歴を使わない（デフォルト値で見積もる）
+    return os.environ.get('DURATION_HISTORY_TABLE', '')
+
+
+def transition_key(from_class, to_class):
+    return f"{from_class}->{to_class}"
+
+
+def load_resize_history(dynamodb):
+    """
+    過去のリサイズ所要時間の履歴（変更ごとの直近 SUMMARY_MAX_SAMPLES 件）を読み込む
+    取得できない場合は空の履歴（= デフォルト値で見積もる）を返す
+    """
+    now = clock.time()
+    if _cache['history'] is not None and now - _cache['loadedAt'] < CACHE_TTL_SECONDS:
+        return _cache['history']
+
+    table_name = summary_table_name()
+    history = {}
+    if table_name:
+        try:
+            kwargs = {
+                'TableName': table_name,
+                'KeyConditionExpression': 'historyKey = :key',
+                'ExpressionAttributeValues': {':key': {'S': SUMMARY_HISTORY_KEY}},
+                'ProjectionExpression': 'sampleKey, samples'
+            }
+            while True:
+                response = dynamodb.query(**kwargs)
+                for item in response.get('Items', []):
+                    values = [int(value['N']) for value in item.get('samples', {}).get('L', [])]
+                    history[item['sampleKey']['S']] = values[-SUMMARY_MAX_SAMPLES:]
+                if not response.get('LastEvaluatedKey'):
+                    break
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except Exception as e:
+            # 履歴はあくまで見積もり用なので、取得できなくても処理は継続する
+            logger.warning(f"Resize history not available from {table_name}, using defaults: {str(e)}")
+            history = {}
+
+    _cache['history'] = history
+    _cache['loadedAt'] = now
+    return history
+
+
+def expected_resize_seconds(history, from_class, to_class, rank=50):
+    """
+    インスタンスタイプの変更にかかる時間の見込み（秒）
+    同じ変更（from -> to）の履歴のパーセンタイル（rank、デフォルトは中央値）、
+    なければ同じ変更先の履歴のパーセンタイル、なければデフォルト値
+    """
+    samples = history.get(transition_key(from_class, to_class))
+    if not samples:
+        samples = [
+            seconds
+            for key, values in history.items()
+            if key != FAILOVER_KEY and key.endswith(f"->{to_class}")
+            for seconds in values
+        ]
+    if not samples:
+        return DEFAULT_RESIZE_SECONDS
+    return percentile(sorted(samples), rank)
+
+
+def expected_failover_seconds(history, rank=50):
+    """
+    フェイルオーバーにかかる時間の見込み（秒、履歴のパーセンタイル）
+    """
+    samples = history.get(FAILOVER_KEY)
+    if not samples:
+        return DEFAULT_FAILOVER_SECONDS
+    return percentile(sorted(samples), rank)
+
+
+def expected_blue_green_seconds(history, key, rank=50):
+    """
+    Blue/Green デプロイのグリーン環境の作成（BLUE_GREEN_PROVISION_KEY）・スイッチオーバー（BLUE_GREEN_SWITCHOVER_KEY）
+    にかかる時間の見込み（秒、履歴のパーセンタイル）
+    """
+    samples = history.get(key)
+    if not samples:
+        return DEFAULT_BLUE_GREEN_SECONDS[key]
+    return percentile(sorted(samples), rank)
+
+
+def append_resize_history(dynamodb, samples):
+    """
+    完了したリサイズ・フェイルオーバーの所要時間を履歴の要約に追加する
+    samples: scaling_common.duration_history のサンプル（transition / durationSeconds）
+    変更ごとに1項目で、list_append による追加のため同時に追加しても失われない（ウェーブ・フリート・Blue/Green の確認から同時に呼ばれる）
+    変更ごとに直近 SUMMARY_MAX_SAMPLES 件のみ残す（全てのサンプルは所要時間の履歴のテーブルに残る）
+    """
+    table_name = summary_table_name()
+    if not samples or not table_name:
+        return
+    by_transition = defaultdict(list)
+    for sample in samples:
+        by_transition[sample['transition']].append(sample['durationSeconds'])
+
+    for transition, durations in by_transition.items():
+        key = {'historyKey': {'S': SUMMARY_HISTORY_KEY}, 'sampleKey': {'S': transition}}
+        try:
+            response = dynamodb.update_item(
+                TableName=table_name,
+                Key=key,
+                UpdateExpression='SET samples = list_append(if_not_exists(samples, :empty), :new)',
+                ExpressionAttributeValues={
+                    ':empty': {'L': []},
+                    ':new': {'L': [{'N': str(int(seconds))} for seconds in durations]}
+                },
+                ReturnValues='UPDATED_NEW'
+            )
+            count = len(response.get('Attributes', {}).get('samples', {}).get('L', []))
+            if count > SUMMARY_MAX_SAMPLES:
+                trim_summary(dynamodb, table_name, key, count)
+        except Exception as e:
+            # 履歴はあくまで見積もり用なので、更新できなくても処理は継続する
+            logger.warning(f"Failed to update resize history {transition} in {table_name}: {str(e)}")
+
+    _cache['history'] = None
+
+
+def trim_summary(dynamodb, table_name, key, count):
+    """
+    古いサンプルを削除して SUMMARY_MAX_SAMPLES 件にする
+    件数が変わっていない場合のみ削除する（同時に追加された場合は、次の追加で削除する）
+    """
+    excess = count - SUMMARY_MAX_SAMPLES
+    try:
+        dynamodb.update_item(
+            TableName=table_name,
+            Key=key,
+            UpdateExpression='REMOVE ' + ', '.join(f"samples[{index}]" for index in range(excess)),
+            ConditionExpression='size(samples) = :count',
+            ExpressionAttributeValues={':count': {'N': str(count)}}
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
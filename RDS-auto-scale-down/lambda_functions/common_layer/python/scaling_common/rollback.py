@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+
+from botocore.exceptions import ClientError
+
+from scaling_common import clock
+from scaling_common.wave_planner import plan_waves
+
+logger = logging.getLogger()
+
+# 実行前のインスタンスタイプと Writer を保存するSSMパラメータ（クラスターごと: <prefix>/<クラスター識別子>）
+# 形式: {"writerInstanceId": "...", "instances": {"<インスタンスID>": "<インスタンスタイプ>", ...},
+#        "status": "in-progress", "executionName": "...", "recordedAt": 1737212400}
+DEFAULT_SNAPSHOT_PREFIX = '/aurora-scaling/rollback-snapshots'
+
+# in-progress: 実行中（または失敗・中止したまま）、completed: 実行が完了、rolled-back: ロールバックが完了
+STATUS_IN_PROGRESS = 'in-progress'
+STATUS_COMPLETED = 'completed'
+STATUS_ROLLED_BACK = 'rolled-back'
+
+# ロールバックで同時に変更する Reader の予算（0 / 未指定は制限なし）
+DEFAULT_MAX_READERS = 0
+DEFAULT_MAX_CAPACITY_PERCENT = 50
+
+
+def snapshot_parameter_name(cluster_identifier):
+    prefix = os.environ.get('ROLLBACK_SNAPSHOT_PREFIX', DEFAULT_SNAPSHOT_PREFIX)
+    return f"{prefix.rstrip('/')}/{cluster_identifier}"
+
+
+def load_snapshot(ssm, cluster_identifier):
+    """
+    クラスターの実行前のスナップショット（保存されていない場合は None）
+    """
+    try:
+        response = ssm.get_parameter(Name=snapshot_parameter_name(cluster_identifier))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ParameterNotFound':
+            return None
+        raise
+    return json.loads(response['Parameter']['Value'])
+
+
+def save_snapshot(ssm, cluster_identifier, snapshot):
+    ssm.put_parameter(
+        Name=snapshot_parameter_name(cluster_identifier),
+        Value=json.dumps(snapshot, sort_keys=True),
+        Type='String',
+        Overwrite=True
+    )
+
+
+def record_snapshot(ssm, cluster_identifier, topology, execution_name):
+    """
+    変更前のインスタンスタイプと Writer を保存する（実行の開始時、変更要求の前）
+    前回の実行が完了もロールバックもしていない（in-progress のまま）場合は、前回の値を元の状態として残す
+    （失敗した実行の後の再実行で、途中まで変更されたタイプを元の状態として上書きしないため）
+    戻り値: (スナップショット, 前回の値を残したか)
+    """
+    instances = {
+        instance_id: detail['instanceClass']
+        for instance_id, detail in topology['instances'].items()
+    }
+    snapshot = {
+        'writerInstanceId': topology['writerInstanceId'],
+        'instances': instances
+    }
+
+    previous = load_snapshot(ssm, cluster_identifier)
+    preserved = bool(previous and previous.get('status') == STATUS_IN_PROGRESS)
+    if preserved:
+        logger.info(f"Previous execution {previous.get('executionName')} did not complete; keeping its snapshot of {cluster_identifier}")
+        # 前回の後に追加されたインスタンスのみ現在のタイプを使う
+        snapshot = {
+            'writerInstanceId': previous.get('writerInstanceId') or topology['writerInstanceId'],
+            'instances': dict(instances, **previous.get('instances', {}))
+        }
+
+    snapshot.update({
+        'status': STATUS_IN_PROGRESS,
+        'executionName': execution_name,
+        'recordedAt': int(clock.time())
+    })
+    save_snapshot(ssm, cluster_identifier, snapshot)
+    return snapshot, preserved
+
+
+def mark_snapshot(ssm, cluster_identifier, status, execution_name=None):
+    """
+    スナップショットの状態を更新する（execution_name を指定した場合は、その実行のスナップショットのみ）
+    戻り値: 更新したか
+    """
+    snapshot = load_snapshot(ssm, cluster_identifier)
+    if snapshot is None:
+        return False
+    if execution_name and snapshot.get('executionName') != execution_name:
+        logger.info(f"Snapshot of {cluster_identifier} belongs to {snapshot.get('executionName')}, not {execution_name}; not marking it {status}")
+        return False
+    snapshot['status'] = status
+    save_snapshot(ssm, cluster_identifier, snapshot)
+    return True
+
+
+def restore_required(detail, original_class):
+    """
+    インスタンスを元のタイプに戻す必要があるか（変更中の場合は、適用待ちのタイプで判定する）
+    """
+    current_class = detail.get('pendingInstanceClass') or detail.get('instanceClass')
+    return current_class != original_class or detail.get('instanceClass') != original_class
+
+
+def next_rollback_step(snapshot, topology, max_readers=None, max_capacity_percent=None):
+    """
+    スナップショットと現在のクラスター構成から、ロールバックの次の手順を決める（呼び出すたびに現在の状態から決め直す）
+      1. resize:   Writer 以外で元のタイプと異なるインスタンスを、元のタイプごとに予算内のウェーブで並列に戻す
+                   （元の Writer を含むウェーブを最初に戻す。フェイルバック先を先に元のタイプにするため）
+      2. failover: 元の Writer にフェイルバックする（Writer 以外が全て元のタイプに戻った後）
+      3. resize:   フェイルバックで Reader になった（縮小済みの）インスタンスを戻す
+      4. complete: 全て元のタイプで、元の Writer が Writer
+    Writer のまま元のタイプと異なる場合（元の Writer がクラスターにない場合など）は Writer を単独で戻す
+    スナップショットの後に追加されたインスタンスは対象外、削除されたインスタンスは missingInstanceIds で返す
+    """
+    instances = topology['instances']
+    original_writer_id = snapshot.get('writerInstanceId')
+    current_writer_id = topology['writerInstanceId']
+
+    missing_ids = sorted(i for i in snapshot['instances'] if i not in instances)
+    pending = {
+        instance_id: original_class
+        for instance_id, original_class in snapshot['instances'].items()
+        if instance_id in instances and restore_required(instances[instance_id], original_class)
+    }
+
+    step = {
+        'action': 'complete',
+        'instanceIds': [],
+        'targetClass': None,
+        'targetInstanceId': None,
+        'originalWriterInstanceId': original_writer_id,
+        'currentWriterInstanceId': current_writer_id,
+        'remainingInstanceIds': sorted(pending),
+        'missingInstanceIds': missing_ids,
+        'reason': 'All instances are at their original class and the original writer is the writer'
+    }
+
+    readers = {i: c for i, c in pending.items() if i != current_writer_id}
+    if readers:
+        waves = []
+        for original_class in sorted(set(readers.values())):
+            ids = sorted(i for i, c in readers.items() if c == original_class)
+            plan = plan_waves(ids, instances, max_readers=max_readers, max_capacity_percent=max_capacity_percent)
+            waves.extend((original_class, wave) for wave in plan['waves'])
+        target_class, wave = next(
+            ((c, w) for c, w in waves if original_writer_id in w),
+            waves[0]
+        )
+        step.update({
+            'action': 'resize',
+            'instanceIds': wave,
+            'targetClass': target_class,
+            'reason': f"Restore {len(wave)} of {len(readers)} readers to {target_class}"
+        })
+        return step
+
+    if original_writer_id and original_writer_id in instances and original_writer_id != current_writer_id:
+        step.update({
+            'action': 'failover',
+            'targetInstanceId': original_writer_id,
+            'reason': f"Fail back to the original writer {original_writer_id}"
+        })
+        return step
+
+    if current_writer_id in pending:
+        logger.warning(f"Writer {current_writer_id} is not at its original class and cannot be failed over first; resizing the writer")
+        step.update({
+            'action': 'resize',
+            'instanceIds': [current_writer_id],
+            'targetClass': pending[current_writer_id],
+            'reason': f"Restore the writer {current_writer_id} to {pending[current_writer_id]}"
+        })
+        return step
+
+    if missing_ids:
+        logger.warning(f"Instances in the snapshot no longer exist and cannot be restored: {missing_ids}")
+    return step
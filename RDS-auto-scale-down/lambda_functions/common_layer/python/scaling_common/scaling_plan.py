@@ -0,0 +1,322 @@
+import logging
+
+from scaling_common.instance_classes import instance_spec
+from scaling_common.resize_history import (
+    BLUE_GREEN_PROVISION_KEY, BLUE_GREEN_SWITCHOVER_KEY, expected_blue_green_seconds, expected_failover_seconds, expected_resize_seconds
+)
+from scaling_common.wave_planner import plan_waves
+
+logger = logging.getLogger()
+
+# スケーリングの方向
+# down: Dedicated Reader -> フェイルオーバー -> 旧Writer -> AutoScaling Reader（Reader の縮小は最後）
+# up:   Dedicated Reader -> AutoScaling Reader -> フェイルオーバー -> 旧Writer（Reader を先に拡大し、拡大した Reader にフェイルオーバーする）
+SCALING_DIRECTIONS = ('down', 'up')
+
+# スケーリングの方法
+# in-place:   インスタンスごとにタイプを変更し、Dedicated Reader にフェイルオーバーする（上記の順序）
+# blue-green: 全インスタンスが変更先のタイプのグリーン環境（Blue/Green デプロイ）を作成し、1回のスイッチオーバーで切り替える
+SCALING_STRATEGIES = ('in-place', 'blue-green')
+
+
+def scaling_direction(current_class, target_class):
+    """
+    変更前のインスタンスタイプ（Writer）と変更先から、スケーリングの方向を判定する
+    メモリ・持続可能なCPU（T系はベースライン性能）の順に比較し、変更先の方が大きければ up
+    """
+    current = instance_spec(current_class)
+    target = instance_spec(target_class)
+    if (target['memoryGiB'], target['sustainedVcpus']) > (current['memoryGiB'], current['sustainedVcpus']):
+        return 'up'
+    return 'down'
+
+
+def phase_order(direction):
+    """
+    方向ごとのフェーズの順序（ステートマシンの ResumeFromFirstIncompleteStep と同じ）
+    """
+    if direction == 'up':
+        return ['dedicated-reader', 'autoscaling-reader', 'failover', 'old-writer']
+    return ['dedicated-reader', 'failover', 'old-writer', 'autoscaling-reader']
+
+
+def instance_needs_change(detail, target_class):
+    """
+    インスタンスタイプの変更が必要か（既に変更先のタイプであれば不要）
+    """
+    return detail.get('instanceClass') != target_class
+
+
+def instance_complete(detail, target_class):
+    """
+    変更が完了しているか（変更先のタイプで available）
+    """
+    return detail.get('instanceClass') == target_class and detail.get('status') == 'available'
+
+
+def assess_progress(topology, target_class, writer_instance_id, dedicated_reader_instance_id, auto_scaling_reader_instance_ids, direction='down'):
+    """
+    現在のクラスター構成から、ステートマシンのどのフェーズが完了済みかを判定する（API呼び出しなし）
+
+    Writer / Dedicated Reader は実行開始時のID（入力）で判定する
+    （フェイルオーバー後にタグから分類し直すと、Writer と Dedicated Reader が入れ替わるため）
+    - Dedicated Reader: 変更先のタイプで available
+    - フェイルオーバー: Dedicated Reader が Writer になっている、または元Writerの変更が不要
+    - 元Writer: 変更先のタイプで available
+    - AutoScaling Reader: 全台が変更先のタイプで available（クラスターから削除されたReaderは対象外）
+    resumeFrom は direction のフェーズの順序で最初の未完了のフェーズ（全て完了していれば complete）
+    """
+    instances = topology.get('instances', {})
+
+    def complete(instance_id):
+        return instance_complete(instances.get(instance_id, {}), target_class)
+
+    dedicated_reader_complete = complete(dedicated_reader_instance_id)
+    failover_complete = (
+        topology.get('writerInstanceId') == dedicated_reader_instance_id
+        or complete(writer_instance_id)
+    )
+    old_writer_complete = complete(writer_instance_id)
+    pending_reader_ids = [
+        instance_id
+        for instance_id in auto_scaling_reader_instance_ids
+        if instance_id in instances and not complete(instance_id)
+    ]
+
+    completed = {
+        'dedicated-reader': dedicated_reader_complete,
+        'failover': failover_complete,
+        'old-writer': old_writer_complete,
+        'autoscaling-reader': not pending_reader_ids
+    }
+    resume_from = next((phase for phase in phase_order(direction) if not completed[phase]), 'complete')
+
+    logger.info(f"Progress: resumeFrom={resume_from}, pending AutoScaling Readers={len(pending_reader_ids)}")
+
+    return {
+        'dedicatedReaderComplete': dedicated_reader_complete,
+        'failoverComplete': failover_complete,
+        'oldWriterComplete': old_writer_complete,
+        'autoScalingReadersComplete': not pending_reader_ids,
+        'pendingAutoScalingReaderInstanceIds': pending_reader_ids,
+        'resumeFrom': resume_from
+    }
+
+
+def reconcile_members(topology, writer_instance_id, dedicated_reader_instance_id, auto_scaling_reader_instance_ids):
+    """
+    実行開始時の AutoScaling Reader の一覧と現在のクラスターメンバーの差分（API呼び出しなし）
+    入力にないメンバー（実行中に追加された Reader）は AutoScaling Reader として追加し、
+    クラスターから削除された Reader は一覧から除く
+    Writer / Dedicated Reader は入力のIDで判定する（フェイルオーバー後にタグから分類し直すと入れ替わるため）
+    """
+    instances = topology.get('instances', {})
+    known_ids = {writer_instance_id, dedicated_reader_instance_id, *auto_scaling_reader_instance_ids}
+    added_ids = sorted(instance_id for instance_id in instances if instance_id not in known_ids)
+    removed_ids = [instance_id for instance_id in auto_scaling_reader_instance_ids if instance_id not in instances]
+
+    if added_ids or removed_ids:
+        logger.info(f"Cluster members changed during the run: added={added_ids}, removed={removed_ids}")
+
+    return {
+        'autoScalingReaderInstanceIds': [
+            instance_id for instance_id in auto_scaling_reader_instance_ids if instance_id in instances
+        ] + added_ids,
+        'addedInstanceIds': added_ids,
+        'removedInstanceIds': removed_ids
+    }
+
+
+def build_scaling_plan(topology, target_class, history, max_readers=None, max_capacity_percent=None, direction='down', rank=50,
+                       strategy='in-place'):
+    """
+    ステートマシンを実行した場合の手順と所要時間の見込みを作成する（API呼び出しなし）
+    strategy: "blue-green" の場合は build_blue_green_plan の手順
+
+    topology は scaling_common.topology.get_cluster_topology の結果、history は resize_history の履歴
+    手順はステートマシンと同じ順序（direction: "down"）:
+    1. Dedicated Reader の変更
+    2. Dedicated Reader へのフェイルオーバー（Writer の変更が必要な場合のみ）
+    3. 旧Writer の変更
+    4. AutoScaling Reader の変更（ウェーブごと）
+    direction: "up" の場合は、AutoScaling Reader の変更をフェイルオーバーの前に行う
+    所要時間は履歴のパーセンタイル（rank、デフォルトは中央値）で見積もる
+    既に変更先のタイプになっているインスタンスは手順に含めない
+    """
+    if strategy == 'blue-green':
+        return build_blue_green_plan(topology, target_class, history, direction, rank)
+
+    instances = topology.get('instances', {})
+    writer_id = topology.get('writerInstanceId')
+    dedicated_reader_id = topology.get('dedicatedReaderInstanceId')
+    auto_scaling_reader_ids = topology.get('autoScalingReaderInstanceIds', [])
+
+    roles = [(dedicated_reader_id, 'dedicated-reader'), (writer_id, 'writer')]
+    roles += [(instance_id, 'autoscaling-reader') for instance_id in auto_scaling_reader_ids]
+
+    plan_instances = []
+    warnings = []
+    for instance_id, role in roles:
+        if not instance_id:
+            continue
+        detail = instances.get(instance_id, {})
+        needs_change = instance_needs_change(detail, target_class)
+        plan_instances.append({
+            'instanceId': instance_id,
+            'role': role,
+            'currentClass': detail.get('instanceClass'),
+            'status': detail.get('status'),
+            'needsChange': needs_change,
+            'expectedSeconds': expected_resize_seconds(history, detail.get('instanceClass'), target_class, rank) if needs_change else 0
+        })
+        if detail.get('status') != 'available':
+            warnings.append(f"Instance {instance_id} is {detail.get('status')}, not available")
+
+    by_id = {instance['instanceId']: instance for instance in plan_instances}
+
+    def needs_change(instance_id):
+        return instance_id in by_id and by_id[instance_id]['needsChange']
+
+    def resize_step(phase, instance_ids):
+        return {
+            'action': 'modify',
+            'phase': phase,
+            'instanceIds': instance_ids,
+            'fromClasses': sorted({by_id[instance_id]['currentClass'] or 'unknown' for instance_id in instance_ids}),
+            'toClass': target_class,
+            'estimatedSeconds': max(by_id[instance_id]['expectedSeconds'] for instance_id in instance_ids)
+        }
+
+    failover_required = needs_change(writer_id)
+    if failover_required and not dedicated_reader_id:
+        warnings.append('Writer needs a change but no Dedicated Reader is available as the failover target')
+
+    pending_reader_ids = [instance_id for instance_id in auto_scaling_reader_ids if needs_change(instance_id)]
+    wave_plan = {'waves': []}
+    if pending_reader_ids:
+        wave_plan = plan_waves(
+            pending_reader_ids,
+            instances,
+            max_readers=max_readers,
+            max_capacity_percent=max_capacity_percent
+        )
+
+    phase_steps = {'dedicated-reader': [], 'failover': [], 'old-writer': [], 'autoscaling-reader': []}
+    if needs_change(dedicated_reader_id):
+        phase_steps['dedicated-reader'].append(resize_step('dedicated-reader', [dedicated_reader_id]))
+    if failover_required and dedicated_reader_id:
+        phase_steps['failover'].append({
+            'action': 'failover',
+            'phase': 'failover',
+            'fromInstanceId': writer_id,
+            'targetInstanceId': dedicated_reader_id,
+            'estimatedSeconds': expected_failover_seconds(history, rank)
+        })
+    if failover_required:
+        phase_steps['old-writer'].append(resize_step('old-writer', [writer_id]))
+    for index, wave in enumerate(wave_plan['waves']):
+        step = resize_step('autoscaling-reader', wave)
+        step['wave'] = index + 1
+        phase_steps['autoscaling-reader'].append(step)
+
+    steps = [step for phase in phase_order(direction) for step in phase_steps[phase]]
+
+    for index, step in enumerate(steps):
+        step['order'] = index + 1
+
+    estimated_seconds = sum(step['estimatedSeconds'] for step in steps)
+
+    logger.info(f"Scaling plan: {len(steps)} steps, {len(warnings)} warnings, about {estimated_seconds} seconds")
+
+    return {
+        'targetClass': target_class,
+        'direction': direction,
+        'strategy': 'in-place',
+        'changeRequired': bool(steps),
+        'failoverRequired': failover_required,
+        'failoverTargetInstanceId': dedicated_reader_id if failover_required else None,
+        'instances': plan_instances,
+        'skippedInstanceIds': [instance['instanceId'] for instance in plan_instances if not instance['needsChange']],
+        'readerWaveCount': len(wave_plan['waves']),
+        'steps': steps,
+        'estimatedDurationSeconds': estimated_seconds,
+        'warnings': warnings
+    }
+
+
+def build_blue_green_plan(topology, target_class, history, direction='down', rank=50):
+    """
+    Blue/Green デプロイ（strategy: "blue-green"）の手順と所要時間の見込みを作成する（API呼び出しなし）
+    1. グリーン環境の作成（全インスタンスを変更先のタイプで作成し、レプリケーションの同期を待つ）
+    2. スイッチオーバー（書き込みが止まるのはこの間のみ）
+    3. ブルー環境（切り替え前のクラスター）の削除
+    所要時間は履歴の blue-green-provision / blue-green-switchover のパーセンタイル（削除は切り替え後のため含めない）
+    インスタンスの ID はスイッチオーバーで引き継がれるため、Writer / Reader の構成は変わらない
+    """
+    instances = topology.get('instances', {})
+    writer_id = topology.get('writerInstanceId')
+    dedicated_reader_id = topology.get('dedicatedReaderInstanceId')
+    roles = [(writer_id, 'writer'), (dedicated_reader_id, 'dedicated-reader')]
+    roles += [(instance_id, 'autoscaling-reader') for instance_id in topology.get('autoScalingReaderInstanceIds', [])]
+
+    plan_instances = []
+    warnings = []
+    for instance_id, role in roles:
+        if not instance_id:
+            continue
+        detail = instances.get(instance_id, {})
+        plan_instances.append({
+            'instanceId': instance_id,
+            'role': role,
+            'currentClass': detail.get('instanceClass'),
+            'status': detail.get('status'),
+            'needsChange': instance_needs_change(detail, target_class),
+            'expectedSeconds': 0
+        })
+        if detail.get('status') != 'available':
+            warnings.append(f"Instance {instance_id} is {detail.get('status')}, not available")
+
+    change_required = any(instance['needsChange'] for instance in plan_instances)
+    steps = []
+    if change_required:
+        steps = [
+            {
+                'action': 'create-green',
+                'phase': 'blue-green-provision',
+                'instanceIds': [instance['instanceId'] for instance in plan_instances],
+                'fromClasses': sorted({instance['currentClass'] or 'unknown' for instance in plan_instances}),
+                'toClass': target_class,
+                'estimatedSeconds': expected_blue_green_seconds(history, BLUE_GREEN_PROVISION_KEY, rank)
+            },
+            {
+                'action': 'switchover',
+                'phase': 'blue-green-switchover',
+                'estimatedSeconds': expected_blue_green_seconds(history, BLUE_GREEN_SWITCHOVER_KEY, rank)
+            },
+            {
+                'action': 'delete-blue',
+                'phase': 'blue-green-cleanup',
+                'estimatedSeconds': 0
+            }
+        ]
+        for index, step in enumerate(steps):
+            step['order'] = index + 1
+
+    estimated_seconds = sum(step['estimatedSeconds'] for step in steps)
+
+    logger.info(f"Blue/Green plan: {len(plan_instances)} instances, {len(warnings)} warnings, about {estimated_seconds} seconds")
+
+    return {
+        'targetClass': target_class,
+        'direction': direction,
+        'strategy': 'blue-green',
+        'changeRequired': change_required,
+        'failoverRequired': False,
+        'failoverTargetInstanceId': None,
+        'instances': plan_instances,
+        'skippedInstanceIds': [],
+        'readerWaveCount': 0,
+        'steps': steps,
+        'estimatedDurationSeconds': estimated_seconds,
+        'warnings': warnings
+    }
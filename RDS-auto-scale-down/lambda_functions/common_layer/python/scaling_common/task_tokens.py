@@ -0,0 +1,171 @@
+import logging
+import os
+
+from scaling_common import clock
+
+logger = logging.getLogger()
+
+# トークンの保持期間（秒）: Step Functions 側のタイムアウトより長くしておく
+DEFAULT_TOKEN_TTL_SECONDS = 24 * 60 * 60
+
+# 待機の種類
+WAIT_MODIFY = 'modify'
+WAIT_FAILOVER = 'failover'
+
+
+def default_table_name():
+    # トークンを保存するDynamoDBテーブル（Terraformで環境変数に設定する）
+    return os.environ.get('TASK_TOKEN_TABLE', '')
+
+
+def instance_key(instance_id):
+    return f"instance#{instance_id}#{WAIT_MODIFY}"
+
+
+def cluster_key(cluster_identifier):
+    return f"cluster#{cluster_identifier}#{WAIT_FAILOVER}"
+
+
+class DynamoDBTaskTokenStore:
+    """
+    Step Functions のタスクトークンを DynamoDB に保存する
+    キー: resourceKey（instance#<id>#modify / cluster#<id>#failover）
+    同じトークンを待つリソースの一覧を groupKeys に保持する（ウェーブ単位の待機用）
+    """
+
+    def __init__(self, dynamodb, table_name, ttl_seconds=DEFAULT_TOKEN_TTL_SECONDS):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+
+    def register(self, keys, task_token, attributes=None):
+        expires_at = int(clock.time()) + self.ttl_seconds
+        for key in keys:
+            item = {
+                'resourceKey': {'S': key},
+                'taskToken': {'S': task_token},
+                'groupKeys': {'SS': list(keys)},
+                'expiresAt': {'N': str(expires_at)}
+            }
+            for name, value in (attributes or {}).items():
+                item[name] = {'S': str(value)}
+            self.dynamodb.put_item(TableName=self.table_name, Item=item)
+
+    def pop(self, key):
+        """
+        キーに対応する待機を取り出して削除する（存在しない場合は None）
+        """
+        response = self.dynamodb.delete_item(
+            TableName=self.table_name,
+            Key={'resourceKey': {'S': key}},
+            ReturnValues='ALL_OLD'
+        )
+        item = response.get('Attributes')
+        if not item:
+            return None
+        return {
+            'resourceKey': item['resourceKey']['S'],
+            'taskToken': item['taskToken']['S'],
+            'groupKeys': item.get('groupKeys', {}).get('SS', []),
+            'attributes': {
+                name: value['S']
+                for name, value in item.items()
+                if name not in ('resourceKey', 'taskToken', 'groupKeys', 'expiresAt') and 'S' in value
+            }
+        }
+
+    def remaining(self, keys, task_token):
+        """
+        同じトークンを待っているキーのうち、まだ完了していないもの
+        """
+        pending = []
+        for key in keys:
+            response = self.dynamodb.get_item(
+                TableName=self.table_name,
+                Key={'resourceKey': {'S': key}},
+                ConsistentRead=True
+            )
+            item = response.get('Item')
+            if item and item['taskToken']['S'] == task_token:
+                pending.append(key)
+        return pending
+
+    def discard(self, keys):
+        for key in keys:
+            self.dynamodb.delete_item(
+                TableName=self.table_name,
+                Key={'resourceKey': {'S': key}}
+            )
+
+
+class InMemoryTaskTokenStore:
+    """
+    DynamoDBTaskTokenStore のローカル代替（AWSなしでのトークン照合の検証用）
+    """
+
+    def __init__(self):
+        self.items = {}
+
+    def register(self, keys, task_token, attributes=None):
+        for key in keys:
+            self.items[key] = {
+                'resourceKey': key,
+                'taskToken': task_token,
+                'groupKeys': list(keys),
+                'attributes': {name: str(value) for name, value in (attributes or {}).items()}
+            }
+
+    def pop(self, key):
+        return self.items.pop(key, None)
+
+    def remaining(self, keys, task_token):
+        return [key for key in keys if key in self.items and self.items[key]['taskToken'] == task_token]
+
+    def discard(self, keys):
+        for key in keys:
+            self.items.pop(key, None)
+
+
+def complete_wait(store, sfn, key, output):
+    """
+    リソースの待機を完了し、同じトークンを待つリソースが全て完了していれば SendTaskSuccess を呼ぶ
+    戻り値: 'not_waiting' / 'pending' / 'task_succeeded' / 'task_closed'
+    """
+    entry = store.pop(key)
+    if entry is None:
+        return 'not_waiting'
+
+    pending = store.remaining(entry['groupKeys'], entry['taskToken'])
+    if pending:
+        logger.info(f"Wait for {key} completed; still waiting for {pending}")
+        return 'pending'
+
+    try:
+        sfn.send_task_success(taskToken=entry['taskToken'], output=output)
+    except Exception as e:
+        # 既にタイムアウト・完了したタスク（フォールバックのポーリングに移行済み）の場合
+        logger.warning(f"send_task_success failed for {key}: {str(e)}")
+        return 'task_closed'
+    logger.info(f"All waits for the task completed (last: {key}); sent task success")
+    return 'task_succeeded'
+
+
+def settle_registration(store, sfn, task_token, keys, settled_keys, output):
+    """
+    待機を登録した後、イベントを待つ必要がなかったリソース（変更不要・削除中など）の待機を外す
+    待つべきリソースが残っていなければ、その場で SendTaskSuccess を呼ぶ
+    戻り値: 待機中のキーの一覧
+    """
+    store.discard(settled_keys)
+    pending = store.remaining(keys, task_token)
+    if pending:
+        logger.info(f"Waiting for RDS events of {pending}")
+        return pending
+
+    try:
+        sfn.send_task_success(taskToken=task_token, output=output)
+        logger.info(f"No RDS event to wait for {keys}; sent task success immediately")
+    except Exception as e:
+        # 登録直後にイベントが届き、イベントハンドラーが先に完了させた場合
+        logger.warning(f"send_task_success failed for {keys}: {str(e)}")
+    return []
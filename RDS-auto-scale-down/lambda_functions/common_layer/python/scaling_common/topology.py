@@ -0,0 +1,177 @@
+import logging
+
+logger = logging.getLogger()
+
+# 分類対象外とするインスタンスのステータス
+SKIPPED_STATUSES = ['deleting', 'deleted']
+
+
+def describe_cluster_instances(rds, cluster_identifier):
+    """
+    クラスターに所属するインスタンスの詳細を取得する
+    db-cluster-id フィルタで一括取得し、Marker によるページングを最後まで辿る
+    （TagList も同じ応答に含まれるため、インスタンスごとのタグ取得は不要）
+    """
+    instances = []
+    marker = None
+
+    while True:
+        params = {
+            'Filters': [
+                {
+                    'Name': 'db-cluster-id',
+                    'Values': [cluster_identifier]
+                }
+            ]
+        }
+        if marker:
+            params['Marker'] = marker
+
+        response = rds.describe_db_instances(**params)
+        instances.extend(response.get('DBInstances', []))
+
+        marker = response.get('Marker')
+        if not marker:
+            break
+
+    return instances
+
+
+def get_cluster_topology(rds, cluster_identifier):
+    """
+    クラスターから現在のインスタンス情報を取得し、
+    Writer、Dedicated Reader、AutoScaling Readerに分類する
+
+    API呼び出しはクラスターの台数に関わらず
+    describe_db_clusters 1回 + describe_db_instances（ページ数分）で固定
+    """
+    logger.info(f"Calling describe_db_clusters for cluster: {cluster_identifier}")
+    response = rds.describe_db_clusters(
+        DBClusterIdentifier=cluster_identifier
+    )
+
+    cluster = response['DBClusters'][0]
+
+    if not cluster.get('DBClusterMembers', []):
+        logger.warning(f"No instances found in cluster {cluster_identifier}")
+        return classify_topology(cluster, [])
+
+    instances = describe_cluster_instances(rds, cluster_identifier)
+    logger.info(f"describe_db_instances returned {len(instances)} instances for cluster {cluster_identifier}")
+
+    return classify_topology(cluster, instances)
+
+
+def classify_topology(cluster, instances):
+    """
+    describe_db_clusters のクラスター情報と describe_db_instances のインスタンス情報から、
+    Writer、Dedicated Reader、AutoScaling Readerに分類する（API呼び出しなし）
+    instances には他のクラスターのインスタンスが含まれていてもよい（クラスターメンバーのみ対象）
+    """
+    cluster_identifier = cluster.get('DBClusterIdentifier')
+    cluster_members = cluster.get('DBClusterMembers', [])
+
+    if not cluster_members:
+        return {
+            'writerInstanceId': None,
+            'dedicatedReaderInstanceId': None,
+            'autoScalingReaderInstanceIds': [],
+            'instances': {},
+            'engine': cluster.get('Engine'),
+            'engineVersion': cluster.get('EngineVersion')
+        }
+
+    # クラスターメンバー情報をIDで引けるようにする
+    member_map = {member['DBInstanceIdentifier']: member for member in cluster_members}
+
+    # Writer、Dedicated Reader、AutoScaling Readerを分類
+    writer_instance_id = None
+    dedicated_reader_instance_id = None
+    auto_scaling_reader_instance_ids = []
+    instance_details = {}
+
+    for instance in instances:
+        instance_id = instance['DBInstanceIdentifier']
+        instance_status = instance.get('DBInstanceStatus', 'unknown')
+
+        # クラスターメンバーでないインスタンスは対象外
+        cluster_member = member_map.get(instance_id)
+        if cluster_member is None:
+            logger.info(f"Skipping instance {instance_id}: not a member of cluster {cluster_identifier}")
+            continue
+
+        # 削除中または削除済みのインスタンスは除外
+        if instance_status in SKIPPED_STATUSES:
+            logger.info(f"Skipping instance {instance_id} with status: {instance_status}")
+            continue
+
+        is_writer = cluster_member.get('IsClusterWriter', False)
+
+        # タグからRoleを取得（describe_db_instances の TagList を使用）
+        tags = {tag['Key']: tag['Value'] for tag in instance.get('TagList', [])}
+        role = tags.get('Role', '')
+
+        instance_details[instance_id] = {
+            'instanceClass': instance.get('DBInstanceClass'),
+            # 適用待ちのインスタンスタイプの変更（変更中の場合。ロールバックで変更先を判定する）
+            'pendingInstanceClass': instance.get('PendingModifiedValues', {}).get('DBInstanceClass'),
+            'status': instance_status,
+            'role': role,
+            'isWriter': is_writer,
+            'promotionTier': cluster_member.get('PromotionTier'),
+            'arn': instance.get('DBInstanceArn')
+        }
+
+        if is_writer:
+            writer_instance_id = instance_id
+        elif role == 'dedicated-reader':
+            dedicated_reader_instance_id = instance_id
+        elif role == 'autoscaling-reader':
+            auto_scaling_reader_instance_ids.append(instance_id)
+        else:
+            # タグがない場合、Writer以外は分類
+            if 'dedicated' in instance_id.lower() or 'dedicated-reader' in instance_id.lower():
+                dedicated_reader_instance_id = instance_id
+            elif 'as-' in instance_id.lower() or 'autoscaling' in instance_id.lower():
+                auto_scaling_reader_instance_ids.append(instance_id)
+            elif dedicated_reader_instance_id is None:
+                # 最初のReaderをDedicated Readerとして扱う
+                dedicated_reader_instance_id = instance_id
+            else:
+                auto_scaling_reader_instance_ids.append(instance_id)
+
+    logger.info(f"Found instances - Writer: {writer_instance_id}, Dedicated Reader: {dedicated_reader_instance_id}, AutoScaling Readers: {len(auto_scaling_reader_instance_ids)}")
+
+    return {
+        'writerInstanceId': writer_instance_id,
+        'dedicatedReaderInstanceId': dedicated_reader_instance_id,
+        'autoScalingReaderInstanceIds': auto_scaling_reader_instance_ids,
+        'instances': instance_details,
+        # 変更先のインスタンスタイプの事前確認（scaling_common.orderability）に使用
+        'engine': cluster.get('Engine'),
+        'engineVersion': cluster.get('EngineVersion')
+    }
+
+
+def get_cluster_writer_state(rds, cluster_identifier):
+    """
+    クラスターのステータスと現在のWriterを取得する（describe_db_clusters 1回のみ）
+    フェイルオーバーの完了確認など、インスタンスの詳細が不要な場合に使用する
+    """
+    response = rds.describe_db_clusters(
+        DBClusterIdentifier=cluster_identifier
+    )
+
+    cluster = response['DBClusters'][0]
+    cluster_members = cluster.get('DBClusterMembers', [])
+    writer_instance_id = next(
+        (member['DBInstanceIdentifier'] for member in cluster_members if member.get('IsClusterWriter')),
+        None
+    )
+
+    return {
+        'clusterStatus': cluster.get('Status', 'unknown'),
+        'writerInstanceId': writer_instance_id,
+        'memberInstanceIds': [member['DBInstanceIdentifier'] for member in cluster_members],
+        'engineVersion': cluster.get('EngineVersion')
+    }
@@ -0,0 +1,65 @@
+import logging
+
+from scaling_common.instance_classes import capacity_units
+
+logger = logging.getLogger()
+
+
+def plan_waves(reader_ids, instances, max_readers=None, max_capacity_percent=None):
+    """
+    Readerを同時に変更する「ウェーブ」に分割する
+
+    予算（どちらか厳しい方を適用）:
+    - max_readers: 1ウェーブで同時に停止してよいReaderの台数
+    - max_capacity_percent: 1ウェーブで同時に停止してよいReaderキャパシティの割合（%）
+
+    instances は scaling_common.topology の 'instances'（ID -> 詳細）
+    予算を超えるReaderでも1台ずつなら必ずウェーブに含める
+    """
+    reader_ids = list(dict.fromkeys(reader_ids))  # 重複を除去（順序は維持）
+
+    def units(instance_id):
+        return capacity_units(instances.get(instance_id, {}).get('instanceClass'))
+
+    # Reader全体のキャパシティ（Writer以外のクラスターメンバー）
+    reader_capacity = sum(
+        units(instance_id)
+        for instance_id, detail in instances.items()
+        if not detail.get('isWriter')
+    )
+    if reader_capacity <= 0:
+        reader_capacity = sum(units(instance_id) for instance_id in reader_ids)
+
+    capacity_budget = None
+    if max_capacity_percent:
+        capacity_budget = reader_capacity * max_capacity_percent / 100.0
+
+    # 大きいインスタンスから順に、予算に収まる最初のウェーブに詰める（First-Fit Decreasing）
+    waves = []
+    for instance_id in sorted(reader_ids, key=lambda i: (-units(i), i)):
+        instance_units = units(instance_id)
+        placed = False
+        for wave in waves:
+            if max_readers and len(wave['instanceIds']) >= max_readers:
+                continue
+            if capacity_budget is not None and wave['capacityUnits'] + instance_units > capacity_budget:
+                continue
+            wave['instanceIds'].append(instance_id)
+            wave['capacityUnits'] += instance_units
+            placed = True
+            break
+
+        if not placed:
+            if capacity_budget is not None and instance_units > capacity_budget:
+                logger.warning(f"Instance {instance_id} ({instance_units} units) exceeds the capacity budget ({capacity_budget} units); it will be modified alone")
+            waves.append({'instanceIds': [instance_id], 'capacityUnits': instance_units})
+
+    logger.info(f"Planned {len(waves)} waves for {len(reader_ids)} readers (maxReaders={max_readers}, maxCapacityPercent={max_capacity_percent}, readerCapacity={reader_capacity})")
+
+    return {
+        'waves': [wave['instanceIds'] for wave in waves],
+        'waveCapacityUnits': [wave['capacityUnits'] for wave in waves],
+        'readerCapacityUnits': reader_capacity,
+        'capacityBudgetUnits': capacity_budget,
+        'maxReadersPerWave': max_readers
+    }
@@ -0,0 +1,249 @@
+import logging
+import math
+from datetime import timedelta, timezone
+
+from scaling_common.metric_data import get_metric_series, metric_query, percentile, time_range
+
+logger = logging.getLogger()
+
+# update-schedule の scheduleTime にこの値を指定すると、負荷の低い時間帯を探して設定する
+AUTO_SCHEDULE_TIME = 'auto'
+
+# daily: 毎日同じ時刻（"HH:MM"）、weekly: 曜日と時刻（cron式の曜日指定）
+SCHEDULE_MODES = ('daily', 'weekly')
+
+# EventBridge の cron式の曜日（月曜 = 0）
+WEEKDAYS = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+HOURS_PER_WEEK = 7 * 24
+
+# 取得するメトリクス（クラスター単位: DBClusterIdentifier ディメンション）
+METRICS = [
+    ('cpu', 'CPUUtilization', 'Average'),
+    ('connections', 'DatabaseConnections', 'Maximum')
+]
+METRIC_PERIOD_SECONDS = 300
+
+DEFAULT_LOOKBACK_DAYS = 28
+DEFAULT_TOP_CANDIDATES = 5
+
+# 曜日・時刻ごとの負荷（5分間隔の値のパーセンタイル）と、1時間の枠として扱うのに必要なデータポイント数
+LOAD_PERCENTILE = 95
+MIN_SAMPLES_PER_HOUR = 6
+
+# 負荷の指標: CPU使用率と接続数（観測した最大値に対する割合）の加重平均（0 - 1）
+CPU_WEIGHT = 0.5
+CONNECTION_WEIGHT = 0.5
+
+# フェイルオーバーの時点の負荷の重み（フェイルオーバー中は書き込みが止まり、接続が切断されるため）
+FAILOVER_WEIGHT = 1.0
+
+JST = timezone(timedelta(hours=9))
+
+
+def fold_by_weekday_hour(timestamps, values):
+    """
+    時系列を曜日・時刻（JST）ごとにまとめる
+    戻り値: 168個（月曜 0時 から 日曜 23時）のリスト
+    """
+    buckets = [[] for _ in range(HOURS_PER_WEEK)]
+    for timestamp, value in zip(timestamps, values):
+        local = timestamp.astimezone(JST)
+        buckets[local.weekday() * 24 + local.hour].append(value)
+    return buckets
+
+
+def weekly_load_profile(series):
+    """
+    クラスターの曜日・時刻ごとの負荷（0 - 1、データが足りない枠は None）
+    series: {"cpu": (timestamps, values), "connections": (timestamps, values)}
+    """
+    folded = {}
+    for key, _, _ in METRICS:
+        timestamps, values = series.get(key, ([], []))
+        folded[key] = [
+            percentile(sorted(bucket), LOAD_PERCENTILE) if len(bucket) >= MIN_SAMPLES_PER_HOUR else None
+            for bucket in fold_by_weekday_hour(timestamps, values)
+        ]
+
+    peak_connections = max((c for c in folded['connections'] if c is not None), default=0) or 1
+    load = []
+    for cpu, connections in zip(folded['cpu'], folded['connections']):
+        if cpu is None:
+            load.append(None)
+            continue
+        load.append(CPU_WEIGHT * min(cpu, 100) / 100 + CONNECTION_WEIGHT * (connections or 0) / peak_connections)
+    return load
+
+
+def workflow_timing(plan):
+    """
+    スケーリングのプランから所要時間の見込みと、開始からフェイルオーバーまでの秒数（フェイルオーバーしない場合は None）
+    """
+    failover_offset = None
+    elapsed = 0
+    for step in plan['steps']:
+        if step['action'] == 'failover':
+            failover_offset = elapsed
+            break
+        elapsed += step['estimatedSeconds']
+    return {'durationSeconds': plan['estimatedDurationSeconds'], 'failoverOffsetSeconds': failover_offset}
+
+
+def evaluate_start(load, start_hour, timing):
+    """
+    週の start_hour（月曜 0時 = 0）に開始した場合の負荷
+      expectedLoad: 実行中の負荷の時間加重平均
+      failoverLoad: フェイルオーバーの時点の負荷
+      peakLoad:     実行中の最大の負荷
+    データが足りない枠を含む場合は None
+    """
+    duration = max(1, timing['durationSeconds'])
+    weighted = 0.0
+    peak = 0.0
+    for offset in range(math.ceil(duration / 3600)):
+        value = load[(start_hour + offset) % HOURS_PER_WEEK]
+        if value is None:
+            return None
+        weighted += value * min(3600, duration - offset * 3600)
+        peak = max(peak, value)
+    expected = weighted / duration
+
+    failover = None
+    score = expected
+    if timing['failoverOffsetSeconds'] is not None:
+        failover = load[(start_hour + int(timing['failoverOffsetSeconds'] // 3600)) % HOURS_PER_WEEK]
+        if failover is None:
+            return None
+        score = (expected + FAILOVER_WEIGHT * failover) / (1 + FAILOVER_WEIGHT)
+    return {'expectedLoad': expected, 'failoverLoad': failover, 'peakLoad': peak, 'score': score}
+
+
+def within_search_window(start_minutes, duration_seconds, search_window):
+    """
+    開始時刻（JST、0時からの分）から終了までが検索範囲（JST の (開始分, 終了分)）に収まるか
+    """
+    if search_window is None:
+        return True
+    window_start, window_end = search_window
+    window_length = (window_end - window_start) % 1440 or 1440
+    return (start_minutes - window_start) % 1440 + duration_seconds / 60 <= window_length
+
+
+def weekly_cron_expression(weekday, hour):
+    """
+    曜日・時刻（JST）を EventBridge の cron式（UTC、毎週）に変換する
+    """
+    utc_hour = (weekday * 24 + hour - 9) % HOURS_PER_WEEK
+    return f"cron(0 {utc_hour % 24} ? * {WEEKDAYS[utc_hour // 24]} *)"
+
+
+def merge_evaluations(evaluations):
+    """
+    複数クラスター（フリートモード）の評価は、最も負荷の高いクラスターの値を使う
+    """
+    if any(e is None for e in evaluations):
+        return None
+    merged = {}
+    for key in ('expectedLoad', 'failoverLoad', 'peakLoad', 'score'):
+        values = [e[key] for e in evaluations if e[key] is not None]
+        merged[key] = max(values) if values else None
+    return merged
+
+
+def rank_windows(loads, timings, mode='daily', search_window=None, top=DEFAULT_TOP_CANDIDATES):
+    """
+    開始時刻の候補を負荷の低い順に並べる
+    loads / timings: クラスターごとの weekly_load_profile / workflow_timing（同じ順序）
+    daily:  毎日同じ時刻に実行する前提で、7日分の評価の平均（worstDayScore は最も負荷の高い曜日）
+    weekly: 曜日・時刻ごとの評価
+    """
+    duration = max(timing['durationSeconds'] for timing in timings)
+    weekly = [
+        merge_evaluations([evaluate_start(load, start_hour, timing) for load, timing in zip(loads, timings)])
+        for start_hour in range(HOURS_PER_WEEK)
+    ]
+
+    candidates = []
+    for hour in range(24):
+        if not within_search_window(hour * 60, duration, search_window):
+            continue
+        if mode == 'weekly':
+            for weekday in range(7):
+                evaluation = weekly[weekday * 24 + hour]
+                if evaluation is None:
+                    continue
+                candidates.append(dict(
+                    evaluation,
+                    weekday=WEEKDAYS[weekday],
+                    scheduleTime=f"{hour:02d}:00",
+                    scheduleExpression=weekly_cron_expression(weekday, hour)
+                ))
+            continue
+
+        days = [weekly[weekday * 24 + hour] for weekday in range(7)]
+        if any(day is None for day in days):
+            continue
+        candidate = {
+            key: sum(day[key] for day in days) / 7 if days[0][key] is not None else None
+            for key in ('expectedLoad', 'failoverLoad', 'score')
+        }
+        candidate['peakLoad'] = max(day['peakLoad'] for day in days)
+        candidate['worstDayScore'] = max(day['score'] for day in days)
+        candidate['scheduleTime'] = f"{hour:02d}:00"
+        candidates.append(candidate)
+
+    candidates.sort(key=lambda c: (round(c['score'], 4), round(c['peakLoad'], 4), c['scheduleTime']))
+    for candidate in candidates:
+        for key in ('expectedLoad', 'failoverLoad', 'peakLoad', 'score', 'worstDayScore'):
+            if candidate.get(key) is not None:
+                candidate[key] = round(candidate[key], 4)
+        candidate['estimatedDurationSeconds'] = duration
+    return candidates[:top]
+
+
+def fetch_cluster_load(cloudwatch, cluster_identifiers, lookback_days):
+    """
+    クラスターごとの CPU使用率・接続数の時系列を GetMetricData でまとめて取得し、曜日・時刻ごとの負荷にする
+    戻り値: {クラスター識別子: weekly_load_profile}
+    """
+    cluster_identifiers = list(cluster_identifiers)
+    queries = [
+        metric_query(f"c{index}_{key}", metric_name, stat, {'DBClusterIdentifier': cluster_identifier}, METRIC_PERIOD_SECONDS)
+        for index, cluster_identifier in enumerate(cluster_identifiers)
+        for key, metric_name, stat in METRICS
+    ]
+    start_time, end_time = time_range(lookback_days, METRIC_PERIOD_SECONDS)
+    series = get_metric_series(cloudwatch, queries, start_time, end_time)
+    return {
+        cluster_identifier: weekly_load_profile({
+            key: series.get(f"c{index}_{key}", ([], []))
+            for key, _, _ in METRICS
+        })
+        for index, cluster_identifier in enumerate(cluster_identifiers)
+    }
+
+
+def find_quiet_windows(cloudwatch, plans, mode='daily', lookback_days=DEFAULT_LOOKBACK_DAYS, search_window=None, top=DEFAULT_TOP_CANDIDATES):
+    """
+    過去 lookback_days 日の負荷と、スケーリングの所要時間の見込みから、負荷の低い開始時刻を探す
+    plans: {クラスター識別子: build_scaling_plan の結果}
+    search_window: 検索範囲（JST の (開始分, 終了分)、終了までに収まる候補のみ）
+    候補がない（メトリクスが足りない）場合は ValueError
+    """
+    if mode not in SCHEDULE_MODES:
+        raise ValueError(f"Invalid schedule mode: {mode}. Use one of {', '.join(SCHEDULE_MODES)}")
+
+    cluster_identifiers = sorted(plans)
+    profiles = fetch_cluster_load(cloudwatch, cluster_identifiers, lookback_days)
+    candidates = rank_windows(
+        [profiles[c] for c in cluster_identifiers],
+        [workflow_timing(plans[c]) for c in cluster_identifiers],
+        mode=mode,
+        search_window=search_window,
+        top=top
+    )
+    if not candidates:
+        raise ValueError(f"No schedule window found: not enough metrics in the last {lookback_days} days or no window fits the search range")
+
+    logger.info(f"Quietest {mode} window for {', '.join(cluster_identifiers)}: {candidates[0]}")
+    return candidates
@@ -0,0 +1,235 @@
+import json
+import logging
+import math
+import os
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+from scaling_common import clock
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.emf import emit, with_emf_metrics
+from scaling_common.metric_data import get_metric_series, metric_query
+from scaling_common.topology import get_cluster_topology
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+rds = LazyClient('rds')
+cloudwatch = LazyClient('cloudwatch')
+
+ACTIONS = ('exclude', 'check', 'include', 'release')
+
+# DatabaseConnections の集計期間（RDS の標準のメトリクスは1分ごと）
+METRIC_PERIOD_SECONDS = 60
+# 接続数の確認の間隔（新しいデータポイントが届く間隔）
+DRAIN_POLL_SECONDS = 60
+# カスタムエンドポイントの変更中（modifying）は変更できないため、available になるまで待つ（Lambdaのタイムアウト内）
+ENDPOINT_WAIT_SECONDS = 40
+ENDPOINT_POLL_SECONDS = 5
+
+# Step Functions の実行ステータス変更イベント（中止・タイムアウトした実行の後始末）
+EXECUTION_STATUS_CHANGE = 'Step Functions Execution Status Change'
+
+@with_emf_metrics
+@with_api_metrics
+def lambda_handler(event, context):
+    """
+    インスタンスタイプを変更する Reader を、カスタム Reader エンドポイントから外して接続を逃がす
+    （変更中・再起動中の Reader に新しい接続が割り当てられないようにする）
+
+    action: "exclude" ... instanceIds をエンドポイントの除外リスト（ExcludedMembers）に加える
+      エンドポイントに available な Reader が残らない場合は除外しない（skipped: true）
+    action: "check" ... 除外した後の DatabaseConnections（最大値）が DRAIN_CONNECTION_THRESHOLD 以下になったか確認する
+      DRAIN_TIMEOUT_SECONDS を過ぎた場合は、接続が残っていても drained: true（timedOut: true）
+    action: "include" ... 変更が完了した instanceIds を除外リストから外す
+    action: "release" ... 除外リストを空にする（失敗時。中止・タイムアウトした実行は EventBridge の実行ステータス変更イベントから）
+    除外リストからは、クラスターから削除されたインスタンスも取り除く
+    """
+    try:
+        if event.get('detail-type') == EXECUTION_STATUS_CHANGE:
+            event = release_event_from_execution(event)
+
+        action = event.get('action')
+        endpoint_identifier = event.get('endpointIdentifier') or os.environ.get('DRAIN_ENDPOINT_IDENTIFIER')
+        instance_ids = event.get('instanceIds', [])
+
+        if action not in ACTIONS:
+            raise ValueError(f"Invalid action: {action}. Use one of {', '.join(ACTIONS)}")
+        if not endpoint_identifier:
+            logger.error("Missing required parameter: endpointIdentifier")
+            raise ValueError("Missing required parameter: endpointIdentifier")
+        if action != 'release' and not instance_ids:
+            logger.error("Missing required parameter: instanceIds")
+            raise ValueError("Missing required parameter: instanceIds")
+
+        if action == 'check':
+            return check_drain(event, endpoint_identifier, instance_ids)
+
+        endpoint = wait_for_endpoint(endpoint_identifier)
+        if endpoint.get('StaticMembers'):
+            raise ValueError(f"Endpoint {endpoint_identifier} uses static members; a custom endpoint with an exclusion list is required")
+
+        topology = get_cluster_topology(rds, endpoint['DBClusterIdentifier'])
+        # クラスターから削除されたインスタンスは除外リストに残さない
+        excluded = [i for i in endpoint.get('ExcludedMembers', []) if i in topology['instances']]
+
+        if action == 'exclude':
+            return exclude_readers(event, endpoint, topology, excluded, instance_ids)
+        if action == 'include':
+            excluded = [i for i in excluded if i not in instance_ids]
+        else:
+            excluded = []
+
+        update_excluded_members(endpoint, excluded)
+        restored = [i for i in endpoint.get('ExcludedMembers', []) if i not in excluded]
+        emit(
+            event,
+            {'ReadersIncluded': len(restored)},
+            dimensions={'ClusterIdentifier': endpoint['DBClusterIdentifier']},
+            properties={'endpointIdentifier': endpoint_identifier, 'includedInstanceIds': restored}
+        )
+
+        return {
+            'endpointIdentifier': endpoint_identifier,
+            'includedInstanceIds': restored,
+            'excludedInstanceIds': excluded
+        }
+
+    except ClientError as e:
+        logger.error(f"AWS Client Error: {str(e)}")
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise e
+
+
+def wait_for_endpoint(endpoint_identifier):
+    """
+    カスタムエンドポイントが available になるまで待つ（ENDPOINT_WAIT_SECONDS を過ぎた場合はエラー）
+    """
+    started_at = clock.time()
+    while True:
+        response = rds.describe_db_cluster_endpoints(DBClusterEndpointIdentifier=endpoint_identifier)
+        endpoints = response.get('DBClusterEndpoints', [])
+        if not endpoints:
+            raise ValueError(f"Custom endpoint {endpoint_identifier} not found")
+        endpoint = endpoints[0]
+        status = endpoint.get('Status')
+        if status == 'available':
+            return endpoint
+        if clock.time() - started_at >= ENDPOINT_WAIT_SECONDS:
+            raise Exception(f"Custom endpoint {endpoint_identifier} is still {status} after {ENDPOINT_WAIT_SECONDS} seconds")
+        logger.info(f"Custom endpoint {endpoint_identifier} is {status}; waiting {ENDPOINT_POLL_SECONDS} seconds")
+        clock.sleep(ENDPOINT_POLL_SECONDS)
+
+
+def update_excluded_members(endpoint, excluded):
+    if sorted(excluded) == sorted(endpoint.get('ExcludedMembers', [])):
+        logger.info(f"Exclusion list of {endpoint['DBClusterEndpointIdentifier']} is already {excluded}")
+        return
+    logger.info(f"Updating exclusion list of {endpoint['DBClusterEndpointIdentifier']}: {endpoint.get('ExcludedMembers', [])} -> {excluded}")
+    rds.modify_db_cluster_endpoint(
+        DBClusterEndpointIdentifier=endpoint['DBClusterEndpointIdentifier'],
+        ExcludedMembers=sorted(excluded)
+    )
+
+
+def exclude_readers(event, endpoint, topology, excluded, instance_ids):
+    """
+    Reader をエンドポイントから外す（Writer・クラスターにないインスタンスは対象外）
+    """
+    instances = topology['instances']
+    targets = [i for i in instance_ids if i in instances and not instances[i]['isWriter']]
+    serving = [
+        i for i, detail in instances.items()
+        if not detail['isWriter'] and detail['status'] == 'available' and i not in excluded and i not in targets
+    ]
+
+    skipped = bool(targets) and not serving
+    if skipped:
+        # 全ての Reader を外すとエンドポイントに接続できなくなるため、接続を逃がさずに変更する
+        logger.warning(f"No other available reader would remain in {endpoint['DBClusterEndpointIdentifier']}; not excluding {targets}")
+        targets = []
+    else:
+        update_excluded_members(endpoint, sorted(set(excluded) | set(targets)))
+
+    emit(
+        event,
+        {'ReadersExcluded': len(targets)},
+        dimensions={'ClusterIdentifier': endpoint['DBClusterIdentifier']},
+        properties={'endpointIdentifier': endpoint['DBClusterEndpointIdentifier'], 'excludedInstanceIds': targets, 'skipped': skipped}
+    )
+
+    return {
+        'endpointIdentifier': endpoint['DBClusterEndpointIdentifier'],
+        'excludedInstanceIds': targets,
+        'skipped': skipped,
+        'drainStartedAt': clock.time(),
+        'drained': not targets,
+        'timedOut': False,
+        'nextPollSeconds': DRAIN_POLL_SECONDS
+    }
+
+
+def check_drain(event, endpoint_identifier, instance_ids):
+    """
+    除外した後の DatabaseConnections が閾値以下になったか確認する
+    除外の前の期間のデータポイントは使わない（除外の後のデータポイントが届くまでは drained: false）
+    """
+    threshold = float(os.environ.get('DRAIN_CONNECTION_THRESHOLD', 0))
+    timeout_seconds = int(os.environ.get('DRAIN_TIMEOUT_SECONDS', 300))
+    started_at = float(event.get('drainStartedAt') or clock.time())
+    elapsed = max(0, int(clock.time() - started_at))
+
+    # 除外の後の最初の集計期間から
+    start_time = datetime.fromtimestamp(math.ceil(started_at / METRIC_PERIOD_SECONDS) * METRIC_PERIOD_SECONDS, timezone.utc)
+    end_time = clock.now()
+    queries = [
+        metric_query(f"c{index}", 'DatabaseConnections', 'Maximum', {'DBInstanceIdentifier': instance_id}, METRIC_PERIOD_SECONDS)
+        for index, instance_id in enumerate(instance_ids)
+    ]
+    series = get_metric_series(cloudwatch, queries, start_time, end_time) if end_time > start_time else {}
+
+    connections = {}
+    for index, instance_id in enumerate(instance_ids):
+        _, values = series.get(f"c{index}", ([], []))
+        connections[instance_id] = values[-1] if values else None
+    draining = [i for i, value in connections.items() if value is None or value > threshold]
+
+    timed_out = bool(draining) and elapsed >= timeout_seconds
+    drained = not draining or timed_out
+    if timed_out:
+        logger.warning(f"Connections to {draining} did not drain within {timeout_seconds} seconds: {json.dumps(connections)}")
+    else:
+        logger.info(f"Connections after {elapsed} seconds (threshold {threshold}): {json.dumps(connections)}")
+
+    if drained:
+        emit(
+            event,
+            {'DrainSeconds': elapsed, 'DrainTimeouts': 1 if timed_out else 0},
+            properties={'endpointIdentifier': endpoint_identifier, 'instanceIds': instance_ids, 'connections': connections}
+        )
+
+    return {
+        'endpointIdentifier': endpoint_identifier,
+        'excludedInstanceIds': instance_ids,
+        'drainStartedAt': started_at,
+        'drained': drained,
+        'timedOut': timed_out,
+        'connections': connections,
+        'elapsedSeconds': elapsed,
+        'nextPollSeconds': max(1, min(DRAIN_POLL_SECONDS, timeout_seconds - elapsed))
+    }
+
+
+def release_event_from_execution(event):
+    """
+    実行ステータス変更イベントから、除外リストを空にする要求を作る
+    """
+    detail = event.get('detail', {})
+    logger.info(f"Execution {detail.get('name')} ended with {detail.get('status')}; releasing drained readers")
+    return {
+        'action': 'release',
+        'executionName': detail.get('name'),
+        'phase': 'reader-drain-release'
+    }
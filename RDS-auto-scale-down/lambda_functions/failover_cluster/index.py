@@ -1,16 +1,34 @@
 import json
-import boto3
 import logging
 from botocore.exceptions import ClientError
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.duration_history import (
+    DynamoDBDurationHistoryStore, failover_start_key, history_key, start_safely
+)
+from scaling_common.emf import emit, with_emf_metrics
+from scaling_common.polling import eta_poll_seconds
+from scaling_common.resize_history import FAILOVER_KEY, load_resize_history, expected_failover_seconds
+from scaling_common.task_tokens import DynamoDBTaskTokenStore, default_table_name, cluster_key
+from scaling_common.topology import get_cluster_writer_state
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-rds = boto3.client('rds')
+rds = LazyClient('rds')
+dynamodb = LazyClient('dynamodb')
+sfn = LazyClient('stepfunctions')
+token_store = DynamoDBTaskTokenStore(dynamodb, default_table_name())
+history_store = DynamoDBDurationHistoryStore(dynamodb)
 
+@with_emf_metrics
+@with_api_metrics
 def lambda_handler(event, context):
     """
     Auroraクラスターを指定したインスタンスにフェイルオーバーする
+    taskToken が指定された場合（.waitForTaskToken での呼び出し）は、フェイルオーバー完了の
+    RDSイベントを待つためにトークンを登録する（完了は rds_event_handler が通知する）
+    フェイルオーバーを開始した場合は、所要時間の履歴に開始を記録する（完了は check_failover_status が記録する）
     """
     try:
         target_instance_id = event.get('targetInstanceId')
@@ -20,7 +38,26 @@ def lambda_handler(event, context):
             logger.error("Missing required parameters: targetInstanceId or clusterIdentifier")
             raise ValueError("Missing required parameters: targetInstanceId or clusterIdentifier")
         
-        logger.info(f"Attempting to failover cluster {cluster_identifier} to instance {target_instance_id}")
+        task_token = event.get('taskToken')
+
+        # ターゲットが既にWriterの場合はフェイルオーバー不要（リトライ時や前回の実行で切り替え済みの場合）
+        state = get_cluster_writer_state(rds, cluster_identifier)
+        if state['writerInstanceId'] == target_instance_id:
+            logger.info(f"Instance {target_instance_id} is already the writer of cluster {cluster_identifier}. Skipping failover.")
+            result = {
+                'message': f'Instance {target_instance_id} is already the writer',
+                'clusterIdentifier': cluster_identifier,
+                'targetInstanceId': target_instance_id,
+                'status': 'already_writer',
+                'nextPollSeconds': 0
+            }
+            if task_token:
+                # 待つべきイベントがないため、その場でタスクを完了させる
+                sfn.send_task_success(
+                    taskToken=task_token,
+                    output=json.dumps({'completionSource': 'failover_cluster', 'message': result['message']})
+                )
+            return result
         
         # ターゲットインスタンスのARNを取得
         response = rds.describe_db_instances(
@@ -36,19 +73,53 @@ def lambda_handler(event, context):
             logger.warning(f'Target instance {target_instance_id} is not available. Current status: {current_status}. This may happen if the instance is starting up from a stopped state.')
             raise Exception(f'Target instance {target_instance_id} is not available. Current status: {current_status}. Please wait for the instance to become available before retrying.')
         
+        # イベント待ちの場合は、フェイルオーバー開始より前にトークンを登録する（イベントの取りこぼし防止）
+        token_keys = [cluster_key(cluster_identifier)]
+        if task_token:
+            token_store.register(token_keys, task_token, {'targetInstanceId': target_instance_id})
+
         # フェイルオーバーを実行
-        failover_response = rds.failover_db_cluster(
-            DBClusterIdentifier=cluster_identifier,
-            TargetDBInstanceIdentifier=target_instance_id
-        )
+        try:
+            failover_response = rds.failover_db_cluster(
+                DBClusterIdentifier=cluster_identifier,
+                TargetDBInstanceIdentifier=target_instance_id
+            )
+        except Exception:
+            # フェイルオーバーを開始できなかった場合はイベントを待たない
+            if task_token:
+                token_store.discard(token_keys)
+            raise
+
+        if history_store.enabled:
+            start_safely(history_store, failover_start_key(cluster_identifier), {
+                'historyKey': history_key(cluster_identifier, state['engineVersion'], FAILOVER_KEY),
+                'transition': FAILOVER_KEY,
+                'clusterIdentifier': cluster_identifier,
+                'engineVersion': state['engineVersion'],
+                'resourceId': target_instance_id,
+                'executionName': event.get('executionName')
+            })
         
-        logger.info(f"Successfully initiated failover of cluster {cluster_identifier} to instance {target_instance_id}")
+        # 過去のフェイルオーバー所要時間の見込みから、最初のステータス確認までの待機時間を決める
+        expected_seconds = expected_failover_seconds(load_resize_history(dynamodb))
+
+        emit(
+            event,
+            {'FailoverRequests': 1, 'ExpectedFailoverSeconds': expected_seconds},
+            dimensions={'ClusterIdentifier': cluster_identifier},
+            properties={
+                'message': f'Successfully initiated failover of cluster {cluster_identifier} to instance {target_instance_id}',
+                'previousWriterInstanceId': state['writerInstanceId'],
+                'targetInstanceId': target_instance_id
+            }
+        )
         
         return {
             'message': f'Successfully initiated failover to {target_instance_id}',
             'clusterIdentifier': cluster_identifier,
             'targetInstanceId': target_instance_id,
-            'status': 'failing-over'
+            'status': 'failing-over',
+            'nextPollSeconds': eta_poll_seconds(0, expected_seconds)
         }
         
     except ClientError as e:
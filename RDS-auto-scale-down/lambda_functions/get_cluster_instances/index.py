@@ -1,17 +1,30 @@
 import json
-import boto3
 import logging
 from botocore.exceptions import ClientError
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.emf import emit, with_emf_metrics
+from scaling_common.scaling_plan import assess_progress, reconcile_members
+from scaling_common.topology import get_cluster_topology
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-rds = boto3.client('rds')
+rds = LazyClient('rds')
 
+@with_emf_metrics
+@with_api_metrics
 def lambda_handler(event, context):
     """
     クラスターから現在のインスタンスを取得する
     Writer、Dedicated Reader、AutoScaling Readerを分類して返す
+
+    targetClass を指定した場合は、入力の Writer / Dedicated Reader / AutoScaling Reader のIDについて
+    完了済みのフェーズ（progress）も返す（ステートマシンの再開位置の判定に使用）
+    direction（down / up）で再開位置（resumeFrom）のフェーズの順序が変わる
+
+    reconcile: true を指定した場合は、入力の AutoScaling Reader の一覧と現在のクラスターメンバーの差分（members）を返し、
+    実行中に追加された Reader も含めて progress を判定する（最終確認の前に、追加された Reader を同じ実行の中で変更するため）
     """
     try:
         cluster_identifier = event.get('clusterIdentifier')
@@ -22,95 +35,50 @@ def lambda_handler(event, context):
         
         logger.info(f"Getting instances for cluster: {cluster_identifier}")
         
-        # クラスターのインスタンスを取得
-        response = rds.describe_db_clusters(
-            DBClusterIdentifier=cluster_identifier
-        )
-        
-        cluster = response['DBClusters'][0]
-        cluster_members = cluster.get('DBClusterMembers', [])
-        
-        # インスタンスIDのリストを取得
-        instance_ids = [member['DBInstanceIdentifier'] for member in cluster_members]
+        # 共通モジュールでクラスター構成を解決（API呼び出し回数は台数に依存しない）
+        topology = get_cluster_topology(rds, cluster_identifier)
         
-        if not instance_ids:
-            logger.warning(f"No instances found in cluster {cluster_identifier}")
-            return {
-                'writerInstanceId': None,
-                'dedicatedReaderInstanceId': None,
-                'autoScalingReaderInstanceIds': []
-            }
-        
-        # 各インスタンスの詳細を取得
-        instances_response = rds.describe_db_instances(
-            Filters=[
-                {
-                    'Name': 'db-instance-id',
-                    'Values': instance_ids
-                }
-            ]
-        )
-        
-        instances = instances_response['DBInstances']
-        
-        # Writer、Dedicated Reader、AutoScaling Readerを分類
-        writer_instance_id = None
-        dedicated_reader_instance_id = None
-        auto_scaling_reader_instance_ids = []
+        result = {
+            'writerInstanceId': topology['writerInstanceId'],
+            'dedicatedReaderInstanceId': topology['dedicatedReaderInstanceId'],
+            'autoScalingReaderInstanceIds': topology['autoScalingReaderInstanceIds']
+        }
         
-        for instance in instances:
-            instance_id = instance['DBInstanceIdentifier']
-            instance_status = instance.get('DBInstanceStatus', 'unknown')
+        target_class = event.get('targetClass')
+        if target_class:
+            writer_instance_id = event.get('writerInstanceId') or topology['writerInstanceId']
+            dedicated_reader_instance_id = event.get('dedicatedReaderInstanceId') or topology['dedicatedReaderInstanceId']
+            auto_scaling_reader_ids = event.get('autoScalingReaderInstanceIds', topology['autoScalingReaderInstanceIds'])
             
-            # 削除中または削除済みのインスタンスは除外
-            if instance_status in ['deleting', 'deleted']:
-                logger.info(f"Skipping instance {instance_id} with status: {instance_status}")
-                continue
-            
-            # クラスターメンバー情報からWriterを判定
-            cluster_member = next(
-                (m for m in cluster_members if m['DBInstanceIdentifier'] == instance_id),
-                None
-            )
-            is_writer = cluster_member.get('IsClusterWriter', False) if cluster_member else False
-            
-            # タグからRoleを取得
-            try:
-                tags_response = rds.list_tags_for_resource(
-                    ResourceName=instance['DBInstanceArn']
+            metrics = {'InstanceCount': len(topology['instances'])}
+            properties = {}
+            if event.get('reconcile'):
+                result['members'] = reconcile_members(
+                    topology, writer_instance_id, dedicated_reader_instance_id, auto_scaling_reader_ids
                 )
-                tags = {tag['Key']: tag['Value'] for tag in tags_response.get('TagList', [])}
-                role = tags.get('Role', '')
-            except Exception as e:
-                logger.warning(f"Failed to get tags for {instance_id}: {str(e)}")
-                role = ''
+                auto_scaling_reader_ids = result['members']['autoScalingReaderInstanceIds']
+                metrics['AddedAutoScalingReaders'] = len(result['members']['addedInstanceIds'])
+                properties['members'] = result['members']
             
-            if is_writer:
-                writer_instance_id = instance_id
-            elif role == 'dedicated-reader':
-                dedicated_reader_instance_id = instance_id
-            elif role == 'autoscaling-reader':
-                auto_scaling_reader_instance_ids.append(instance_id)
-            else:
-                # タグがない場合、Writer以外は分類
-                if not is_writer:
-                    if 'dedicated' in instance_id.lower() or 'dedicated-reader' in instance_id.lower():
-                        dedicated_reader_instance_id = instance_id
-                    elif 'as-' in instance_id.lower() or 'autoscaling' in instance_id.lower():
-                        auto_scaling_reader_instance_ids.append(instance_id)
-                    elif dedicated_reader_instance_id is None:
-                        # 最初のReaderをDedicated Readerとして扱う
-                        dedicated_reader_instance_id = instance_id
-                    else:
-                        auto_scaling_reader_instance_ids.append(instance_id)
-        
-        logger.info(f"Found instances - Writer: {writer_instance_id}, Dedicated Reader: {dedicated_reader_instance_id}, AutoScaling Readers: {len(auto_scaling_reader_instance_ids)}")
+            result['progress'] = assess_progress(
+                topology,
+                target_class,
+                writer_instance_id,
+                dedicated_reader_instance_id,
+                auto_scaling_reader_ids,
+                direction=event.get('direction', 'down')
+            )
+            progress = result['progress']
+            metrics['PendingAutoScalingReaders'] = len(progress['pendingAutoScalingReaderInstanceIds'])
+            properties['progress'] = progress
+            emit(
+                event,
+                metrics,
+                dimensions={'ClusterIdentifier': cluster_identifier},
+                properties=properties
+            )
         
-        return {
-            'writerInstanceId': writer_instance_id,
-            'dedicatedReaderInstanceId': dedicated_reader_instance_id,
-            'autoScalingReaderInstanceIds': auto_scaling_reader_instance_ids
-        }
+        return result
         
     except ClientError as e:
         logger.error(f"AWS Client Error: {str(e)}")
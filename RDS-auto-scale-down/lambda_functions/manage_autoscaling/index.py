@@ -0,0 +1,152 @@
+import json
+import logging
+from botocore.exceptions import ClientError
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.emf import emit, with_emf_metrics
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+application_autoscaling = LazyClient('application-autoscaling')
+
+# Aurora の Reader 台数のスケーラブルターゲット（autoscaling.tf）
+SERVICE_NAMESPACE = 'rds'
+SCALABLE_DIMENSION = 'rds:cluster:ReadReplicaCount'
+
+ACTIONS = ('suspend', 'resume')
+
+# ターゲット追跡ポリシー（スケールイン・スケールアウト）とスケジュールされたアクションを全て止める
+SUSPENDED = {
+    'DynamicScalingInSuspended': True,
+    'DynamicScalingOutSuspended': True,
+    'ScheduledScalingSuspended': True
+}
+NOT_SUSPENDED = {key: False for key in SUSPENDED}
+
+# Step Functions の実行ステータス変更イベント（中止・タイムアウトした実行の後始末）
+EXECUTION_STATUS_CHANGE = 'Step Functions Execution Status Change'
+
+@with_emf_metrics
+@with_api_metrics
+def lambda_handler(event, context):
+    """
+    Auroraクラスターの Reader 台数の Application Auto Scaling を一時停止・再開する
+    （実行中に変更前のタイプの Reader が追加・削除されて、最終確認が完了しないのを防ぐ）
+
+    action: "suspend" ... 実行開始時に、スケーリングポリシーとスケジュールされたアクションを一時停止する
+      戻り値の previousSuspendedState を再開時に渡す（実行前から停止していた項目は再開しない）
+    action: "resume" ... 実行終了時（失敗時を含む）に、previousSuspendedState の状態に戻す
+      suspended: false（この実行で一時停止していない）の場合は何もしない
+    スケーラブルターゲットが登録されていないクラスターは何もしない（registered: false）
+
+    Step Functions の実行が中止・タイムアウトした場合（Catch できない終了）は、EventBridge の
+    実行ステータス変更イベントから呼び出され、実行の入力のクラスターについて一時停止を解除する
+    """
+    try:
+        if event.get('detail-type') == EXECUTION_STATUS_CHANGE:
+            event = resume_event_from_execution(event)
+
+        cluster_identifier = event.get('clusterIdentifier')
+        action = event.get('action')
+
+        if not cluster_identifier:
+            logger.error("Missing required parameter: clusterIdentifier")
+            raise ValueError("Missing required parameter: clusterIdentifier")
+        if action not in ACTIONS:
+            raise ValueError(f"Invalid action: {action}. Use one of {', '.join(ACTIONS)}")
+
+        resource_id = f"cluster:{cluster_identifier}"
+
+        # 一時停止していない（ターゲットが未登録・一時停止に失敗した）場合は、再開もしない
+        if action == 'resume' and event.get('suspended') is False:
+            logger.info(f"Application Auto Scaling of {resource_id} was not suspended by this execution; nothing to resume")
+            return {
+                'clusterIdentifier': cluster_identifier,
+                'action': action,
+                'registered': None,
+                'suspended': False
+            }
+
+        target = describe_scalable_target(resource_id)
+        if target is None:
+            logger.info(f"No scalable target registered for {resource_id}; nothing to {action}")
+            return {
+                'clusterIdentifier': cluster_identifier,
+                'action': action,
+                'registered': False,
+                'suspended': False,
+                'previousSuspendedState': NOT_SUSPENDED
+            }
+
+        current_state = dict(NOT_SUSPENDED, **target.get('SuspendedState', {}))
+
+        if action == 'suspend':
+            suspended_state = SUSPENDED
+        else:
+            # 一時停止の前の状態に戻す（不明な場合は全て再開）
+            suspended_state = dict(NOT_SUSPENDED, **(event.get('previousSuspendedState') or {}))
+
+        if current_state != suspended_state:
+            logger.info(f"Updating suspended state of {resource_id}: {json.dumps(current_state)} -> {json.dumps(suspended_state)}")
+            application_autoscaling.register_scalable_target(
+                ServiceNamespace=SERVICE_NAMESPACE,
+                ResourceId=resource_id,
+                ScalableDimension=SCALABLE_DIMENSION,
+                SuspendedState=suspended_state
+            )
+        else:
+            logger.info(f"Suspended state of {resource_id} is already {json.dumps(suspended_state)}")
+
+        emit(
+            event,
+            {'AutoScalingSuspended' if action == 'suspend' else 'AutoScalingResumed': 1},
+            dimensions={'ClusterIdentifier': cluster_identifier},
+            properties={'previousSuspendedState': current_state, 'suspendedState': suspended_state}
+        )
+
+        return {
+            'clusterIdentifier': cluster_identifier,
+            'action': action,
+            'registered': True,
+            'suspended': any(suspended_state.values()),
+            'previousSuspendedState': current_state,
+            'minCapacity': target.get('MinCapacity'),
+            'maxCapacity': target.get('MaxCapacity')
+        }
+
+    except ClientError as e:
+        logger.error(f"AWS Client Error: {str(e)}")
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise e
+
+
+def describe_scalable_target(resource_id):
+    """
+    クラスターの Reader 台数のスケーラブルターゲット（登録されていない場合は None）
+    """
+    response = application_autoscaling.describe_scalable_targets(
+        ServiceNamespace=SERVICE_NAMESPACE,
+        ResourceIds=[resource_id],
+        ScalableDimension=SCALABLE_DIMENSION
+    )
+    targets = response.get('ScalableTargets', [])
+    return targets[0] if targets else None
+
+
+def resume_event_from_execution(event):
+    """
+    実行ステータス変更イベントから、実行の入力のクラスターの再開要求を作る
+    一時停止の前の状態は実行の中にしか残っていないため、全て再開する
+    """
+    detail = event.get('detail', {})
+    execution_input = json.loads(detail.get('input') or '{}')
+    logger.info(f"Execution {detail.get('name')} ended with {detail.get('status')}; resuming Application Auto Scaling")
+    return {
+        'clusterIdentifier': execution_input.get('clusterIdentifier'),
+        'action': 'resume',
+        'executionName': detail.get('name'),
+        'phase': 'autoscaling-resume'
+    }
@@ -1,100 +1,247 @@
 import json
-import boto3
 import logging
 from botocore.exceptions import ClientError
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.duration_history import (
+    DynamoDBDurationHistoryStore, history_key, instance_start_key, start_safely
+)
+from scaling_common.emf import emit, with_emf_metrics
+from scaling_common.polling import eta_poll_seconds, next_poll_seconds
+from scaling_common.resize_history import load_resize_history, expected_resize_seconds
+from scaling_common.task_tokens import (
+    DynamoDBTaskTokenStore, default_table_name, instance_key, settle_registration
+)
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-rds = boto3.client('rds')
+rds = LazyClient('rds')
+dynamodb = LazyClient('dynamodb')
+sfn = LazyClient('stepfunctions')
+token_store = DynamoDBTaskTokenStore(dynamodb, default_table_name())
+history_store = DynamoDBDurationHistoryStore(dynamodb)
 
+@with_emf_metrics
+@with_api_metrics
 def lambda_handler(event, context):
     """
     RDSインスタンスのインスタンスタイプを変更する
     Step Functions からの直接呼び出しを想定
+    instanceIds（ウェーブ単位の複数指定）または instanceId（単体）を受け付ける
+    taskToken が指定された場合（.waitForTaskToken での呼び出し）は、変更完了のRDSイベントを
+    待つためにトークンを登録する（完了は rds_event_handler が SendTaskSuccess で通知する）
+    変更を要求したインスタンスは、所要時間の履歴に開始を記録する（完了は check_instance_status が記録する）
     """
     try:
+        instance_ids = event.get('instanceIds', [])
         instance_id = event.get('instanceId')
         target_class = event.get('targetClass')
-        
-        if not instance_id or not target_class:
-            logger.error("Missing required parameters: instanceId or targetClass")
+
+        if (not instance_ids and not instance_id) or not target_class:
+            logger.error("Missing required parameters: instanceId/instanceIds or targetClass")
             # Step Functions がエラーとして扱えるように例外を発生させる
-            raise ValueError("Missing required parameters: instanceId or targetClass")
-            
+            raise ValueError("Missing required parameters: instanceId/instanceIds or targetClass")
+
         apply_immediately = event.get('applyImmediately', True)
+        task_token = event.get('taskToken')
+
+        # イベント待ちの場合は、変更要求より前にトークンを登録する（イベントの取りこぼし防止）
+        token_keys = [instance_key(i) for i in (instance_ids or [instance_id])]
+        if task_token:
+            token_store.register(token_keys, task_token, {'targetClass': target_class})
+
+        try:
+            result = modify_instances(instance_ids, instance_id, target_class, apply_immediately, event.get('executionName'))
+        except Exception:
+            # 変更要求に失敗した場合はイベントを待たない（タスクは失敗し、Catch でステータス確認に進む）
+            if task_token:
+                token_store.discard(token_keys)
+            raise
+
+        emit_resize_requests(event, result, target_class)
+
+        if task_token:
+            results = result.get('instances', [result])
+            settled_keys = [instance_key(r['instanceId']) for r in results if r['status'] != 'modifying']
+            pending_keys = settle_registration(
+                token_store, sfn, task_token, token_keys, settled_keys,
+                json.dumps({'completionSource': 'modify_instance', 'message': 'No modification to wait for'})
+            )
+            result['waitingForEvents'] = len(pending_keys)
+
+        return result
+
+    except ClientError as e:
+        logger.error(f"AWS Client Error: {str(e)}")
+        # Step Functions がエラーとして扱えるように例外を発生させる
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        # Step Functions がエラーとして扱えるように例外を発生させる
+        raise e
 
-        logger.info(f"Attempting to modify instance {instance_id} to {target_class} (ApplyImmediately={apply_immediately})")
-        
+
+def emit_resize_requests(event, result, target_class):
+    """
+    変更を要求したインスタンスごとに、変更前後のインスタンスタイプと所要時間の見込みをEMFで出力する
+    """
+    for r in result.get('instances', [result]):
+        if r['status'] != 'modifying' or not r.get('previousClass'):
+            continue
+        emit(
+            event,
+            {
+                'ResizeRequests': 1,
+                'ExpectedResizeSeconds': expected_resize_seconds(load_resize_history(dynamodb), r['previousClass'], target_class)
+            },
+            dimensions={'InstanceClassTransition': f"{r['previousClass']}->{target_class}"},
+            properties={'instanceId': r['instanceId'], 'message': r['message']}
+        )
+
+
+def modify_instances(instance_ids, instance_id, target_class, apply_immediately, execution_name=None):
+    """
+    単体（instance_id）またはウェーブ（instance_ids）のインスタンスタイプを変更する
+    """
+    # 単体指定の場合は従来どおりの応答を返す
+    if not instance_ids:
         # インスタンスの現在の状態を確認
         response = rds.describe_db_instances(
             DBInstanceIdentifier=instance_id
         )
-        
-        instance_info = response['DBInstances'][0]
-        current_status = instance_info['DBInstanceStatus']
-        current_class = instance_info['DBInstanceClass']
-        
-        # deleting 状態の場合はスキップ（既に削除されるため）
-        if current_status == 'deleting':
-            logger.info(f'Instance {instance_id} is being deleted. Skipping modification. Current status: {current_status}')
-            return {
-                'message': f'Instance {instance_id} is being deleted, skipping modification',
-                'instanceId': instance_id,
-                'status': 'deleting',
-                'currentClass': current_class,
-                'targetClass': target_class,
-                'skipped': True
-            }
-        
-        # modifying 状態の場合は既に変更が進行中なので、成功として扱う
-        if current_status == 'modifying':
-            logger.info(f'Instance {instance_id} is already being modified. Current status: {current_status}')
-            return {
-                'message': f'Instance {instance_id} is already being modified',
-                'instanceId': instance_id,
-                'status': 'modifying',
-                'currentClass': current_class,
-                'targetClass': target_class
-            }
-        
-        # available 以外の状態（rebooting, backing-up など）の場合はエラー
-        if current_status != 'available':
-            logger.warning(f'Instance {instance_id} is not available. Current status: {current_status}')
-            # 変更不可なので、後でリトライできるようにエラーを返す
-            raise Exception(f'Instance {instance_id} is not available. Current status: {current_status}')
-        
-        if current_class == target_class:
-            logger.info(f'Instance {instance_id} is already {target_class}. No change needed.')
-
-            return {
-                'message': f'Instance {instance_id} is already {target_class}',
-                'instanceId': instance_id,
-                'status': 'no_change_needed'
+        result = modify_instance(response['DBInstances'][0], target_class, apply_immediately, execution_name)
+        result['nextPollSeconds'] = next_poll_seconds([initial_poll_seconds(result, target_class)])
+        return result
+
+    # --- ウェーブ単位の変更: 全インスタンスの変更要求を出してから結果をまとめる ---
+    # ウェーブ内のインスタンスの状態は1回の describe_db_instances でまとめて取得する
+    response = rds.describe_db_instances(
+        Filters=[
+            {
+                'Name': 'db-instance-id',
+                'Values': instance_ids
             }
-        
-        # インスタンスタイプを変更
-        modify_response = rds.modify_db_instance(
-            DBInstanceIdentifier=instance_id,
-            DBInstanceClass=target_class,
-            ApplyImmediately=apply_immediately
-        )
-        
-        logger.info(f"Successfully initiated modification of {instance_id} to {target_class}")
-        
+        ]
+    )
+    instance_map = {inst['DBInstanceIdentifier']: inst for inst in response['DBInstances']}
+
+    results = []
+    failed = []
+    for wave_instance_id in instance_ids:
+        try:
+            if wave_instance_id not in instance_map:
+                raise Exception(f'Instance {wave_instance_id} not found')
+            results.append(modify_instance(instance_map[wave_instance_id], target_class, apply_immediately, execution_name))
+        except Exception as e:
+            logger.error(f"Failed to modify instance {wave_instance_id}: {str(e)}")
+            failed.append({'instanceId': wave_instance_id, 'error': str(e)})
+
+    if failed:
+        # 一部でも失敗した場合は Step Functions の Catch でステータス確認に進ませる
+        # （成功したインスタンスの変更はそのまま進行する）
+        raise Exception(f"Failed to modify {len(failed)} of {len(instance_ids)} instances: {json.dumps(failed)}")
+
+    return {
+        'message': f'Modification requested for {len(instance_ids)} instances',
+        'instances': results,
+        'modifiedCount': len([r for r in results if r['status'] == 'modifying']),
+        'targetClass': target_class,
+        'nextPollSeconds': next_poll_seconds([initial_poll_seconds(r, target_class) for r in results])
+    }
+
+
+def initial_poll_seconds(result, target_class):
+    """
+    変更要求後、最初のステータス確認までの待機時間（変更不要の場合は None）
+    過去の所要時間の見込みに基づいて決める
+    """
+    if result['status'] != 'modifying':
+        return None
+    from_class = result.get('previousClass') or result.get('currentClass')
+    expected_seconds = expected_resize_seconds(load_resize_history(dynamodb), from_class, target_class)
+    return eta_poll_seconds(0, expected_seconds)
+
+
+def modify_instance(instance_info, target_class, apply_immediately, execution_name=None):
+    """
+    1台のインスタンスのインスタンスタイプを変更する
+    instance_info は describe_db_instances の応答に含まれるインスタンス情報
+    """
+    instance_id = instance_info['DBInstanceIdentifier']
+
+    current_status = instance_info['DBInstanceStatus']
+    current_class = instance_info['DBInstanceClass']
+
+    # deleting 状態の場合はスキップ（既に削除されるため）
+    if current_status == 'deleting':
+        logger.info(f'Instance {instance_id} is being deleted. Skipping modification. Current status: {current_status}')
+        return {
+            'message': f'Instance {instance_id} is being deleted, skipping modification',
+            'instanceId': instance_id,
+            'status': 'deleting',
+            'currentClass': current_class,
+            'targetClass': target_class,
+            'skipped': True
+        }
+
+    # modifying 状態の場合は既に変更が進行中なので、成功として扱う
+    if current_status == 'modifying':
+        logger.info(f'Instance {instance_id} is already being modified. Current status: {current_status}')
         return {
-            'message': f'Successfully initiated modification of {instance_id} to {target_class}',
+            'message': f'Instance {instance_id} is already being modified',
             'instanceId': instance_id,
             'status': 'modifying',
-            'previousClass': current_class,
+            'currentClass': current_class,
             'targetClass': target_class
         }
-        
-    except ClientError as e:
-        logger.error(f"AWS Client Error: {str(e)}")
-        # Step Functions がエラーとして扱えるように例外を発生させる
-        raise e
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
-        # Step Functions がエラーとして扱えるように例外を発生させる
-        raise e
\ No newline at end of file
+
+    # available 以外の状態（rebooting, backing-up など）の場合はエラー
+    if current_status != 'available':
+        logger.warning(f'Instance {instance_id} is not available. Current status: {current_status}')
+        # 変更不可なので、後でリトライできるようにエラーを返す
+        raise Exception(f'Instance {instance_id} is not available. Current status: {current_status}')
+
+    if current_class == target_class:
+        logger.info(f'Instance {instance_id} is already {target_class}. No change needed.')
+
+        return {
+            'message': f'Instance {instance_id} is already {target_class}',
+            'instanceId': instance_id,
+            'status': 'no_change_needed'
+        }
+
+    # インスタンスタイプを変更
+    rds.modify_db_instance(
+        DBInstanceIdentifier=instance_id,
+        DBInstanceClass=target_class,
+        ApplyImmediately=apply_immediately
+    )
+    record_resize_start(instance_info, target_class, execution_name)
+
+    return {
+        'message': f'Successfully initiated modification of {instance_id} to {target_class}',
+        'instanceId': instance_id,
+        'status': 'modifying',
+        'previousClass': current_class,
+        'targetClass': target_class
+    }
+
+
+def record_resize_start(instance_info, target_class, execution_name):
+    """
+    所要時間の履歴に変更の開始を記録する（クラスター・エンジンバージョン・変更前後のインスタンスタイプごと）
+    """
+    if not history_store.enabled:
+        return
+    transition = f"{instance_info['DBInstanceClass']}->{target_class}"
+    cluster_identifier = instance_info.get('DBClusterIdentifier')
+    engine_version = instance_info.get('EngineVersion')
+    start_safely(history_store, instance_start_key(instance_info['DBInstanceIdentifier']), {
+        'historyKey': history_key(cluster_identifier, engine_version, transition),
+        'transition': transition,
+        'clusterIdentifier': cluster_identifier,
+        'engineVersion': engine_version,
+        'resourceId': instance_info['DBInstanceIdentifier'],
+        'executionName': execution_name
+    })
@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+from botocore.exceptions import ClientError
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.topology import get_cluster_topology
+from scaling_common.wave_planner import plan_waves
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+rds = LazyClient('rds')
+
+# Aurora クラスターの Reader の上限（置き換え中は置き換え元と置き換え後の両方がクラスターに所属する）
+MAX_CLUSTER_READERS = 15
+
+@with_api_metrics
+def lambda_handler(event, context):
+    """
+    AutoScaling Readerを同時に変更するウェーブに分割する
+    キャパシティ予算（台数 / Readerキャパシティの割合）を超えないようにウェーブを組む
+
+    readerStrategy: "replace" の場合は、置き換え中も Reader のキャパシティが減らないため割合の予算は使わず、
+    台数（REPLACE_WAVE_MAX_READERS）と、クラスターに追加できる Reader の台数（最大 MAX_CLUSTER_READERS 台）で制限する
+    """
+    try:
+        cluster_identifier = event.get('clusterIdentifier')
+        reader_ids = event.get('instanceIds', [])
+
+        if not cluster_identifier:
+            logger.error("Missing required parameter: clusterIdentifier")
+            raise ValueError("Missing required parameter: clusterIdentifier")
+
+        # 予算はイベントで上書き可能（未指定の場合は環境変数）
+        wave_budget = event.get('waveBudget') or {}
+        max_readers = int(wave_budget.get('maxReaders', os.environ.get('WAVE_MAX_READERS', 1)))
+        max_capacity_percent = float(wave_budget.get('maxCapacityPercent', os.environ.get('WAVE_MAX_CAPACITY_PERCENT', 100)))
+
+        logger.info(f"Planning waves for {len(reader_ids)} readers in cluster {cluster_identifier} (maxReaders={max_readers}, maxCapacityPercent={max_capacity_percent})")
+
+        if not reader_ids:
+            return {
+                'waves': [],
+                'waveCount': 0
+            }
+
+        topology = get_cluster_topology(rds, cluster_identifier)
+
+        if event.get('readerStrategy') == 'replace':
+            max_readers, max_capacity_percent = replace_wave_budget(topology, wave_budget)
+
+        plan = plan_waves(
+            reader_ids,
+            topology['instances'],
+            max_readers=max_readers,
+            max_capacity_percent=max_capacity_percent
+        )
+        plan['waveCount'] = len(plan['waves'])
+
+        logger.info(f"Wave plan: {json.dumps(plan)}")
+
+        return plan
+
+    except ClientError as e:
+        logger.error(f"AWS Client Error: {str(e)}")
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise e
+
+
+def replace_wave_budget(topology, wave_budget):
+    """
+    置き換え（readerStrategy: "replace"）のウェーブの予算: (台数, キャパシティの割合 = 制限なし)
+    """
+    max_readers = int(wave_budget.get('maxReaders', os.environ.get('REPLACE_WAVE_MAX_READERS', 4)))
+    reader_count = len([d for d in topology['instances'].values() if not d.get('isWriter')])
+    headroom = MAX_CLUSTER_READERS - reader_count
+    if headroom < 1:
+        raise ValueError(f"Cluster already has {reader_count} readers; no room to create replacement readers (maximum {MAX_CLUSTER_READERS})")
+    if not max_readers or max_readers > headroom:
+        logger.info(f"Limiting replacement waves to {headroom} readers (cluster has {reader_count} of {MAX_CLUSTER_READERS} readers)")
+        max_readers = headroom
+    return max_readers, None
@@ -0,0 +1,115 @@
+import json
+import logging
+from botocore.exceptions import ClientError
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.duration_history import DynamoDBDurationHistoryStore, failover_start_key, instance_start_key
+from scaling_common.task_tokens import (
+    DynamoDBTaskTokenStore, default_table_name, instance_key, cluster_key, complete_wait
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+sfn = LazyClient('stepfunctions')
+token_store = DynamoDBTaskTokenStore(LazyClient('dynamodb'), default_table_name())
+history_store = DynamoDBDurationHistoryStore(LazyClient('dynamodb'))
+
+# インスタンスタイプの変更完了
+# RDS-EVENT-0014: Finished applying modification to DB instance class.
+MODIFY_COMPLETED_EVENT_IDS = ['RDS-EVENT-0014']
+MODIFY_COMPLETED_MESSAGES = ['finished applying modification to db instance class']
+
+# フェイルオーバー完了
+# RDS-EVENT-0071: Completed failover to DB instance: xxx
+FAILOVER_COMPLETED_EVENT_IDS = ['RDS-EVENT-0071']
+FAILOVER_COMPLETED_MESSAGES = ['completed failover']
+
+@with_api_metrics
+def lambda_handler(event, context):
+    """
+    RDSイベント（EventBridge経由）を受け取り、待機中の Step Functions タスクを完了させる
+    インスタンスの変更完了・クラスターのフェイルオーバー完了に対応するタスクトークンに SendTaskSuccess を送る
+    所要時間の履歴の開始の記録には完了の時刻を残す（サンプルはステータス確認で保存する）
+    """
+    try:
+        detail = event.get('detail', {})
+        detail_type = event.get('detail-type', '')
+        source_identifier = detail.get('SourceIdentifier', '')
+        event_id = detail.get('EventID', '')
+        message = detail.get('Message', '')
+
+        logger.info(f"Received {detail_type} for {source_identifier}: {event_id} {message}")
+
+        key = match_wait_key(detail_type, source_identifier, event_id, message)
+        if key is None:
+            logger.info(f"Event {event_id} for {source_identifier} is not a completion event. Ignoring.")
+            return {
+                'status': 'ignored',
+                'sourceIdentifier': source_identifier,
+                'eventId': event_id
+            }
+
+        output = json.dumps({
+            'completionSource': 'rds_event',
+            'resourceKey': key,
+            'sourceIdentifier': source_identifier,
+            'eventId': event_id,
+            'message': message,
+            'eventTime': detail.get('Date', event.get('time'))
+        })
+        mark_duration_finished(detail_type, source_identifier)
+        status = complete_wait(token_store, sfn, key, output)
+
+        logger.info(f"Completion event for {key} processed: {status}")
+
+        return {
+            'status': status,
+            'resourceKey': key,
+            'sourceIdentifier': source_identifier,
+            'eventId': event_id
+        }
+
+    except ClientError as e:
+        logger.error(f"AWS Client Error: {str(e)}")
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise e
+
+
+def is_event(event_id, message, event_ids, messages):
+    lowered = (message or '').lower()
+    return event_id in event_ids or any(m in lowered for m in messages)
+
+
+def match_wait_key(detail_type, source_identifier, event_id, message):
+    """
+    RDSイベントに対応する待機のキーを返す（完了イベントでない場合は None）
+    """
+    if not source_identifier:
+        return None
+    if detail_type == 'RDS DB Instance Event':
+        if is_event(event_id, message, MODIFY_COMPLETED_EVENT_IDS, MODIFY_COMPLETED_MESSAGES):
+            return instance_key(source_identifier)
+    if detail_type == 'RDS DB Cluster Event':
+        if is_event(event_id, message, FAILOVER_COMPLETED_EVENT_IDS, FAILOVER_COMPLETED_MESSAGES):
+            return cluster_key(source_identifier)
+    return None
+
+
+def mark_duration_finished(detail_type, source_identifier):
+    """
+    所要時間の履歴の開始の記録に完了の時刻を残す（ウェーブの確認を待たずに、インスタンスごとの完了時刻を記録するため）
+    記録に失敗してもタスクの完了は続ける
+    """
+    if not history_store.enabled:
+        return
+    if detail_type == 'RDS DB Instance Event':
+        start_key = instance_start_key(source_identifier)
+    else:
+        start_key = failover_start_key(source_identifier)
+    try:
+        history_store.mark_finished(start_key)
+    except Exception as e:
+        logger.warning(f"Failed to mark the finish of {start_key}: {str(e)}")
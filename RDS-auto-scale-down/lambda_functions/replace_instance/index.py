@@ -0,0 +1,229 @@
+import json
+import logging
+import re
+from botocore.exceptions import ClientError
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.emf import emit, with_emf_metrics
+from scaling_common.polling import eta_poll_seconds, next_poll_seconds
+from scaling_common.resize_history import load_resize_history, expected_resize_seconds
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+rds = LazyClient('rds')
+dynamodb = LazyClient('dynamodb')
+
+ACTIONS = ('create', 'retire')
+
+# インスタンス識別子の上限（RDS）
+MAX_IDENTIFIER_LENGTH = 63
+
+# 置き換え後のインスタンスの識別子の接尾辞（-r2, -r3, ...）。置き換えのたびに番号を増やす
+REPLACEMENT_SUFFIX = re.compile(r'-r(\d+)$')
+
+# 置き換え元から引き継ぐ設定（describe_db_instances の項目 -> create_db_instance のパラメータ）
+INHERITED_SETTINGS = {
+    'AvailabilityZone': 'AvailabilityZone',
+    'PubliclyAccessible': 'PubliclyAccessible',
+    'AutoMinorVersionUpgrade': 'AutoMinorVersionUpgrade',
+    'CACertificateIdentifier': 'CACertificateIdentifier',
+    'MonitoringInterval': 'MonitoringInterval',
+    'MonitoringRoleArn': 'MonitoringRoleArn',
+    'PerformanceInsightsEnabled': 'EnablePerformanceInsights',
+    'PerformanceInsightsKMSKeyId': 'PerformanceInsightsKMSKeyId',
+    'PerformanceInsightsRetentionPeriod': 'PerformanceInsightsRetentionPeriod'
+}
+
+@with_emf_metrics
+@with_api_metrics
+def lambda_handler(event, context):
+    """
+    Reader を変更先のインスタンスタイプの新しいインスタンスに置き換える（readerStrategy: "replace"）
+    インスタンスタイプの変更（modify-instance）と違い、置き換え中も Reader のキャパシティが減らない
+
+    action: "create" ... instanceIds の Reader ごとに、同じクラスター・昇格優先順位（PromotionTier）・タグ（Role など）・
+      AZ・パラメータグループで targetClass の新しいインスタンスを作成する
+      作成済み（再実行）の場合は作成しない。戻り値の replacementInstanceIds の完了を check-instance-status で待つ
+    action: "retire" ... 置き換え後のインスタンスが targetClass で available の場合のみ、置き換え元の Reader を削除する
+    """
+    try:
+        instance_ids = event.get('instanceIds', [])
+        target_class = event.get('targetClass')
+        action = event.get('action')
+
+        if not instance_ids or not target_class:
+            logger.error("Missing required parameters: instanceIds or targetClass")
+            raise ValueError("Missing required parameters: instanceIds or targetClass")
+        if action not in ACTIONS:
+            raise ValueError(f"Invalid action: {action}. Use one of {', '.join(ACTIONS)}")
+
+        replacements = {instance_id: replacement_instance_id(instance_id) for instance_id in instance_ids}
+        response = rds.describe_db_instances(
+            Filters=[
+                {
+                    'Name': 'db-instance-id',
+                    'Values': instance_ids + list(replacements.values())
+                }
+            ]
+        )
+        instance_map = {inst['DBInstanceIdentifier']: inst for inst in response['DBInstances']}
+
+        if action == 'create':
+            return create_replacements(event, replacements, instance_map, target_class)
+        return retire_replaced(event, replacements, instance_map, target_class)
+
+    except ClientError as e:
+        logger.error(f"AWS Client Error: {str(e)}")
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise e
+
+
+def replacement_instance_id(instance_id):
+    """
+    置き換え後のインスタンスの識別子（同じ置き換え元からは常に同じ識別子。再実行で重複して作成しないため）
+    例: reader-1 -> reader-1-r2、reader-1-r2 -> reader-1-r3
+    """
+    match = REPLACEMENT_SUFFIX.search(instance_id)
+    base = instance_id[:match.start()] if match else instance_id
+    suffix = f"-r{int(match.group(1)) + 1 if match else 2}"
+    return base[:MAX_IDENTIFIER_LENGTH - len(suffix)].rstrip('-') + suffix
+
+
+def create_replacements(event, replacements, instance_map, target_class):
+    """
+    置き換え元ごとに新しいインスタンスを作成する（作成済み・置き換え元が削除済みの場合は作成しない）
+    """
+    results = []
+    failed = []
+    for instance_id, new_instance_id in replacements.items():
+        try:
+            results.append(create_replacement(instance_id, new_instance_id, instance_map, target_class))
+        except Exception as e:
+            logger.error(f"Failed to create a replacement for {instance_id}: {str(e)}")
+            failed.append({'instanceId': instance_id, 'error': str(e)})
+
+    if failed:
+        # 作成できたインスタンスはそのまま残す（再実行すると残りのみ作成する）
+        raise Exception(f"Failed to create replacements for {len(failed)} of {len(replacements)} instances: {json.dumps(failed)}")
+
+    created = [r for r in results if r['status'] == 'creating']
+    history = load_resize_history(dynamodb)
+    for r in created:
+        emit(
+            event,
+            {
+                'ReplacementRequests': 1,
+                'ExpectedResizeSeconds': expected_resize_seconds(history, r['previousClass'], target_class)
+            },
+            dimensions={'InstanceClassTransition': f"{r['previousClass']}->{target_class}"},
+            properties={'instanceId': r['instanceId'], 'replacementInstanceId': r['replacementInstanceId']}
+        )
+
+    return {
+        'message': f"Replacement requested for {len(created)} of {len(results)} instances",
+        'instances': results,
+        'replacementInstanceIds': [r['replacementInstanceId'] for r in results if r['status'] != 'skipped'],
+        'replacementCount': len([r for r in results if r['status'] != 'skipped']),
+        'createdCount': len(created),
+        'targetClass': target_class,
+        'nextPollSeconds': next_poll_seconds([
+            eta_poll_seconds(0, expected_resize_seconds(history, r['previousClass'], target_class)) for r in created
+        ])
+    }
+
+
+def create_replacement(instance_id, new_instance_id, instance_map, target_class):
+    existing = instance_map.get(new_instance_id)
+    if existing is not None:
+        logger.info(f"Replacement {new_instance_id} for {instance_id} already exists ({existing['DBInstanceStatus']})")
+        return {
+            'instanceId': instance_id,
+            'replacementInstanceId': new_instance_id,
+            'status': 'exists',
+            'currentClass': existing['DBInstanceClass']
+        }
+
+    instance = instance_map.get(instance_id)
+    if instance is None or instance['DBInstanceStatus'] in ('deleting', 'deleted'):
+        # スケールインなどで削除された Reader は置き換えない
+        logger.info(f"Instance {instance_id} no longer exists; skipping replacement")
+        return {'instanceId': instance_id, 'replacementInstanceId': new_instance_id, 'status': 'skipped'}
+
+    params = {
+        'DBInstanceIdentifier': new_instance_id,
+        'DBClusterIdentifier': instance['DBClusterIdentifier'],
+        'DBInstanceClass': target_class,
+        'Engine': instance['Engine'],
+        'PromotionTier': instance.get('PromotionTier', 1),
+        'Tags': [tag for tag in instance.get('TagList', []) if not tag['Key'].startswith('aws:')]
+    }
+    parameter_groups = instance.get('DBParameterGroups', [])
+    if parameter_groups:
+        params['DBParameterGroupName'] = parameter_groups[0]['DBParameterGroupName']
+    for source_key, param_key in INHERITED_SETTINGS.items():
+        if instance.get(source_key) is not None:
+            params[param_key] = instance[source_key]
+    # 拡張モニタリングが無効（0）の場合はロールを指定できない
+    if not params.get('MonitoringInterval'):
+        params.pop('MonitoringRoleArn', None)
+
+    logger.info(f"Creating replacement {new_instance_id} ({target_class}) for {instance_id} ({instance['DBInstanceClass']})")
+    try:
+        rds.create_db_instance(**params)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'DBInstanceAlreadyExists':
+            raise
+        # 前回の実行で作成済み（応答を受け取れなかった場合など）。作成済みとして扱い、再実行で完了を待つ
+        existing = rds.describe_db_instances(DBInstanceIdentifier=new_instance_id)['DBInstances'][0]
+        logger.info(f"Replacement {new_instance_id} for {instance_id} was already created ({existing['DBInstanceStatus']})")
+        return {
+            'instanceId': instance_id,
+            'replacementInstanceId': new_instance_id,
+            'status': 'exists',
+            'currentClass': existing['DBInstanceClass']
+        }
+
+    return {
+        'instanceId': instance_id,
+        'replacementInstanceId': new_instance_id,
+        'status': 'creating',
+        'previousClass': instance['DBInstanceClass'],
+        'targetClass': target_class
+    }
+
+
+def retire_replaced(event, replacements, instance_map, target_class):
+    """
+    置き換え後のインスタンスが targetClass で available になった置き換え元を削除する
+    置き換え後のインスタンスが準備できていない場合は削除せずにエラー（Reader のキャパシティを減らさないため）
+    """
+    retired = []
+    not_ready = []
+    for instance_id, new_instance_id in replacements.items():
+        instance = instance_map.get(instance_id)
+        if instance is None or instance['DBInstanceStatus'] in ('deleting', 'deleted'):
+            logger.info(f"Instance {instance_id} is already deleted")
+            continue
+
+        replacement = instance_map.get(new_instance_id)
+        if replacement is None or replacement['DBInstanceStatus'] != 'available' or replacement['DBInstanceClass'] != target_class:
+            not_ready.append(instance_id)
+            continue
+
+        logger.info(f"Deleting {instance_id}, replaced by {new_instance_id}")
+        rds.delete_db_instance(DBInstanceIdentifier=instance_id)
+        retired.append(instance_id)
+
+    if not_ready:
+        raise Exception(f"Replacements are not available at {target_class} for: {', '.join(not_ready)}")
+
+    emit(event, {'InstancesRetired': len(retired)}, properties={'retiredInstanceIds': retired})
+
+    return {
+        'message': f"Deleted {len(retired)} replaced instances",
+        'retiredInstanceIds': retired,
+        'replacementInstanceIds': list(replacements.values())
+    }
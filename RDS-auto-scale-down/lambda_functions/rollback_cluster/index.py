@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+from botocore.exceptions import ClientError
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.emf import emit, with_emf_metrics
+from scaling_common.rollback import (
+    DEFAULT_MAX_CAPACITY_PERCENT, DEFAULT_MAX_READERS, STATUS_COMPLETED, STATUS_ROLLED_BACK,
+    load_snapshot, mark_snapshot, next_rollback_step, record_snapshot
+)
+from scaling_common.topology import get_cluster_topology
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+rds = LazyClient('rds')
+ssm = LazyClient('ssm')
+
+ACTIONS = ('snapshot', 'plan', 'complete')
+
+@with_emf_metrics
+@with_api_metrics
+def lambda_handler(event, context):
+    """
+    スケーリングのロールバック（実行前のインスタンスタイプと Writer に戻す）
+
+    action: "snapshot" ... 実行の開始時（変更要求の前）に、全インスタンスのタイプと Writer をSSMパラメータに保存する
+    action: "plan"     ... 現在のクラスター構成とスナップショットから、ロールバックの次の手順（resize / failover / complete）を返す
+      ステートマシンは手順を実行して完了を確認し、complete になるまで繰り返す（毎回現在の状態から決め直すため、途中から再実行できる）
+      expectedExecutionName を指定した場合は、その実行が保存したスナップショットのみ使う（失敗時の自動ロールバック）
+    action: "complete" ... 実行が完了した場合に、スナップショットを completed にする
+    """
+    try:
+        cluster_identifier = event.get('clusterIdentifier')
+        action = event.get('action')
+
+        if not cluster_identifier:
+            logger.error("Missing required parameter: clusterIdentifier")
+            raise ValueError("Missing required parameter: clusterIdentifier")
+        if action not in ACTIONS:
+            raise ValueError(f"Invalid action: {action}. Use one of {', '.join(ACTIONS)}")
+
+        if action == 'complete':
+            marked = mark_snapshot(ssm, cluster_identifier, STATUS_COMPLETED, event.get('executionName'))
+            return {'clusterIdentifier': cluster_identifier, 'action': action, 'marked': marked}
+
+        topology = get_cluster_topology(rds, cluster_identifier)
+
+        if action == 'snapshot':
+            snapshot, preserved = record_snapshot(ssm, cluster_identifier, topology, event.get('executionName'))
+            logger.info(f"Recorded rollback snapshot of {cluster_identifier}: {json.dumps(snapshot)}")
+            return {
+                'clusterIdentifier': cluster_identifier,
+                'action': action,
+                'writerInstanceId': snapshot['writerInstanceId'],
+                'instanceCount': len(snapshot['instances']),
+                'preserved': preserved
+            }
+
+        snapshot = load_snapshot(ssm, cluster_identifier)
+        if snapshot is None:
+            raise ValueError(f"No rollback snapshot recorded for cluster {cluster_identifier}")
+
+        expected_execution_name = event.get('expectedExecutionName')
+        if expected_execution_name and snapshot.get('executionName') != expected_execution_name:
+            raise ValueError(
+                f"Rollback snapshot of {cluster_identifier} was recorded by {snapshot.get('executionName')}, "
+                f"not by this execution ({expected_execution_name})"
+            )
+
+        step = next_rollback_step(
+            snapshot,
+            topology,
+            max_readers=int(os.environ.get('ROLLBACK_WAVE_MAX_READERS', DEFAULT_MAX_READERS)),
+            max_capacity_percent=float(os.environ.get('ROLLBACK_WAVE_MAX_CAPACITY_PERCENT', DEFAULT_MAX_CAPACITY_PERCENT))
+        )
+        logger.info(f"Next rollback step for {cluster_identifier}: {json.dumps(step)}")
+
+        if step['action'] == 'complete':
+            mark_snapshot(ssm, cluster_identifier, STATUS_ROLLED_BACK)
+
+        emit(
+            event,
+            {
+                'RollbackSteps': 0 if step['action'] == 'complete' else 1,
+                'RollbackInstancesRemaining': len(step['remainingInstanceIds'])
+            },
+            dimensions={'ClusterIdentifier': cluster_identifier},
+            properties={'step': step, 'snapshotExecutionName': snapshot.get('executionName')}
+        )
+
+        return dict(step, clusterIdentifier=cluster_identifier)
+
+    except ClientError as e:
+        logger.error(f"AWS Client Error: {str(e)}")
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise e
@@ -1,19 +1,39 @@
 import json
-import boto3
 import logging
 import os
 import re
 import traceback
 from datetime import datetime
 from botocore.exceptions import ClientError
+from scaling_common import clock
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.class_recommender import AUTO_TARGET_CLASS, recommend_target_classes
+from scaling_common.deadline import deadline_settings, deadline_slack
+from scaling_common.emf import emit, with_emf_metrics
+from scaling_common.fleet import DEFAULT_MAX_WORKERS, resolve_fleet_topologies, run_bounded
+from scaling_common.orderability import preflight_target_classes
+from scaling_common.resize_history import load_resize_history
+from scaling_common.rollback import (
+    DEFAULT_MAX_CAPACITY_PERCENT as ROLLBACK_DEFAULT_MAX_CAPACITY_PERCENT,
+    DEFAULT_MAX_READERS as ROLLBACK_DEFAULT_MAX_READERS,
+    load_snapshot, next_rollback_step
+)
+from scaling_common.scaling_plan import SCALING_DIRECTIONS, SCALING_STRATEGIES, build_scaling_plan, scaling_direction
+from scaling_common.topology import get_cluster_topology
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-rds = boto3.client('rds')
-sfn = boto3.client('stepfunctions')
-events = boto3.client('events')
+rds = LazyClient('rds')
+sfn = LazyClient('stepfunctions')
+events = LazyClient('events')
+ssm = LazyClient('ssm')
+dynamodb = LazyClient('dynamodb')
+cloudwatch = LazyClient('cloudwatch')
 
+@with_emf_metrics
+@with_api_metrics
 def lambda_handler(event, context):
     """
     スケジュール実行用Lambda関数
@@ -21,6 +41,34 @@ def lambda_handler(event, context):
     2. クラスターから現在のインスタンス情報を取得
     3. JSONを作成
     4. Step Functionsを実行
+
+    イベントに fleet（clusterIdentifiers / namePrefix / tags）を指定した場合は、
+    条件に一致する全クラスターについて Step Functions を実行する（フリートモード）
+
+    イベントに targetClass: "auto" を指定した場合は、CloudWatch のメトリクス（オフピークのCPU・メモリ・接続数・レプリカラグ）から
+    クラスターごとに変更先のインスタンスタイプを推奨して使用する（scaling_common.class_recommender）
+
+    実行前に変更先のインスタンスタイプがクラスターのエンジン・バージョンで注文可能か確認し（scaling_common.orderability）、
+    注文できない場合は Step Functions を実行せずに失敗する（フリートモードでは該当クラスターを skipped にする）
+
+    イベントに plan: true を指定した場合は、Step Functions を実行せずに
+    変更が必要なインスタンス・フェイルオーバー先・手順・所要時間の見込みを返す（プランモード）
+    全インスタンスが既に変更先のタイプの場合は、Step Functions を実行しない
+
+    イベントに direction（down / up）を指定しない場合は、Writer の現在のタイプと変更先から判定する（scaling_common.scaling_plan）
+    direction: "up"（スケールアップ）では、AutoScaling Reader をフェイルオーバーの前に変更する
+    （targetClass を省略した場合は SCALE_UP_TARGET_CLASS、実行後に無効化するルールは SCALE_UP_EVENTBRIDGE_RULE_NAME）
+
+    イベントに deadline（"HH:MM" / "YYYY-MM-DD HH:MM" JST、変更を終わらせる期限）を指定した場合は、
+    今開始した場合の期限までの余裕（DEADLINE_ESTIMATE_PERCENTILE の所要時間の見込み）を記録し、間に合わない見込みの場合は警告する
+    （期限に間に合う開始時刻は update-schedule の deadline で逆算して設定する）
+
+    イベントに scalingStrategy: "blue-green" を指定した場合（省略時は SCALING_STRATEGY）は、インスタンスごとの変更と
+    フェイルオーバーの代わりに、変更先のタイプのグリーン環境（Blue/Green デプロイ）を作成して1回のスイッチオーバーで切り替える
+
+    イベントに rollback: true を指定した場合は、最後の実行の前に保存したインスタンスタイプと Writer に戻す
+    Step Functions を mode: "rollback" で実行する（オンデマンドのロールバック、scaling_common.rollback）
+    plan: true と合わせて指定した場合は、スナップショットとロールバックの次の手順を返す
     """
     try:
         logger.info(f"Received event: {json.dumps(event)}")
@@ -29,12 +77,37 @@ def lambda_handler(event, context):
         # イベントから設定を取得（EventBridgeルールの入力パラメータまたは直接実行時のパラメータ）
         cluster_identifier = event.get('clusterIdentifier')
         target_class = event.get('targetClass')
+        direction = event.get('direction')
+        deadline = event.get('deadline')
+        strategy = event.get('scalingStrategy') or os.environ.get('SCALING_STRATEGY', 'in-place')
+        
+        if direction is not None and direction not in SCALING_DIRECTIONS:
+            raise ValueError(f"Invalid direction: {direction}. Use one of {', '.join(SCALING_DIRECTIONS)}")
+        if strategy not in SCALING_STRATEGIES:
+            raise ValueError(f"Invalid scalingStrategy: {strategy}. Use one of {', '.join(SCALING_STRATEGIES)}")
         
         # 環境変数から取得（フォールバック）
+        if not target_class:
+            if direction == 'up':
+                target_class = os.environ.get('SCALE_UP_TARGET_CLASS')
+            else:
+                target_class = os.environ.get('TARGET_CLASS', 'db.t4g.medium')
+        
+        plan_only = event.get('plan') is True
+        
+        # オンデマンドのロールバック: 変更先のタイプは使わない
+        if event.get('rollback') is True:
+            return start_rollback(cluster_identifier or os.environ.get('CLUSTER_IDENTIFIER'), plan_only)
+        
+        # フリートモード: 複数クラスターをまとめて実行
+        fleet_selector = event.get('fleet')
+        if fleet_selector:
+            if plan_only:
+                return plan_fleet(fleet_selector, target_class, direction, strategy)
+            return start_fleet_executions(fleet_selector, target_class, event.get('maxConcurrency'), direction, strategy)
+        
         if not cluster_identifier:
             cluster_identifier = os.environ.get('CLUSTER_IDENTIFIER')
-        if not target_class:
-            target_class = os.environ.get('TARGET_CLASS', 'db.t4g.medium')
         
         if not cluster_identifier:
             raise ValueError("clusterIdentifier is required (set in event or CLUSTER_IDENTIFIER env var)")
@@ -56,24 +129,56 @@ def lambda_handler(event, context):
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
         
-        # JSONを作成
-        step_function_input = {
-            'targetClass': target_class,
-            'clusterIdentifier': cluster_identifier,
-            'writerInstanceId': instances_info.get('writerInstanceId'),
-            'dedicatedReaderInstanceId': instances_info.get('dedicatedReaderInstanceId'),
-            'autoScalingReaderInstanceIds': instances_info.get('autoScalingReaderInstanceIds', [])
-        }
+        # targetClass: "auto" の場合はメトリクスから変更先を決める
+        recommendation = None
+        if target_class == AUTO_TARGET_CLASS:
+            recommendation = recommend_target_classes(cloudwatch, {cluster_identifier: instances_info})[cluster_identifier]
+            target_class = recommendation['targetClass']
+            logger.info(f"Recommended target class: {target_class} ({recommendation['source']}: {recommendation['reason']})")
+        
+        # スケーリングの方向（指定がなければ Writer の現在のタイプと変更先から判定）
+        direction = resolve_direction(direction, instances_info, target_class)
+        
+        # JSONを作成（必須パラメータの検証を含む）
+        step_function_input = build_step_function_input(target_class, cluster_identifier, instances_info, direction, strategy)
         
-        # 必須パラメータの検証
-        if not step_function_input['writerInstanceId']:
-            raise ValueError("Writer instance not found")
-        if not step_function_input['dedicatedReaderInstanceId']:
-            raise ValueError("Dedicated Reader instance not found")
-        if not step_function_input['autoScalingReaderInstanceIds']:
-            logger.warning("No AutoScaling Reader instances found")
+        # 変更先のインスタンスタイプが注文可能か事前確認（注文できない変更要求のステータス確認のリトライで時間を失わないため）
+        preflight_error = preflight_target_classes(rds, ssm, {cluster_identifier: (instances_info, target_class)})[cluster_identifier]
+        if preflight_error:
+            raise ValueError(preflight_error)
         
         logger.info(f"Created Step Functions input: {json.dumps(step_function_input, indent=2)}")
+        
+        # 手順と所要時間の見込みを作成
+        plan = build_plan(target_class, instances_info, direction, strategy=strategy)
+        plan['clusterIdentifier'] = cluster_identifier
+        if recommendation:
+            plan['recommendation'] = recommendation
+        if deadline:
+            plan['deadline'] = check_deadline(deadline, target_class, instances_info, direction, strategy)
+        logger.info(f"Scaling plan: {json.dumps(plan, default=str)}")
+        
+        if plan_only:
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'Scaling plan (Step Functions execution not started)',
+                    'plan': plan,
+                    'input': step_function_input
+                }, default=str)
+            }
+        
+        # 全インスタンスが変更先のタイプの場合は実行しない
+        if not plan['changeRequired']:
+            logger.info(f"All instances in cluster {cluster_identifier} are already {target_class}; skipping execution")
+            disable_one_time_rule(direction)
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'No scaling required (all instances are already at the target class)',
+                    'plan': plan
+                }, default=str)
+            }
         logger.info(f"Remaining time before Step Functions call: {context.get_remaining_time_in_millis()} ms")
         
         # Step Functionsを実行
@@ -90,39 +195,22 @@ def lambda_handler(event, context):
                 name=execution_name,
                 input=json.dumps(step_function_input)
             )
-            logger.info(f"Successfully started Step Functions execution: {response['executionArn']}")
+            metrics = {
+                'ExecutionsStarted': 1,
+                'PlannedSteps': len(plan['steps']),
+                'EstimatedDurationSeconds': plan['estimatedDurationSeconds']
+            }
+            if deadline:
+                metrics['DeadlineSlackSeconds'] = plan['deadline']['slackSeconds']
+            emit(
+                {'phase': 'schedule', 'executionName': execution_name},
+                metrics,
+                dimensions={'ClusterIdentifier': cluster_identifier, 'TargetClass': target_class},
+                properties={'executionArn': response['executionArn'], 'direction': direction, 'scalingStrategy': strategy}
+            )
             
             # 実行後にEventBridgeルールを無効化（特定の日時のcron式の場合のみ）
-            # 毎日実行するcron式（* * ? * *）の場合は無効化しない
-            try:
-                rule_name = os.environ.get('EVENTBRIDGE_RULE_NAME')
-                if rule_name:
-                    rule_info = events.describe_rule(Name=rule_name)
-                    schedule_expression = rule_info.get('ScheduleExpression', '')
-                    description = rule_info.get('Description', '')
-                    
-                    # 特定の日時を指定するcron式を検出（日と月が具体的な値で、年が*でない場合）
-                    # 例: cron(6 14 18 11 ? *) - 11月18日14:06に実行
-                    # 毎日のcron式: cron(6 14 * * ? *) - 毎日14:06に実行
-                    if schedule_expression.startswith('cron('):
-                        # cron式を解析して、日と月が具体的な値か確認
-                        cron_match = re.match(r'cron\((\d+)\s+(\d+)\s+(\d+|\*)\s+(\d+|\*)\s+\?\s+\*\)', schedule_expression)
-                        if cron_match:
-                            day = cron_match.group(3)
-                            month = cron_match.group(4)
-                            # 日と月が具体的な値（*でない）場合は、特定の日時の実行と判断
-                            if day != '*' and month != '*':
-                                logger.info(f"Disabling EventBridge rule after one-time execution: {rule_name}")
-                                events.put_rule(
-                                    Name=rule_name,
-                                    ScheduleExpression=schedule_expression,
-                                    State='DISABLED',
-                                    Description=description + ' (disabled after execution)'
-                                )
-                                logger.info(f"EventBridge rule disabled: {rule_name}")
-            except Exception as e:
-                # ルールの無効化に失敗しても、Step Functionsの実行は成功しているので警告のみ
-                logger.warning(f"Failed to disable EventBridge rule after execution: {str(e)}")
+            disable_one_time_rule(direction)
                 
         except Exception as e:
             logger.error(f"Error starting Step Functions execution: {str(e)}")
@@ -135,8 +223,10 @@ def lambda_handler(event, context):
                 'message': 'Step Functions execution started',
                 'executionArn': response['executionArn'],
                 'executionName': execution_name,
-                'input': step_function_input
-            })
+                'input': step_function_input,
+                'estimatedDurationSeconds': plan['estimatedDurationSeconds'],
+                'plan': plan
+            }, default=str)
         }
         
     except ClientError as e:
@@ -160,126 +250,381 @@ def lambda_handler(event, context):
 def get_instances_from_cluster(cluster_identifier):
     """
     クラスターから現在のインスタンス情報を取得
+    （分類ロジックは共通モジュール scaling_common.topology を使用）
     """
     try:
-        logger.info(f"Calling describe_db_clusters for cluster: {cluster_identifier}")
-        # クラスターのインスタンスを取得
-        response = rds.describe_db_clusters(
-            DBClusterIdentifier=cluster_identifier
-        )
-        logger.info(f"describe_db_clusters response received")
+        return get_cluster_topology(rds, cluster_identifier)
     except ClientError as e:
         error_code = e.response.get('Error', {}).get('Code', 'Unknown')
         error_message = e.response.get('Error', {}).get('Message', str(e))
-        logger.error(f"Error calling describe_db_clusters - Code: {error_code}, Message: {error_message}")
+        logger.error(f"Error resolving cluster topology - Code: {error_code}, Message: {error_message}")
         logger.error(f"Full error response: {json.dumps(e.response, default=str)}")
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in describe_db_clusters: {str(e)}")
+        logger.error(f"Unexpected error resolving cluster topology: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise
+
+
+def build_step_function_input(target_class, cluster_identifier, instances_info, direction='down', strategy='in-place'):
+    """
+    Step Functions の入力JSONを作成する
+    Writer / Dedicated Reader が見つからない場合は ValueError
+    """
+    step_function_input = {
+        'targetClass': target_class,
+        'clusterIdentifier': cluster_identifier,
+        'writerInstanceId': instances_info.get('writerInstanceId'),
+        'dedicatedReaderInstanceId': instances_info.get('dedicatedReaderInstanceId'),
+        'autoScalingReaderInstanceIds': instances_info.get('autoScalingReaderInstanceIds', []),
+        'direction': direction,
+        'scalingStrategy': strategy
+    }
+    
+    # 必須パラメータの検証
+    if not step_function_input['writerInstanceId']:
+        raise ValueError("Writer instance not found")
+    if not step_function_input['dedicatedReaderInstanceId']:
+        raise ValueError("Dedicated Reader instance not found")
+    if not step_function_input['autoScalingReaderInstanceIds']:
+        logger.warning(f"No AutoScaling Reader instances found in cluster {cluster_identifier}")
     
-    cluster = response['DBClusters'][0]
-    cluster_members = cluster.get('DBClusterMembers', [])
+    return step_function_input
+
+
+def build_plan(target_class, instances_info, direction='down', rank=50, strategy='in-place'):
+    """
+    クラスターの構成から手順と所要時間の見込みを作成する
+    ウェーブの予算は plan-reader-waves と同じ環境変数、所要時間は過去のリサイズ履歴（要約）のパーセンタイル（rank）を使用
+    """
+    history = load_resize_history(dynamodb)
+    return build_scaling_plan(
+        instances_info,
+        target_class,
+        history,
+        max_readers=int(os.environ.get('WAVE_MAX_READERS', 1)),
+        max_capacity_percent=float(os.environ.get('WAVE_MAX_CAPACITY_PERCENT', 100)),
+        direction=direction,
+        rank=rank,
+        strategy=strategy
+    )
+
+
+def resolve_direction(direction, instances_info, target_class):
+    """
+    スケーリングの方向: 指定がなければ Writer の現在のタイプと変更先から判定する
+    """
+    if direction:
+        return direction
+    writer = instances_info.get('instances', {}).get(instances_info.get('writerInstanceId'), {})
+    return scaling_direction(writer.get('instanceClass'), target_class)
+
+
+def check_deadline(deadline, target_class, instances_info, direction, strategy='in-place'):
+    """
+    今開始した場合の期限までの余裕（所要時間は DEADLINE_ESTIMATE_PERCENTILE のパーセンタイルで見積もる）
+    """
+    settings = deadline_settings()
+    plan = build_plan(target_class, instances_info, direction, rank=settings['percentile'], strategy=strategy)
+    slack = deadline_slack(deadline, plan, settings, clock.now())
+    if slack['slackSeconds'] < 0:
+        logger.warning(f"Scaling is expected to finish {-slack['slackSeconds']} seconds after the deadline {deadline} JST: {json.dumps(slack)}")
+    else:
+        logger.info(f"Scaling is expected to finish {slack['slackSeconds']} seconds before the deadline {deadline} JST")
+    return slack
+
+
+def plan_fleet(fleet_selector, target_class, direction=None, strategy='in-place'):
+    """
+    フリートモードのプラン: 選択条件に一致するクラスターごとの手順と所要時間の見込みを返す（実行はしない）
+    """
+    topologies = resolve_fleet_topologies(rds, fleet_selector)
+    target_classes = resolve_target_classes(target_class, topologies)
+    preflight_errors = preflight_fleet(topologies, target_classes)
     
-    # インスタンスIDのリストを取得
-    instance_ids = [member['DBInstanceIdentifier'] for member in cluster_members]
+    plans = []
+    for cluster_identifier in sorted(topologies):
+        topology = topologies[cluster_identifier]
+        cluster_target_class, recommendation = target_classes[cluster_identifier]
+        cluster_direction = resolve_direction(direction, topology, cluster_target_class)
+        try:
+            build_step_function_input(cluster_target_class, cluster_identifier, topology, cluster_direction, strategy)
+        except ValueError as e:
+            plans.append({'clusterIdentifier': cluster_identifier, 'status': 'skipped', 'reason': str(e)})
+            continue
+        if preflight_errors[cluster_identifier]:
+            plans.append({'clusterIdentifier': cluster_identifier, 'status': 'skipped', 'reason': preflight_errors[cluster_identifier]})
+            continue
+        plan = build_plan(cluster_target_class, topology, cluster_direction, strategy=strategy)
+        plan['clusterIdentifier'] = cluster_identifier
+        if recommendation:
+            plan['recommendation'] = recommendation
+        plan['status'] = 'planned' if plan['changeRequired'] else 'skipped'
+        plans.append(plan)
+    
+    planned = [p for p in plans if p['status'] == 'planned']
     
-    if not instance_ids:
-        logger.warning(f"No instances found in cluster {cluster_identifier}")
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': f'Scaling plan for {len(planned)} of {len(plans)} clusters (Step Functions executions not started)',
+            'targetClass': target_class,
+            'clusterCount': len(plans),
+            'plannedCount': len(planned),
+            'maxEstimatedDurationSeconds': max([p['estimatedDurationSeconds'] for p in planned], default=0),
+            'clusters': plans
+        }, default=str)
+    }
+
+
+def resolve_target_classes(target_class, topologies):
+    """
+    クラスターごとの変更先のインスタンスタイプと推奨の内容（指定されたタイプを使う場合は None）
+    targetClass が "auto" の場合は、全クラスターのメトリクスをまとめて取得して推奨する
+    """
+    if target_class != AUTO_TARGET_CLASS:
+        return {cluster_identifier: (target_class, None) for cluster_identifier in topologies}
+    
+    recommendations = recommend_target_classes(cloudwatch, topologies)
+    return {
+        cluster_identifier: (recommendation['targetClass'], recommendation)
+        for cluster_identifier, recommendation in recommendations.items()
+    }
+
+
+def preflight_fleet(topologies, target_classes):
+    """
+    フリートモードの事前確認: クラスターごとの変更先のインスタンスタイプが注文可能か
+    （同じエンジン・バージョン・タイプの組み合わせは1回だけ確認する）
+    """
+    return preflight_target_classes(rds, ssm, {
+        cluster_identifier: (topology, target_classes[cluster_identifier][0])
+        for cluster_identifier, topology in topologies.items()
+    })
+
+
+def start_rollback(cluster_identifier, plan_only=False):
+    """
+    オンデマンドのロールバック: 保存したスナップショットに戻す Step Functions を実行する
+    （手順はステートマシンが rollback-cluster で1手順ずつ決める。ここでは次の手順の見込みのみ返す）
+    スナップショットが保存されていない場合は ValueError
+    """
+    if not cluster_identifier:
+        raise ValueError("clusterIdentifier is required (set in event or CLUSTER_IDENTIFIER env var)")
+    
+    snapshot = load_snapshot(ssm, cluster_identifier)
+    if snapshot is None:
+        raise ValueError(f"No rollback snapshot recorded for cluster {cluster_identifier}")
+    
+    next_step = next_rollback_step(
+        snapshot,
+        get_instances_from_cluster(cluster_identifier),
+        max_readers=int(os.environ.get('ROLLBACK_WAVE_MAX_READERS', ROLLBACK_DEFAULT_MAX_READERS)),
+        max_capacity_percent=float(os.environ.get('ROLLBACK_WAVE_MAX_CAPACITY_PERCENT', ROLLBACK_DEFAULT_MAX_CAPACITY_PERCENT))
+    )
+    logger.info(f"Rollback snapshot of {cluster_identifier}: {json.dumps(snapshot)}; next step: {json.dumps(next_step)}")
+    
+    if plan_only:
         return {
-            'writerInstanceId': None,
-            'dedicatedReaderInstanceId': None,
-            'autoScalingReaderInstanceIds': []
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': 'Rollback plan (Step Functions execution not started)',
+                'snapshot': snapshot,
+                'nextStep': next_step
+            }, default=str)
         }
     
-    # 各インスタンスの詳細を取得
+    if next_step['action'] == 'complete':
+        logger.info(f"Cluster {cluster_identifier} already matches its rollback snapshot; skipping execution")
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': 'No rollback required (all instances are at their original class)',
+                'snapshot': snapshot,
+                'nextStep': next_step
+            }, default=str)
+        }
+    
+    step_function_arn = os.environ.get('STEP_FUNCTION_ARN')
+    if not step_function_arn:
+        raise ValueError("STEP_FUNCTION_ARN environment variable is not set")
+    
+    execution_name = f"rollback-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}"
+    step_function_input = {'mode': 'rollback', 'clusterIdentifier': cluster_identifier}
+    
+    logger.info(f"Starting rollback execution: {execution_name}")
+    response = sfn.start_execution(
+        stateMachineArn=step_function_arn,
+        name=execution_name,
+        input=json.dumps(step_function_input)
+    )
+    
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Rollback execution started',
+            'executionArn': response['executionArn'],
+            'executionName': execution_name,
+            'input': step_function_input,
+            'snapshot': snapshot,
+            'nextStep': next_step
+        }, default=str)
+    }
+
+
+def disable_one_time_rule(direction='down'):
+    """
+    実行後にEventBridgeルールを無効化する（特定の日時のcron式の場合のみ）
+    毎日実行するcron式（* * ? * *）の場合は無効化しない
+    direction: "up" の場合はスケールアップのルール（SCALE_UP_EVENTBRIDGE_RULE_NAME）
+    """
     try:
-        logger.info(f"Calling describe_db_instances for {len(instance_ids)} instances")
-        instances_response = rds.describe_db_instances(
-            Filters=[
-                {
-                    'Name': 'db-instance-id',
-                    'Values': instance_ids
-                }
-            ]
-        )
-        logger.info(f"describe_db_instances response received: {len(instances_response.get('DBInstances', []))} instances")
-    except ClientError as e:
-        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
-        error_message = e.response.get('Error', {}).get('Message', str(e))
-        logger.error(f"Error calling describe_db_instances - Code: {error_code}, Message: {error_message}")
-        logger.error(f"Full error response: {json.dumps(e.response, default=str)}")
-        raise
+        if direction == 'up':
+            rule_name = os.environ.get('SCALE_UP_EVENTBRIDGE_RULE_NAME')
+        else:
+            rule_name = os.environ.get('EVENTBRIDGE_RULE_NAME')
+        if rule_name:
+            rule_info = events.describe_rule(Name=rule_name)
+            schedule_expression = rule_info.get('ScheduleExpression', '')
+            description = rule_info.get('Description', '')
+            
+            # 特定の日時を指定するcron式を検出（日と月が具体的な値で、年が*でない場合）
+            # 例: cron(6 14 18 11 ? *) - 11月18日14:06に実行
+            # 毎日のcron式: cron(6 14 * * ? *) - 毎日14:06に実行
+            if schedule_expression.startswith('cron('):
+                # cron式を解析して、日と月が具体的な値か確認
+                cron_match = re.match(r'cron\((\d+)\s+(\d+)\s+(\d+|\*)\s+(\d+|\*)\s+\?\s+\*\)', schedule_expression)
+                if cron_match:
+                    day = cron_match.group(3)
+                    month = cron_match.group(4)
+                    # 日と月が具体的な値（*でない）場合は、特定の日時の実行と判断
+                    if day != '*' and month != '*':
+                        logger.info(f"Disabling EventBridge rule after one-time execution: {rule_name}")
+                        events.put_rule(
+                            Name=rule_name,
+                            ScheduleExpression=schedule_expression,
+                            State='DISABLED',
+                            Description=description + ' (disabled after execution)'
+                        )
+                        logger.info(f"EventBridge rule disabled: {rule_name}")
     except Exception as e:
-        logger.error(f"Unexpected error in describe_db_instances: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        raise
+        # ルールの無効化に失敗しても、Step Functionsの実行は成功しているので警告のみ
+        logger.warning(f"Failed to disable EventBridge rule after execution: {str(e)}")
+
+
+def fleet_execution_name(cluster_identifier, timestamp):
+    """
+    クラスターごとの実行名（Step Functions の実行名は80文字まで）
+    """
+    return f"scaling-{cluster_identifier[:56]}-{timestamp}"
+
+
+def start_fleet_executions(fleet_selector, target_class, max_concurrency=None, direction=None, strategy='in-place'):
+    """
+    フリートモード: 選択条件に一致するクラスターごとに Step Functions を実行する
+    1. describe_db_clusters / describe_db_instances のページング一括取得で全クラスターの構成を解決
+       （変更先のインスタンスタイプが注文できないクラスターは skipped）
+    2. 上限付きのワーカープールで StartExecution を並列実行（スロットリング時はバックオフしてリトライ）
+    3. クラスターごとの結果（started / skipped / failed）を返す
+    """
+    step_function_arn = os.environ.get('STEP_FUNCTION_ARN')
+    if not step_function_arn:
+        raise ValueError("STEP_FUNCTION_ARN environment variable is not set")
     
-    instances = instances_response['DBInstances']
+    max_workers = int(max_concurrency or os.environ.get('FLEET_MAX_CONCURRENCY', DEFAULT_MAX_WORKERS))
     
-    # Writer、Dedicated Reader、AutoScaling Readerを分類
-    writer_instance_id = None
-    dedicated_reader_instance_id = None
-    auto_scaling_reader_instance_ids = []
+    topologies = resolve_fleet_topologies(rds, fleet_selector)
+    target_classes = resolve_target_classes(target_class, topologies)
+    preflight_errors = preflight_fleet(topologies, target_classes)
+    timestamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
     
-    for instance in instances:
-        instance_id = instance['DBInstanceIdentifier']
-        instance_status = instance.get('DBInstanceStatus', 'unknown')
-        
-        # 削除中または削除済みのインスタンスは除外
-        if instance_status in ['deleting', 'deleted']:
-            logger.info(f"Skipping instance {instance_id} with status: {instance_status}")
+    summary = {}
+    tasks = {}
+    for cluster_identifier, topology in topologies.items():
+        cluster_target_class, recommendation = target_classes[cluster_identifier]
+        cluster_direction = resolve_direction(direction, topology, cluster_target_class)
+        try:
+            step_function_input = build_step_function_input(cluster_target_class, cluster_identifier, topology, cluster_direction, strategy)
+        except ValueError as e:
+            logger.warning(f"Skipping cluster {cluster_identifier}: {str(e)}")
+            summary[cluster_identifier] = {
+                'clusterIdentifier': cluster_identifier,
+                'status': 'skipped',
+                'reason': str(e)
+            }
             continue
         
-        # クラスターメンバー情報からWriterを判定
-        cluster_member = next(
-            (m for m in cluster_members if m['DBInstanceIdentifier'] == instance_id),
-            None
-        )
-        is_writer = cluster_member.get('IsClusterWriter', False) if cluster_member else False
+        if preflight_errors[cluster_identifier]:
+            logger.warning(f"Skipping cluster {cluster_identifier}: {preflight_errors[cluster_identifier]}")
+            summary[cluster_identifier] = {
+                'clusterIdentifier': cluster_identifier,
+                'status': 'skipped',
+                'reason': preflight_errors[cluster_identifier]
+            }
+            continue
         
-        # タグからRoleを取得
-        try:
-            tags_response = rds.list_tags_for_resource(
-                ResourceName=instance['DBInstanceArn']
-            )
-            tags = {tag['Key']: tag['Value'] for tag in tags_response.get('TagList', [])}
-            role = tags.get('Role', '')
-            logger.debug(f"Instance {instance_id} tags: {tags}, role: {role}")
-        except ClientError as e:
-            error_code = e.response.get('Error', {}).get('Code', 'Unknown')
-            logger.warning(f"Failed to get tags for {instance_id} - Code: {error_code}, Message: {str(e)}")
-            role = ''
-        except Exception as e:
-            logger.warning(f"Failed to get tags for {instance_id}: {str(e)}")
-            logger.warning(f"Traceback: {traceback.format_exc()}")
-            role = ''
+        # 全インスタンスが変更先のタイプのクラスターは実行しない
+        if not build_plan(cluster_target_class, topology, cluster_direction, strategy=strategy)['changeRequired']:
+            logger.info(f"Skipping cluster {cluster_identifier}: all instances are already {cluster_target_class}")
+            summary[cluster_identifier] = {
+                'clusterIdentifier': cluster_identifier,
+                'status': 'skipped',
+                'reason': 'All instances are already at the target class'
+            }
+            continue
         
-        if is_writer:
-            writer_instance_id = instance_id
-        elif role == 'dedicated-reader':
-            dedicated_reader_instance_id = instance_id
-        elif role == 'autoscaling-reader':
-            auto_scaling_reader_instance_ids.append(instance_id)
+        execution_name = fleet_execution_name(cluster_identifier, timestamp)
+        summary[cluster_identifier] = {
+            'clusterIdentifier': cluster_identifier,
+            'executionName': execution_name
+        }
+        if recommendation:
+            summary[cluster_identifier]['targetClass'] = cluster_target_class
+        # ループ変数を束縛するためデフォルト引数を使う
+        # スロットリング時のリトライとレート制限は scaling_common.api_calls が行う
+        tasks[cluster_identifier] = lambda name=execution_name, payload=step_function_input: sfn.start_execution(
+            stateMachineArn=step_function_arn,
+            name=name,
+            input=json.dumps(payload)
+        )
+    
+    logger.info(f"Starting {len(tasks)} executions with up to {max_workers} workers ({len(summary) - len(tasks)} skipped)")
+    
+    for cluster_identifier, outcome in run_bounded(tasks, max_workers).items():
+        if 'error' in outcome:
+            logger.error(f"Failed to start execution for cluster {cluster_identifier}: {str(outcome['error'])}")
+            summary[cluster_identifier]['status'] = 'failed'
+            summary[cluster_identifier]['reason'] = str(outcome['error'])
         else:
-            # タグがない場合、Writer以外は分類
-            if not is_writer:
-                if 'dedicated' in instance_id.lower() or 'dedicated-reader' in instance_id.lower():
-                    dedicated_reader_instance_id = instance_id
-                elif 'as-' in instance_id.lower() or 'autoscaling' in instance_id.lower():
-                    auto_scaling_reader_instance_ids.append(instance_id)
-                elif dedicated_reader_instance_id is None:
-                    # 最初のReaderをDedicated Readerとして扱う
-                    dedicated_reader_instance_id = instance_id
-                else:
-                    auto_scaling_reader_instance_ids.append(instance_id)
+            summary[cluster_identifier]['status'] = 'started'
+            summary[cluster_identifier]['executionArn'] = outcome['result']['executionArn']
+    
+    clusters = [summary[cluster_identifier] for cluster_identifier in sorted(summary)]
+    started_count = len([c for c in clusters if c['status'] == 'started'])
     
-    logger.info(f"Found instances - Writer: {writer_instance_id}, Dedicated Reader: {dedicated_reader_instance_id}, AutoScaling Readers: {len(auto_scaling_reader_instance_ids)}")
+    if started_count:
+        disable_one_time_rule(direction)
+    
+    emit(
+        {'phase': 'schedule'},
+        {
+            'ExecutionsStarted': started_count,
+            'ExecutionsFailed': len([c for c in clusters if c['status'] == 'failed']),
+            'ClustersSkipped': len([c for c in clusters if c['status'] == 'skipped'])
+        },
+        dimensions={'TargetClass': target_class},
+        properties={'fleetSelector': fleet_selector}
+    )
     
     return {
-        'writerInstanceId': writer_instance_id,
-        'dedicatedReaderInstanceId': dedicated_reader_instance_id,
-        'autoScalingReaderInstanceIds': auto_scaling_reader_instance_ids
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': f'Step Functions executions started for {started_count} of {len(clusters)} clusters',
+            'targetClass': target_class,
+            'clusterCount': len(clusters),
+            'startedCount': started_count,
+            'skippedCount': len([c for c in clusters if c['status'] == 'skipped']),
+            'failedCount': len([c for c in clusters if c['status'] == 'failed']),
+            'clusters': clusters
+        })
     }
-
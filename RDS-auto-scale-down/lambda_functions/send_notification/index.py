@@ -1,14 +1,16 @@
 import json
-import boto3
 import logging
 import os
 from datetime import datetime
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-sns = boto3.client('sns')
+sns = LazyClient('sns')
 
+@with_api_metrics
 def lambda_handler(event, context):
     topic_arn = os.environ.get('SNS_TOPIC_ARN')
     if not topic_arn:
@@ -1,49 +1,135 @@
 import json
-import boto3
 import logging
 import os
 from datetime import datetime, timedelta
 from botocore.exceptions import ClientError
+from scaling_common import clock
+from scaling_common.api_calls import with_api_metrics
+from scaling_common.aws_clients import LazyClient
+from scaling_common.class_recommender import AUTO_TARGET_CLASS, parse_window
+from scaling_common.deadline import deadline_settings, start_for_deadline
+from scaling_common.fleet import resolve_fleet_topologies
+from scaling_common.resize_history import load_resize_history
+from scaling_common.scaling_plan import SCALING_DIRECTIONS, build_scaling_plan, scaling_direction
+from scaling_common.topology import get_cluster_topology
+from scaling_common.window_finder import AUTO_SCHEDULE_TIME, DEFAULT_LOOKBACK_DAYS, find_quiet_windows
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-events = boto3.client('events')
+events = LazyClient('events')
+rds = LazyClient('rds')
+dynamodb = LazyClient('dynamodb')
+cloudwatch = LazyClient('cloudwatch')
 
+@with_api_metrics
 def lambda_handler(event, context):
     """
     EventBridgeルールのスケジュール式を更新する
     実行時間をユーザーが指定できるようにする
+
+    scheduleTime に "auto" を指定した場合は、過去の負荷（CloudWatch の CPU使用率・接続数）と
+    スケーリングの所要時間の見込みから、負荷の低い開始時刻を探して設定する（scaling_common.window_finder）
+      scheduleMode: daily（毎日同じ時刻、デフォルト）/ weekly（曜日と時刻）
+      searchWindow: 検索範囲（"HH:MM-HH:MM" JST、終了までに収まる開始時刻のみ）
+      plan: true の場合は、ルールを更新せずに候補を返す
+
+    scheduleTime の代わりに deadline（"HH:MM" は毎日、"YYYY-MM-DD HH:MM" は1回のみ、JST）を指定した場合は、
+    変更を期限までに終わらせる開始時刻を逆算して設定する（scaling_common.deadline）
+      所要時間は過去のリサイズ履歴の DEADLINE_ESTIMATE_PERCENTILE パーセンタイル
+      + フェイルオーバーの前の待機の上限（FAILOVER_GATE_MAX_WAIT_SECONDS）+ DEADLINE_MARGIN_MINUTES 分
+      plan: true の場合は、ルールを更新せずに開始時刻を返す
+
+    direction: "up"（スケールアップ）の場合は、スケールダウンとは別のルール（SCALE_UP_EVENTBRIDGE_RULE_NAME）を更新する
+    （省略時は Writer の現在のタイプと変更先から判定する。targetClass の省略時は SCALE_UP_TARGET_CLASS）
     """
     try:
         # イベントから設定を取得
         cluster_identifier = event.get('clusterIdentifier')
         target_class = event.get('targetClass')
-        schedule_time = event.get('scheduleTime')  # 形式: "HH:MM" (JST), "YYYY-MM-DD HH:MM" (JST), または cron式
+        schedule_time = event.get('scheduleTime')  # 形式: "HH:MM" (JST), "YYYY-MM-DD HH:MM" (JST), cron式, または "auto"
+        deadline = event.get('deadline')  # 変更を終わらせる期限: "HH:MM" (JST、毎日) または "YYYY-MM-DD HH:MM" (JST)
+        direction = event.get('direction')  # down / up（省略時は Writer の現在のタイプと変更先から判定）
         disable_after_execution = event.get('disableAfterExecution', True)  # 実行後に無効化するか（デフォルト: True）
+        fleet_selector = event.get('fleet')  # フリートモード: 複数クラスターの選択条件（clusterIdentifiers / namePrefix / tags）
         
-        if not cluster_identifier:
+        if direction is not None and direction not in SCALING_DIRECTIONS:
+            raise ValueError(f"Invalid direction: {direction}. Use one of {', '.join(SCALING_DIRECTIONS)}")
+        if not cluster_identifier and not fleet_selector:
             cluster_identifier = os.environ.get('CLUSTER_IDENTIFIER')
         if not target_class:
-            target_class = os.environ.get('TARGET_CLASS', 'db.t4g.medium')
-        if not schedule_time:
-            raise ValueError("scheduleTime is required (format: 'HH:MM' or 'YYYY-MM-DD HH:MM' in JST, or cron expression)")
+            if direction == 'up':
+                target_class = os.environ.get('SCALE_UP_TARGET_CLASS')
+            else:
+                target_class = os.environ.get('TARGET_CLASS', 'db.t4g.medium')
+        if not target_class:
+            raise ValueError("targetClass is required (set in event or SCALE_UP_TARGET_CLASS env var)")
+        if schedule_time and deadline:
+            raise ValueError("Specify either scheduleTime or deadline, not both")
+        if not schedule_time and not deadline:
+            raise ValueError("scheduleTime or deadline is required (format: 'HH:MM' or 'YYYY-MM-DD HH:MM' in JST, cron expression, or 'auto')")
         
-        if not cluster_identifier:
-            raise ValueError("clusterIdentifier is required")
+        if not cluster_identifier and not fleet_selector:
+            raise ValueError("clusterIdentifier or fleet is required")
         
-        # ルール名を取得
-        rule_name = os.environ.get('EVENTBRIDGE_RULE_NAME')
+        # deadline / "auto" の見積もりにはクラスター構成が必要（direction の指定がなければ構成から判定する）
+        topologies = None
+        if deadline or schedule_time == AUTO_SCHEDULE_TIME:
+            topologies = resolve_topologies(cluster_identifier, fleet_selector)
+            if not direction:
+                direction = resolve_direction(topologies, target_class)
+        
+        # deadline の場合は期限までに終わる開始時刻を逆算する
+        deadline_schedule = None
+        if deadline:
+            deadline_schedule = schedule_for_deadline(topologies, target_class, direction, deadline)
+            if event.get('plan') is True:
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps({
+                        'message': 'Start time for the deadline (EventBridge rule not updated)',
+                        'targetClass': target_class,
+                        'direction': direction,
+                        'clusterIdentifier': cluster_identifier,
+                        'deadlineSchedule': deadline_schedule
+                    })
+                }
+            schedule_time = deadline_schedule['scheduleTime']
+        
+        # scheduleTime: "auto" の場合は負荷の低い開始時刻を探す
+        candidates = None
+        if schedule_time == AUTO_SCHEDULE_TIME:
+            candidates = find_schedule_windows(topologies, target_class, direction, event)
+            if event.get('plan') is True:
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps({
+                        'message': 'Schedule window candidates (EventBridge rule not updated)',
+                        'targetClass': target_class,
+                        'clusterIdentifier': cluster_identifier,
+                        'candidates': candidates
+                    })
+                }
+            schedule_time = candidates[0].get('scheduleExpression') or candidates[0]['scheduleTime']
+            logger.info(f"Selected schedule window: {json.dumps(candidates[0])}")
+        
+        # ルール名を取得（スケールアップはスケールダウンとは別のルール）
+        if direction == 'up':
+            rule_name = os.environ.get('SCALE_UP_EVENTBRIDGE_RULE_NAME')
+            default_suffix = 'schedule-scale-up'
+        else:
+            rule_name = os.environ.get('EVENTBRIDGE_RULE_NAME')
+            default_suffix = 'schedule-scaling'
         if not rule_name:
             # デフォルトのルール名を生成
-            rule_name = f"{os.environ.get('PROJECT_NAME', 'k-nakatani')}-{os.environ.get('ENVIRONMENT', 'dev')}-schedule-scaling"
+            rule_name = f"{os.environ.get('PROJECT_NAME', 'k-nakatani')}-{os.environ.get('ENVIRONMENT', 'dev')}-{default_suffix}"
         
         # スケジュール式を生成
         schedule_expression, description = convert_to_schedule_expression(schedule_time)
         
         logger.info(f"Updating EventBridge rule: {rule_name}")
         logger.info(f"New schedule: {schedule_expression}")
-        logger.info(f"Target class: {target_class}, Cluster: {cluster_identifier}")
+        logger.info(f"Target class: {target_class}, Cluster: {cluster_identifier}, Fleet: {fleet_selector}")
         logger.info(f"Disable after execution: {disable_after_execution}")
         
         # EventBridgeルールを更新
@@ -60,10 +146,24 @@ def lambda_handler(event, context):
         if targets['Targets']:
             # 既存のターゲットを更新
             target = targets['Targets'][0]
-            target['Input'] = json.dumps({
-                'clusterIdentifier': cluster_identifier,
-                'targetClass': target_class
-            })
+            if fleet_selector:
+                # 1つのスケジュールで選択条件に一致する全クラスターを実行する
+                target_input = {
+                    'fleet': fleet_selector,
+                    'targetClass': target_class
+                }
+            else:
+                target_input = {
+                    'clusterIdentifier': cluster_identifier,
+                    'targetClass': target_class
+                }
+            # direction を指定しなかった場合（deadline を除く）は、schedule-scaling が実行時に判定する
+            if event.get('direction') or deadline:
+                target_input['direction'] = direction
+            if deadline:
+                # schedule-scaling が実行時に期限までの余裕を記録する
+                target_input['deadline'] = deadline
+            target['Input'] = json.dumps(target_input)
             
             events.put_targets(
                 Rule=rule_name,
@@ -81,9 +181,17 @@ def lambda_handler(event, context):
             'scheduleExpression': schedule_expression,
             'scheduleTime': schedule_time,
             'targetClass': target_class,
+            'direction': direction,
             'clusterIdentifier': cluster_identifier,
             'disableAfterExecution': disable_after_execution
         }
+        if fleet_selector:
+            response_body['fleet'] = fleet_selector
+        if deadline_schedule:
+            response_body['deadlineSchedule'] = deadline_schedule
+        if candidates:
+            response_body['window'] = candidates[0]
+            response_body['candidates'] = candidates
         
         # 実行後に無効化する必要がある場合、その旨を記録
         if disable_after_execution:
@@ -99,6 +207,81 @@ def lambda_handler(event, context):
         raise e
 
 
+def resolve_topologies(cluster_identifier, fleet_selector):
+    """
+    対象のクラスターの構成（フリートモードでは選択条件に一致する全クラスター）
+    """
+    if fleet_selector:
+        topologies = resolve_fleet_topologies(rds, fleet_selector)
+    else:
+        topologies = {cluster_identifier: get_cluster_topology(rds, cluster_identifier)}
+    if not topologies:
+        raise ValueError(f"No clusters matched the fleet selector: {json.dumps(fleet_selector)}")
+    return topologies
+
+
+def resolve_direction(topologies, target_class):
+    """
+    スケーリングの方向: いずれかのクラスターの Writer より変更先が大きければ up
+    targetClass が "auto" の場合は down（推奨はオフピークの縮小に使うため）
+    """
+    if target_class == AUTO_TARGET_CLASS:
+        return 'down'
+    directions = {
+        scaling_direction(topology.get('instances', {}).get(topology.get('writerInstanceId'), {}).get('instanceClass'), target_class)
+        for topology in topologies.values()
+    }
+    return 'up' if 'up' in directions else 'down'
+
+
+def build_plans(topologies, target_class, direction, rank=50):
+    """
+    クラスターごとの手順と所要時間の見込み（schedule-scaling のプランモードと同じ: 過去のリサイズ履歴とウェーブの予算）
+    targetClass が "auto" の場合は TARGET_CLASS への変更として見積もる
+    """
+    if target_class == AUTO_TARGET_CLASS:
+        target_class = os.environ.get('TARGET_CLASS', 'db.t4g.medium')
+    history = load_resize_history(dynamodb)
+    return {
+        identifier: build_scaling_plan(
+            topology,
+            target_class,
+            history,
+            max_readers=int(os.environ.get('WAVE_MAX_READERS', 1)),
+            max_capacity_percent=float(os.environ.get('WAVE_MAX_CAPACITY_PERCENT', 100)),
+            direction=direction,
+            rank=rank
+        )
+        for identifier, topology in topologies.items()
+    }
+
+
+def schedule_for_deadline(topologies, target_class, direction, deadline):
+    """
+    期限までに終わる開始時刻（フリートモードでは最も時間のかかるクラスターに合わせる）
+    """
+    settings = deadline_settings()
+    plans = build_plans(topologies, target_class, direction, rank=settings['percentile'])
+    return start_for_deadline(deadline, list(plans.values()), settings, clock.now())
+
+
+def find_schedule_windows(topologies, target_class, direction, event):
+    """
+    負荷の低い開始時刻の候補（負荷の低い順）
+    所要時間の見込みは schedule-scaling のプランモードと同じ（過去のリサイズ履歴とウェーブの予算）
+    """
+    plans = build_plans(topologies, target_class, direction)
+    
+    search_window = event.get('searchWindow')
+    return find_quiet_windows(
+        cloudwatch,
+        plans,
+        mode=event.get('scheduleMode', 'daily'),
+        lookback_days=int(os.environ.get('SCHEDULE_WINDOW_LOOKBACK_DAYS', DEFAULT_LOOKBACK_DAYS)),
+        search_window=parse_window(search_window) if search_window else None
+    )
+
+
 def convert_to_schedule_expression(schedule_time):
     """
     スケジュール時間をEventBridgeのスケジュール式に変換
@@ -125,7 +308,7 @@ def convert_to_schedule_expression(schedule_time):
             utc_datetime = jst_datetime - timedelta(hours=9)
             
             # 過去の日時でないことを確認
-            now_utc = datetime.utcnow()
+            now_utc = clock.now().replace(tzinfo=None)
             if utc_datetime < now_utc:
                 raise ValueError(f"Schedule time {schedule_time} JST is in the past. Please specify a future time.")
             
@@ -40,6 +40,11 @@ output "cluster_reader_endpoint" {
   value       = aws_rds_cluster.main.reader_endpoint
 }
 
+output "cluster_custom_reader_endpoint" {
+  description = "Custom reader endpoint that excludes readers while they are resized (use instead of the cluster reader endpoint)"
+  value       = aws_rds_cluster_endpoint.reader_drain.endpoint
+}
+
 output "cluster_port" {
   description = "Aurora cluster port"
   value       = aws_rds_cluster.main.port
@@ -132,13 +137,21 @@ output "step_function_name" {
   value       = aws_sfn_state_machine.aurora_scaling.name
 }
 
+# Duration History Outputs
+output "duration_history_table_name" {
+  description = "DynamoDB table name of the resize and failover duration history"
+  value       = aws_dynamodb_table.duration_history.name
+}
+
 # VPC Endpoints Outputs
 output "vpc_endpoint_ids" {
   description = "VPC Endpoint IDs"
   value = {
-    rds    = aws_vpc_endpoint.rds.id
-    logs   = aws_vpc_endpoint.logs.id
-    states = aws_vpc_endpoint.states.id
+    rds      = aws_vpc_endpoint.rds.id
+    logs     = aws_vpc_endpoint.logs.id
+    states   = aws_vpc_endpoint.states.id
+    ssm      = aws_vpc_endpoint.ssm.id
+    dynamodb = aws_vpc_endpoint.dynamodb.id
   }
 }
 
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+スケーリングのステートマシン（stepfunction.tf）の実行履歴から、フェーズごとの所要時間を集計する
+
+実行履歴（GetExecutionHistory のイベント）から実行ごとのタイムラインをステート単位で組み立て、以下を集計する。
+  - 実行全体・フェーズごと・フェーズ×インスタンスタイプの変更ごとの所要時間のパーセンタイル（p50 / p90 / p95）
+  - 待機（Wait ステート・イベント待ち）と処理（Lambda）の比率、フェーズあたりの Wait の回数（ポーリングの回数）
+  - ステートの再実行（ポーリングのループ・全体リトライ）とタスクの失敗・タイムアウトの頻度
+  - 所要時間の長い実行
+Wait の秒数（polling_*、event_wait_timeout_seconds など）やリトライ回数を実績に基づいて調整するために使う。
+
+入力（いずれか）:
+  - AWS: --state-machine-arn / --state-machine-name の実行を ListExecutions / GetExecutionHistory で取得する
+    （--save-history で保存すると、次回からはファイルで分析できる）
+  - ファイル・ディレクトリ: GetExecutionHistory の出力（aws stepfunctions get-execution-history の JSON）、
+    --save-history で保存したファイル、simulate_scaling.py --history-dir の出力
+
+使い方:
+    python3 scripts/analyze_executions.py --state-machine-name rds-scaling-prod-aurora-scaling --max-executions 500
+    python3 scripts/analyze_executions.py --state-machine-arn arn:aws:states:... --since 2025-01-01 --save-history history/
+    python3 scripts/analyze_executions.py history/                        # 保存した実行履歴を分析
+    python3 scripts/analyze_executions.py history/ --json > analysis.json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lambdaレイヤー（/opt/python）の代わりに共通モジュールを読み込む（AWSからの取得にレート制限・リトライを使う）
+sys.path.insert(0, os.path.join(ROOT, 'lambda_functions', 'common_layer', 'python'))
+# Step Functions の API のクォータ（ListExecutions: 2回/秒、GetExecutionHistory: 5回/秒）に合わせる
+os.environ.setdefault('AWS_CLIENT_RATE_LIMITS', json.dumps({
+    'stepfunctions:list_executions': 2,
+    'stepfunctions:list_state_machines': 2,
+    'stepfunctions:get_execution_history': 5
+}))
+
+from scaling_common.aws_clients import LazyClient  # noqa: E402
+
+sfn = LazyClient('stepfunctions')
+
+PERCENTILES = (50, 90, 95)
+NO_PHASE = '(setup)'
+
+# 子ステートの時間を含むステート（フェーズの時間には子ステートのみを数える）
+CONTAINER_STATE_TYPES = ('Map', 'Parallel')
+
+# Lambda のタスク（arn:aws:states:::lambda:invoke）と Lambda 関数のARNを直接指定したタスク
+TASK_EVENT_TYPES = {
+    'TaskScheduled': 'scheduled', 'LambdaFunctionScheduled': 'scheduled',
+    'TaskSubmitted': 'submitted',
+    'TaskSucceeded': 'succeeded', 'LambdaFunctionSucceeded': 'succeeded',
+    'TaskFailed': 'failed', 'LambdaFunctionFailed': 'failed',
+    'LambdaFunctionScheduleFailed': 'failed', 'LambdaFunctionStartFailed': 'failed',
+    'TaskTimedOut': 'timed-out', 'LambdaFunctionTimedOut': 'timed-out'
+}
+
+
+def to_epoch(value):
+    """
+    タイムスタンプ（boto3 の datetime、AWS CLI の ISO 8601 文字列、エポック秒）をエポック秒に変換する
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def percentile(sorted_values, q):
+    """
+    線形補間のパーセンタイル（sorted_values は昇順）
+    """
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def distribution(values):
+    values = sorted(values)
+    if not values:
+        return None
+    result = {'count': len(values), 'min': round(values[0], 1), 'mean': round(sum(values) / len(values), 1)}
+    for q in PERCENTILES:
+        result[f"p{q}"] = round(percentile(values, q), 1)
+    result['max'] = round(values[-1], 1)
+    return result
+
+
+def ratio(part, whole):
+    return round(part / whole, 3) if whole else None
+
+
+# --- 実行履歴の読み込み ---
+
+def iter_history_files(paths):
+    """
+    ファイル・ディレクトリ（*.json）から実行履歴を1実行ずつ読み込む
+    （実行履歴は1実行で数百KBになるため、全件をメモリに載せずにタイムラインに変換する）
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.json'))
+        else:
+            files.append(path)
+
+    for file_path in files:
+        with open(file_path, encoding='utf-8') as f:
+            document = json.load(f)
+        # 1ファイルに複数の実行（{"executions": [...]}）、イベントの配列のみのファイルも受け付ける
+        for execution in document.get('executions', [document]) if isinstance(document, dict) else [document]:
+            if isinstance(execution, list):
+                execution = {'events': execution}
+            execution.setdefault('name', os.path.splitext(os.path.basename(file_path))[0])
+            yield execution
+
+
+def resolve_state_machine_arn(name):
+    for page in sfn.get_paginator('list_state_machines').paginate():
+        for state_machine in page['stateMachines']:
+            if state_machine['name'] == name:
+                return state_machine['stateMachineArn']
+    raise ValueError(f"State machine {name} not found")
+
+
+def list_executions(state_machine_arn, status=None, since=None, max_executions=None):
+    """
+    実行の一覧（新しい順）。since より前に開始した実行に達したら取得をやめる
+    """
+    params = {'stateMachineArn': state_machine_arn, 'maxResults': 1000}
+    if status:
+        params['statusFilter'] = status
+    executions = []
+    for page in sfn.get_paginator('list_executions').paginate(**params):
+        for execution in page['executions']:
+            if since is not None and to_epoch(execution['startDate']) < since:
+                return executions
+            executions.append(execution)
+            if max_executions and len(executions) >= max_executions:
+                return executions
+    return executions
+
+
+def fetch_history(execution):
+    events = []
+    for page in sfn.get_paginator('get_execution_history').paginate(
+        executionArn=execution['executionArn'], maxResults=1000, includeExecutionData=True
+    ):
+        events += page['events']
+    return dict(execution, events=events)
+
+
+def fetch_executions(state_machine_arn, status=None, since=None, max_executions=None, workers=4):
+    executions = list_executions(state_machine_arn, status, since, max_executions)
+    print(f"Fetching history of {len(executions)} executions...", file=sys.stderr)
+    # GetExecutionHistory は api_calls のトークンバケットでクォータ内に制限される
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fetch_history, executions))
+
+
+def save_histories(directory, executions):
+    os.makedirs(directory, exist_ok=True)
+    for execution in executions:
+        with open(os.path.join(directory, f"{execution['name']}.json"), 'w', encoding='utf-8') as f:
+            json.dump(execution, f, default=str)
+
+
+# --- 実行ごとのタイムライン ---
+
+def parse_json(text):
+    if not isinstance(text, str):
+        return text
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+# ステートの入出力・タスクのパラメーターは大きい（ステートの全項目を含む）ため、phase の部分のみをデコードする
+PHASE_OBJECT = re.compile(r'"phase":\s*\{')
+PHASE_NAME = re.compile(r'"phase":\s*"([^"]*)"')
+_decoder = json.JSONDecoder()
+
+
+def phase_objects(text):
+    """
+    ステートの入出力（JSON文字列）に含まれる phase（{name, startedAt}）。Map の出力では各反復の phase も含む
+    """
+    for match in PHASE_OBJECT.finditer(text or ''):
+        try:
+            yield _decoder.raw_decode(text, match.end() - 1)[0]
+        except json.JSONDecodeError:
+            continue
+
+
+def event_details(event):
+    for key, value in event.items():
+        if key.endswith('EventDetails'):
+            return value
+    return {}
+
+
+def previous_classes(task_output):
+    """
+    modify_instance の応答に含まれる変更前のインスタンスタイプ（instances の各要素、または単体の previousClass）
+    """
+    if '"previousClass"' not in task_output:
+        return []
+    payload = (parse_json(task_output) or {}).get('Payload') or {}
+    results = payload.get('instances', [payload]) if isinstance(payload, dict) else []
+    return [r['previousClass'] for r in results if isinstance(r, dict) and r.get('previousClass')]
+
+
+class PhaseTracker:
+    """
+    ステートの入出力の phase（{name, startedAt}）と Lambda のペイロードの phase から、現在のフェーズを判定する
+    フェーズは開始時刻（startedAt）ごとに別の実施として扱う（全体リトライでの再実施・ウェーブごと）
+    """
+
+    def __init__(self):
+        self.occurrences = []
+        self.current = None
+        self.seen = set()
+
+    def start(self, name, started_at):
+        self.current = {
+            'phase': name, 'startedAt': started_at, 'fromClasses': set(),
+            'enteredAt': None, 'exitedAt': None, 'waitSeconds': 0.0, 'workSeconds': 0.0, 'waits': 0, 'states': 0
+        }
+        self.occurrences.append(self.current)
+
+    def observe_phase(self, phase):
+        if not isinstance(phase, dict) or not phase.get('name'):
+            return
+        key = (phase['name'], phase.get('startedAt'))
+        # 以前のフェーズの値が残っている場合（Map の後の最上位の phase など）は切り替えない
+        if key in self.seen:
+            return
+        self.seen.add(key)
+        self.start(phase['name'], phase.get('startedAt'))
+
+    def observe_payload_phase(self, name):
+        # 入出力の phase を更新しないフェーズ（最終確認: "phase" = "final-verification"）
+        if name and (self.current is None or self.current['phase'] != name):
+            self.start(name, None)
+
+    def attribute(self, state):
+        if self.current is None:
+            self.start(NO_PHASE, None)
+        occurrence = self.current
+        state['phase'] = occurrence['phase']
+        if state['type'] in CONTAINER_STATE_TYPES:
+            return
+        occurrence['enteredAt'] = state['enteredAt'] if occurrence['enteredAt'] is None else min(occurrence['enteredAt'], state['enteredAt'])
+        occurrence['exitedAt'] = state['exitedAt'] if occurrence['exitedAt'] is None else max(occurrence['exitedAt'], state['exitedAt'])
+        occurrence['waitSeconds'] += state['waitSeconds']
+        occurrence['workSeconds'] += state['workSeconds']
+        occurrence['waits'] += 1 if state['type'] == 'Wait' else 0
+        occurrence['states'] += 1
+        occurrence['fromClasses'].update(state.pop('fromClasses', ()))
+
+
+def build_timeline(execution):
+    """
+    1実行分のイベントから、ステートごとの区間（入った時刻・出た時刻・待機 / 処理の秒数・タスクの試行）と
+    フェーズの実施ごとの区間を組み立てる
+    """
+    events = sorted(execution.get('events', []), key=lambda e: e['id'])
+    tracker = PhaseTracker()
+    states = []
+    owners = {}
+    open_states = {}
+    execution_input = {}
+    started_at = to_epoch(execution.get('startDate'))
+    stopped_at = to_epoch(execution.get('stopDate'))
+    status = execution.get('status')
+
+    for event in events:
+        event_type = event['type']
+        timestamp = to_epoch(event['timestamp'])
+        details = event_details(event)
+        # タスクのイベントは previousEventId をたどってステートに対応づける
+        owner = owners.get(event.get('previousEventId'))
+
+        if event_type == 'ExecutionStarted':
+            started_at = timestamp
+            execution_input = parse_json(details.get('input')) or {}
+            tracker.observe_phase(execution_input.get('phase'))
+        elif event_type in ('ExecutionSucceeded', 'ExecutionFailed', 'ExecutionTimedOut', 'ExecutionAborted'):
+            stopped_at = timestamp
+            status = status or event_type[len('Execution'):].upper().replace('TIMEDOUT', 'TIMED_OUT')
+        elif event_type.endswith('StateEntered'):
+            state = {
+                'state': details['name'], 'type': event_type[:-len('StateEntered')], 'enteredAt': timestamp, 'exitedAt': None,
+                'waitSeconds': 0.0, 'workSeconds': 0.0, 'attempts': 0, 'failures': 0, 'timeouts': 0, 'fromClasses': [],
+                'task': None
+            }
+            states.append(state)
+            open_states.setdefault(state['state'], []).append(state)
+            owners[event['id']] = state
+        elif event_type.endswith('StateExited'):
+            stack = open_states.get(details['name']) or []
+            state = owner if owner in stack else (stack[-1] if stack else None)
+            if state is None:
+                continue
+            stack.remove(state)
+            state['exitedAt'] = timestamp
+            if state['type'] == 'Wait':
+                state['waitSeconds'] = timestamp - state['enteredAt']
+            # ステートの入力は直前のステートの出力なので、出力のみを見る
+            for phase in phase_objects(details.get('output')):
+                tracker.observe_phase(phase)
+            tracker.attribute(state)
+        elif event_type in TASK_EVENT_TYPES:
+            state = owner if owner is not None and owner['type'] == 'Task' else next(
+                (s for s in reversed(states) if s['type'] == 'Task' and s['exitedAt'] is None), None
+            )
+            if state is None:
+                continue
+            owners[event['id']] = state
+            account_task_event(state, TASK_EVENT_TYPES[event_type], timestamp, details, tracker)
+        elif owner is not None:
+            owners[event['id']] = owner
+
+    # 実行中・異常終了の実行は、最後のイベントまでの区間で扱う
+    last_timestamp = to_epoch(events[-1]['timestamp']) if events else stopped_at
+    for state in states:
+        if state['exitedAt'] is None:
+            state['exitedAt'] = last_timestamp
+            tracker.attribute(state)
+        state.pop('task', None)
+        state.pop('fromClasses', None)
+        state['seconds'] = state['exitedAt'] - state['enteredAt']
+
+    phases = []
+    for occurrence in tracker.occurrences:
+        if occurrence['enteredAt'] is None:
+            continue
+        from_classes = sorted(occurrence.pop('fromClasses'))
+        occurrence['fromClass'] = '+'.join(from_classes) if from_classes else None
+        occurrence['seconds'] = occurrence['exitedAt'] - occurrence['enteredAt']
+        phases.append(occurrence)
+
+    stopped_at = stopped_at or last_timestamp
+    return {
+        'name': execution.get('name') or execution_input.get('executionName'),
+        'status': status or 'RUNNING',
+        'startedAt': started_at,
+        'durationSeconds': (stopped_at - started_at) if started_at is not None and stopped_at is not None else None,
+        'targetClass': execution_input.get('targetClass'),
+        'clusterIdentifier': execution_input.get('clusterIdentifier'),
+        'states': states,
+        'phases': phases
+    }
+
+
+def account_task_event(state, kind, timestamp, details, tracker):
+    """
+    タスクの試行ごとに、Lambda の処理時間（スケジュール〜応答）とタスクトークン待ち（応答〜完了）を加算する
+    """
+    task = state['task']
+    if kind == 'scheduled':
+        state['attempts'] += 1
+        state['task'] = {'scheduledAt': timestamp, 'submittedAt': None}
+        match = PHASE_NAME.search(details.get('parameters') or '')
+        if match:
+            tracker.observe_payload_phase(match.group(1))
+        return
+    if task is None:
+        return
+    if kind == 'submitted':
+        state['workSeconds'] += timestamp - task['scheduledAt']
+        task['submittedAt'] = timestamp
+        state['fromClasses'] += previous_classes(details.get('output') or '')
+        return
+    if task['submittedAt'] is not None:
+        state['waitSeconds'] += timestamp - task['submittedAt']
+    else:
+        state['workSeconds'] += timestamp - task['scheduledAt']
+    if kind == 'succeeded' and task['submittedAt'] is None:
+        state['fromClasses'] += previous_classes(details.get('output') or '')
+    state['failures'] += 1 if kind == 'failed' else 0
+    state['timeouts'] += 1 if kind == 'timed-out' else 0
+    state['task'] = None
+
+
+# --- 集計 ---
+
+def group_by(rows, key_func):
+    groups = {}
+    for row in rows:
+        groups.setdefault(key_func(row), []).append(row)
+    return groups
+
+
+def analyze(timelines, slowest=10):
+    """
+    実行ごとのタイムラインを、ステート・フェーズの行に展開してからまとめて集計する
+    """
+    # 実行名は重複しうる（別のステートマシン・ファイル）ため、実行は一覧の位置で区別する
+    executions = [t for t in timelines if t['durationSeconds'] is not None]
+    phase_rows = [
+        dict(phase, execution=index, targetClass=t['targetClass'])
+        for index, t in enumerate(executions) for phase in t['phases']
+    ]
+    state_rows = [dict(state, execution=index) for index, t in enumerate(executions) for state in t['states']]
+
+    total_seconds = sum(t['durationSeconds'] for t in executions)
+    total_wait = sum(p['waitSeconds'] for p in phase_rows)
+    total_work = sum(p['workSeconds'] for p in phase_rows)
+
+    def phase_summary(rows):
+        seconds = sum(r['seconds'] for r in rows)
+        return {
+            'occurrences': len(rows),
+            'executions': len({r['execution'] for r in rows}),
+            'durationSeconds': distribution([r['seconds'] for r in rows]),
+            'waitRatio': ratio(sum(r['waitSeconds'] for r in rows), seconds),
+            'workRatio': ratio(sum(r['workSeconds'] for r in rows), seconds),
+            'waitsPerOccurrence': distribution([r['waits'] for r in rows])
+        }
+
+    phases = {name: phase_summary(rows) for name, rows in group_by(phase_rows, lambda r: r['phase']).items()}
+    phase_classes = [
+        dict(phase_summary(rows), phase=phase, instanceClass=f"{from_class}->{target}" if from_class else target)
+        for (phase, from_class, target), rows in sorted(
+            group_by(phase_rows, lambda r: (r['phase'], r['fromClass'], r['targetClass'] or '?')).items(),
+            key=lambda item: (item[0][0], str(item[0][1]), item[0][2])
+        )
+    ]
+
+    states = {}
+    for name, rows in group_by(state_rows, lambda r: r['state']).items():
+        entries_per_execution = {}
+        for row in rows:
+            entries_per_execution[row['execution']] = entries_per_execution.get(row['execution'], 0) + 1
+        attempts = sum(r['attempts'] for r in rows)
+        states[name] = {
+            'type': rows[0]['type'],
+            'entries': len(rows),
+            'executions': len(entries_per_execution),
+            'reenteredExecutions': len([n for n in entries_per_execution.values() if n > 1]),
+            'entriesPerExecution': distribution(entries_per_execution.values()),
+            'seconds': distribution([r['seconds'] for r in rows]),
+            'waitSeconds': round(sum(r['waitSeconds'] for r in rows), 1),
+            'workSeconds': round(sum(r['workSeconds'] for r in rows), 1),
+            'taskAttempts': attempts,
+            'taskRetries': attempts - len([r for r in rows if r['attempts']]),
+            'taskFailures': sum(r['failures'] for r in rows),
+            'taskTimeouts': sum(r['timeouts'] for r in rows)
+        }
+
+    def longest_phase(timeline):
+        phase = max(timeline['phases'], key=lambda p: p['seconds'], default=None)
+        return {'phase': phase['phase'], 'seconds': round(phase['seconds'], 1)} if phase else None
+
+    return {
+        'executions': {
+            'count': len(executions),
+            'statuses': {s: len([t for t in executions if t['status'] == s]) for s in sorted({t['status'] for t in executions})},
+            'durationSeconds': distribution([t['durationSeconds'] for t in executions]),
+            'waitRatio': ratio(total_wait, total_seconds),
+            'workRatio': ratio(total_work, total_seconds)
+        },
+        'phases': dict(sorted(phases.items(), key=lambda item: -item[1]['durationSeconds']['mean'])),
+        'phaseInstanceClasses': phase_classes,
+        'states': dict(sorted(states.items(), key=lambda item: -(item[1]['waitSeconds'] + item[1]['workSeconds']))),
+        'reenteredStates': sorted(
+            [name for name, s in states.items() if s['reenteredExecutions'] or s['taskRetries'] or s['taskFailures'] or s['taskTimeouts']],
+            key=lambda name: -states[name]['entriesPerExecution']['mean']
+        ),
+        'slowest': [
+            {
+                'name': t['name'], 'status': t['status'], 'durationSeconds': round(t['durationSeconds'], 1),
+                'targetClass': t['targetClass'], 'clusterIdentifier': t['clusterIdentifier'], 'longestPhase': longest_phase(t)
+            }
+            for t in sorted(executions, key=lambda t: -t['durationSeconds'])[:slowest]
+        ]
+    }
+
+
+# --- 出力 ---
+
+def format_distribution(d):
+    if d is None:
+        return '-'
+    return ' '.join(f"{key} {d[key]:>7}" for key in ('p50', 'p90', 'p95', 'max'))
+
+
+def format_ratio(value):
+    return '-' if value is None else f"{value * 100:.1f}%"
+
+
+def print_report(analysis):
+    e = analysis['executions']
+    print(f"Executions: {e['count']} {e['statuses']}")
+    print(f"Duration (s): {format_distribution(e['durationSeconds'])}")
+    print(f"Waiting {format_ratio(e['waitRatio'])} / working {format_ratio(e['workRatio'])} of the total duration")
+    print()
+    print(f"{'phase':<28} {'runs':>5} {'duration (s)':<48} {'wait':>5} {'work':>5} {'waits p50/p95':>14}")
+    for name, p in analysis['phases'].items():
+        waits = p['waitsPerOccurrence']
+        print(f"{name:<28} {p['occurrences']:>5} {format_distribution(p['durationSeconds']):<48} "
+              f"{format_ratio(p['waitRatio']):>5} {format_ratio(p['workRatio']):>5} {waits['p50']:>6}/{waits['p95']:<7}")
+    print()
+    print(f"{'phase':<28} {'instance class':<34} {'runs':>5} duration (s)")
+    for p in analysis['phaseInstanceClasses']:
+        print(f"{p['phase']:<28} {p['instanceClass']:<34} {p['occurrences']:>5} {format_distribution(p['durationSeconds'])}")
+    print()
+    print('Re-entered states and task failures (polling loops, retries):')
+    print(f"  {'state':<40} {'executions':>10} {'entries/exec p50/p95/max':>25} {'retries':>8} {'failures':>8} {'timeouts':>8}")
+    for name in analysis['reenteredStates']:
+        s = analysis['states'][name]
+        d = s['entriesPerExecution']
+        print(f"  {name:<40} {s['reenteredExecutions']:>4}/{s['executions']:<5} {d['p50']:>9}/{d['p95']}/{d['max']:<7} "
+              f"{s['taskRetries']:>8} {s['taskFailures']:>8} {s['taskTimeouts']:>8}")
+    print()
+    print('Slowest executions:')
+    for t in analysis['slowest']:
+        longest = t['longestPhase']
+        print(f"  {t['name']:<45} {t['status']:<10} {t['durationSeconds']:>9} s  {t['targetClass'] or '':<16} "
+              f"longest: {longest['phase'] if longest else '-'} ({longest['seconds'] if longest else '-'} s)")
+
+
+def parse_since(text):
+    return to_epoch(text if 'T' in text else f"{text}T00:00:00+00:00")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze per-phase durations from the execution history of the scaling state machine')
+    parser.add_argument('paths', nargs='*', help='execution history JSON files or directories')
+    parser.add_argument('--state-machine-arn', help='fetch executions of this state machine from AWS')
+    parser.add_argument('--state-machine-name', help='fetch executions of the state machine with this name from AWS')
+    parser.add_argument('--status', choices=['RUNNING', 'SUCCEEDED', 'FAILED', 'TIMED_OUT', 'ABORTED'], help='only executions with this status')
+    parser.add_argument('--since', help='only executions started at or after this date (YYYY-MM-DD or ISO 8601)')
+    parser.add_argument('--max-executions', type=int, help='maximum number of executions to fetch (newest first)')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent GetExecutionHistory requests')
+    parser.add_argument('--save-history', metavar='DIR', help='save the fetched execution histories as JSON files')
+    parser.add_argument('--slowest', type=int, default=10, help='number of slowest executions to list')
+    parser.add_argument('--json', action='store_true', help='print the analysis as JSON')
+    args = parser.parse_args()
+
+    if not args.paths and not (args.state_machine_arn or args.state_machine_name):
+        parser.error('specify history files/directories or --state-machine-arn / --state-machine-name')
+
+    started = time.perf_counter()
+    since = parse_since(args.since) if args.since else None
+    timelines = [build_timeline(execution) for execution in iter_history_files(args.paths)]
+    if args.state_machine_arn or args.state_machine_name:
+        arn = args.state_machine_arn or resolve_state_machine_arn(args.state_machine_name)
+        fetched = fetch_executions(arn, args.status, since, args.max_executions, args.workers)
+        if args.save_history:
+            save_histories(args.save_history, fetched)
+        timelines += [build_timeline(execution) for execution in fetched]
+    if args.status:
+        timelines = [t for t in timelines if t['status'] == args.status]
+    if since is not None:
+        timelines = [t for t in timelines if t['startedAt'] is not None and t['startedAt'] >= since]
+
+    analysis = analyze(timelines, args.slowest)
+    analysis['elapsedSeconds'] = round(time.perf_counter() - started, 3)
+
+    if args.json:
+        print(json.dumps(analysis, indent=2, default=str))
+    else:
+        print_report(analysis)
+        print()
+        print(f"Analyzed {len(timelines)} executions in {analysis['elapsedSeconds']} s")
+
+
+if __name__ == '__main__':
+    main()
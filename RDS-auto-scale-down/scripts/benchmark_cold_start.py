@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+各Lambda関数のコールドスタート時間をローカルで計測するベンチマーク
+
+Lambda関数ごとに新しい Python プロセスを起動し、以下を計測する（API呼び出しは行わない）:
+  - import:       index.py の import にかかる時間（Lambdaの Init 時間に相当）
+  - first_client: ハンドラーが使う boto3 クライアントを初めて生成するのにかかる時間
+                  （初回呼び出し時のオーバーヘッド。LazyClient により初回の API 呼び出し時に発生する）
+  - clients:      ハンドラーが使うクライアント（LazyClient）の一覧
+
+使い方:
+    python3 scripts/benchmark_cold_start.py                      # 全Lambda関数を5回ずつ計測（中央値を表示）
+    python3 scripts/benchmark_cold_start.py --runs 10 --json     # JSONで出力
+    python3 scripts/benchmark_cold_start.py --max-import-ms 150  # import 時間が上限を超えたら終了コード 1
+
+計測値は実行環境に依存するため、同じマシンでの前後比較（リグレッション検知）に使う。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(ROOT, 'lambda_functions')
+LAYER_DIR = os.path.join(LAMBDA_DIR, 'common_layer', 'python')
+
+# 子プロセスで実行する計測コード
+PROBE = r'''
+import importlib.util, json, sys, time
+
+path = sys.argv[1]
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location('index', path)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+import_ms = (time.perf_counter() - start) * 1000
+
+from scaling_common.aws_clients import LazyClient, get_client
+
+services = sorted({
+    value.service for value in vars(module).values() if isinstance(value, LazyClient)
+} | {
+    value.dynamodb.service for value in vars(module).values()
+    if isinstance(getattr(value, 'dynamodb', None), LazyClient)
+})
+eager = sorted(
+    name for name, value in vars(module).items()
+    if type(value).__module__.startswith('botocore.client')
+)
+
+start = time.perf_counter()
+for service in services:
+    get_client(service)
+first_client_ms = (time.perf_counter() - start) * 1000
+
+print(json.dumps({
+    'importMs': import_ms,
+    'firstClientMs': first_client_ms,
+    'clients': services,
+    'eagerClients': eager
+}))
+'''
+
+
+def lambda_names():
+    return sorted(
+        name for name in os.listdir(LAMBDA_DIR)
+        if os.path.isfile(os.path.join(LAMBDA_DIR, name, 'index.py'))
+    )
+
+
+def probe(name):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = LAYER_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    # クライアント生成にリージョンと認証情報が必要（API呼び出しは行わない）
+    env.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    env.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    env.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE, os.path.join(LAMBDA_DIR, name, 'index.py')],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{name}: {result.stderr.strip().splitlines()[-1] if result.stderr else 'probe failed'}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(name, runs):
+    samples = [probe(name) for _ in range(runs)]
+    return {
+        'function': name,
+        'runs': runs,
+        'importMs': round(statistics.median(s['importMs'] for s in samples), 1),
+        'firstClientMs': round(statistics.median(s['firstClientMs'] for s in samples), 1),
+        'clients': samples[0]['clients'],
+        'eagerClients': samples[0]['eagerClients']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure Lambda cold start (import and first client) locally')
+    parser.add_argument('functions', nargs='*', help='Lambda function directories (default: all)')
+    parser.add_argument('--runs', type=int, default=5, help='number of fresh processes per function (median is reported)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--max-import-ms', type=float, help='fail if any import time exceeds this value')
+    args = parser.parse_args()
+
+    results = [benchmark(name, args.runs) for name in (args.functions or lambda_names())]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'function':<24} {'import(ms)':>11} {'first client(ms)':>17}  clients")
+        for r in results:
+            print(f"{r['function']:<24} {r['importMs']:>11} {r['firstClientMs']:>17}  {', '.join(r['clients'])}")
+
+    failures = []
+    for r in results:
+        # import 時に boto3 クライアントを生成しているLambda関数はリグレッションとして扱う
+        if r['eagerClients']:
+            failures.append(f"{r['function']}: clients created at import time: {r['eagerClients']}")
+        if args.max_import_ms is not None and r['importMs'] > args.max_import_ms:
+            failures.append(f"{r['function']}: import {r['importMs']}ms exceeds {args.max_import_ms}ms")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL  {failure}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
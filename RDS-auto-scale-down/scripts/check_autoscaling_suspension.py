@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+実行中の Application Auto Scaling の一時停止・再開（manage-autoscaling）と、
+最終確認の前のクラスターメンバーの再確認（get-cluster-instances の reconcile）をローカルで検証する
+
+シミュレーターの FakeApplicationAutoScaling（シナリオの autoScaling 設定）に対して、実行の開始時に一時停止し、
+成功・失敗のどちらでも実行前の状態に戻ること、一時停止中は AutoScaling による Reader の追加・削除が起きないこと、
+実行中に追加された Reader が全体のリトライなしで変更されることを確認する。AWSへの接続は不要。
+
+使い方:
+    python3 scripts/check_autoscaling_suspension.py              # 全シナリオを実行
+    python3 scripts/check_autoscaling_suspension.py -k resume    # 名前に resume を含むシナリオのみ実行
+    python3 scripts/check_autoscaling_suspension.py -v           # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.asl import StatesError  # noqa: E402
+from simulator.checks import check, entries, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+MANAGE_AUTOSCALING_FUNCTION = 'function:manage_autoscaling'
+
+NOT_SUSPENDED = {
+    'DynamicScalingInSuspended': False,
+    'DynamicScalingOutSuspended': False,
+    'ScheduledScalingSuspended': False
+}
+
+# 実行中に AutoScaling が Reader を追加しようとする（一時停止中は追加されない）
+SCALE_OUT_DURING_RUN = [{
+    'atSeconds': 600,
+    'add': {
+        'id': 'application-autoscaling-sim-cluster-05',
+        'class': 'db.r6g.xlarge',
+        'promotionTier': 15,
+        'role': 'autoscaling-reader'
+    }
+}]
+
+
+def run_scenario(name, **overrides):
+    scenario = load_scenario(name)
+    scenario.update(overrides)
+    simulation = Simulation(scenario)
+    return simulation, simulation.run()
+
+
+def scenario_suspended_during_run_and_restored():
+    simulation, report = run_scenario('baseline', clusterChanges=SCALE_OUT_DURING_RUN)
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    changes = simulation.autoscaling.changes
+    check(len(changes) == 2 and all(changes[0].values()), f"Expected suspend then resume: {changes}")
+    check(report['autoScaling']['suspendedState'] == NOT_SUSPENDED, f"Auto scaling was not resumed: {report['autoScaling']}")
+    check(report['autoScaling']['skippedClusterChanges'] == 1, 'The scale-out should not happen while suspended')
+    check('application-autoscaling-sim-cluster-05' not in report['finalInstances'], 'A reader was added while suspended')
+
+
+def scenario_previous_state_preserved():
+    # 実行前から停止していたスケジュールされたアクションは、実行後も停止したまま
+    previous = dict(NOT_SUSPENDED, ScheduledScalingSuspended=True)
+    _, report = run_scenario('baseline', autoScaling={'suspendedState': previous})
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(report['autoScaling']['suspendedState'] == previous, f"The previous state was not restored: {report['autoScaling']}")
+
+
+def scenario_resumed_after_failure():
+    simulation, report = run_scenario('stuck-reader')
+    check(report['status'] == 'FAILED', f"Expected the execution to fail: {report['status']}")
+    check(report['error']['error'] == 'AutoScalingReaderStatusTimeout', f"The original error was not preserved: {report['error']}")
+    check(entries(report, 'ResumeAutoScalingAfterFailure') == 1, 'Auto scaling was not resumed on the failure path')
+    check(simulation.autoscaling.changes[-1] == NOT_SUSPENDED, f"Auto scaling is still suspended: {simulation.autoscaling.changes}")
+
+
+def scenario_reader_added_mid_run_reconciled():
+    _, report = run_scenario('reader-scale-out')
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(entries(report, 'AdoptReconciledMembers') == 1, 'The added reader was not adopted by the reconciliation')
+    check(entries(report, 'IncrementOverallRetry') == 0, 'The added reader should not need an overall retry')
+    added = report['finalInstances'].get('application-autoscaling-sim-cluster-05')
+    check(added and added['class'] == 'db.r6g.large', f"The added reader was not resized: {added}")
+    check('application-autoscaling-sim-cluster-04' not in report['finalInstances'], 'The removed reader is still listed')
+
+
+def scenario_unregistered_target_is_noop():
+    _, report = run_scenario('baseline', autoScaling={'registered': False})
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(report['apiCalls'].get('application-autoscaling:RegisterScalableTarget', 0) == 0, f"Unexpected calls: {report['apiCalls']}")
+    check(report['apiCalls'].get('application-autoscaling:DescribeScalableTargets') == 1, 'Resume should not describe the target again')
+
+
+def scenario_suspend_failure_does_not_block():
+    # 一時停止できない場合もスケーリングは行う（再開もしない）
+    faults = [{'service': 'application-autoscaling', 'operation': 'DescribeScalableTargets', 'code': 'AccessDeniedException', 'count': 10}]
+    simulation, report = run_scenario('baseline', faults=faults)
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(entries(report, 'AutoScalingNotSuspended') == 1, 'The suspend failure was not caught')
+    check(not simulation.autoscaling.changes, f"The suspended state should not change: {simulation.autoscaling.changes}")
+
+
+def scenario_aborted_execution_resumes():
+    simulation = Simulation(load_scenario('baseline'))
+    cluster_identifier = simulation.rds.cluster['DBClusterIdentifier']
+    with simulation.fake_aws():
+        response, _ = simulation.invoke_lambda(MANAGE_AUTOSCALING_FUNCTION, {'clusterIdentifier': cluster_identifier, 'action': 'suspend'})
+        check(not isinstance(response, StatesError) and response['suspended'], f"Suspend failed: {response}")
+
+        # 中止された実行の EventBridge イベント（実行の入力にクラスター識別子がある）
+        event = {
+            'source': 'aws.states',
+            'detail-type': 'Step Functions Execution Status Change',
+            'detail': {
+                'name': 'aborted-execution',
+                'status': 'ABORTED',
+                'input': json.dumps({'clusterIdentifier': cluster_identifier, 'targetClass': 'db.r6g.large'})
+            }
+        }
+        response, _ = simulation.invoke_lambda(MANAGE_AUTOSCALING_FUNCTION, event)
+    check(not isinstance(response, StatesError) and response['action'] == 'resume', f"Resume failed: {response}")
+    check(simulation.autoscaling.changes[-1] == NOT_SUSPENDED, f"Auto scaling is still suspended: {simulation.autoscaling.changes}")
+
+
+SCENARIOS = [
+    scenario_suspended_during_run_and_restored,
+    scenario_previous_state_preserved,
+    scenario_resumed_after_failure,
+    scenario_reader_added_mid_run_reconciled,
+    scenario_unregistered_target_is_noop,
+    scenario_suspend_failure_does_not_block,
+    scenario_aborted_execution_resumes,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate the Application Auto Scaling suspension and member reconciliation against the simulator')
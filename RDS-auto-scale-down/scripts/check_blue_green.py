@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Blue/Green デプロイによるスケーリング（scalingStrategy: "blue-green"、blue-green-deployment）をローカルで検証する
+
+シミュレーターの FakeRds に対して、グリーン環境の作成・スイッチオーバー・切り替え前のクラスター（-old1）の削除で
+インスタンスの変更・フェイルオーバーなしに全インスタンスが変更先のタイプになること、
+グリーン環境の作成・スイッチオーバーに失敗した場合はグリーン環境を削除してブルー環境のまま失敗すること、
+切り替え前のクラスターを残すデフォルト（blue_green_delete_old_cluster = false）と削除保護、デプロイの作成の再実行を確認する。
+AWSへの接続は不要。
+
+使い方:
+    python3 scripts/check_blue_green.py              # 全シナリオを実行
+    python3 scripts/check_blue_green.py -k switch    # 名前に switch を含むシナリオのみ実行
+    python3 scripts/check_blue_green.py -v           # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.asl import StatesError  # noqa: E402
+from simulator.checks import check, entries, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+BLUE_GREEN_FUNCTION = 'function:blue_green_deployment'
+TARGET_CLASS = 'db.r6g.large'
+ORIGINAL_CLASS = 'db.r6g.xlarge'
+CLUSTER = 'sim-cluster'
+OLD_CLUSTER = f"{CLUSTER}-old1"
+
+
+def blue_green_scenario(**overrides):
+    scenario = load_scenario('blue-green')
+    for key, value in overrides.items():
+        scenario[key] = dict(scenario.get(key, {}), **value)
+    return scenario
+
+
+def check_blue_unchanged(report):
+    final = report['finalInstances']
+    check({i['class'] for i in final.values()} == {ORIGINAL_CLASS}, f"The blue environment was changed: {final}")
+    check(final[f"{CLUSTER}-writer"]['writer'], f"The writer moved: {final}")
+
+
+def scenario_switches_over_and_deletes_blue():
+    simulation = Simulation(load_scenario('blue-green'), variables={'blue_green_delete_old_cluster': True})
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    final = report['finalInstances']
+    check({i['class'] for i in final.values()} == {TARGET_CLASS}, f"Not every instance is at {TARGET_CLASS}: {final}")
+    check({i['status'] for i in final.values()} == {'available'}, f"Not every instance is available: {final}")
+    check(final[f"{CLUSTER}-writer"]['writer'], f"The writer identifier changed: {final}")
+    for operation in ('rds:ModifyDBInstance', 'rds:FailoverDBCluster'):
+        check(operation not in report['apiCalls'], f"{operation} should not be called: {report['apiCalls']}")
+    blue_green = report['blueGreen']
+    check(len(blue_green['switchovers']) == 1, f"Expected one switchover: {blue_green}")
+    check(not blue_green['deployments'], f"The deployment was not deleted: {blue_green}")
+    deleted = blue_green['deletedClusters']
+    check([c['clusterIdentifier'] for c in deleted] == [OLD_CLUSTER], f"Unexpected deleted clusters: {deleted}")
+    check((deleted[0]['finalSnapshotIdentifier'] or '').startswith(f"{OLD_CLUSTER}-final-"), f"No final snapshot: {deleted}")
+    check(not blue_green['remainingClusters'], f"Clusters left behind: {blue_green}")
+    # グリーン環境の作成・スイッチオーバーの所要時間が履歴の要約に追加される
+    history = simulation.resize_history_summary()
+    check(len(history['blue-green-provision']) == 4 and len(history['blue-green-switchover']) == 4, f"History not updated: {history}")
+
+
+def scenario_plan_lists_blue_green_steps():
+    plan = Simulation(load_scenario('blue-green')).plan()
+    check(plan['strategy'] == 'blue-green', f"Unexpected strategy: {plan['strategy']}")
+    check([s['action'] for s in plan['steps']] == ['create-green', 'switchover', 'delete-blue'], f"Unexpected steps: {plan['steps']}")
+    check(not plan['failoverRequired'], 'A blue/green plan should not fail over')
+    # 履歴の中央値: グリーン環境の作成 1700 秒 + スイッチオーバー 60 秒
+    check(plan['estimatedDurationSeconds'] == 1760, f"Unexpected estimate: {plan['estimatedDurationSeconds']}")
+
+
+def scenario_switchover_timeout_keeps_blue():
+    # レプリケーションが SwitchoverTimeout（300秒）までに追いつかない: RDS が切り替えを取り消す
+    simulation = Simulation(blue_green_scenario(latency={'switchoverSeconds': 900}))
+    report = simulation.run()
+    check(report['status'] == 'FAILED', f"Expected the execution to fail: {report['status']}")
+    check(report['error']['error'] == 'BlueGreenSwitchoverFailed', f"Unexpected error: {report['error']}")
+    check_blue_unchanged(report)
+    check(entries(report, 'AbortBlueGreenDeployment') == 1, 'The green environment should be deleted')
+    blue_green = report['blueGreen']
+    check(not blue_green['deployments'], f"The deployment was not deleted: {blue_green}")
+    deleted = [c['clusterIdentifier'] for c in blue_green['deletedClusters']]
+    check(len(deleted) == 1 and deleted[0].startswith(f"{CLUSTER}-green-"), f"Only the green cluster should be deleted: {deleted}")
+    check(entries(report, 'ResumeAutoScalingAfterFailure') == 1, 'Application Auto Scaling was not resumed')
+
+
+def scenario_provisioning_failure_keeps_blue():
+    simulation = Simulation(blue_green_scenario(cluster={'failedBlueGreenProvisions': 1}))
+    report = simulation.run()
+    check(report['status'] == 'FAILED', f"Expected the execution to fail: {report['status']}")
+    check(report['error']['error'] == 'BlueGreenProvisioningFailed', f"Unexpected error: {report['error']}")
+    check_blue_unchanged(report)
+    check(entries(report, 'SwitchoverBlueGreenDeployment') == 0, 'Switchover should not be attempted')
+    check(not report['blueGreen']['deployments'], f"The deployment was not deleted: {report['blueGreen']}")
+
+
+def scenario_provisioning_timeout_keeps_blue():
+    simulation = Simulation(load_scenario('blue-green'), variables={'blue_green_timeout_seconds': 600})
+    report = simulation.run()
+    check(report['status'] == 'FAILED', f"Expected the execution to fail: {report['status']}")
+    check(report['error']['error'] == 'BlueGreenProvisioningTimeout', f"Unexpected error: {report['error']}")
+    check_blue_unchanged(report)
+    check(not report['blueGreen']['deployments'], f"The deployment was not deleted: {report['blueGreen']}")
+
+
+def scenario_requires_logical_replication():
+    simulation = Simulation(blue_green_scenario(cluster={'logicalReplication': False}))
+    report = simulation.run()
+    check(report['status'] == 'FAILED', f"Expected the execution to fail: {report['status']}")
+    check('rds.logical_replication' in json.dumps(report['error']), f"Unexpected error: {report['error']}")
+    check('rds:CreateBlueGreenDeployment' not in report['apiCalls'], f"A deployment was created: {report['apiCalls']}")
+    check_blue_unchanged(report)
+    # パラメータグループを変更しても、Writer を再起動するまでは作成しない
+    simulation = Simulation(blue_green_scenario(cluster={'parameterGroupStatus': 'pending-reboot'}))
+    event = {'action': 'create', 'clusterIdentifier': CLUSTER, 'targetClass': TARGET_CLASS, 'executionName': 'run-1'}
+    with simulation.fake_aws():
+        response, _ = simulation.invoke_lambda(BLUE_GREEN_FUNCTION, event)
+    check(isinstance(response, StatesError) and 'reboot the writer' in response.cause, f"Expected a refusal: {response}")
+    check(not simulation.rds.blue_green_deployments, f"A deployment was created: {simulation.rds.blue_green_deployments}")
+
+
+def scenario_keeps_old_cluster_by_default():
+    simulation = Simulation(load_scenario('blue-green'))
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(report['blueGreen']['remainingClusters'] == [OLD_CLUSTER], f"The old cluster should be kept: {report['blueGreen']}")
+    for operation in ('rds:DeleteDBInstance', 'rds:DeleteDBCluster'):
+        check(operation not in report['apiCalls'], f"{operation} should not be called by default: {report['apiCalls']}")
+
+
+def scenario_deletes_blue_next_to_retained_cluster():
+    # 前回の実行で残した -old1 がある場合、RDS は切り替え前のクラスターを -old2 にする
+    simulation = Simulation(load_scenario('blue-green'), variables={'blue_green_delete_old_cluster': True})
+    simulation.rds.other_clusters[OLD_CLUSTER] = {
+        'cluster': dict(simulation.rds.cluster, DBClusterIdentifier=OLD_CLUSTER, DBClusterArn=simulation.rds.cluster_arn(OLD_CLUSTER),
+                        DbClusterResourceId='cluster-previous-run'),
+        'instances': {}, 'sourceIds': {}, 'writer': None
+    }
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    deleted = [c['clusterIdentifier'] for c in report['blueGreen']['deletedClusters']]
+    check(deleted == [f"{CLUSTER}-old2"], f"Unexpected deleted clusters: {deleted}")
+    check(report['blueGreen']['remainingClusters'] == [OLD_CLUSTER], f"The retained cluster was touched: {report['blueGreen']}")
+
+
+def scenario_deletion_protection_keeps_old_cluster():
+    simulation = Simulation(blue_green_scenario(cluster={'deletionProtection': True}), variables={'blue_green_delete_old_cluster': True})
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(report['blueGreen']['remainingClusters'] == [OLD_CLUSTER], f"The old cluster should be kept: {report['blueGreen']}")
+    check('rds:DeleteDBCluster' not in report['apiCalls'], f"A protected cluster was deleted: {report['apiCalls']}")
+
+
+def scenario_already_at_target_skips_deployment():
+    simulation = Simulation(blue_green_scenario(input={'targetClass': ORIGINAL_CLASS}))
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(entries(report, 'CreateBlueGreenDeployment') == 0, 'No deployment should be created when nothing changes')
+
+
+def scenario_create_is_idempotent():
+    simulation = Simulation(load_scenario('blue-green'))
+    event = {'action': 'create', 'clusterIdentifier': CLUSTER, 'targetClass': TARGET_CLASS, 'executionName': 'run-1'}
+    with simulation.fake_aws():
+        first, _ = simulation.invoke_lambda(BLUE_GREEN_FUNCTION, event)
+        second, _ = simulation.invoke_lambda(BLUE_GREEN_FUNCTION, event)
+        other, _ = simulation.invoke_lambda(BLUE_GREEN_FUNCTION, dict(event, executionName='run-2'))
+    check(not isinstance(first, StatesError) and first['created'], f"Unexpected first response: {first}")
+    check(not isinstance(second, StatesError) and not second['created'], f"The re-run created a deployment again: {second}")
+    check(second['blueGreenDeploymentIdentifier'] == first['blueGreenDeploymentIdentifier'], 'The re-run found another deployment')
+    check(isinstance(other, StatesError) and 'already has' in other.cause, f"Expected a refusal for another execution: {other}")
+    check(len(simulation.rds.blue_green_deployments) == 1, f"Unexpected deployments: {simulation.rds.blue_green_deployments}")
+
+
+def scenario_cleanup_refuses_before_switchover():
+    simulation = Simulation(load_scenario('blue-green'))
+    event = {'clusterIdentifier': CLUSTER, 'targetClass': TARGET_CLASS, 'executionName': 'run-1'}
+    with simulation.fake_aws():
+        created, _ = simulation.invoke_lambda(BLUE_GREEN_FUNCTION, dict(event, action='create'))
+        response, _ = simulation.invoke_lambda(
+            BLUE_GREEN_FUNCTION, dict(event, action='cleanup', sourceClusterResourceId=created['sourceClusterResourceId'])
+        )
+    check(isinstance(response, StatesError) and 'before switchover' in response.cause, f"Expected a refusal: {response}")
+    check(not simulation.rds.deleted_clusters, f"A cluster was deleted: {simulation.rds.deleted_clusters}")
+
+
+def scenario_default_strategy_is_in_place():
+    report = Simulation(load_scenario('baseline')).run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(entries(report, 'CreateBlueGreenDeployment') == 0, 'The in-place strategy should not create a deployment')
+    check('rds:ModifyDBInstance' in report['apiCalls'], f"Instances were not modified in place: {report['apiCalls']}")
+
+
+SCENARIOS = [
+    scenario_switches_over_and_deletes_blue,
+    scenario_plan_lists_blue_green_steps,
+    scenario_switchover_timeout_keeps_blue,
+    scenario_provisioning_failure_keeps_blue,
+    scenario_provisioning_timeout_keeps_blue,
+    scenario_requires_logical_replication,
+    scenario_keeps_old_cluster_by_default,
+    scenario_deletes_blue_next_to_retained_cluster,
+    scenario_deletion_protection_keeps_old_cluster,
+    scenario_already_at_target_skips_deployment,
+    scenario_create_is_idempotent,
+    scenario_cleanup_refuses_before_switchover,
+    scenario_default_strategy_is_in_place,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate the blue/green scaling strategy (blue-green-deployment) against the simulator')
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+変更先のインスタンスタイプの推奨（targetClass: "auto"、scaling_common.class_recommender）をローカルで検証する
+
+シミュレーターの FakeCloudWatch が合成したメトリクスの時系列（夜間のバッチ処理、接続数・メモリの多いクラスター、
+レプリカラグ、データ不足など）に対して、推奨されるインスタンスタイプと GetMetricData の呼び出し方を確認する。
+AWSへの接続は不要。
+
+使い方:
+    python3 scripts/check_class_recommender.py              # 全シナリオを実行
+    python3 scripts/check_class_recommender.py -k batch     # 名前に batch を含むシナリオのみ実行
+    python3 scripts/check_class_recommender.py -v           # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import copy
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.checks import check, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+from scaling_common import class_recommender, metric_data  # noqa: E402
+from scaling_common.aws_clients import LazyClient  # noqa: E402
+
+SCHEDULER_FUNCTION = 'function:schedule_scaling'
+
+# 日中は忙しく、オフピーク（0:00-7:00 JST）はほぼアイドルのクラスター（db.r6g.xlarge: 4 vCPU / 32 GiB）
+IDLE_METRICS = {
+    'days': 14,
+    'default': {
+        'cpu': {'peak': 55, 'offPeak': 3},
+        'freeableMemoryGiB': {'peak': 8, 'offPeak': 12},
+        'connections': {'peak': 400, 'offPeak': 20},
+        'replicaLagMs': {'peak': 40, 'offPeak': 15}
+    }
+}
+
+
+def auto_scenario(metrics=None, **overrides):
+    scenario = load_scenario('baseline')
+    scenario['targetClass'] = class_recommender.AUTO_TARGET_CLASS
+    scenario['metrics'] = copy.deepcopy(metrics or IDLE_METRICS)
+    scenario.update(overrides)
+    return scenario
+
+
+def with_profile(**profile):
+    """
+    IDLE_METRICS の default に項目を追加・上書きした metrics 設定
+    """
+    metrics = copy.deepcopy(IDLE_METRICS)
+    metrics['default'].update(profile)
+    return metrics
+
+
+def plan_recommendation(scenario):
+    simulation = Simulation(scenario)
+    plan = simulation.plan()
+    check('recommendation' in plan, f"Plan has no recommendation: {plan}")
+    return simulation, plan, plan['recommendation']
+
+
+def scenario_off_peak_window_grouping():
+    # 日をまたぐ時間帯（22:00-06:00 JST）: 23:00 と翌 05:00 は同じ晩、07:00 は対象外
+    window = class_recommender.parse_window('22:00-06:00')
+    jst = timezone(timedelta(hours=9))
+    night = class_recommender.night_of(datetime(2025, 1, 10, 23, 0, tzinfo=jst), window)
+    check(night == class_recommender.night_of(datetime(2025, 1, 11, 5, 55, tzinfo=jst), window), 'Points after midnight belong to the previous night')
+    check(class_recommender.night_of(datetime(2025, 1, 11, 7, 0, tzinfo=jst), window) is None, '07:00 is outside the window')
+
+    # 5分間隔の 8 時間分: 1晩目は 0..95、2晩目は 10 倍。晩ごとの p95 の最大値は 2晩目の p95
+    start = datetime(2025, 1, 10, 22, 0, tzinfo=jst)
+    timestamps = [start + timedelta(minutes=5 * i) for i in range(96)] + [start + timedelta(days=1, minutes=5 * i) for i in range(96)]
+    values = list(range(96)) + [10 * i for i in range(96)]
+    nights = class_recommender.nightly_percentiles(timestamps, values, window, 95)
+    check(len(nights) == 2, f"Expected two nights, got {sorted(nights)}")
+    check(abs(max(nights.values()) - 902.5) < 1e-6, f"Unexpected p95 of the second night: {nights}")
+    check(abs(min(nights.values()) - 90.25) < 1e-6, f"Unexpected p95 of the first night: {nights}")
+
+
+def scenario_idle_cluster_recommends_smallest_class():
+    _, plan, recommendation = plan_recommendation(auto_scenario())
+    check(recommendation['source'] == 'metrics', f"Unexpected source: {recommendation}")
+    check(recommendation['targetClass'] == 'db.t4g.medium', f"Expected db.t4g.medium, got {recommendation['targetClass']}")
+    check(plan['targetClass'] == 'db.t4g.medium' and plan['changeRequired'], f"Plan does not use the recommendation: {plan['targetClass']}")
+    check(all(summary['nights'] == 14 for summary in recommendation['instances'].values()), 'Every instance should have 14 nights of metrics')
+
+
+def scenario_overnight_batch_keeps_larger_class():
+    # 毎晩 2:00-3:00 に Writer で CPU 30%（db.r6g.xlarge の 1.2 vCPU）のバッチ処理
+    metrics = copy.deepcopy(IDLE_METRICS)
+    metrics['roles'] = {'writer': {'batch': {'startHour': 2, 'hours': 1, 'cpu': 30}}}
+    _, _, recommendation = plan_recommendation(auto_scenario(metrics))
+    check(recommendation['targetClass'] == 'db.r6g.large', f"Expected db.r6g.large, got {recommendation['targetClass']}")
+    shortfalls = {c['instanceClass']: c['shortfalls'] for c in recommendation['candidates']}
+    check(shortfalls['db.t4g.large'] == ['cpu'], f"db.t4g.large should be rejected for CPU only: {shortfalls}")
+
+
+def scenario_connection_heavy_cluster():
+    # 500 接続: db.t4g.medium（max_connections 450）では足りない
+    _, _, recommendation = plan_recommendation(auto_scenario(with_profile(connections={'peak': 800, 'offPeak': 500})))
+    check(recommendation['targetClass'] == 'db.t4g.large', f"Expected db.t4g.large, got {recommendation['targetClass']}")
+    shortfalls = {c['instanceClass']: c['shortfalls'] for c in recommendation['candidates']}
+    check(shortfalls['db.t4g.medium'] == ['connections'], f"Unexpected shortfalls: {shortfalls}")
+
+
+def scenario_memory_heavy_cluster():
+    # FreeableMemory 7.5 GiB（db.r6g.xlarge、揺らぎを含めた p5 は約 6.8 GiB）: shared_buffers 以外に約 3.4 GiB を使用
+    _, _, recommendation = plan_recommendation(auto_scenario(with_profile(freeableMemoryGiB={'peak': 5, 'offPeak': 7.5})))
+    check(recommendation['targetClass'] == 'db.r6g.large', f"Expected db.r6g.large, got {recommendation['targetClass']}")
+    check(3.0 < recommendation['requirements']['workMemoryGiB'] < 4.0, f"Unexpected memory requirement: {recommendation['requirements']}")
+
+
+def scenario_replica_lag_blocks_downsizing():
+    metrics = copy.deepcopy(IDLE_METRICS)
+    metrics['roles'] = {'autoscaling-reader': {'replicaLagMs': {'peak': 500, 'offPeak': 3000}}}
+    _, plan, recommendation = plan_recommendation(auto_scenario(metrics))
+    check(recommendation['targetClass'] == 'db.r6g.xlarge', f"Expected the current writer class, got {recommendation['targetClass']}")
+    check(not plan['changeRequired'], 'No change should be required when downsizing is blocked')
+    shortfalls = {c['instanceClass']: c['shortfalls'] for c in recommendation['candidates']}
+    check('replicaLag' in shortfalls['db.t4g.medium'], f"Replica lag was not reported: {shortfalls}")
+
+
+def scenario_insufficient_data_falls_back():
+    metrics = copy.deepcopy(IDLE_METRICS)
+    metrics['days'] = 2
+    _, plan, recommendation = plan_recommendation(auto_scenario(metrics))
+    check(recommendation['source'] == 'fallback', f"Expected a fallback, got {recommendation}")
+    check(recommendation['targetClass'] == class_recommender.DEFAULT_TARGET_CLASS, f"Unexpected fallback class: {recommendation['targetClass']}")
+    check(plan['targetClass'] == class_recommender.DEFAULT_TARGET_CLASS, f"Plan does not use the fallback: {plan['targetClass']}")
+
+
+def scenario_metrics_batched_and_paginated():
+    # 150 インスタンス x 4 メトリクス = 600 クエリ -> 500 + 100 の2回に分け、各回は NextToken でページング
+    metrics = copy.deepcopy(IDLE_METRICS)
+    metrics.update({'days': 3, 'maxDatapointsPerPage': 50000})
+    scenario = auto_scenario(metrics)
+    scenario['cluster']['autoScalingReaders'] = 148
+    simulation = Simulation(scenario)
+    instance_ids = sorted(simulation.rds.instances)
+    with simulation.fake_aws():
+        series = class_recommender.fetch_instance_metrics(LazyClient('cloudwatch'), instance_ids, 14)
+
+    requests = simulation.cloudwatch.requests
+    batches = [r['queries'] for r in requests if r['nextToken'] is None]
+    check(batches == [500, 100], f"Unexpected GetMetricData batches: {batches}")
+    check(len(requests) > len(batches), f"Expected NextToken pagination, got {len(requests)} requests")
+    check(all(r['queries'] <= metric_data.MAX_QUERIES_PER_REQUEST for r in requests), 'Too many queries in one request')
+
+    # ページの境界で欠けたり重複したりしない（3日分 = 864 点、Writer のレプリカラグはなし）
+    for instance_id, metrics_by_key in series.items():
+        for key, (timestamps, values) in metrics_by_key.items():
+            expected = 0 if key == 'replicaLag' and instance_id == simulation.rds.writer_instance_id else 864
+            check(len(timestamps) == len(values) == expected, f"{instance_id} {key}: {len(timestamps)} points (expected {expected})")
+            check(timestamps == sorted(timestamps), f"{instance_id} {key} is not in ascending order")
+
+
+def scenario_fleet_plan_recommends_per_cluster():
+    simulation = Simulation(auto_scenario())
+    cluster_identifier = simulation.rds.cluster['DBClusterIdentifier']
+    event = {'fleet': {'clusterIdentifiers': [cluster_identifier]}, 'targetClass': 'auto', 'plan': True}
+    with simulation.fake_aws():
+        response, _ = simulation.invoke_lambda(SCHEDULER_FUNCTION, event)
+    body = json.loads(response['body'])
+    check(body['plannedCount'] == 1, f"Expected one planned cluster: {body['message']}")
+    plan = body['clusters'][0]
+    check(plan['targetClass'] == 'db.t4g.medium' and plan['recommendation']['source'] == 'metrics', f"Unexpected fleet plan: {plan['targetClass']}")
+
+
+def scenario_end_to_end_auto_target_class():
+    simulation = Simulation(auto_scenario())
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    classes = {instance['class'] for instance in report['finalInstances'].values()}
+    check(classes == {'db.t4g.medium'}, f"Instances were not resized to the recommended class: {classes}")
+    check(report['apiCalls'].get('cloudwatch:GetMetricData', 0) >= 1, f"GetMetricData was not called: {report['apiCalls']}")
+
+
+SCENARIOS = [
+    scenario_off_peak_window_grouping,
+    scenario_idle_cluster_recommends_smallest_class,
+    scenario_overnight_batch_keeps_larger_class,
+    scenario_connection_heavy_cluster,
+    scenario_memory_heavy_cluster,
+    scenario_replica_lag_blocks_downsizing,
+    scenario_insufficient_data_falls_back,
+    scenario_metrics_batched_and_paginated,
+    scenario_fleet_plan_recommends_per_cluster,
+    scenario_end_to_end_auto_target_class,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate the metric-driven target class recommendation on synthetic metric series')
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+リサイズ・フェイルオーバーの所要時間の履歴（scaling_common/duration_history.py）をローカルで検証する
+
+シミュレーターの FakeDynamoDB（パーティションキー + ソートキー、query のページング）に対して、
+modify-instance / failover-cluster が開始を、check-instance-status / check-failover-status が完了を記録し、
+クラスター・エンジンバージョン・変更ごとのサンプルとして保存すること、
+サンプル数の上限・保持期間（TTL）、履歴の要約への追加・直近のサンプル数の上限、遅いリサイズの判定（SlowResizes）を確認する。
+AWSへの接続は不要。
+
+使い方:
+    python3 scripts/check_duration_history.py               # 全シナリオを実行
+    python3 scripts/check_duration_history.py -k slow       # 名前に slow を含むシナリオのみ実行
+    python3 scripts/check_duration_history.py -v            # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import copy
+import os
+import sys
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.fake_aws import FakeDynamoDB  # noqa: E402
+from simulator.checks import check, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+from scaling_common import clock, resize_history  # noqa: E402
+from scaling_common.duration_history import (  # noqa: E402
+    DynamoDBDurationHistoryStore, InMemoryDurationHistoryStore, duration_stats, history_key, instance_start_key
+)
+
+CLUSTER = 'sim-cluster'
+ENGINE_VERSION = '15.4'
+TRANSITION = 'db.r6g.xlarge->db.r6g.large'
+RESIZE_KEY = history_key(CLUSTER, ENGINE_VERSION, TRANSITION)
+FAILOVER_HISTORY_KEY = history_key(CLUSTER, ENGINE_VERSION, 'failover')
+
+
+def history_table(simulation):
+    return simulation.terraform.lambda_environment('modify_instance')['DURATION_HISTORY_TABLE']
+
+
+def stored_items(simulation):
+    return list(simulation.dynamodb.tables.get(history_table(simulation), {}).values())
+
+
+def samples_of(simulation, key):
+    return sorted(
+        (item for item in stored_items(simulation) if item['historyKey']['S'] == key),
+        key=lambda item: item['sampleKey']['S']
+    )
+
+
+def run(scenario_name, completion_mode='polling', variables=None, seed_items=None):
+    scenario = copy.deepcopy(load_scenario(scenario_name))
+    scenario.setdefault('input', {})['completionMode'] = completion_mode
+    simulation = Simulation(scenario, variables=variables)
+    for item in seed_items or []:
+        simulation.dynamodb.put_item(TableName=history_table(simulation), Item=item)
+    report = simulation.run()
+    return simulation, report
+
+
+def seeded_sample(index, seconds):
+    finished_at = 1700000000 + index * 3600
+    return {
+        'historyKey': {'S': RESIZE_KEY},
+        'sampleKey': {'S': f"{finished_at:012d}#seed-{index}"},
+        'durationSeconds': {'N': str(seconds)},
+        'startedAt': {'N': str(finished_at - seconds)},
+        'finishedAt': {'N': str(finished_at)},
+        'expiresAt': {'N': str(finished_at + 86400)},
+        'transition': {'S': TRANSITION}
+    }
+
+
+def scenario_resizes_recorded_per_cluster_engine_and_transition():
+    simulation, report = run('baseline')
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    samples = samples_of(simulation, RESIZE_KEY)
+    check(len(samples) == len(report['resizes']), f"Expected one sample per resize: {len(samples)} / {len(report['resizes'])}")
+    actual = {r['instanceId']: r['seconds'] for r in report['resizes']}
+    for item in samples:
+        instance_id = item['resourceId']['S']
+        recorded = int(item['durationSeconds']['N'])
+        # 完了はステータス確認で観測するため、実際の所要時間よりポーリングの間隔の分だけ長くなりうる
+        check(actual[instance_id] - 1 <= recorded <= actual[instance_id] + 300, f"{instance_id}: recorded {recorded}, actual {actual[instance_id]}")
+        check(item['executionName']['S'] == simulation.execution_name, f"Missing execution name: {item}")
+    starts = [item for item in stored_items(simulation) if item['sampleKey']['S'] == 'start']
+    check(not starts, f"Start records left after the run: {starts}")
+
+
+def scenario_failover_recorded():
+    simulation, report = run('baseline')
+    samples = samples_of(simulation, FAILOVER_HISTORY_KEY)
+    check(len(samples) == 1, f"Expected one failover sample: {samples}")
+    check(samples[0]['resourceId']['S'] == 'sim-cluster-dedicated-reader', f"Unexpected failover target: {samples[0]}")
+    check(0 < int(samples[0]['durationSeconds']['N']) < 600, f"Unexpected failover duration: {samples[0]}")
+
+
+def scenario_event_mode_records_close_to_actual():
+    simulation, report = run('baseline', completion_mode='event')
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    actual = {r['instanceId']: r['seconds'] for r in report['resizes']}
+    samples = samples_of(simulation, RESIZE_KEY)
+    check(len(samples) == len(actual), f"Expected one sample per resize: {len(samples)} / {len(actual)}")
+    for item in samples:
+        instance_id = item['resourceId']['S']
+        recorded = int(item['durationSeconds']['N'])
+        check(abs(recorded - actual[instance_id]) <= 30, f"{instance_id}: recorded {recorded}, actual {actual[instance_id]}")
+
+
+def scenario_summary_feeds_estimates():
+    simulation, report = run('baseline')
+    summary = simulation.resize_history_summary()
+    durations = sorted(int(item['durationSeconds']['N']) for item in samples_of(simulation, RESIZE_KEY))
+    check(sorted(summary.get(TRANSITION, [])) == durations, f"Summary does not match the samples: {summary}")
+    check(len(summary.get('failover', [])) == 1, f"Failover missing from the summary: {summary}")
+    # 記録した履歴で、変更前の構成の次の実行を見積もる
+    scenario = copy.deepcopy(load_scenario('baseline'))
+    scenario['resizeHistory'] = summary
+    plan = Simulation(scenario).plan()
+    expected = duration_stats(durations, ranks=(50,))['p50']
+    step = next(s for s in plan['steps'] if s.get('phase') == 'dedicated-reader')
+    check(abs(step['estimatedSeconds'] - expected) <= 1, f"Plan does not use the recorded history: {step} (p50 {expected})")
+
+
+def scenario_summary_keeps_newest_samples():
+    dynamodb = FakeDynamoDB({'history': ['historyKey', 'sampleKey']})
+    os.environ['DURATION_HISTORY_TABLE'] = 'history'
+    try:
+        # 同じ変更の追加が重なっても失われず、直近 SUMMARY_MAX_SAMPLES 件のみ残る
+        limit = resize_history.SUMMARY_MAX_SAMPLES
+        for seconds in range(limit + 5):
+            resize_history.append_resize_history(dynamodb, [
+                {'transition': TRANSITION, 'durationSeconds': 600 + seconds},
+                {'transition': 'failover', 'durationSeconds': 30}
+            ])
+        history = resize_history.load_resize_history(dynamodb)
+        check(history[TRANSITION] == list(range(605, 600 + limit + 5)), f"Unexpected summary: {history[TRANSITION]}")
+        check(len(history['failover']) == limit, f"Unexpected failover summary: {history['failover']}")
+        # 件数が変わっていた場合（同時に追加された場合）は削除しない
+        key = {'historyKey': {'S': resize_history.SUMMARY_HISTORY_KEY}, 'sampleKey': {'S': TRANSITION}}
+        resize_history.trim_summary(dynamodb, 'history', key, limit + 1)
+        check(len(dynamodb.get_item(TableName='history', Key=key)['Item']['samples']['L']) == limit, 'Trimmed a changed summary')
+    finally:
+        del os.environ['DURATION_HISTORY_TABLE']
+        resize_history._cache['history'] = None
+
+
+def scenario_failover_retry_waits_past_median():
+    # 中央値（45秒）を過ぎても、p90 と下限（300秒）を過ぎるまではフェイルオーバーの再実行を要求しない
+    scenario = copy.deepcopy(load_scenario('baseline'))
+    scenario['resizeHistory'] = {'failover': [40, 45, 50]}
+    simulation = Simulation(scenario)
+    responses = {}
+    with simulation.fake_aws():
+        for elapsed in (200, 400):
+            started = (clock.now() - timedelta(seconds=elapsed)).isoformat()
+            responses[elapsed], _ = simulation.invoke_lambda('function:check_failover_status', {
+                'clusterIdentifier': CLUSTER, 'targetInstanceId': f"{CLUSTER}-dedicated-reader", 'phaseStartTime': started
+            })
+    check(not responses[200]['failoverRequired'], f"Failover re-requested after the median: {responses[200]}")
+    check(responses[400]['failoverRequired'], f"Failover not re-requested after the retry bound: {responses[400]}")
+
+
+def scenario_stuck_resize_leaves_only_start():
+    simulation, report = run('stuck-reader')
+    check(report['status'] == 'FAILED', f"Execution ended with {report['status']}")
+    starts = [item for item in stored_items(simulation) if item['sampleKey']['S'] == 'start']
+    check(len(starts) == 1, f"Expected the stuck reader's start record only: {starts}")
+    check(int(starts[0]['expiresAt']['N']) - int(starts[0]['startedAt']['N']) == 86400, f"Start records should expire after a day: {starts[0]}")
+    stuck_id = starts[0]['resourceId']['S']
+    check(all(item['resourceId']['S'] != stuck_id for item in samples_of(simulation, RESIZE_KEY)), 'The stuck reader was recorded as finished')
+
+
+def scenario_retention_sets_expiry():
+    simulation, report = run('baseline', variables={'duration_history_retention_days': 30})
+    for item in samples_of(simulation, RESIZE_KEY) + samples_of(simulation, FAILOVER_HISTORY_KEY):
+        ttl = int(item['expiresAt']['N']) - int(item['finishedAt']['N'])
+        check(ttl == 30 * 86400, f"Unexpected expiry: {ttl} seconds")
+
+
+def scenario_compaction_keeps_newest_samples():
+    now = [1737212400.0]
+    clock.set_time_source(lambda: now[0], lambda seconds: None)
+    try:
+        settings = {'retentionDays': 180, 'maxSamples': 3, 'slowFactor': 2.0}
+        dynamodb = FakeDynamoDB({'history': ['historyKey', 'sampleKey']}, page_size=2)
+        stores = [DynamoDBDurationHistoryStore(dynamodb, 'history'), InMemoryDurationHistoryStore()]
+        for store in stores:
+            for index in range(5):
+                start = {
+                    'historyKey': RESIZE_KEY, 'transition': TRANSITION, 'clusterIdentifier': CLUSTER,
+                    'engineVersion': ENGINE_VERSION, 'resourceId': f"reader-{index}"
+                }
+                store.record_start(instance_start_key(f"reader-{index}"), start)
+                now[0] += 600 + index
+                sample = store.record_finish(instance_start_key(f"reader-{index}"), settings)
+                check(sample['durationSeconds'] == 600 + index, f"Unexpected sample: {sample}")
+            kept = store.samples(RESIZE_KEY)
+            check([s['durationSeconds'] for s in kept] == [602, 603, 604], f"{type(store).__name__} kept {kept}")
+            check(store.record_finish(instance_start_key('reader-0'), settings) is None, 'A finish without a start was recorded')
+    finally:
+        clock.reset_time_source()
+
+
+def scenario_slow_resize_reported():
+    fast = [seeded_sample(index, 200) for index in range(5)]
+    simulation, report = run('baseline', seed_items=fast)
+    records = [r for r in simulation.emf_records if 'ResizeDurationSeconds' in r]
+    check(len(records) == len(report['resizes']), f"Expected one record per resize: {records}")
+    # 最初のリサイズは過去のサンプル（200秒）の p90 × 2 を超える。以降は記録したサンプルで閾値が上がる
+    check(records[0]['SlowResizes'] == 1 and records[0]['slowThresholdSeconds'] == 400, f"A resize 3x slower than history not reported: {records[0]}")
+    check(records[-1]['slowThresholdSeconds'] > 400, f"The threshold did not follow the recorded samples: {records[-1]}")
+    check(['ClusterIdentifier'] in records[0]['_aws']['CloudWatchMetrics'][0]['Dimensions'], f"Alarm dimension missing: {records[0]['_aws']}")
+
+
+def scenario_normal_resize_not_reported():
+    typical = [seeded_sample(index, 650) for index in range(5)]
+    simulation, report = run('baseline', seed_items=typical)
+    records = [r for r in simulation.emf_records if 'ResizeDurationSeconds' in r]
+    check(records and all(r['SlowResizes'] == 0 for r in records), f"Typical resizes reported as slow: {records}")
+    failover = [r for r in simulation.emf_records if 'SlowFailovers' in r]
+    check(failover and failover[0]['SlowFailovers'] == 0, f"Unexpected failover record: {failover}")
+
+
+def scenario_history_errors_do_not_fail_scaling():
+    scenario = copy.deepcopy(load_scenario('baseline'))
+    scenario['faults'] = [
+        {'service': 'dynamodb', 'operation': operation, 'code': 'ProvisionedThroughputExceededException', 'count': 1000}
+        for operation in ('PutItem', 'DeleteItem', 'Query')
+    ]
+    simulation = Simulation(scenario)
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"History errors failed the execution: {report['status']}: {report['error']}")
+    check(not stored_items(simulation), f"Nothing should be stored: {stored_items(simulation)}")
+
+
+SCENARIOS = [
+    scenario_resizes_recorded_per_cluster_engine_and_transition,
+    scenario_failover_recorded,
+    scenario_event_mode_records_close_to_actual,
+    scenario_summary_feeds_estimates,
+    scenario_summary_keeps_newest_samples,
+    scenario_failover_retry_waits_past_median,
+    scenario_stuck_resize_leaves_only_start,
+    scenario_retention_sets_expiry,
+    scenario_compaction_keeps_newest_samples,
+    scenario_slow_resize_reported,
+    scenario_normal_resize_not_reported,
+    scenario_history_errors_do_not_fail_scaling,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate the resize / failover duration history against the simulator')
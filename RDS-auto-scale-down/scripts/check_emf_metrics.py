@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Lambda関数が出力する CloudWatch Embedded Metric Format（EMF）のレコードをローカルで検証する
+
+ステートマシンのシミュレーター（scripts/simulate_scaling.py と同じ仕組み）でスケーリングを実行し、
+各Lambda関数が出力したEMFのレコードについて以下を確認する。AWSへの接続は不要。
+  - EMFの仕様（_aws.Timestamp / CloudWatchMetrics、ディメンション・メトリクスの値がレコードに含まれること）
+  - フェーズごとの所要時間（PhaseDurationSeconds / FailoverDurationSeconds）、変更前後のインスタンスタイプ、
+    AWS API のメトリクス、実行開始からの経過時間が出力されていること
+  - スロットリングが続く場合も、AWS API のリトライが Lambda のタイムアウトまでに打ち切られること
+
+使い方:
+    python3 scripts/check_emf_metrics.py            # 全シナリオを実行
+    python3 scripts/check_emf_metrics.py -k faults  # 名前に faults を含むシナリオのみ実行
+    python3 scripts/check_emf_metrics.py -v         # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.asl import StatesError  # noqa: E402
+from simulator.checks import check, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+# CloudWatch がサポートする単位のうち、このプロジェクトで使うもの
+UNITS = {'Count', 'Seconds', 'Milliseconds', 'Count/Second'}
+MAX_DIMENSIONS_PER_SET = 30
+MAX_METRICS_PER_DIRECTIVE = 100
+
+INSTRUMENTED_FUNCTIONS = [
+    'schedule_scaling', 'get_cluster_instances', 'modify_instance',
+    'check_instance_status', 'failover_cluster', 'check_failover_status', 'check_failover_readiness'
+]
+
+
+def validate_record(record):
+    """
+    EMFの仕様に沿っているか（CloudWatch Logs がメトリクスとして取り込めるか）
+    """
+    metadata = record.get('_aws')
+    check(isinstance(metadata, dict), f"_aws is missing: {record}")
+    check(isinstance(metadata.get('Timestamp'), int), f"_aws.Timestamp must be epoch milliseconds: {metadata}")
+    directives = metadata.get('CloudWatchMetrics')
+    check(isinstance(directives, list) and directives, f"_aws.CloudWatchMetrics must be a non-empty list: {metadata}")
+    for directive in directives:
+        check(isinstance(directive.get('Namespace'), str) and directive['Namespace'], f"Namespace is missing: {directive}")
+        check(len(directive['Metrics']) <= MAX_METRICS_PER_DIRECTIVE, f"Too many metrics: {len(directive['Metrics'])}")
+        for dimension_set in directive['Dimensions']:
+            check(len(dimension_set) <= MAX_DIMENSIONS_PER_SET, f"Too many dimensions: {dimension_set}")
+            for name in dimension_set:
+                check(isinstance(record.get(name), str), f"Dimension {name} must be a string member of the record: {record.get(name)!r}")
+        for metric in directive['Metrics']:
+            name = metric['Name']
+            check(metric.get('Unit') in UNITS, f"Unsupported unit for {name}: {metric.get('Unit')}")
+            value = record.get(name)
+            check(isinstance(value, (int, float)) and not isinstance(value, bool), f"Metric {name} must be a number: {value!r}")
+
+
+def metric_records(records, name, **dimensions):
+    return [
+        r for r in records
+        if name in r and all(r.get(key) == value for key, value in dimensions.items())
+    ]
+
+
+def run(scenario_name, completion_mode='polling'):
+    scenario = load_scenario(scenario_name)
+    scenario.setdefault('input', {})['completionMode'] = completion_mode
+    simulation = Simulation(scenario)
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"{scenario_name} ended with {report['status']}: {report['error']}")
+    for record in simulation.emf_records:
+        validate_record(record)
+    return scenario, report, simulation.emf_records
+
+
+def check_common(scenario, report, records):
+    """
+    全シナリオ共通: 関数ごとの呼び出しのメトリクス、フェーズの所要時間、変更前後のインスタンスタイプ
+    """
+    target_class = scenario['targetClass']
+
+    functions = {r['FunctionName'] for r in metric_records(records, 'Invocations')}
+    missing = [name for name in INSTRUMENTED_FUNCTIONS if name not in functions]
+    check(not missing, f"No invocation metrics from {missing}")
+    for record in metric_records(records, 'Invocations'):
+        check(record['ApiCalls'] >= 1, f"{record['FunctionName']} reported no API calls")
+        if record['FunctionName'] != 'schedule_scaling':
+            check(record.get('executionName') and 'Phase' in record, f"{record['FunctionName']} has no execution context: {record}")
+
+    # 実行開始からの経過時間はシミュレーションの所要時間を超えない
+    elapsed = [r['SecondsSinceExecutionStart'] for r in metric_records(records, 'SecondsSinceExecutionStart')]
+    check(elapsed and max(elapsed) <= report['durationSeconds'] + 1, f"SecondsSinceExecutionStart out of range: {max(elapsed)}")
+
+    # 変更を要求したインスタンスごとに変更前後のインスタンスタイプ
+    resized_ids = {r['instanceId'] for r in report['resizes']}
+    requests = metric_records(records, 'ResizeRequests')
+    check({r['instanceId'] for r in requests} == resized_ids, f"ResizeRequests {len(requests)} do not match resized instances {sorted(resized_ids)}")
+    for record in requests:
+        check(record['InstanceClassTransition'].endswith(f"->{target_class}"), f"Unexpected transition: {record['InstanceClassTransition']}")
+
+    # フェーズが完了した確認ごとに所要時間
+    durations = metric_records(records, 'PhaseDurationSeconds', TargetClass=target_class)
+    phases = {r['Phase'] for r in durations}
+    return durations, phases
+
+
+def scenario_baseline_phase_durations():
+    scenario, report, records = run('baseline')
+    durations, phases = check_common(scenario, report, records)
+    check({'dedicated-reader', 'old-writer', 'autoscaling-reader-wave'} <= phases, f"Missing phase durations: {phases}")
+
+    failovers = metric_records(records, 'FailoverDurationSeconds', Phase='failover')
+    check(len(failovers) == 1, f"Expected one failover duration, got {len(failovers)}")
+    check(failovers[0]['ClusterIdentifier'] == scenario['cluster']['identifier'], f"Unexpected ClusterIdentifier: {failovers[0]['ClusterIdentifier']}")
+
+    # リサイズのフェーズの所要時間は、シミュレーションの変更時間（modifying）以上
+    resize_seconds = scenario['latency']['resizeSeconds'] * (1 - scenario['latency'].get('jitter', 0))
+    for record in durations:
+        check(record['PhaseDurationSeconds'] >= resize_seconds, f"{record['Phase']} finished too early: {record['PhaseDurationSeconds']}")
+
+    started = metric_records(records, 'ExecutionsStarted', Phase='schedule')
+    check(started and started[0]['EstimatedDurationSeconds'] > 0, 'schedule_scaling did not report the estimated duration')
+
+
+def scenario_event_mode_phase_durations():
+    scenario, report, records = run('baseline', completion_mode='event')
+    durations, phases = check_common(scenario, report, records)
+    check({'dedicated-reader', 'old-writer', 'autoscaling-reader-wave'} <= phases, f"Missing phase durations: {phases}")
+
+
+def scenario_faults_report_api_retries():
+    scenario, report, records = run('faults')
+    check_common(scenario, report, records)
+    retries = sum(r['ApiRetries'] for r in metric_records(records, 'ApiRetries'))
+    throttles = sum(r['ApiThrottles'] for r in metric_records(records, 'ApiThrottles'))
+    check(retries > 0 and throttles > 0, f"Injected throttling was not reported (retries={retries}, throttles={throttles})")
+    retried_operations = {
+        operation
+        for r in metric_records(records, 'ApiRetries')
+        for operation, entry in r['apiOperations'].items()
+        if entry['retries']
+    }
+    check(retried_operations == {'rds:describe_db_instances'}, f"Unexpected retried operations: {retried_operations}")
+
+
+def scenario_faults_retries_stop_before_lambda_timeout():
+    # スロットリングが続き、試行回数の上限（AWS_CLIENT_MAX_ATTEMPTS）だけではタイムアウトを超える場合
+    scenario = load_scenario('baseline')
+    scenario['faults'] = [{'service': 'rds', 'operation': 'DescribeDBInstances', 'code': 'Throttling', 'count': 100}]
+    simulation = Simulation(scenario)
+    timeout = simulation.terraform.lambda_timeout('check_instance_status')
+    saved = os.environ.get('AWS_CLIENT_MAX_ATTEMPTS')
+    os.environ['AWS_CLIENT_MAX_ATTEMPTS'] = '50'
+    try:
+        with simulation.fake_aws():
+            response, seconds = simulation.invoke_lambda(
+                'function:check_instance_status', {'instanceIds': ['sim-cluster-writer'], 'targetClass': scenario['targetClass']}
+            )
+    finally:
+        if saved is None:
+            os.environ.pop('AWS_CLIENT_MAX_ATTEMPTS', None)
+        else:
+            os.environ['AWS_CLIENT_MAX_ATTEMPTS'] = saved
+    check(isinstance(response, StatesError) and 'Throttling' in response.cause, f"Expected the throttling error to be returned: {response}")
+    check(seconds < timeout, f"Retries ran past the {timeout}s Lambda timeout: {seconds:.1f}s")
+    attempts = sum(entry['apiCalls'].get('rds:DescribeDBInstances', 0) for entry in simulation.recorder.states.values())
+    check(1 < attempts < 50, f"Expected the retries to stop early: {attempts} attempts")
+
+
+SCENARIOS = [
+    scenario_baseline_phase_durations,
+    scenario_event_mode_phase_durations,
+    scenario_faults_report_api_retries,
+    scenario_faults_retries_stop_before_lambda_timeout,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate the EMF metrics emitted by the Lambda functions in a local simulation')
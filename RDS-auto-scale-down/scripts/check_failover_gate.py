@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+フェイルオーバーの前の負荷の確認（check-failover-readiness）をローカルで検証する
+
+シミュレーターの FakeCloudWatch の合成メトリクス（spikes で書き込みの集中・レプリカラグを表す）に対して、
+Writer の WriteIOPS・DatabaseConnections とフェイルオーバー先の AuroraReplicaLag が落ち着くまでフェイルオーバーを待つこと、
+failover_gate_max_wait_seconds を過ぎた場合は待たずにフェイルオーバーすること、
+メトリクスを1回の GetMetricData でまとめて取得し、フェイルオーバーした時点の条件を EMF に残すことを確認する。
+AWSへの接続は不要。
+
+使い方:
+    python3 scripts/check_failover_gate.py              # 全シナリオを実行
+    python3 scripts/check_failover_gate.py -k timeout   # 名前に timeout を含むシナリオのみ実行
+    python3 scripts/check_failover_gate.py -v           # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import copy
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.checks import check, entries, record_requests, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+WRITER = 'sim-cluster-writer'
+DEDICATED_READER = 'sim-cluster-dedicated-reader'
+
+
+def state_api_calls(report, state_name):
+    return next((s['apiCalls'] for s in report['states'] if s['state'] == state_name), {})
+
+
+def gate_scenario(spikes=None):
+    """
+    failover-gate シナリオ（spikes: {インスタンスID: {メトリクス: [spike, ...]}} で書き込みの集中を置き換える）
+    """
+    scenario = copy.deepcopy(load_scenario('failover-gate'))
+    if spikes is not None:
+        scenario['metrics']['instances'] = {
+            instance_id: {key: {'spikes': values} for key, values in metrics.items()}
+            for instance_id, metrics in spikes.items()
+        }
+    return scenario
+
+
+def gate_records(simulation):
+    return [r for r in simulation.emf_records if 'FailoverGateWaitSeconds' in r]
+
+
+def run_gate(scenario, variables=None):
+    simulation = Simulation(scenario, variables=variables)
+    # フェイルオーバーを要求した時刻（シミュレーション開始からの秒数）
+    requested = record_requests(simulation.rds, 'failover_db_cluster', lambda _: simulation.virtual_time() - simulation.cloudwatch.start)
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    records = gate_records(simulation)
+    check(len(records) == 1, f"Expected one failover gate record: {records}")
+    return simulation, report, requested, records[0]
+
+
+def scenario_waits_for_write_burst_to_pass():
+    simulation, report, requested, record = run_gate(gate_scenario())
+    # 書き込みの集中（900秒まで）の後のデータポイントが届いてからフェイルオーバーする
+    check(requested and requested[0] >= 900, f"Failover was requested during the write burst: {requested}")
+    check(record['FailoverGateTimeouts'] == 0, f"The gate should not time out: {record}")
+    check(record['FailoverGateWaitSeconds'] > 0, f"The gate did not wait: {record}")
+    check(record['conditions']['writeIops']['quiet'], f"Unexpected conditions: {record['conditions']}")
+    check(record['WriteIopsAtFailover'] <= record['conditions']['writeIops']['limit'], f"Failover at a busy moment: {record}")
+
+
+def scenario_replica_lag_blocks_failover():
+    scenario = gate_scenario({DEDICATED_READER: {'replicaLagMs': [{'fromSeconds': -300, 'toSeconds': 900, 'value': 2500}]}})
+    simulation, report, requested, record = run_gate(scenario)
+    check(requested and requested[0] >= 900, f"Failover was requested while the target was lagging: {requested}")
+    check(record['ReplicaLagAtFailover'] <= 100, f"Failover with replica lag: {record}")
+
+
+def scenario_gate_times_out_and_fails_over():
+    scenario = gate_scenario({DEDICATED_READER: {'replicaLagMs': [{'fromSeconds': -3600, 'toSeconds': 86400, 'value': 2500}]}})
+    simulation, report, requested, record = run_gate(scenario, variables={'failover_gate_max_wait_seconds': 300})
+    check(record['FailoverGateTimeouts'] == 1, f"Expected the gate to time out: {record}")
+    check(300 <= record['FailoverGateWaitSeconds'] < 360, f"The gate did not stop at the limit: {record['FailoverGateWaitSeconds']}")
+    check(not record['conditions']['replicaLagMs']['quiet'], f"Unexpected conditions: {record['conditions']}")
+    check(entries(report, 'FailoverToDedicatedReader') >= 1, 'Failover was not requested after the timeout')
+
+
+def scenario_quiet_cluster_fails_over_immediately():
+    simulation, report, requested, record = run_gate(gate_scenario({}))
+    check(entries(report, 'CheckFailoverReadiness') == 1, f"Unexpected checks: {entries(report, 'CheckFailoverReadiness')}")
+    check(record['FailoverGateWaitSeconds'] == 0 and record['FailoverGateTimeouts'] == 0, f"Unexpected wait: {record}")
+
+
+def scenario_metrics_fetched_in_one_request():
+    simulation, report, requested, record = run_gate(gate_scenario())
+    checks = entries(report, 'CheckFailoverReadiness')
+    calls = state_api_calls(report, 'CheckFailoverReadiness')
+    check(calls.get('cloudwatch:GetMetricData') == checks, f"Expected one GetMetricData call per check: {calls} ({checks} checks)")
+    check(all(r['queries'] == 3 for r in simulation.cloudwatch.requests), f"Unexpected batches: {simulation.cloudwatch.requests}")
+
+
+def scenario_missing_metrics_do_not_block():
+    report = Simulation(load_scenario('baseline')).run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(entries(report, 'CheckFailoverReadiness') == 1, f"Missing metrics should not delay failover: {entries(report, 'CheckFailoverReadiness')}")
+
+
+def scenario_disabled_gate_skips_metrics():
+    simulation = Simulation(gate_scenario(), variables={'failover_gate_max_wait_seconds': 0})
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(not state_api_calls(report, 'CheckFailoverReadiness'), f"The disabled gate called AWS: {state_api_calls(report, 'CheckFailoverReadiness')}")
+    check(not gate_records(simulation), 'The disabled gate should not record conditions')
+
+
+SCENARIOS = [
+    scenario_waits_for_write_burst_to_pass,
+    scenario_replica_lag_blocks_failover,
+    scenario_gate_times_out_and_fails_over,
+    scenario_quiet_cluster_fails_over_immediately,
+    scenario_metrics_fetched_in_one_request,
+    scenario_missing_metrics_do_not_block,
+    scenario_disabled_gate_skips_metrics,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate the pre-failover load gate (check-failover-readiness) against the simulator')
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+変更先のインスタンスタイプの事前確認（schedule-scaling、scaling_common.orderability）をローカルで検証する
+
+シミュレーターの FakeRds（cluster の orderableClasses で注文可能なタイプを指定）に対して、
+注文できないタイプが Step Functions の実行前に失敗すること、確認結果のインデックス（SSM）の有効期間と
+フリートモードでの扱いを確認する。AWSへの接続は不要。
+
+使い方:
+    python3 scripts/check_orderability.py              # 全シナリオを実行
+    python3 scripts/check_orderability.py -k fleet     # 名前に fleet を含むシナリオのみ実行
+    python3 scripts/check_orderability.py -v           # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.asl import StatesError  # noqa: E402
+from simulator.checks import check, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+from scaling_common import orderability  # noqa: E402
+
+SCHEDULER_FUNCTION = 'function:schedule_scaling'
+DESCRIBE_ORDERABLE = 'rds:DescribeOrderableDBInstanceOptions'
+
+# db.t4g.medium を注文できないエンジン・バージョンのクラスター
+WITHOUT_T4G = ['db.r6g.large', 'db.r6g.xlarge', 'db.r6g.2xlarge']
+
+
+def orderability_simulation(target_class='db.r6g.large', faults=None, **cluster):
+    scenario = load_scenario('baseline')
+    scenario['targetClass'] = target_class
+    scenario['cluster'].update(cluster)
+    if faults:
+        scenario['faults'] = faults
+    simulation = Simulation(scenario)
+    parameter_name = simulation.terraform.lambda_environment('schedule_scaling')['ORDERABILITY_INDEX_PARAMETER']
+    return simulation, parameter_name
+
+
+def invoke_scheduler(simulation, **event):
+    """
+    schedule_scaling を新しいコンテナで呼び出す（戻り値: (応答 または StatesError, 仮想時間での処理時間)）
+    """
+    event = dict({
+        'clusterIdentifier': simulation.rds.cluster['DBClusterIdentifier'],
+        'targetClass': simulation.scenario['targetClass']
+    }, **event)
+    with simulation.fake_aws():
+        response, seconds = simulation.invoke_lambda(SCHEDULER_FUNCTION, event)
+    if isinstance(response, StatesError):
+        return response, seconds
+    return json.loads(response['body']), seconds
+
+
+def api_calls(simulation, operation):
+    return sum(entry['apiCalls'].get(operation, 0) for entry in simulation.recorder.states.values())
+
+
+def scenario_orderable_target_starts_execution():
+    simulation, parameter_name = orderability_simulation()
+    body, _ = invoke_scheduler(simulation)
+    check(body.get('executionArn'), f"Execution was not started: {body}")
+    index = json.loads(simulation.ssm.parameters[parameter_name])
+    entry = index.get(orderability.index_key('aurora-postgresql', '15.4', 'db.r6g.large'))
+    check(entry and entry['orderable'] is True, f"The result was not saved to the index: {index}")
+
+
+def scenario_not_orderable_fails_fast():
+    simulation, _ = orderability_simulation('db.t4g.medium', orderableClasses=WITHOUT_T4G)
+    response, seconds = invoke_scheduler(simulation)
+    check(isinstance(response, StatesError) and response.error == 'ValueError', f"Expected a ValueError, got {response}")
+    message = json.loads(response.cause)['errorMessage']
+    check('db.t4g.medium is not orderable for aurora-postgresql 15.4' in message, f"The reason is not clear: {message}")
+    check(not simulation.sfn.executions, 'Step Functions must not be started for an unorderable class')
+    check(api_calls(simulation, 'rds:ModifyDBInstance') == 0, 'No instance should be modified')
+    check(seconds < 60, f"The request should fail within seconds, took {seconds} s")
+
+
+def scenario_index_reused_within_ttl():
+    simulation, parameter_name = orderability_simulation('db.t4g.medium', orderableClasses=WITHOUT_T4G)
+    invoke_scheduler(simulation)
+    invoke_scheduler(simulation)
+    check(api_calls(simulation, DESCRIBE_ORDERABLE) == 1, f"The cached result should be reused: {api_calls(simulation, DESCRIBE_ORDERABLE)} calls")
+
+    # 有効期間を過ぎた確認結果は RDS API で確認し直す
+    index = json.loads(simulation.ssm.parameters[parameter_name])
+    for entry in index.values():
+        entry['checkedAt'] -= orderability.DEFAULT_TTL_HOURS * 3600 + 1
+    simulation.ssm.parameters[parameter_name] = json.dumps(index)
+    invoke_scheduler(simulation)
+    check(api_calls(simulation, DESCRIBE_ORDERABLE) == 2, 'An expired entry should be checked again')
+
+
+def scenario_fleet_skips_unorderable_cluster():
+    simulation, _ = orderability_simulation('db.t4g.medium', orderableClasses=WITHOUT_T4G)
+    fleet = {'clusterIdentifiers': [simulation.rds.cluster['DBClusterIdentifier']]}
+
+    body, _ = invoke_scheduler(simulation, fleet=fleet, plan=True)
+    check(body['plannedCount'] == 0 and 'not orderable' in body['clusters'][0]['reason'], f"Unexpected fleet plan: {body}")
+
+    body, _ = invoke_scheduler(simulation, fleet=fleet)
+    cluster = body['clusters'][0]
+    check(cluster['status'] == 'skipped' and 'not orderable' in cluster['reason'], f"Unexpected fleet result: {cluster}")
+    check(not simulation.sfn.executions, 'Step Functions must not be started for an unorderable class')
+
+
+def scenario_check_failure_does_not_block():
+    # 事前確認の API が使えない場合は確認せずに実行する（変更要求の失敗はステートマシンが扱う）
+    faults = [{'service': 'rds', 'operation': 'DescribeOrderableDBInstanceOptions', 'code': 'AccessDenied', 'count': 10}]
+    simulation, parameter_name = orderability_simulation(faults=faults)
+    body, _ = invoke_scheduler(simulation)
+    check(body.get('executionArn'), f"Execution was not started: {body}")
+    check(parameter_name not in simulation.ssm.parameters, 'A failed check must not be saved to the index')
+
+
+SCENARIOS = [
+    scenario_orderable_target_starts_execution,
+    scenario_not_orderable_fails_fast,
+    scenario_index_reused_within_ttl,
+    scenario_fleet_skips_unorderable_cluster,
+    scenario_check_failure_does_not_block,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate the orderability pre-flight of schedule-scaling against the simulated RDS API')
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Reader のドレイン（readerDrain: true、drain-reader）をローカルで検証する
+
+シミュレーターの FakeRds のカスタム Reader エンドポイントに対して、インスタンスタイプを変更する Reader を
+変更の前にエンドポイントから外し、接続数（DatabaseConnections）が 0 になってから変更すること、
+接続が残っていても DRAIN_TIMEOUT_SECONDS で変更に進むこと、変更が完了した Reader をエンドポイントに戻すこと、
+失敗・中止した実行では除外リストを空にすることを確認する。AWSへの接続は不要。
+
+使い方:
+    python3 scripts/check_reader_drain.py              # 全シナリオを実行
+    python3 scripts/check_reader_drain.py -k release   # 名前に release を含むシナリオのみ実行
+    python3 scripts/check_reader_drain.py -v           # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.asl import StatesError  # noqa: E402
+from simulator.fake_aws import client_error  # noqa: E402
+from simulator.checks import check, entries, record_requests, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+DRAIN_FUNCTION = 'function:drain_reader'
+WRITER = 'sim-cluster-writer'
+DEDICATED_READER = 'sim-cluster-dedicated-reader'
+AUTOSCALING_READERS = [f"application-autoscaling-sim-cluster-{i:02d}" for i in range(1, 5)]
+
+
+def excluded_members(report):
+    (endpoint,) = report['readerEndpoints'].values()
+    return endpoint['excludedMembers']
+
+
+def drain_records(simulation):
+    return [r for r in simulation.emf_records if 'DrainSeconds' in r]
+
+
+def drain_state(simulation, instance_id):
+    """
+    インスタンスタイプの変更を要求した時点の、エンドポイントの除外リストと接続数の割合
+    """
+    (identifier,) = simulation.rds.cluster_endpoints
+    endpoint = simulation.rds.cluster_endpoint(identifier)
+    return {
+        'excluded': instance_id in endpoint['ExcludedMembers'],
+        'connectionFactor': simulation.rds.connection_factor(instance_id, simulation.virtual_time())
+    }
+
+
+def scenario_readers_drained_before_modify():
+    simulation = Simulation(load_scenario('reader-drain'))
+    requests = record_requests(
+        simulation.rds, 'modify_db_instance',
+        lambda kwargs: (kwargs['DBInstanceIdentifier'], drain_state(simulation, kwargs['DBInstanceIdentifier'])),
+        once_per='DBInstanceIdentifier'
+    )
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    # 旧Writer もフェイルオーバーの後は Reader として変更するため、エンドポイントから外す
+    expected = sorted([WRITER, DEDICATED_READER] + AUTOSCALING_READERS)
+    requested = sorted(instance_id for instance_id, _ in requests)
+    check(requested == expected, f"Unexpected modify requests: {requested}")
+    for instance_id, request in requests:
+        check(request['excluded'], f"{instance_id} was modified while still in the endpoint")
+        check(request['connectionFactor'] == 0, f"{instance_id} still had connections when modified: {request}")
+    check(report['drainedInstances'] == expected, f"Unexpected drained instances: {report['drainedInstances']}")
+    check(excluded_members(report) == [], f"Readers were not returned to the endpoint: {excluded_members(report)}")
+    records = drain_records(simulation)
+    check(records and all(r['DrainTimeouts'] == 0 for r in records), f"Unexpected drain timeouts: {records}")
+
+
+def scenario_drain_timeout_proceeds_with_connections():
+    scenario = load_scenario('reader-drain')
+    scenario['latency']['drainSeconds'] = 3600
+    simulation = Simulation(scenario, variables={'reader_drain_timeout_seconds': 180})
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    records = drain_records(simulation)
+    check(records and all(r['DrainTimeouts'] == 1 for r in records), f"Expected every drain to time out: {records}")
+    check(all(180 <= r['DrainSeconds'] < 240 for r in records), f"Drain did not stop at the timeout: {[r['DrainSeconds'] for r in records]}")
+    check(excluded_members(report) == [], f"Readers were not returned to the endpoint: {excluded_members(report)}")
+
+
+def scenario_last_available_reader_is_not_excluded():
+    simulation = Simulation(load_scenario('reader-drain'))
+    event = {'action': 'exclude', 'instanceIds': [DEDICATED_READER] + AUTOSCALING_READERS}
+    with simulation.fake_aws():
+        response, _ = simulation.invoke_lambda(DRAIN_FUNCTION, event)
+    check(not isinstance(response, StatesError), f"Unexpected error: {response}")
+    check(response['skipped'] and response['drained'], f"Excluding every reader should be skipped: {response}")
+    (endpoint,) = simulation.rds.cluster_endpoints.values()
+    check(endpoint['ExcludedMembers'] == [], f"The endpoint was modified: {endpoint['ExcludedMembers']}")
+
+
+def scenario_writer_is_never_excluded():
+    simulation = Simulation(load_scenario('reader-drain'))
+    with simulation.fake_aws():
+        response, _ = simulation.invoke_lambda(DRAIN_FUNCTION, {'action': 'exclude', 'instanceIds': [WRITER]})
+    check(not isinstance(response, StatesError), f"Unexpected error: {response}")
+    check(response['excludedInstanceIds'] == [] and response['drained'], f"The writer was excluded: {response}")
+
+
+def scenario_failed_execution_releases_endpoint():
+    scenario = load_scenario('stuck-reader')
+    scenario['input'] = {'readerDrain': True}
+    report = Simulation(scenario).run()
+    check(report['status'] == 'FAILED', f"Expected the execution to fail: {report['status']}")
+    check(entries(report, 'ReleaseReaderEndpointAfterFailure') == 1, 'The endpoint was not released after the failure')
+    check(excluded_members(report) == [], f"Readers remain excluded after the failure: {excluded_members(report)}")
+
+
+def scenario_aborted_execution_event_releases_endpoint():
+    simulation = Simulation(load_scenario('reader-drain'))
+    event = {
+        'source': 'aws.states',
+        'detail-type': 'Step Functions Execution Status Change',
+        'detail': {'name': 'scaling-aborted', 'status': 'ABORTED'}
+    }
+    with simulation.fake_aws():
+        simulation.invoke_lambda(DRAIN_FUNCTION, {'action': 'exclude', 'instanceIds': AUTOSCALING_READERS[:2]})
+        response, _ = simulation.invoke_lambda(DRAIN_FUNCTION, event)
+    check(not isinstance(response, StatesError), f"Unexpected error: {response}")
+    check(sorted(response['includedInstanceIds']) == AUTOSCALING_READERS[:2], f"Unexpected release: {response}")
+    check(response['excludedInstanceIds'] == [], f"Readers remain excluded: {response}")
+
+
+def scenario_failed_include_does_not_roll_back():
+    # エンドポイントに戻す変更（除外リストを減らす変更）が失敗し続ける: 変更は完了しているため、記録して続ける
+    simulation = Simulation(load_scenario('reader-drain'))
+    modify_endpoint = simulation.rds.modify_db_cluster_endpoint
+
+    def failing_include(DBClusterEndpointIdentifier, ExcludedMembers=None, **kwargs):
+        current = simulation.rds.cluster_endpoint(DBClusterEndpointIdentifier)['ExcludedMembers']
+        if ExcludedMembers is not None and set(ExcludedMembers) < set(current):
+            raise client_error('InvalidDBClusterEndpointStateFault', 'Injected include failure', 'ModifyDBClusterEndpoint')
+        return modify_endpoint(DBClusterEndpointIdentifier=DBClusterEndpointIdentifier, ExcludedMembers=ExcludedMembers, **kwargs)
+
+    simulation.rds.modify_db_cluster_endpoint = failing_include
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(entries(report, 'ChooseRollbackOnFailure') == 0, 'An endpoint include failure should not roll back')
+    check(excluded_members(report), 'The include failure was not exercised')
+    check({i['class'] for i in report['finalInstances'].values()} == {'db.r6g.large'}, f"Not every instance was resized: {report['finalInstances']}")
+
+
+def scenario_disabled_by_default():
+    report = Simulation(load_scenario('baseline')).run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    calls = [op for op in report['apiCalls'] if 'DBClusterEndpoint' in op]
+    check(not calls, f"The endpoint was used without readerDrain: {calls}")
+
+
+SCENARIOS = [
+    scenario_readers_drained_before_modify,
+    scenario_drain_timeout_proceeds_with_connections,
+    scenario_last_available_reader_is_not_excluded,
+    scenario_writer_is_never_excluded,
+    scenario_failed_execution_releases_endpoint,
+    scenario_aborted_execution_event_releases_endpoint,
+    scenario_failed_include_does_not_roll_back,
+    scenario_disabled_by_default,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate draining readers from the custom reader endpoint (drain-reader) against the simulator')
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Reader の置き換え（readerStrategy: "replace"、replace-instance）をローカルで検証する
+
+シミュレーターの FakeRds に対して、AutoScaling Reader を変更先のタイプの新しいインスタンスに置き換えること、
+置き換え元は置き換え後のインスタンスが available になるまで削除しない（Reader の台数が減らない）こと、
+昇格優先順位とタグを引き継ぐこと、同時に置き換える台数がクラスターの Reader の上限で制限されること、
+作成・削除の失敗を replace_reader_max_retries 回まで再試行することを確認する。
+AWSへの接続は不要。
+
+使い方:
+    python3 scripts/check_reader_replacement.py              # 全シナリオを実行
+    python3 scripts/check_reader_replacement.py -k retire    # 名前に retire を含むシナリオのみ実行
+    python3 scripts/check_reader_replacement.py -v           # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.asl import StatesError  # noqa: E402
+from simulator.checks import check, entries, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+REPLACE_FUNCTION = 'function:replace_instance'
+TARGET_CLASS = 'db.r6g.large'
+
+AUTOSCALING_READERS = [f"application-autoscaling-sim-cluster-{i:02d}" for i in range(1, 5)]
+REPLACE = {'reader_strategy': 'replace'}
+
+
+def cluster_with_readers(count):
+    return dict(load_scenario('baseline')['cluster'], autoScalingReaders=count)
+
+
+def record_reader_counts(simulation):
+    """
+    置き換え元を削除する直前の、available な Reader の台数を記録する
+    """
+    counts = []
+    delete_db_instance = simulation.rds.delete_db_instance
+
+    def recording_delete(DBInstanceIdentifier, **kwargs):
+        counts.append(len([
+            i for i, inst in simulation.rds.instances.items()
+            if i != simulation.rds.writer_instance_id and inst['DBInstanceStatus'] == 'available'
+        ]))
+        return delete_db_instance(DBInstanceIdentifier=DBInstanceIdentifier, **kwargs)
+
+    simulation.rds.delete_db_instance = recording_delete
+    return counts
+
+
+def scenario_replace_keeps_reader_count():
+    simulation = Simulation(load_scenario('baseline'), variables=REPLACE)
+    reader_count = len(simulation.rds.instances) - 1
+    counts = record_reader_counts(simulation)
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(sorted(report['replacements']['deleted']) == AUTOSCALING_READERS, f"Unexpected deletions: {report['replacements']}")
+    check(
+        sorted(report['replacements']['created']) == [f"{i}-r2" for i in AUTOSCALING_READERS],
+        f"Unexpected replacements: {report['replacements']}"
+    )
+    check(counts and min(counts) >= reader_count, f"Reader count dropped below {reader_count} before a deletion: {counts}")
+    check(entries(report, 'ScaleAutoScalingReader') == 0, 'AutoScaling readers should not be modified in place')
+    final = report['finalInstances']
+    for instance_id in AUTOSCALING_READERS:
+        replacement = final[f"{instance_id}-r2"]
+        check(replacement['class'] == TARGET_CLASS and replacement['status'] == 'available', f"Replacement not ready: {replacement}")
+        check(final[instance_id]['status'] == 'deleting', f"{instance_id} was not deleted: {final[instance_id]}")
+
+
+def scenario_replacement_inherits_tier_and_tags():
+    simulation = Simulation(load_scenario('baseline'), variables=REPLACE)
+    original = simulation.rds.instances[AUTOSCALING_READERS[0]]
+    original['TagList'].append({'Key': 'CostCenter', 'Value': 'analytics'})
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    replacement = simulation.rds.instances[f"{AUTOSCALING_READERS[0]}-r2"]
+    check(replacement['PromotionTier'] == original['PromotionTier'], f"Promotion tier not inherited: {replacement['PromotionTier']}")
+    tags = {tag['Key']: tag['Value'] for tag in replacement['TagList']}
+    check(tags.get('Role') == 'autoscaling-reader', f"Role tag not inherited: {tags}")
+    check(tags.get('CostCenter') == 'analytics', f"Other tags not inherited: {tags}")
+
+
+def scenario_waves_limited_by_cluster_reader_limit():
+    # Reader 13台（Dedicated Reader + AutoScaling Reader 12台）のクラスターでは、同時に2台までしか追加できない
+    scenario = dict(load_scenario('baseline'), cluster=cluster_with_readers(12))
+    simulation = Simulation(scenario, variables=REPLACE)
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    waves = entries(report, 'CreateReplacementReaders')
+    check(waves == 6, f"Expected 6 waves of 2 readers: {waves}")
+    check(len(report['replacements']['created']) == 12, f"Not all readers were replaced: {report['replacements']}")
+
+
+def scenario_wave_budget_replaces_readers_concurrently():
+    simulation = Simulation(load_scenario('baseline'), variables=dict(REPLACE, replace_wave_max_readers=2))
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(entries(report, 'CreateReplacementReaders') == 2, f"Expected 2 waves: {entries(report, 'CreateReplacementReaders')}")
+
+
+def scenario_full_cluster_refuses_to_replace():
+    scenario = dict(load_scenario('baseline'), cluster=cluster_with_readers(14))
+    simulation = Simulation(scenario, variables=REPLACE)
+    report = simulation.run()
+    check(report['status'] == 'FAILED', f"Expected the execution to fail: {report['status']}")
+    check('no room' in report['error']['cause'], f"Unexpected error: {report['error']}")
+    check(not report['replacements']['created'], 'No replacement should be created')
+
+
+def scenario_failed_create_and_retire_are_retried():
+    # 1台の作成と1台の削除が一時的に失敗する: ウェーブを失敗させずに、作成・削除をやり直す
+    faults = [
+        {'service': 'rds', 'operation': 'CreateDBInstance', 'code': 'InsufficientDBInstanceCapacity', 'count': 1},
+        {'service': 'rds', 'operation': 'DeleteDBInstance', 'code': 'InvalidDBInstanceState', 'count': 1}
+    ]
+    simulation = Simulation(dict(load_scenario('baseline'), faults=faults), variables=REPLACE)
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(entries(report, 'CreateReplacementReaders') == 2, f"Expected one create retry: {entries(report, 'CreateReplacementReaders')}")
+    check(entries(report, 'RetireReplacedReaders') == 2, f"Expected one retire retry: {entries(report, 'RetireReplacedReaders')}")
+    check(entries(report, 'ChooseRollbackOnFailure') == 0, 'A retried failure should not roll back')
+    check(sorted(report['replacements']['deleted']) == AUTOSCALING_READERS, f"Unexpected deletions: {report['replacements']}")
+    check(len(simulation.rds.created_instances) == 4, f"Replacements were created twice: {simulation.rds.created_instances}")
+
+
+def scenario_create_failure_fails_after_retries():
+    faults = [{'service': 'rds', 'operation': 'CreateDBInstance', 'code': 'InsufficientDBInstanceCapacity', 'count': 100}]
+    simulation = Simulation(dict(load_scenario('baseline'), faults=faults), variables=REPLACE)
+    report = simulation.run()
+    check(report['status'] == 'FAILED', f"Expected the execution to fail: {report['status']}")
+    check(entries(report, 'CreateReplacementReaders') == 4, f"Expected 3 retries: {entries(report, 'CreateReplacementReaders')}")
+    check('InsufficientDBInstanceCapacity' in report['error']['cause'], f"Unexpected error: {report['error']}")
+
+
+def scenario_create_is_idempotent():
+    simulation = Simulation(load_scenario('baseline'))
+    event = {'action': 'create', 'instanceIds': AUTOSCALING_READERS[:2], 'targetClass': TARGET_CLASS}
+    with simulation.fake_aws():
+        first, _ = simulation.invoke_lambda(REPLACE_FUNCTION, event)
+        second, _ = simulation.invoke_lambda(REPLACE_FUNCTION, event)
+    check(not isinstance(first, StatesError) and first['createdCount'] == 2, f"Unexpected first response: {first}")
+    check(not isinstance(second, StatesError) and second['createdCount'] == 0, f"The re-run created instances again: {second}")
+    check({r['status'] for r in second['instances']} == {'exists'}, f"Unexpected statuses: {second['instances']}")
+    check(len(simulation.rds.created_instances) == 2, f"Unexpected creations: {simulation.rds.created_instances}")
+
+
+def scenario_create_treats_already_exists_as_created():
+    # 前回の作成の応答を受け取れなかった: 一覧に出る前に再実行すると DBInstanceAlreadyExists になる
+    simulation = Simulation(load_scenario('baseline'))
+    event = {'action': 'create', 'instanceIds': AUTOSCALING_READERS[:1], 'targetClass': TARGET_CLASS}
+    replacement_id = f"{AUTOSCALING_READERS[0]}-r2"
+    describe_db_instances = simulation.rds.describe_db_instances
+
+    def describe_without_replacement(**kwargs):
+        response = describe_db_instances(**kwargs)
+        if kwargs.get('Filters'):
+            response['DBInstances'] = [i for i in response['DBInstances'] if i['DBInstanceIdentifier'] != replacement_id]
+        return response
+
+    with simulation.fake_aws():
+        simulation.invoke_lambda(REPLACE_FUNCTION, event)
+        simulation.rds.describe_db_instances = describe_without_replacement
+        response, _ = simulation.invoke_lambda(REPLACE_FUNCTION, event)
+    check(not isinstance(response, StatesError), f"The re-run failed: {response}")
+    check(response['instances'][0]['status'] == 'exists', f"Unexpected status: {response['instances']}")
+    check(response['replacementInstanceIds'] == [replacement_id], f"Unexpected replacements: {response}")
+    check(len(simulation.rds.created_instances) == 1, f"Unexpected creations: {simulation.rds.created_instances}")
+
+
+def scenario_retire_refuses_until_replacement_available():
+    simulation = Simulation(load_scenario('baseline'))
+    event = {'instanceIds': AUTOSCALING_READERS[:1], 'targetClass': TARGET_CLASS}
+    with simulation.fake_aws():
+        simulation.invoke_lambda(REPLACE_FUNCTION, dict(event, action='create'))
+        response, _ = simulation.invoke_lambda(REPLACE_FUNCTION, dict(event, action='retire'))
+    check(isinstance(response, StatesError) and 'not available' in response.cause, f"Expected a refusal: {response}")
+    check(not simulation.rds.deleted_instances, f"The old reader was deleted: {simulation.rds.deleted_instances}")
+
+
+def scenario_default_strategy_modifies_in_place():
+    report = Simulation(load_scenario('baseline')).run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(not report['replacements']['created'] and not report['replacements']['deleted'], f"Unexpected replacements: {report['replacements']}")
+    check(entries(report, 'CreateReplacementReaders') == 0, 'The modify strategy should not create readers')
+
+
+SCENARIOS = [
+    scenario_replace_keeps_reader_count,
+    scenario_replacement_inherits_tier_and_tags,
+    scenario_waves_limited_by_cluster_reader_limit,
+    scenario_wave_budget_replaces_readers_concurrently,
+    scenario_full_cluster_refuses_to_replace,
+    scenario_failed_create_and_retire_are_retried,
+    scenario_create_failure_fails_after_retries,
+    scenario_create_is_idempotent,
+    scenario_create_treats_already_exists_as_created,
+    scenario_retire_refuses_until_replacement_available,
+    scenario_default_strategy_modifies_in_place,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate the replace reader strategy (replace-instance) against the simulator')
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+ロールバック（rollback-cluster と、ステートマシンの失敗時・オンデマンドのロールバック）をローカルで検証する
+
+シミュレーターの FakeRds / FakeSsm に対して、実行の開始時に保存したスナップショットから、失敗した実行の後に
+元のインスタンスタイプと Writer に戻ること、Reader を予算内のウェーブで並列に戻すこと、
+失敗した実行の再実行でスナップショットが上書きされないことを確認する。AWSへの接続は不要。
+
+使い方:
+    python3 scripts/check_rollback.py              # 全シナリオを実行
+    python3 scripts/check_rollback.py -k demand    # 名前に demand を含むシナリオのみ実行
+    python3 scripts/check_rollback.py -v           # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.asl import StatesError  # noqa: E402
+from simulator.checks import check, entries, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+ROLLBACK_FUNCTION = 'function:rollback_cluster'
+SNAPSHOT_PARAMETER = '/aurora-scaling/rollback-snapshots/sim-cluster'
+
+WRITER = 'sim-cluster-writer'
+DEDICATED_READER = 'sim-cluster-dedicated-reader'
+AUTOSCALING_READERS = [f"application-autoscaling-sim-cluster-{i:02d}" for i in range(1, 5)]
+
+# 旧Writerの変更要求が受け付けられない（フェイルオーバーの後に失敗する）
+OLD_WRITER_REJECTED = [{
+    'service': 'rds',
+    'operation': 'ModifyDBInstance',
+    'match': {'DBInstanceIdentifier': WRITER, 'DBInstanceClass': 'db.r6g.large'},
+    'code': 'InvalidParameterCombination',
+    'count': 100
+}]
+
+# スケールダウンが完了したクラスター（元は全て db.r6g.xlarge で、Dedicated Reader が Writer）
+SCALED_DOWN_CLUSTER = {
+    'identifier': 'sim-cluster',
+    'writerClass': 'db.r6g.large',
+    'dedicatedReaderClass': 'db.r6g.large',
+    'autoScalingReaders': 4,
+    'autoScalingReaderClass': 'db.r6g.large'
+}
+
+
+def original_snapshot(writer_instance_id, status='completed', execution_name='scaling-20250117-150000'):
+    return {
+        'writerInstanceId': writer_instance_id,
+        'instances': {i: 'db.r6g.xlarge' for i in [WRITER, DEDICATED_READER] + AUTOSCALING_READERS},
+        'status': status,
+        'executionName': execution_name,
+        'recordedAt': 1737126000
+    }
+
+
+def on_demand_simulation(snapshot, variables=None):
+    scenario = dict(load_scenario('baseline'), cluster=SCALED_DOWN_CLUSTER, schedulerEvent={'rollback': True})
+    simulation = Simulation(scenario, variables=variables)
+    if snapshot is not None:
+        simulation.ssm.parameters[SNAPSHOT_PARAMETER] = json.dumps(snapshot)
+    return simulation
+
+
+def stored_snapshot(simulation):
+    return json.loads(simulation.ssm.parameters[SNAPSHOT_PARAMETER])
+
+
+def scenario_success_marks_snapshot_completed():
+    simulation = Simulation(load_scenario('baseline'))
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    snapshot = stored_snapshot(simulation)
+    check(snapshot['status'] == 'completed', f"Snapshot was not completed: {snapshot}")
+    check(snapshot['writerInstanceId'] == WRITER, f"Unexpected original writer: {snapshot}")
+    check(set(snapshot['instances'].values()) == {'db.r6g.xlarge'}, f"Snapshot did not record the original classes: {snapshot}")
+    check(entries(report, 'PlanRollbackStep') == 0, 'A successful execution should not roll back')
+
+
+def scenario_failure_without_opt_in_does_not_roll_back():
+    simulation = Simulation(dict(load_scenario('baseline'), faults=OLD_WRITER_REJECTED))
+    report = simulation.run()
+    check(report['status'] == 'FAILED', f"Expected the execution to fail: {report['status']}")
+    check(entries(report, 'PlanRollbackStep') == 0, 'rollbackOnFailure defaults to false')
+    check(stored_snapshot(simulation)['status'] == 'in-progress', 'The snapshot of a failed execution stays in-progress')
+
+
+def scenario_failure_restores_classes_and_writer():
+    scenario = dict(load_scenario('baseline'), faults=OLD_WRITER_REJECTED, input={'rollbackOnFailure': True})
+    simulation = Simulation(scenario)
+    report = simulation.run()
+    check(report['status'] == 'FAILED', f"Expected the execution to fail: {report['status']}")
+    check(report['error']['error'] == 'OldWriterStatusTimeout', f"The original error was not preserved: {report['error']}")
+    check(entries(report, 'RollbackFailover') == 1, 'Rollback did not fail back to the original writer')
+    final = report['finalInstances']
+    check(final[WRITER]['writer'], f"The original writer is not the writer: {final}")
+    wrong = {i: f['class'] for i, f in final.items() if f['class'] != 'db.r6g.xlarge'}
+    check(not wrong, f"Instances were not restored to their original class: {wrong}")
+    check(stored_snapshot(simulation)['status'] == 'rolled-back', 'The snapshot was not marked rolled-back')
+    check(entries(report, 'ResumeAutoScalingAfterFailure') == 1, 'Auto scaling was not resumed after the rollback')
+
+
+def scenario_on_demand_rollback_in_parallel_waves():
+    # Reader 5台を、容量の 50% の予算（2台ずつ）で並列に戻す
+    simulation = on_demand_simulation(original_snapshot(DEDICATED_READER))
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(entries(report, 'ValidateInput') == 0, 'The rollback mode should skip the scaling path')
+    resizes = entries(report, 'BeginRollbackResize')
+    check(resizes == 4, f"Expected 3 reader waves and the demoted writer: {resizes}")
+    final = report['finalInstances']
+    check(final[DEDICATED_READER]['writer'], f"Did not fail back to the original writer: {final}")
+    wrong = {i: f['class'] for i, f in final.items() if f['class'] != 'db.r6g.xlarge'}
+    check(not wrong, f"Instances were not restored to their original class: {wrong}")
+    check(stored_snapshot(simulation)['status'] == 'rolled-back', 'The snapshot was not marked rolled-back')
+    check(report['notifications'] == 1, 'The rollback notification was not sent')
+
+
+def scenario_wave_budget_unlimited_restores_readers_at_once():
+    simulation = on_demand_simulation(
+        original_snapshot(DEDICATED_READER),
+        variables={'rollback_wave_max_capacity_percent': 100}
+    )
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    check(entries(report, 'BeginRollbackResize') == 2, f"Expected one reader wave and the demoted writer: {entries(report, 'BeginRollbackResize')}")
+
+
+def scenario_on_demand_plan_does_not_start():
+    simulation = on_demand_simulation(original_snapshot(WRITER))
+    with simulation.fake_aws():
+        body = simulation.invoke_scheduler(plan_only=True)
+    check(not simulation.sfn.executions, 'The plan mode should not start an execution')
+    check(body['nextStep']['action'] == 'resize', f"Unexpected next step: {body['nextStep']}")
+    check(WRITER not in body['nextStep']['instanceIds'], 'The writer should be resized after the readers')
+
+
+def scenario_missing_snapshot_fails_clearly():
+    simulation = on_demand_simulation(None)
+    report = simulation.run()
+    check(report['status'] == 'ERROR', f"Expected the scheduler to refuse: {report['status']}")
+    check('No rollback snapshot' in report['error']['cause'], f"Unexpected error: {report['error']}")
+
+
+def scenario_snapshot_preserved_across_failed_rerun():
+    simulation = on_demand_simulation(None)
+    cluster_identifier = simulation.rds.cluster['DBClusterIdentifier']
+    previous = original_snapshot(DEDICATED_READER, status='in-progress', execution_name='scaling-failed')
+    simulation.ssm.parameters[SNAPSHOT_PARAMETER] = json.dumps(previous)
+    with simulation.fake_aws():
+        response, _ = simulation.invoke_lambda(ROLLBACK_FUNCTION, {
+            'clusterIdentifier': cluster_identifier, 'action': 'snapshot', 'executionName': 'scaling-rerun'
+        })
+        check(not isinstance(response, StatesError) and response['preserved'], f"Snapshot was not preserved: {response}")
+        check(stored_snapshot(simulation)['instances'] == previous['instances'], 'The partially resized classes overwrote the snapshot')
+        check(stored_snapshot(simulation)['writerInstanceId'] == DEDICATED_READER, 'The original writer was overwritten')
+
+        # 別の実行のスナップショットでは、失敗時の自動ロールバックは行わない
+        response, _ = simulation.invoke_lambda(ROLLBACK_FUNCTION, {
+            'clusterIdentifier': cluster_identifier, 'action': 'plan', 'expectedExecutionName': 'scaling-other'
+        })
+    check(isinstance(response, StatesError) and 'not by this execution' in response.cause, f"Expected a refusal: {response}")
+
+
+def scenario_stuck_rollback_keeps_original_error():
+    scenario = dict(load_scenario('stuck-reader'), input={'rollbackOnFailure': True})
+    simulation = Simulation(scenario)
+    report = simulation.run()
+    check(report['status'] == 'FAILED', f"Expected the execution to fail: {report['status']}")
+    check(report['error']['error'] == 'AutoScalingReaderStatusTimeout', f"The original error was not preserved: {report['error']}")
+    check(entries(report, 'RollbackStepTimeoutError') == 1, 'The stuck rollback step did not time out')
+    check(stored_snapshot(simulation)['status'] == 'in-progress', 'An incomplete rollback must keep the snapshot in-progress')
+
+
+SCENARIOS = [
+    scenario_success_marks_snapshot_completed,
+    scenario_failure_without_opt_in_does_not_roll_back,
+    scenario_failure_restores_classes_and_writer,
+    scenario_on_demand_rollback_in_parallel_waves,
+    scenario_wave_budget_unlimited_restores_readers_at_once,
+    scenario_on_demand_plan_does_not_start,
+    scenario_missing_snapshot_fails_clearly,
+    scenario_snapshot_preserved_across_failed_rerun,
+    scenario_stuck_rollback_keeps_original_error,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate the rollback engine and the rollback paths of the state machine against the simulator')
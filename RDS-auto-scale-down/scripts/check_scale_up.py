@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+スケールアップ（direction: "up"）と期限からの開始時刻の逆算（deadline）をローカルで検証する
+
+シミュレーターの FakeRds に対して、スケールアップでは Reader（Dedicated Reader と AutoScaling Reader）を先に変更し、
+拡大した Dedicated Reader にフェイルオーバーしてから旧Writer を変更すること、スケールダウンの順序は変わらないこと、
+update-schedule の deadline が過去のリサイズ履歴のパーセンタイルから期限までに終わる開始時刻を設定すること、
+schedule-scaling が期限までの余裕（DeadlineSlackSeconds）を記録することを確認する。AWSへの接続は不要。
+
+使い方:
+    python3 scripts/check_scale_up.py              # 全シナリオを実行
+    python3 scripts/check_scale_up.py -k deadline  # 名前に deadline を含むシナリオのみ実行
+    python3 scripts/check_scale_up.py -v           # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import json
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.asl import StatesError  # noqa: E402
+from simulator.checks import check, record_requests, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+from scaling_common import deadline as deadline_module  # noqa: E402
+
+UPDATE_SCHEDULE_FUNCTION = 'function:update_schedule'
+WRITER = 'sim-cluster-writer'
+DEDICATED_READER = 'sim-cluster-dedicated-reader'
+AUTOSCALING_READERS = [f"application-autoscaling-sim-cluster-{i:02d}" for i in range(1, 5)]
+
+
+def run_recorded(scenario):
+    simulation = Simulation(scenario)
+    # インスタンスタイプの変更とフェイルオーバーを要求した順序（同じインスタンスの再要求は最初の1回のみ）
+    operations = record_requests(simulation.rds, 'modify_db_instance', lambda kwargs: ('modify', kwargs['DBInstanceIdentifier']),
+                                 once_per='DBInstanceIdentifier')
+    record_requests(simulation.rds, 'failover_db_cluster', lambda kwargs: ('failover', kwargs.get('TargetDBInstanceIdentifier')), operations)
+    report = simulation.run()
+    check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+    return simulation, report, operations
+
+
+def position(operations, operation):
+    check(operation in operations, f"{operation} was not requested: {operations}")
+    return operations.index(operation)
+
+
+def schedule_simulation(scenario_name='scale-up'):
+    simulation = Simulation(load_scenario(scenario_name))
+    for name in ('EVENTBRIDGE_RULE_NAME', 'SCALE_UP_EVENTBRIDGE_RULE_NAME'):
+        rule_name = simulation.terraform.lambda_environment('update_schedule')[name]
+        simulation.events_client.targets[rule_name] = [{'Id': 'ScheduleScalingTarget', 'Arn': 'arn:aws:lambda:local:000000000000:function:schedule-scaling'}]
+    return simulation
+
+
+def update_schedule(simulation, **event):
+    event = dict({'clusterIdentifier': simulation.rds.cluster['DBClusterIdentifier'], 'targetClass': 'db.r6g.large'}, **event)
+    with simulation.fake_aws():
+        response, _ = simulation.invoke_lambda(UPDATE_SCHEDULE_FUNCTION, event)
+    if isinstance(response, StatesError):
+        return response
+    return json.loads(response['body'])
+
+
+def scenario_readers_upsized_before_failover():
+    simulation, report, operations = run_recorded(load_scenario('scale-up'))
+    failover = position(operations, ('failover', DEDICATED_READER))
+    for reader in [DEDICATED_READER] + AUTOSCALING_READERS:
+        check(position(operations, ('modify', reader)) < failover, f"{reader} was not upsized before the failover: {operations}")
+    check(position(operations, ('modify', WRITER)) > failover, f"The old writer was modified before the failover: {operations}")
+    check(report['finalInstances'][DEDICATED_READER]['writer'], 'The upsized dedicated reader is not the writer')
+    check(all(i['class'] == 'db.r6g.large' for i in report['finalInstances'].values()), f"Unexpected classes: {report['finalInstances']}")
+
+
+def scenario_scale_down_keeps_readers_last():
+    simulation, report, operations = run_recorded(load_scenario('baseline'))
+    old_writer = position(operations, ('modify', WRITER))
+    for reader in AUTOSCALING_READERS:
+        check(position(operations, ('modify', reader)) > old_writer, f"{reader} was resized before the old writer: {operations}")
+
+
+def scenario_direction_inferred_from_classes():
+    up = Simulation(load_scenario('scale-up')).plan()
+    down = Simulation(load_scenario('baseline')).plan()
+    check(up['direction'] == 'up' and down['direction'] == 'down', f"Unexpected directions: {up['direction']}, {down['direction']}")
+    phases = [step['phase'] for step in up['steps']]
+    check(phases.index('failover') > max(i for i, phase in enumerate(phases) if phase == 'autoscaling-reader'), f"Unexpected scale-up plan: {phases}")
+    check(phases[-1] == 'old-writer', f"Unexpected scale-up plan: {phases}")
+
+
+def scenario_explicit_direction_overrides():
+    scenario = load_scenario('scale-up')
+    scenario['schedulerEvent'] = {'direction': 'down'}
+    simulation, report, operations = run_recorded(scenario)
+    old_writer = position(operations, ('modify', WRITER))
+    check(all(position(operations, ('modify', r)) > old_writer for r in AUTOSCALING_READERS), f"direction: down was not honoured: {operations}")
+
+
+def scenario_resume_skips_finished_dedicated_reader():
+    scenario = load_scenario('scale-up')
+    scenario['cluster']['dedicatedReaderClass'] = 'db.r6g.large'
+    simulation, report, operations = run_recorded(scenario)
+    check(('modify', DEDICATED_READER) not in operations, f"The finished dedicated reader was modified again: {operations}")
+    check(operations[0][1] in AUTOSCALING_READERS, f"Scale-up did not resume with the readers: {operations}")
+    check(position(operations, ('failover', DEDICATED_READER)) > max(position(operations, ('modify', r)) for r in AUTOSCALING_READERS), f"Unexpected order: {operations}")
+
+
+def expected_start(deadline_minutes, budget_seconds):
+    start = (deadline_minutes - math.ceil(budget_seconds / 60)) % 1440
+    return start - start % deadline_module.START_ROUNDING_MINUTES
+
+
+def scenario_deadline_start_time_uses_history_percentile():
+    simulation = schedule_simulation()
+    body = update_schedule(simulation, deadline='08:00', direction='up')
+    check(not isinstance(body, StatesError), f"update-schedule failed: {body}")
+    schedule = body['deadlineSchedule']
+    environment = simulation.terraform.lambda_environment('update_schedule')
+    check(schedule['estimatePercentile'] == float(environment['DEADLINE_ESTIMATE_PERCENTILE']), f"Unexpected percentile: {schedule}")
+    check(schedule['failoverGateSeconds'] == int(environment['FAILOVER_GATE_MAX_WAIT_SECONDS']), f"The failover gate was not budgeted: {schedule}")
+    check(schedule['marginSeconds'] == int(environment['DEADLINE_MARGIN_MINUTES']) * 60, f"Unexpected margin: {schedule}")
+    # 中央値の見込みより長い（履歴の遅い変更も期限に間に合わせる）
+    median_plan = Simulation(load_scenario('scale-up')).plan()
+    check(schedule['estimatedDurationSeconds'] > median_plan['estimatedDurationSeconds'], f"The percentile estimate is not above the median: {schedule}")
+    start = expected_start(8 * 60, schedule['budgetSeconds'])
+    check(schedule['scheduleTime'] == f"{start // 60:02d}:{start % 60:02d}", f"Unexpected start time: {schedule}")
+
+    rule_name = environment['SCALE_UP_EVENTBRIDGE_RULE_NAME']
+    check(body['ruleName'] == rule_name, f"The scale-up rule was not updated: {body['ruleName']}")
+    utc_minutes = (start - 9 * 60) % 1440
+    expression = f"cron({utc_minutes % 60} {utc_minutes // 60} * * ? *)"
+    check(simulation.events_client.rules[rule_name]['ScheduleExpression'] == expression, f"Unexpected schedule: {simulation.events_client.rules[rule_name]}")
+    target_input = json.loads(simulation.events_client.targets[rule_name][0]['Input'])
+    check(target_input.get('direction') == 'up' and target_input.get('deadline') == '08:00', f"Unexpected target input: {target_input}")
+    check(environment['EVENTBRIDGE_RULE_NAME'] not in simulation.events_client.rules, 'The scale-down rule was changed')
+
+
+def scenario_deadline_plan_does_not_update_rule():
+    simulation = schedule_simulation()
+    body = update_schedule(simulation, deadline='08:00', plan=True)
+    check(not isinstance(body, StatesError), f"update-schedule failed: {body}")
+    check(body['direction'] == 'up', f"Direction was not inferred: {body}")
+    check(not simulation.events_client.rules, f"Plan mode updated a rule: {simulation.events_client.rules}")
+
+
+def scenario_unreachable_one_time_deadline_rejected():
+    # シミュレーションの開始時刻は 2025-01-19 00:00 JST
+    simulation = schedule_simulation()
+    response = update_schedule(simulation, deadline='2025-01-19 00:30', direction='up')
+    check(isinstance(response, StatesError) and 'cannot finish' in response.cause, f"Expected the deadline to be rejected: {response}")
+    body = update_schedule(simulation, deadline='2025-01-20 08:00', direction='up')
+    check(not isinstance(body, StatesError), f"update-schedule failed: {body}")
+    check(body['deadlineSchedule']['scheduleTime'].startswith('2025-01-20 0'), f"Unexpected one-time start: {body['deadlineSchedule']}")
+
+
+def scenario_scheduler_records_deadline_slack():
+    for deadline, late in (('08:00', False), ('00:30', True)):
+        scenario = load_scenario('scale-up')
+        scenario['schedulerEvent'] = {'direction': 'up', 'deadline': deadline}
+        simulation = Simulation(scenario)
+        report = simulation.run()
+        check(report['status'] == 'SUCCEEDED', f"Execution ended with {report['status']}: {report['error']}")
+        records = [r for r in simulation.emf_records if 'DeadlineSlackSeconds' in r]
+        check(len(records) == 1, f"Expected one deadline record: {records}")
+        slack = records[0]['DeadlineSlackSeconds']
+        check((slack < 0) == late, f"Unexpected slack for deadline {deadline}: {slack}")
+        # 間に合わない見込みでも実行は開始する（遅れても拡大しないよりはよいため）
+        check(report['finalInstances'][DEDICATED_READER]['class'] == 'db.r6g.large', f"Scale-up did not run: {report['finalInstances']}")
+
+
+SCENARIOS = [
+    scenario_readers_upsized_before_failover,
+    scenario_scale_down_keeps_readers_last,
+    scenario_direction_inferred_from_classes,
+    scenario_explicit_direction_overrides,
+    scenario_resume_skips_finished_dedicated_reader,
+    scenario_deadline_start_time_uses_history_percentile,
+    scenario_deadline_plan_does_not_update_rule,
+    scenario_unreachable_one_time_deadline_rejected,
+    scenario_scheduler_records_deadline_slack,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate the scale-up workflow and deadline-driven scheduling against the simulator')
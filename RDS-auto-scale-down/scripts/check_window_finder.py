@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+負荷の低い時間帯の検索（update-schedule の scheduleTime: "auto"、scaling_common.window_finder）をローカルで検証する
+
+シミュレーターの FakeCloudWatch が合成したクラスターの CPU使用率・接続数（時刻・曜日ごとの負荷）に対して、
+選ばれる開始時刻と EventBridge ルールの更新内容を確認する。AWSへの接続は不要。
+
+使い方:
+    python3 scripts/check_window_finder.py              # 全シナリオを実行
+    python3 scripts/check_window_finder.py -k weekly    # 名前に weekly を含むシナリオのみ実行
+    python3 scripts/check_window_finder.py -v           # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import copy
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_scaling import load_scenario  # noqa: E402
+from simulator.asl import StatesError  # noqa: E402
+from simulator.checks import check, run_scenarios  # noqa: E402
+from simulator.runner import Simulation  # noqa: E402
+
+from scaling_common import window_finder  # noqa: E402
+
+UPDATE_SCHEDULE_FUNCTION = 'function:update_schedule'
+
+# 日中 60%、深夜 20%、3:00-5:00 JST だけほぼアイドルのクラスター
+QUIET_AT_THREE = {
+    'days': 28,
+    'noise': 0.05,
+    'cluster': {
+        'cpu': {'peak': 60, 'offPeak': 20, 'byHour': {'3': 5, '4': 5}},
+        'connections': {'peak': 500, 'offPeak': 120, 'byHour': {'3': 20, '4': 20}}
+    }
+}
+
+
+def window_simulation(metrics=None, variables=None, **cluster):
+    scenario = load_scenario('baseline')
+    scenario['metrics'] = copy.deepcopy(metrics or QUIET_AT_THREE)
+    scenario['cluster'].update(cluster)
+    simulation = Simulation(scenario, variables=variables)
+    rule_name = simulation.terraform.lambda_environment('update_schedule')['EVENTBRIDGE_RULE_NAME']
+    simulation.events_client.targets[rule_name] = [{'Id': 'ScheduleScalingTarget', 'Arn': 'arn:aws:lambda:local:000000000000:function:schedule-scaling'}]
+    return simulation, rule_name
+
+
+def update_schedule(simulation, **event):
+    event = dict({
+        'clusterIdentifier': simulation.rds.cluster['DBClusterIdentifier'],
+        'targetClass': 'db.r6g.large',
+        'scheduleTime': window_finder.AUTO_SCHEDULE_TIME
+    }, **event)
+    with simulation.fake_aws():
+        response, _ = simulation.invoke_lambda(UPDATE_SCHEDULE_FUNCTION, event)
+    if isinstance(response, StatesError):
+        return response
+    return json.loads(response['body'])
+
+
+def scenario_fold_by_weekday_hour():
+    # 日曜 15:00 UTC = 月曜 0:00 JST。2週間分の1時間ごとの値は各枠に2つずつ
+    start = datetime(2025, 1, 5, 15, 0, tzinfo=timezone.utc)
+    timestamps = [start + timedelta(hours=i) for i in range(2 * window_finder.HOURS_PER_WEEK)]
+    buckets = window_finder.fold_by_weekday_hour(timestamps, list(range(len(timestamps))))
+    check(all(len(bucket) == 2 for bucket in buckets), 'Every weekday/hour bucket should have two samples')
+    check(buckets[0] == [0, 168], f"Monday 00:00 JST bucket is wrong: {buckets[0]}")
+    check(buckets[6 * 24 + 23] == [167, 335], f"Sunday 23:00 JST bucket is wrong: {buckets[6 * 24 + 23]}")
+
+    # UTC への変換で曜日がずれる（月曜 3:00 JST = 日曜 18:00 UTC）
+    check(window_finder.weekly_cron_expression(0, 3) == 'cron(0 18 ? * SUN *)', window_finder.weekly_cron_expression(0, 3))
+    check(window_finder.weekly_cron_expression(2, 12) == 'cron(0 3 ? * WED *)', window_finder.weekly_cron_expression(2, 12))
+
+
+def scenario_daily_window_avoids_traffic():
+    simulation, _ = window_simulation()
+    body = update_schedule(simulation, plan=True)
+    best = body['candidates'][0]
+    check(best['scheduleTime'] in ('03:00', '04:00'), f"Expected the quiet 3:00-5:00 window, got {best['scheduleTime']}")
+    check(best['score'] < 0.1 < body['candidates'][-1]['score'], f"Unexpected scores: {[c['score'] for c in body['candidates']]}")
+    check(not simulation.events_client.rules, 'Plan mode must not update the EventBridge rule')
+
+
+def scenario_long_workflow_shifts_window():
+    # 3:00 だけアイドルで 4:00 以降は日中の負荷。約2時間かかる構成では 3:00 開始だと大半が日中の負荷に重なる
+    metrics = copy.deepcopy(QUIET_AT_THREE)
+    metrics['cluster'] = {
+        'cpu': {'peak': 80, 'offPeak': 25, 'byHour': {'3': 5, '4': 80, '5': 80, '6': 80}},
+        'connections': {'peak': 600, 'offPeak': 150, 'byHour': {'3': 20, '4': 600, '5': 600, '6': 600}}
+    }
+    short, _ = window_simulation(metrics)
+    check(update_schedule(short, plan=True)['candidates'][0]['scheduleTime'] == '03:00', 'The short workflow should start at 03:00')
+
+    long, _ = window_simulation(metrics, variables={'reader_wave_max_readers': 1}, autoScalingReaders=10)
+    best = update_schedule(long, plan=True)['candidates'][0]
+    check(best['estimatedDurationSeconds'] > 2 * 3600, f"Expected a workflow longer than 2 hours: {best['estimatedDurationSeconds']}")
+    check(best['scheduleTime'] in ('00:00', '01:00', '02:00'), f"The long workflow should start before 03:00 to avoid the daytime load: {best}")
+    check(best['expectedLoad'] < 0.3, f"Unexpected load for the long workflow: {best}")
+
+
+def scenario_weekly_mode_picks_quiet_day():
+    metrics = copy.deepcopy(QUIET_AT_THREE)
+    for level in metrics['cluster'].values():
+        level['byWeekday'] = {'SUN': 0.2}
+    simulation, rule_name = window_simulation(metrics)
+    body = update_schedule(simulation, scheduleMode='weekly')
+    window = body['window']
+    check(window['weekday'] == 'SUN' and window['scheduleTime'] in ('03:00', '04:00'), f"Expected Sunday 3:00-5:00 JST: {window}")
+    check(body['scheduleExpression'] == window['scheduleExpression'] == window_finder.weekly_cron_expression(6, int(window['scheduleTime'][:2])), body['scheduleExpression'])
+    check(simulation.events_client.rules[rule_name]['ScheduleExpression'] == body['scheduleExpression'], 'The rule was not updated with the weekly expression')
+
+
+def scenario_search_window_limits_candidates():
+    simulation, _ = window_simulation()
+    body = update_schedule(simulation, plan=True, searchWindow='22:00-02:00')
+    starts = {c['scheduleTime'] for c in body['candidates']}
+    check(starts and starts <= {'22:00', '23:00', '00:00', '01:00'}, f"Candidates outside the search window: {starts}")
+
+
+def scenario_update_schedule_programs_rule():
+    simulation, rule_name = window_simulation()
+    body = update_schedule(simulation, targetClass='auto')
+    rule = simulation.events_client.rules[rule_name]
+    check(rule['State'] == 'ENABLED', f"Rule is not enabled: {rule}")
+    # 3:00 JST = 18:00 UTC、4:00 JST = 19:00 UTC（毎日）
+    check(rule['ScheduleExpression'] in ('cron(0 18 * * ? *)', 'cron(0 19 * * ? *)'), f"Unexpected schedule: {rule['ScheduleExpression']}")
+    check(body['scheduleTime'] == body['window']['scheduleTime'], f"Response does not report the selected window: {body}")
+    target_input = json.loads(simulation.events_client.targets[rule_name][0]['Input'])
+    check(target_input == {'clusterIdentifier': simulation.rds.cluster['DBClusterIdentifier'], 'targetClass': 'auto'}, f"Unexpected target input: {target_input}")
+
+
+def scenario_insufficient_metrics_fails():
+    metrics = copy.deepcopy(QUIET_AT_THREE)
+    metrics['days'] = 0
+    simulation, rule_name = window_simulation(metrics)
+    response = update_schedule(simulation)
+    check(isinstance(response, StatesError) and response.error == 'ValueError', f"Expected a ValueError, got {response}")
+    check(rule_name not in simulation.events_client.rules, 'The rule must not be updated without a window')
+
+
+SCENARIOS = [
+    scenario_fold_by_weekday_hour,
+    scenario_daily_window_avoids_traffic,
+    scenario_long_workflow_shifts_window,
+    scenario_weekly_mode_picks_quiet_day,
+    scenario_search_window_limits_candidates,
+    scenario_update_schedule_programs_rule,
+    scenario_insufficient_metrics_fails,
+]
+
+
+if __name__ == '__main__':
+    run_scenarios(SCENARIOS, 'Validate the quiet-window search of update-schedule on synthetic metric series')
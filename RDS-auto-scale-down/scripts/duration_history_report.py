@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+所要時間の履歴（DynamoDB のテーブル <project>-<environment>-scaling-duration-history）から、
+クラスター×エンジンバージョン×インスタンスタイプの変更（フェイルオーバー）ごとの所要時間のパーセンタイルを表示する
+
+Wait の秒数（polling_*、event_wait_timeout_seconds など）の調整や、遅い変更の判定（slow_duration_factor）の確認に使う。
+キー（--cluster / --engine-version / --transition をすべて指定）を指定した場合は Query、それ以外は Scan で読み込む。
+
+使い方:
+    python3 scripts/duration_history_report.py --table rds-scaling-prod-scaling-duration-history
+    python3 scripts/duration_history_report.py --table rds-scaling-prod-scaling-duration-history --cluster aurora-prod
+    python3 scripts/duration_history_report.py --table rds-scaling-prod-scaling-duration-history \\
+        --cluster aurora-prod --engine-version 8.0.mysql_aurora.3.05.2 --transition db.r6g.large->db.t4g.medium --json
+"""
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lambdaレイヤー（/opt/python）の代わりに共通モジュールを読み込む
+sys.path.insert(0, os.path.join(ROOT, 'lambda_functions', 'common_layer', 'python'))
+
+from scaling_common.aws_clients import LazyClient  # noqa: E402
+from scaling_common.duration_history import (  # noqa: E402
+    START_SORT_KEY, DynamoDBDurationHistoryStore, duration_stats, history_key
+)
+from scaling_common.resize_history import SUMMARY_HISTORY_KEY  # noqa: E402
+
+dynamodb = LazyClient('dynamodb')
+
+PROJECTION = 'historyKey, sampleKey, durationSeconds'
+
+
+def scan_samples(table_name):
+    """
+    テーブル全体のサンプル: {historyKey: [durationSeconds, ...]}（開始の記録と見積もり用の要約は除く）
+    """
+    samples = defaultdict(list)
+    kwargs = {'TableName': table_name, 'ProjectionExpression': PROJECTION}
+    while True:
+        response = dynamodb.scan(**kwargs)
+        for item in response.get('Items', []):
+            if item['sampleKey']['S'].startswith(START_SORT_KEY) or item['historyKey']['S'] == SUMMARY_HISTORY_KEY:
+                continue
+            samples[item['historyKey']['S']].append(int(item['durationSeconds']['N']))
+        if not response.get('LastEvaluatedKey'):
+            return samples
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def summarize(samples, cluster=None):
+    """
+    キーごとの集計（クラスター・キーの順）
+    """
+    rows = []
+    for key in sorted(samples):
+        cluster_identifier, engine_version, transition = key.split('#', 2)
+        if cluster and cluster_identifier != cluster:
+            continue
+        rows.append({
+            'clusterIdentifier': cluster_identifier,
+            'engineVersion': engine_version,
+            'transition': transition,
+            **duration_stats(samples[key])
+        })
+    return rows
+
+
+def print_report(rows):
+    if not rows:
+        print('No samples')
+        return
+    print(f"{'cluster':<24} {'engine':<28} {'transition':<40} {'n':>5} {'p50':>8} {'p90':>8} {'p95':>8} {'max':>8}")
+    for row in rows:
+        print(
+            f"{row['clusterIdentifier']:<24} {row['engineVersion']:<28} {row['transition']:<40} {row['count']:>5} "
+            f"{row['p50']:>8} {row['p90']:>8} {row['p95']:>8} {row['max']:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show resize and failover duration percentiles from the duration history table')
+    parser.add_argument('--table', required=True, help='duration history DynamoDB table name')
+    parser.add_argument('--cluster', help='only this cluster identifier')
+    parser.add_argument('--engine-version', help='engine version (with --cluster and --transition: query one key)')
+    parser.add_argument('--transition', help="class transition such as 'db.r6g.large->db.t4g.medium' or 'failover'")
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args()
+
+    if args.cluster and args.engine_version and args.transition:
+        key = history_key(args.cluster, args.engine_version, args.transition)
+        store = DynamoDBDurationHistoryStore(dynamodb, args.table)
+        samples = {key: [sample['durationSeconds'] for sample in store.samples(key)]}
+        samples = {k: v for k, v in samples.items() if v}
+    else:
+        if args.engine_version or args.transition:
+            parser.error('--engine-version and --transition require --cluster, --engine-version and --transition together')
+        samples = scan_samples(args.table)
+
+    rows = summarize(samples, args.cluster)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_report(rows)
+
+
+if __name__ == '__main__':
+    main()
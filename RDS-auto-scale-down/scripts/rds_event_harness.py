@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+イベント駆動モード（completionMode = "event"）のタスクトークン照合をローカルで検証するハーネス
+
+modify_instance / failover_cluster / rds_event_handler の各Lambdaを読み込み、
+RDS・Step Functions・DynamoDB をメモリ上の代替に差し替えてRDSイベントを注入する。
+AWSへの接続は不要。
+
+使い方:
+    python3 scripts/rds_event_harness.py            # 全シナリオを実行
+    python3 scripts/rds_event_harness.py -k wave    # 名前に wave を含むシナリオのみ実行
+    python3 scripts/rds_event_harness.py -v         # Lambdaのログも表示
+
+いずれかのシナリオが失敗した場合は終了コード 1 で終了する。
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import sys
+import traceback
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(ROOT, 'lambda_functions')
+
+# Lambdaレイヤー（/opt/python）の代わりに共通モジュールを読み込む
+sys.path.insert(0, os.path.join(LAMBDA_DIR, 'common_layer', 'python'))
+# boto3 クライアントの生成にリージョンが必要（API呼び出しは行わない）
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+
+from scaling_common import emf  # noqa: E402
+from scaling_common.task_tokens import InMemoryTaskTokenStore, instance_key, cluster_key  # noqa: E402
+
+
+def load_lambda(name):
+    spec = importlib.util.spec_from_file_location(f"{name}_index", os.path.join(LAMBDA_DIR, name, 'index.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TaskClosedError(Exception):
+    """
+    タイムアウト・完了済みのタスクに SendTaskSuccess を送った場合（states:TaskTimedOut 相当）
+    """
+
+
+class FakeStepFunctions:
+    def __init__(self):
+        self.succeeded = []
+        self.closed_tokens = set()
+
+    def send_task_success(self, taskToken, output):
+        if taskToken in self.closed_tokens:
+            raise TaskClosedError(f"Task {taskToken} already closed")
+        self.closed_tokens.add(taskToken)
+        self.succeeded.append({'taskToken': taskToken, 'output': json.loads(output)})
+
+    def tokens(self):
+        return [s['taskToken'] for s in self.succeeded]
+
+
+class FakeSsm:
+    def get_parameter(self, Name):
+        # 履歴なし（デフォルトの見込み時間を使う）
+        raise Exception(f"Parameter {Name} not found")
+
+
+class FakeRds:
+    def __init__(self, instances, cluster_identifier='test-cluster', writer_instance_id='writer'):
+        self.cluster_identifier = cluster_identifier
+        self.writer_instance_id = writer_instance_id
+        self.instances = {
+            instance_id: {
+                'DBInstanceIdentifier': instance_id,
+                'DBInstanceArn': f"arn:aws:rds:ap-northeast-1:123456789012:db:{instance_id}",
+                'DBInstanceClass': instance_class,
+                'DBInstanceStatus': status
+            }
+            for instance_id, (instance_class, status) in instances.items()
+        }
+        self.calls = []
+
+    def describe_db_clusters(self, DBClusterIdentifier):
+        self.calls.append('DescribeDBClusters')
+        members = [self.writer_instance_id] + [i for i in self.instances if i != self.writer_instance_id]
+        return {'DBClusters': [{
+            'DBClusterIdentifier': DBClusterIdentifier,
+            'Status': 'available',
+            'DBClusterMembers': [
+                {'DBInstanceIdentifier': i, 'IsClusterWriter': i == self.writer_instance_id}
+                for i in members
+            ]
+        }]}
+
+    def describe_db_instances(self, DBInstanceIdentifier=None, Filters=None):
+        self.calls.append('DescribeDBInstances')
+        if DBInstanceIdentifier:
+            return {'DBInstances': [dict(self.instances[DBInstanceIdentifier])]}
+        ids = Filters[0]['Values']
+        return {'DBInstances': [dict(self.instances[i]) for i in ids if i in self.instances]}
+
+    def modify_db_instance(self, DBInstanceIdentifier, DBInstanceClass, ApplyImmediately):
+        self.calls.append('ModifyDBInstance')
+        self.instances[DBInstanceIdentifier]['DBInstanceStatus'] = 'modifying'
+
+    def failover_db_cluster(self, DBClusterIdentifier, TargetDBInstanceIdentifier):
+        self.calls.append('FailoverDBCluster')
+        return {'DBCluster': {'DBClusterIdentifier': DBClusterIdentifier, 'Status': 'failing-over'}}
+
+
+def instance_event(instance_id, event_id='RDS-EVENT-0014', message='Finished applying modification to DB instance class'):
+    return {
+        'source': 'aws.rds',
+        'detail-type': 'RDS DB Instance Event',
+        'time': '2025-01-18T15:10:00Z',
+        'detail': {
+            'SourceType': 'DB_INSTANCE',
+            'SourceIdentifier': instance_id,
+            'EventID': event_id,
+            'Message': message,
+            'Date': '2025-01-18T15:10:00.000Z'
+        }
+    }
+
+
+def cluster_event(cluster_identifier, target_instance_id, event_id='RDS-EVENT-0071'):
+    return {
+        'source': 'aws.rds',
+        'detail-type': 'RDS DB Cluster Event',
+        'time': '2025-01-18T15:20:00Z',
+        'detail': {
+            'SourceType': 'CLUSTER',
+            'SourceIdentifier': cluster_identifier,
+            'EventID': event_id,
+            'Message': f"Completed failover to DB instance: {target_instance_id}",
+            'Date': '2025-01-18T15:20:00.000Z'
+        }
+    }
+
+
+class Harness:
+    """
+    3つのLambdaで同じトークンストア・Step Functions の代替を共有する
+    """
+
+    def __init__(self, instances, writer_instance_id='writer'):
+        self.store = InMemoryTaskTokenStore()
+        self.sfn = FakeStepFunctions()
+        self.rds = FakeRds(instances, writer_instance_id=writer_instance_id)
+
+        self.modify = load_lambda('modify_instance')
+        self.failover = load_lambda('failover_cluster')
+        self.handler = load_lambda('rds_event_handler')
+
+        for module in (self.modify, self.failover, self.handler):
+            module.token_store = self.store
+            module.sfn = self.sfn
+            if hasattr(module, 'rds'):
+                module.rds = self.rds
+            if hasattr(module, 'ssm'):
+                module.ssm = FakeSsm()
+
+    def inject(self, event):
+        return self.handler.lambda_handler(event, None)
+
+
+def check(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+# --- シナリオ ---
+
+def scenario_single_instance_modify():
+    h = Harness({'reader-1': ('db.r6g.large', 'available')})
+    h.modify.lambda_handler({'instanceId': 'reader-1', 'targetClass': 'db.t4g.medium', 'taskToken': 'token-1'}, None)
+
+    check(instance_key('reader-1') in h.store.items, 'token should be registered before completion')
+    check(h.sfn.succeeded == [], 'task must not complete before the RDS event')
+
+    # 関係のないイベント（変更開始の通知）は無視される
+    result = h.inject(instance_event('reader-1', 'RDS-EVENT-0012', 'Applying modification to database instance class'))
+    check(result['status'] == 'ignored', f"modification start event should be ignored: {result}")
+
+    result = h.inject(instance_event('reader-1'))
+    check(result['status'] == 'task_succeeded', f"completion event should succeed the task: {result}")
+    check(h.sfn.tokens() == ['token-1'], f"unexpected task completions: {h.sfn.tokens()}")
+    check(h.sfn.succeeded[0]['output']['eventId'] == 'RDS-EVENT-0014', 'task output should carry the event')
+    check(h.store.items == {}, 'store should be empty after completion')
+
+
+def scenario_wave_waits_for_all_instances():
+    h = Harness({
+        'as-reader-1': ('db.r6g.large', 'available'),
+        'as-reader-2': ('db.r6g.large', 'available'),
+        'as-reader-3': ('db.t4g.medium', 'available')  # 変更不要: 待機しない
+    })
+    result = h.modify.lambda_handler({
+        'instanceIds': ['as-reader-1', 'as-reader-2', 'as-reader-3'],
+        'targetClass': 'db.t4g.medium',
+        'taskToken': 'wave-token'
+    }, None)
+
+    check(result['waitingForEvents'] == 2, f"two instances should be waited for: {result}")
+    check(instance_key('as-reader-3') not in h.store.items, 'unchanged instance should not be waited for')
+
+    result = h.inject(instance_event('as-reader-2'))
+    check(result['status'] == 'pending', f"first completion in a wave should stay pending: {result}")
+    check(h.sfn.succeeded == [], 'wave task must wait for every instance')
+
+    result = h.inject(instance_event('as-reader-1'))
+    check(result['status'] == 'task_succeeded', f"last completion should succeed the wave task: {result}")
+    check(h.sfn.tokens() == ['wave-token'], f"unexpected task completions: {h.sfn.tokens()}")
+
+
+def scenario_wave_without_changes_completes_immediately():
+    h = Harness({
+        'as-reader-1': ('db.t4g.medium', 'available'),
+        'as-reader-2': ('db.t4g.medium', 'available')
+    })
+    h.modify.lambda_handler({
+        'instanceIds': ['as-reader-1', 'as-reader-2'],
+        'targetClass': 'db.t4g.medium',
+        'taskToken': 'noop-token'
+    }, None)
+
+    check(h.sfn.tokens() == ['noop-token'], 'task should complete without waiting for events')
+    check(h.sfn.succeeded[0]['output']['completionSource'] == 'modify_instance', 'completion should come from modify_instance')
+    check(h.store.items == {}, 'nothing should remain in the store')
+
+
+def scenario_failover_completion():
+    h = Harness({'dedicated-reader': ('db.t4g.medium', 'available')})
+    h.failover.lambda_handler({
+        'clusterIdentifier': 'test-cluster',
+        'targetInstanceId': 'dedicated-reader',
+        'taskToken': 'failover-token'
+    }, None)
+
+    check(cluster_key('test-cluster') in h.store.items, 'failover wait should be registered on the cluster')
+
+    # インスタンスの変更完了イベントではフェイルオーバーの待機は完了しない
+    result = h.inject(instance_event('dedicated-reader'))
+    check(result['status'] == 'not_waiting', f"instance event must not match the cluster wait: {result}")
+
+    # EventID がなくてもメッセージで判定する
+    result = h.inject(cluster_event('test-cluster', 'dedicated-reader', event_id=''))
+    check(result['status'] == 'task_succeeded', f"failover completion should succeed the task: {result}")
+    check(h.sfn.tokens() == ['failover-token'], f"unexpected task completions: {h.sfn.tokens()}")
+
+
+def scenario_failover_skipped_when_already_writer():
+    h = Harness({'dedicated-reader': ('db.t4g.medium', 'available')}, writer_instance_id='dedicated-reader')
+    result = h.failover.lambda_handler({
+        'clusterIdentifier': 'test-cluster',
+        'targetInstanceId': 'dedicated-reader',
+        'taskToken': 'failover-token'
+    }, None)
+
+    check(result['status'] == 'already_writer', f"failover should be skipped: {result}")
+    check('FailoverDBCluster' not in h.rds.calls, 'failover_db_cluster must not be called')
+    check(h.sfn.tokens() == ['failover-token'], 'task should complete without waiting for events')
+    check(h.store.items == {}, 'nothing should remain in the store')
+
+
+def scenario_failed_request_does_not_wait():
+    h = Harness({'reader-1': ('db.r6g.large', 'backing-up')})
+    try:
+        h.modify.lambda_handler({'instanceId': 'reader-1', 'targetClass': 'db.t4g.medium', 'taskToken': 'token-1'}, None)
+        raise AssertionError('modify_instance should fail for an unavailable instance')
+    except AssertionError:
+        raise
+    except Exception:
+        pass
+    check(h.store.items == {}, 'token should be discarded when the request fails')
+
+
+def scenario_duplicate_and_late_events():
+    h = Harness({'reader-1': ('db.r6g.large', 'available')})
+    h.modify.lambda_handler({'instanceId': 'reader-1', 'targetClass': 'db.t4g.medium', 'taskToken': 'token-1'}, None)
+    h.inject(instance_event('reader-1'))
+
+    # 同じイベントが再送されても二重に完了させない
+    result = h.inject(instance_event('reader-1'))
+    check(result['status'] == 'not_waiting', f"duplicate event should be ignored: {result}")
+
+    # タイムアウトでポーリングに移行済みのタスク（トークンは閉じている）
+    h.rds.instances['reader-1']['DBInstanceStatus'] = 'available'
+    h.modify.lambda_handler({'instanceId': 'reader-1', 'targetClass': 'db.r6g.xlarge', 'taskToken': 'timed-out-token'}, None)
+    h.sfn.closed_tokens.add('timed-out-token')
+    result = h.inject(instance_event('reader-1'))
+    check(result['status'] == 'task_closed', f"late event should be tolerated: {result}")
+    check(h.sfn.tokens() == ['token-1'], f"unexpected task completions: {h.sfn.tokens()}")
+
+
+def scenario_tokens_are_isolated_per_instance():
+    h = Harness({
+        'reader-1': ('db.r6g.large', 'available'),
+        'reader-2': ('db.r6g.large', 'available')
+    })
+    h.modify.lambda_handler({'instanceId': 'reader-1', 'targetClass': 'db.t4g.medium', 'taskToken': 'token-a'}, None)
+    h.modify.lambda_handler({'instanceId': 'reader-2', 'targetClass': 'db.t4g.medium', 'taskToken': 'token-b'}, None)
+
+    h.inject(instance_event('reader-2'))
+    check(h.sfn.tokens() == ['token-b'], f"only reader-2's task should complete: {h.sfn.tokens()}")
+    h.inject(instance_event('reader-1'))
+    check(h.sfn.tokens() == ['token-b', 'token-a'], f"unexpected task completions: {h.sfn.tokens()}")
+
+
+SCENARIOS = [
+    scenario_single_instance_modify,
+    scenario_wave_waits_for_all_instances,
+    scenario_wave_without_changes_completes_immediately,
+    scenario_failover_completion,
+    scenario_failover_skipped_when_already_writer,
+    scenario_failed_request_does_not_wait,
+    scenario_duplicate_and_late_events,
+    scenario_tokens_are_isolated_per_instance,
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inject RDS events into the task token handlers locally')
+    parser.add_argument('-k', dest='keyword', help='run only scenarios whose name contains this keyword')
+    parser.add_argument('-v', dest='verbose', action='store_true', help='show Lambda logs')
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(format='    %(levelname)s %(message)s')
+    else:
+        logging.disable(logging.CRITICAL)
+        # EMFのメトリクス（標準出力）も表示しない
+        emf.set_sink(lambda line: None)
+
+    failures = 0
+    for scenario in SCENARIOS:
+        name = scenario.__name__.replace('scenario_', '')
+        if args.keyword and args.keyword not in name:
+            continue
+        try:
+            scenario()
+            print(f"PASS  {name}")
+        except Exception:
+            failures += 1
+            print(f"FAIL  {name}")
+            traceback.print_exc()
+
+    if failures:
+        print(f"{failures} scenario(s) failed")
+        sys.exit(1)
+    print('All scenarios passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+スケーリングのステートマシン（stepfunction.tf）をローカルで実行するシミュレーター
+
+stepfunction.tf の定義（var.* は variables.tf / terraform.tfvars から解決）を ASL インタープリターで実行し、
+Task からは実際の lambda_handler を呼び出す。RDS などのAWS APIは代替（仮想時計上で状態が遷移する）を使うため、
+1時間以上かかる実行も数秒で終わる。ネットワーク接続は不要。
+
+使い方:
+    python3 scripts/simulate_scaling.py                                   # baseline シナリオ
+    python3 scripts/simulate_scaling.py --scenario faults                 # 障害の注入
+    python3 scripts/simulate_scaling.py --completion-mode event           # イベント駆動モード
+    python3 scripts/simulate_scaling.py --readers 12 --runs 20            # Reader 12台、シード20通りの分布
+    python3 scripts/simulate_scaling.py --var reader_wave_max_readers=4   # Terraform 変数を上書き
+    python3 scripts/simulate_scaling.py --json > report.json              # JSONで出力
+    python3 scripts/simulate_scaling.py --plan                            # プランモードの結果のみ（実行しない）
+    python3 scripts/simulate_scaling.py --runs 20 --history-dir history/  # 実行履歴を保存（analyze_executions.py で分析）
+
+レポート: 所要時間（仮想時間）、待機（Wait・イベント待ち）と処理（Lambda）の内訳、ステートごとのAPI呼び出し回数
+--expect-status を指定した場合、結果が一致しなければ終了コード 1 で終了する。
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulator.runner import Simulation, quiet_lambda_logs  # noqa: E402
+
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'simulator', 'scenarios')
+
+
+def load_scenario(name_or_path):
+    path = name_or_path
+    if not os.path.exists(path):
+        path = os.path.join(SCENARIO_DIR, f"{name_or_path}.json")
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def parse_variable(text):
+    name, _, value = text.partition('=')
+    try:
+        return name, json.loads(value)
+    except json.JSONDecodeError:
+        return name, value
+
+
+def format_seconds(seconds):
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def print_report(report):
+    print(f"Scenario: {report['scenario']} (seed {report['seed']})")
+    print(f"Status:   {report['status']}" + (f" - {report['error']['error']}: {report['error']['cause']}" if report['error'] else ''))
+    print(f"Duration: {format_seconds(report['durationSeconds'])} ({report['durationSeconds']} s virtual, {report['wallSeconds']} s wall)")
+    if report['plannedDurationSeconds'] is not None:
+        print(f"  planned {format_seconds(report['plannedDurationSeconds'])} (schedule-scaling plan estimate)")
+    print(f"  waiting {report['waitSeconds']} s / working {report['workSeconds']} s / other {report['otherSeconds']} s")
+    print(f"State transitions: {report['stateTransitions']}, API calls: {report['apiCallCount']}, "
+          f"RDS events: {report['rdsEvents']['delivered']} delivered / {report['rdsEvents']['dropped']} dropped")
+    print()
+    print(f"{'state':<40} {'entries':>7} {'seconds':>9} {'wait':>9} {'work':>7}  api calls")
+    for s in report['states']:
+        calls = ', '.join(f"{op}={n}" for op, n in sorted(s['apiCalls'].items()))
+        if s['retriedApiCalls']:
+            calls += f" (+{s['retriedApiCalls']} retried)"
+        print(f"{s['state']:<40} {s['entries']:>7} {s['seconds']:>9} {s['waitSeconds']:>9} {s['workSeconds']:>7}  {calls}")
+    print()
+    print('API calls by operation:')
+    for operation, count in report['apiCalls'].items():
+        print(f"  {operation:<40} {count:>5}")
+    print()
+    auto_scaling = report['autoScaling']
+    suspended = [key for key, value in (auto_scaling['suspendedState'] or {}).items() if value]
+    print(f"Application Auto Scaling: {auto_scaling['changes']} suspended-state change(s), "
+          f"final suspended: {', '.join(suspended) or 'none'}, cluster changes skipped while suspended: {auto_scaling['skippedClusterChanges']}")
+    replacements = report['replacements']
+    if replacements['created'] or replacements['deleted']:
+        print(f"Reader replacement: {len(replacements['created'])} created, {len(replacements['deleted'])} deleted")
+    if report['drainedInstances']:
+        excluded = sorted({i for endpoint in report['readerEndpoints'].values() for i in endpoint['excludedMembers']})
+        print(f"Reader drain: {len(report['drainedInstances'])} instance(s) excluded from the custom endpoint, still excluded: {', '.join(excluded) or 'none'}")
+    blue_green = report['blueGreen']
+    if blue_green['switchovers'] or blue_green['deployments'] or blue_green['deletedClusters']:
+        switchover_seconds = ', '.join(f"{s['seconds']}s" for s in blue_green['switchovers']) or 'none'
+        print(f"Blue/green: switchover(s) {switchover_seconds}, deployments left: {len(blue_green['deployments'])}, "
+              f"clusters deleted: {', '.join(c['clusterIdentifier'] for c in blue_green['deletedClusters']) or 'none'}, "
+              f"clusters left: {', '.join(blue_green['remainingClusters']) or 'none'}")
+    print()
+    print('Final instances:')
+    for instance_id, instance in report['finalInstances'].items():
+        print(f"  {instance_id:<45} {instance['class']:<16} {instance['status']:<10} {'writer' if instance['writer'] else ''}")
+
+
+def print_plan(plan):
+    print(f"Target class: {plan['targetClass']}, change required: {plan['changeRequired']}, "
+          f"failover target: {plan['failoverTargetInstanceId']}")
+    print(f"Estimated duration: {format_seconds(plan['estimatedDurationSeconds'])}")
+    for step in plan['steps']:
+        if step['action'] == 'failover':
+            target = f"{step['fromInstanceId']} -> {step['targetInstanceId']}"
+        else:
+            target = f"{', '.join(step['instanceIds'])} ({', '.join(step['fromClasses'])} -> {step['toClass']})"
+        print(f"  {step['order']:>2}. {step['phase']:<20} {step['action']:<9} {step['estimatedSeconds']:>7} s  {target}")
+    if plan['skippedInstanceIds']:
+        print(f"Already at target class: {', '.join(plan['skippedInstanceIds'])}")
+    for warning in plan['warnings']:
+        print(f"WARNING: {warning}")
+
+
+def write_history(directory, scenario, simulation):
+    os.makedirs(directory, exist_ok=True)
+    name = f"{scenario.get('name', 'unnamed')}-{simulation.seed}"
+    with open(os.path.join(directory, f"{name}.json"), 'w', encoding='utf-8') as f:
+        json.dump(dict(simulation.execution_history(), name=name), f, default=str)
+
+
+def summarize(reports):
+    durations = sorted(r['durationSeconds'] for r in reports)
+    api_calls = sorted(r['apiCallCount'] for r in reports)
+    return {
+        'runs': len(reports),
+        'statuses': {status: len([r for r in reports if r['status'] == status]) for status in sorted({r['status'] for r in reports})},
+        'durationSeconds': {
+            'min': durations[0],
+            'p50': statistics.median(durations),
+            'p90': durations[min(len(durations) - 1, int(len(durations) * 0.9))],
+            'max': durations[-1]
+        },
+        'apiCallCount': {'min': api_calls[0], 'p50': statistics.median(api_calls), 'max': api_calls[-1]}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate the Aurora scaling state machine locally with a fake RDS and a virtual clock')
+    parser.add_argument('--scenario', default='baseline', help='scenario name (scripts/simulator/scenarios) or JSON file path')
+    parser.add_argument('--completion-mode', choices=['polling', 'event'], help='override completionMode of the execution input')
+    parser.add_argument('--readers', type=int, help='override the number of AutoScaling readers')
+    parser.add_argument('--target-class', help='override the target instance class')
+    parser.add_argument('--var', action='append', default=[], metavar='NAME=VALUE', help='override a Terraform variable')
+    parser.add_argument('--tfvars', help='tfvars file (default: terraform.tfvars)')
+    parser.add_argument('--seed', type=int, help='random seed (default: from the scenario)')
+    parser.add_argument('--runs', type=int, default=1, help='number of runs with consecutive seeds (summary is reported)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--plan', action='store_true', help='only print the schedule-scaling plan (no execution)')
+    parser.add_argument('--history-dir', help='write each run as an execution history JSON file (input of analyze_executions.py)')
+    parser.add_argument('--expect-status', choices=['SUCCEEDED', 'FAILED', 'ERROR'], help='exit 1 unless every run ends with this status')
+    parser.add_argument('-v', '--verbose', action='store_true', help='show Lambda logs')
+    args = parser.parse_args()
+
+    quiet_lambda_logs(args.verbose)
+
+    scenario = load_scenario(args.scenario)
+    if args.completion_mode:
+        scenario.setdefault('input', {})['completionMode'] = args.completion_mode
+    if args.readers is not None:
+        scenario['cluster']['autoScalingReaders'] = args.readers
+    if args.target_class:
+        scenario['targetClass'] = args.target_class
+    variables = dict(parse_variable(v) for v in args.var)
+
+    first_seed = args.seed if args.seed is not None else scenario.get('seed', 0)
+    if args.plan:
+        plan = Simulation(scenario, tfvars=args.tfvars, variables=variables, seed=first_seed).plan()
+        if args.json:
+            print(json.dumps(plan, indent=2, default=str))
+        else:
+            print_plan(plan)
+        return
+
+    reports = []
+    for i in range(args.runs):
+        simulation = Simulation(scenario, tfvars=args.tfvars, variables=variables, seed=first_seed + i,
+                                record_history=bool(args.history_dir))
+        reports.append(simulation.run())
+        if args.history_dir:
+            write_history(args.history_dir, scenario, simulation)
+
+    if args.json:
+        print(json.dumps(reports[0] if args.runs == 1 else {'summary': summarize(reports), 'runs': reports}, indent=2, default=str))
+    elif args.runs == 1:
+        print_report(reports[0])
+    else:
+        summary = summarize(reports)
+        print(f"Scenario: {scenario.get('name')} x {summary['runs']} runs, statuses: {summary['statuses']}")
+        d = summary['durationSeconds']
+        print(f"Duration: min {format_seconds(d['min'])}  p50 {format_seconds(d['p50'])}  p90 {format_seconds(d['p90'])}  max {format_seconds(d['max'])}")
+        a = summary['apiCallCount']
+        print(f"API calls: min {a['min']}  p50 {a['p50']}  max {a['max']}")
+
+    if args.expect_status and any(r['status'] != args.expect_status for r in reports):
+        print(f"FAIL  expected status {args.expect_status}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
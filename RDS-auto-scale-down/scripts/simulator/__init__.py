@@ -0,0 +1,4 @@
+"""
+Auroraスケーリングのステートマシンをローカルで実行するシミュレーター
+（scripts/simulate_scaling.py から使う。AWSへの接続は不要）
+"""
@@ -0,0 +1,875 @@
+"""
+Amazon States Language（ASL）のインタープリター（仮想時計上で実行する）
+
+ステートマシンの各ブランチ（実行本体・Map の反復・Parallel のブランチ）はジェネレーターとして実装し、
+待機（Wait ステート、Lambda の実行時間、タスクトークン待ち）を Scheduler に yield する。
+Scheduler は次に起きるイベントの時刻まで仮想時計を進めるため、1時間かかる実行も数秒で終わる。
+
+対応しているステート: Pass / Task / Choice / Wait / Succeed / Fail / Map / Parallel
+Task のリソース: arn:aws:states:::lambda:invoke(.waitForTaskToken)、Lambda関数のARN
+"""
+import copy
+import heapq
+import itertools
+import json
+import re
+import uuid
+from datetime import datetime, timezone
+
+
+class StatesError(Exception):
+    """
+    ステートマシンのエラー（Catch / Retry の ErrorEquals と照合される）
+    """
+
+    def __init__(self, error, cause=''):
+        super().__init__(f"{error}: {cause}")
+        self.error = error
+        self.cause = cause
+
+
+class SimulationError(Exception):
+    """
+    シミュレーター自体の制限（未対応の構文、遷移数の上限など）
+    """
+
+
+def isoformat(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.') + f"{int(seconds * 1000) % 1000:03d}Z"
+
+
+def parse_timestamp(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+# --- 仮想時計とコルーチンの実行 ---
+
+class Sleep:
+    def __init__(self, seconds):
+        self.seconds = max(0, seconds)
+
+
+class Join:
+    def __init__(self, tasks):
+        self.tasks = tasks
+
+
+class WaitForToken:
+    def __init__(self, token, timeout_seconds=None):
+        self.token = token
+        self.timeout_seconds = timeout_seconds
+
+
+class Coroutine:
+    """
+    Scheduler 上で動くブランチ（ジェネレーター）
+    """
+
+    def __init__(self, scheduler, generator, name):
+        self.scheduler = scheduler
+        self.generator = generator
+        self.name = name
+        self.done = False
+        self.cancelled = False
+        self.result = None
+        self.error = None
+        self.callbacks = []
+
+    def step(self, value=None, error=None):
+        if self.done or self.cancelled:
+            return
+        try:
+            request = self.generator.throw(error) if error is not None else self.generator.send(value)
+        except StopIteration as stop:
+            self.finish(result=stop.value)
+            return
+        except Exception as e:
+            self.finish(error=e)
+            return
+        self.scheduler.handle(self, request)
+
+    def finish(self, result=None, error=None):
+        self.done = True
+        self.result = result
+        self.error = error
+        for callback in self.callbacks:
+            callback(self)
+
+    def cancel(self):
+        self.cancelled = True
+        self.generator.close()
+
+
+class TaskTokenRegistry:
+    """
+    .waitForTaskToken のタスクトークン（SendTaskSuccess / SendTaskFailure の受け口）
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.tokens = {}
+        self.sequence = itertools.count(1)
+
+    def create(self):
+        token = f"sim-token-{next(self.sequence)}-{uuid.uuid4().hex[:8]}"
+        self.tokens[token] = {'open': True, 'outcome': None, 'waiter': None, 'timer': None}
+        return token
+
+    def complete(self, token, outcome):
+        """
+        outcome: ('success', 出力) / ('failure', StatesError)
+        閉じたトークン（完了済み・タイムアウト済み）の場合は False
+        """
+        entry = self.tokens.get(token)
+        if entry is None or not entry['open']:
+            return False
+        entry['open'] = False
+        entry['outcome'] = outcome
+        if entry['waiter'] is not None:
+            if entry['timer'] is not None:
+                entry['timer'].cancelled = True
+            self.scheduler.call_later(0, self.resume, token)
+        return True
+
+    def wait(self, coroutine, token, timeout_seconds):
+        entry = self.tokens[token]
+        entry['waiter'] = coroutine
+        entry['waitStartedAt'] = self.scheduler.now
+        if entry['outcome'] is not None:
+            self.scheduler.call_later(0, self.resume, token)
+        elif timeout_seconds:
+            entry['timer'] = self.scheduler.call_later(timeout_seconds, self.time_out, token)
+
+    def time_out(self, token):
+        entry = self.tokens[token]
+        if not entry['open']:
+            return
+        entry['open'] = False
+        entry['outcome'] = ('failure', StatesError('States.Timeout', f"Task token {token} timed out"))
+        self.resume(token)
+
+    def resume(self, token):
+        entry = self.tokens[token]
+        waiter = entry['waiter']
+        kind, value = entry['outcome']
+        if kind == 'success':
+            waiter.step(value)
+        else:
+            waiter.step(error=value)
+
+
+class Timer:
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class Scheduler:
+    """
+    仮想時計（秒）と、時刻順に実行するタイマーのキュー
+    """
+
+    def __init__(self, start_time):
+        self.now = float(start_time)
+        self.queue = []
+        self.sequence = itertools.count()
+        self.tokens = TaskTokenRegistry(self)
+
+    def call_at(self, when, callback, *args):
+        timer = Timer(max(when, self.now), callback, args)
+        heapq.heappush(self.queue, (timer.when, next(self.sequence), timer))
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.now + max(0, delay), callback, *args)
+
+    def spawn(self, generator, name=''):
+        coroutine = Coroutine(self, generator, name)
+        self.call_later(0, coroutine.step)
+        return coroutine
+
+    def handle(self, coroutine, request):
+        if isinstance(request, Sleep):
+            self.call_later(request.seconds, coroutine.step)
+        elif isinstance(request, WaitForToken):
+            self.tokens.wait(coroutine, request.token, request.timeout_seconds)
+        elif isinstance(request, Join):
+            self.join(coroutine, request.tasks)
+        else:
+            coroutine.step(error=SimulationError(f"Unknown scheduler request: {request!r}"))
+
+    def join(self, coroutine, tasks):
+        """
+        全ての子が完了したら結果の一覧で再開する（1つでも失敗したら残りを取り消してエラーで再開）
+        """
+        if not tasks:
+            self.call_later(0, coroutine.step, [])
+            return
+        state = {'resumed': False}
+
+        def on_done(_):
+            if state['resumed']:
+                return
+            failed = next((t for t in tasks if t.done and t.error is not None), None)
+            if failed is not None:
+                state['resumed'] = True
+                for task in tasks:
+                    if not task.done:
+                        task.cancel()
+                self.call_later(0, coroutine.step, None, failed.error)
+            elif all(t.done for t in tasks):
+                state['resumed'] = True
+                self.call_later(0, coroutine.step, [t.result for t in tasks])
+
+        for task in tasks:
+            task.callbacks.append(on_done)
+
+    def run(self, main, max_seconds=None):
+        """
+        main が完了するまで（または仮想時間が max_seconds を超えるまで）タイマーを実行する
+        """
+        deadline = self.now + max_seconds if max_seconds else None
+        while self.queue and not main.done:
+            when, _, timer = heapq.heappop(self.queue)
+            if timer.cancelled:
+                continue
+            if deadline is not None and when > deadline:
+                raise SimulationError(f"Simulation exceeded {max_seconds} virtual seconds")
+            self.now = when
+            timer.callback(*timer.args)
+        if not main.done:
+            raise SimulationError("Simulation stalled: no pending timers but the execution has not finished")
+
+
+# --- JSONPath / パラメーター / 組み込み関数 ---
+
+PATH_SEGMENT = re.compile(r"\.([A-Za-z0-9_\-$@]+)|\['([^']*)'\]|\[(\d+)\]|\[\*\]")
+
+
+def split_path(path):
+    if path.startswith('$$'):
+        root, rest = '$$', path[2:]
+    elif path.startswith('$'):
+        root, rest = '$', path[1:]
+    else:
+        raise StatesError('States.Runtime', f"Invalid path {path}")
+    segments = []
+    pos = 0
+    while pos < len(rest):
+        match = PATH_SEGMENT.match(rest, pos)
+        if not match:
+            raise StatesError('States.Runtime', f"Unsupported path {path}")
+        if match.group(1) is not None:
+            segments.append(match.group(1))
+        elif match.group(2) is not None:
+            segments.append(match.group(2))
+        elif match.group(3) is not None:
+            segments.append(int(match.group(3)))
+        else:
+            segments.append('*')
+        pos = match.end()
+    return root, segments
+
+
+MISSING = object()
+# read_path の default 省略時（パスがない場合は States.Runtime）
+REQUIRED = object()
+
+
+def read_path(path, data, context, default=REQUIRED):
+    root, segments = split_path(path)
+    value = context if root == '$$' else data
+    for segment in segments:
+        if segment == '*' and isinstance(value, list):
+            continue
+        try:
+            value = value[segment]
+        except (KeyError, IndexError, TypeError):
+            if default is not REQUIRED:
+                return default
+            raise StatesError('States.Runtime', f"The JSONPath '{path}' could not be found in the input")
+    return value
+
+
+def write_path(data, path, value):
+    """
+    ResultPath: data の path の位置に value を書き込んだ新しい値を返す
+    """
+    if path is None:
+        return data
+    root, segments = split_path(path)
+    if not segments:
+        return value
+    result = copy.deepcopy(data) if isinstance(data, dict) else {}
+    target = result
+    for segment in segments[:-1]:
+        if not isinstance(target.get(segment), dict):
+            target[segment] = {}
+        target = target[segment]
+    target[segments[-1]] = value
+    return result
+
+
+def split_arguments(text):
+    args = []
+    depth = 0
+    quoted = False
+    current = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if quoted:
+            current.append(char)
+            if char == '\\' and i + 1 < len(text):
+                current.append(text[i + 1])
+                i += 1
+            elif char == "'":
+                quoted = False
+        elif char == "'":
+            quoted = True
+            current.append(char)
+        elif char == '(':
+            depth += 1
+            current.append(char)
+        elif char == ')':
+            depth -= 1
+            current.append(char)
+        elif char == ',' and depth == 0:
+            args.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    if ''.join(current).strip():
+        args.append(''.join(current).strip())
+    return args
+
+
+def evaluate_argument(text, data, context):
+    if text.startswith('States.'):
+        return evaluate_intrinsic(text, data, context)
+    if text.startswith('$'):
+        return read_path(text, data, context)
+    if text.startswith("'"):
+        return re.sub(r"\\(.)", r"\1", text[1:-1])
+    if text in ('true', 'false'):
+        return text == 'true'
+    if text == 'null':
+        return None
+    return float(text) if '.' in text else int(text)
+
+
+def format_value(value):
+    if isinstance(value, (dict, list)) or isinstance(value, bool) or value is None:
+        return json.dumps(value)
+    return str(value)
+
+
+def merge_json(left, right, deep):
+    if not deep:
+        return {**left, **right}
+    result = copy.deepcopy(left)
+    for key, value in right.items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = merge_json(result[key], value, True)
+        else:
+            result[key] = value
+    return result
+
+
+INTRINSICS = {
+    'States.Array': lambda *args: list(args),
+    'States.ArrayLength': lambda array: len(array),
+    'States.ArrayContains': lambda array, value: value in array,
+    'States.ArrayGetItem': lambda array, index: array[int(index)],
+    'States.ArrayRange': lambda start, end, step: list(range(int(start), int(end) + 1, int(step))),
+    'States.ArrayPartition': lambda array, size: [array[i:i + int(size)] for i in range(0, len(array), int(size))],
+    'States.ArrayUnique': lambda array: [json.loads(v) for v in dict.fromkeys(json.dumps(v, sort_keys=True) for v in array)],
+    'States.Format': lambda template, *args: re.sub(r'\{\}', lambda _m, it=iter(args): format_value(next(it)), template),
+    'States.StringToJson': lambda value: json.loads(value),
+    'States.JsonToString': lambda value: json.dumps(value, separators=(',', ':')),
+    'States.JsonMerge': lambda left, right, deep: merge_json(left, right, deep),
+    'States.MathAdd': lambda a, b: a + b,
+    'States.StringSplit': lambda value, separators: [s for s in re.split('[' + re.escape(separators) + ']', value) if s],
+    'States.UUID': lambda: str(uuid.uuid4()),
+}
+
+
+def evaluate_intrinsic(text, data, context):
+    match = re.match(r'^(States\.[A-Za-z]+)\((.*)\)$', text.strip(), re.DOTALL)
+    if not match or match.group(1) not in INTRINSICS:
+        raise SimulationError(f"Unsupported intrinsic function: {text}")
+    args = [evaluate_argument(arg, data, context) for arg in split_arguments(match.group(2))]
+    try:
+        return INTRINSICS[match.group(1)](*args)
+    except (TypeError, ValueError, KeyError, IndexError) as e:
+        raise StatesError('States.IntrinsicFailure', f"{text}: {str(e)}")
+
+
+def evaluate_parameters(template, data, context):
+    """
+    Parameters / ResultSelector / ItemSelector のテンプレートを評価する（キーが .$ で終わる値はパスまたは組み込み関数）
+    """
+    if isinstance(template, dict):
+        result = {}
+        for key, value in template.items():
+            if key.endswith('.$'):
+                result[key[:-2]] = evaluate_argument(value, data, context)
+            else:
+                result[key] = evaluate_parameters(value, data, context)
+        return result
+    if isinstance(template, list):
+        return [evaluate_parameters(value, data, context) for value in template]
+    return template
+
+
+# --- Choice ルール ---
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def is_timestamp(value):
+    if not isinstance(value, str):
+        return False
+    try:
+        parse_timestamp(value)
+        return True
+    except ValueError:
+        return False
+
+
+def string_matches(value, pattern):
+    """
+    StringMatches: * は任意の文字列（\\* はアスタリスクそのもの）
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern[i] == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        parts.append('.*' if pattern[i] == '*' else re.escape(pattern[i]))
+        i += 1
+    return re.fullmatch(''.join(parts), value) is not None
+
+
+COMPARATORS = {
+    'StringEquals': (lambda v: isinstance(v, str), lambda a, b: a == b),
+    'StringLessThan': (lambda v: isinstance(v, str), lambda a, b: a < b),
+    'StringGreaterThan': (lambda v: isinstance(v, str), lambda a, b: a > b),
+    'StringLessThanEquals': (lambda v: isinstance(v, str), lambda a, b: a <= b),
+    'StringGreaterThanEquals': (lambda v: isinstance(v, str), lambda a, b: a >= b),
+    'StringMatches': (lambda v: isinstance(v, str), string_matches),
+    'NumericEquals': (is_number, lambda a, b: a == b),
+    'NumericLessThan': (is_number, lambda a, b: a < b),
+    'NumericGreaterThan': (is_number, lambda a, b: a > b),
+    'NumericLessThanEquals': (is_number, lambda a, b: a <= b),
+    'NumericGreaterThanEquals': (is_number, lambda a, b: a >= b),
+    'BooleanEquals': (lambda v: isinstance(v, bool), lambda a, b: a == b),
+    'TimestampEquals': (is_timestamp, lambda a, b: parse_timestamp(a) == parse_timestamp(b)),
+    'TimestampLessThan': (is_timestamp, lambda a, b: parse_timestamp(a) < parse_timestamp(b)),
+    'TimestampGreaterThan': (is_timestamp, lambda a, b: parse_timestamp(a) > parse_timestamp(b)),
+    'TimestampLessThanEquals': (is_timestamp, lambda a, b: parse_timestamp(a) <= parse_timestamp(b)),
+    'TimestampGreaterThanEquals': (is_timestamp, lambda a, b: parse_timestamp(a) >= parse_timestamp(b)),
+}
+
+TYPE_TESTS = {
+    'IsNull': lambda v: v is None,
+    'IsNumeric': is_number,
+    'IsString': lambda v: isinstance(v, str),
+    'IsBoolean': lambda v: isinstance(v, bool),
+    'IsTimestamp': is_timestamp,
+}
+
+
+def evaluate_rule(rule, data, context):
+    if 'And' in rule:
+        return all(evaluate_rule(r, data, context) for r in rule['And'])
+    if 'Or' in rule:
+        return any(evaluate_rule(r, data, context) for r in rule['Or'])
+    if 'Not' in rule:
+        return not evaluate_rule(rule['Not'], data, context)
+
+    variable = rule['Variable']
+    if 'IsPresent' in rule:
+        present = read_path(variable, data, context, default=MISSING) is not MISSING
+        return present == rule['IsPresent']
+    value = read_path(variable, data, context)
+    for name, test in TYPE_TESTS.items():
+        if name in rule:
+            return test(value) == rule[name]
+    for name, (type_check, compare) in COMPARATORS.items():
+        if name in rule:
+            expected = rule[name]
+        elif name + 'Path' in rule:
+            expected = read_path(rule[name + 'Path'], data, context)
+        else:
+            continue
+        return type_check(value) and type_check(expected) and compare(value, expected)
+    raise SimulationError(f"Unsupported Choice rule: {json.dumps(rule)}")
+
+
+def error_matches(error_equals, error):
+    """
+    States.ALL は全てのエラー、States.TaskFailed は States.Timeout 以外のエラーに一致する
+    """
+    if 'States.ALL' in error_equals or error in error_equals:
+        return True
+    return 'States.TaskFailed' in error_equals and error != 'States.Timeout'
+
+
+# --- ステートマシンの実行 ---
+
+LAMBDA_INVOKE = 'arn:aws:states:::lambda:invoke'
+WAIT_FOR_TASK_TOKEN = '.waitForTaskToken'
+
+
+class Recorder:
+    """
+    ステートごとの実行回数・時間（待機 / 処理）と、ステートごとのAPI呼び出し回数を記録する
+    """
+
+    def __init__(self):
+        self.states = {}
+        self.current = None
+        self.transitions = 0
+
+    def entry(self, name):
+        return self.states.setdefault(name, {
+            'type': None, 'entries': 0, 'seconds': 0.0, 'waitSeconds': 0.0, 'workSeconds': 0.0, 'apiCalls': {}
+        })
+
+    def api_call(self, service, operation):
+        entry = self.entry(self.current or '(outside execution)')
+        key = f"{service}:{operation}"
+        entry['apiCalls'][key] = entry['apiCalls'].get(key, 0) + 1
+
+
+class ExecutionHistory:
+    """
+    実行履歴を GetExecutionHistory と同じ形式のイベントで記録する（scripts/analyze_executions.py の入力になる）
+    previousEventId は直前のイベント（Map / Parallel の並列実行は考慮しない）
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.events = []
+
+    def add(self, event_type, details_key=None, **details):
+        event = {
+            'timestamp': isoformat(self.scheduler.now),
+            'type': event_type,
+            'id': len(self.events) + 1,
+            'previousEventId': len(self.events)
+        }
+        if details_key:
+            event[details_key] = details
+        self.events.append(event)
+
+
+def task_details(resource, **details):
+    """
+    Task*イベントの詳細（resourceType: lambda、resource: invoke / invoke.waitForTaskToken）
+    """
+    return dict(details, resourceType='lambda', resource=resource.rsplit(':', 1)[-1])
+
+
+class Interpreter:
+    """
+    invoke_lambda(関数のARN, ペイロード) -> (応答, 処理時間の秒数) で Lambda を呼び出す
+    history（ExecutionHistory）を指定した場合は実行履歴のイベントを記録する
+    """
+
+    def __init__(self, definition, scheduler, invoke_lambda, recorder=None,
+                 max_transitions=25000, transition_seconds=0.0, history=None):
+        self.definition = definition
+        self.scheduler = scheduler
+        self.invoke_lambda = invoke_lambda
+        self.recorder = recorder or Recorder()
+        self.max_transitions = max_transitions
+        self.transition_seconds = transition_seconds
+        self.history = history
+
+    def history_event(self, event_type, details_key=None, **details):
+        if self.history is not None:
+            self.history.add(event_type, details_key, **details)
+
+    def start(self, execution_input, execution_name='simulation'):
+        context = {
+            'Execution': {
+                'Id': f"arn:aws:states:local:000000000000:execution:simulation:{execution_name}",
+                'Name': execution_name,
+                'StartTime': isoformat(self.scheduler.now),
+                'Input': execution_input
+            },
+            'StateMachine': {'Name': 'simulation'}
+        }
+        return self.scheduler.spawn(
+            self.run_execution(execution_input, context), name=execution_name
+        )
+
+    def run_execution(self, execution_input, context):
+        self.history_event('ExecutionStarted', 'executionStartedEventDetails', input=json.dumps(execution_input))
+        try:
+            output = yield from self.run_states(self.definition, execution_input, context)
+        except StatesError as e:
+            self.history_event('ExecutionFailed', 'executionFailedEventDetails', error=e.error, cause=e.cause)
+            raise
+        self.history_event('ExecutionSucceeded', 'executionSucceededEventDetails', output=json.dumps(output))
+        return output
+
+    def run_states(self, machine, data, context):
+        state_name = machine['StartAt']
+        states = machine['States']
+        while True:
+            state = states[state_name]
+            self.recorder.transitions += 1
+            if self.recorder.transitions > self.max_transitions:
+                raise SimulationError(f"Exceeded {self.max_transitions} state transitions (Step Functions execution history limit)")
+            if self.transition_seconds:
+                yield Sleep(self.transition_seconds)
+
+            context = dict(context, State={'Name': state_name, 'EnteredTime': isoformat(self.scheduler.now)})
+            entered_at = self.scheduler.now
+            record = self.recorder.entry(state_name)
+            record['type'] = state['Type']
+            record['entries'] += 1
+            self.history_event(f"{state['Type']}StateEntered", 'stateEnteredEventDetails', name=state_name, input=json.dumps(data))
+
+            try:
+                data, next_name = yield from self.run_state(state_name, state, data, context, record)
+            finally:
+                record['seconds'] += self.scheduler.now - entered_at
+            self.history_event(f"{state['Type']}StateExited", 'stateExitedEventDetails', name=state_name, output=json.dumps(data))
+
+            if next_name is None:
+                return data
+            state_name = next_name
+
+    def run_state(self, name, state, data, context, record):
+        state_type = state['Type']
+        if state_type == 'Pass':
+            effective = self.input_of(state, data, context)
+            if 'Parameters' in state:
+                result = evaluate_parameters(state['Parameters'], effective, context)
+            elif 'Result' in state:
+                result = state['Result']
+            else:
+                result = effective
+            return self.output_of(state, data, result, context), self.next_of(state)
+
+        if state_type == 'Choice':
+            effective = self.input_of(state, data, context)
+            for rule in state.get('Choices', []):
+                if evaluate_rule(rule, effective, context):
+                    return self.filter_output(state, effective, context), rule['Next']
+            if 'Default' not in state:
+                raise StatesError('States.NoChoiceMatched', f"No Choice rule matched in state {name}")
+            return self.filter_output(state, effective, context), state['Default']
+
+        if state_type == 'Wait':
+            effective = self.input_of(state, data, context)
+            if 'Seconds' in state:
+                seconds = state['Seconds']
+            elif 'SecondsPath' in state:
+                seconds = read_path(state['SecondsPath'], effective, context)
+            elif 'Timestamp' in state:
+                seconds = parse_timestamp(state['Timestamp']) - self.scheduler.now
+            else:
+                seconds = parse_timestamp(read_path(state['TimestampPath'], effective, context)) - self.scheduler.now
+            if not is_number(seconds) or seconds < 0:
+                raise StatesError('States.Runtime', f"Invalid wait seconds in state {name}: {seconds!r}")
+            started_at = self.scheduler.now
+            yield Sleep(seconds)
+            record['waitSeconds'] += self.scheduler.now - started_at
+            return self.filter_output(state, effective, context), self.next_of(state)
+
+        if state_type == 'Succeed':
+            return self.filter_output(state, self.input_of(state, data, context), context), None
+
+        if state_type == 'Fail':
+            # ErrorPath / CausePath: 入力から取り出したエラー名・原因で失敗する（Catch した元のエラーを伝える場合など）
+            error = read_path(state['ErrorPath'], data, context) if 'ErrorPath' in state else state.get('Error', 'States.Fail')
+            cause = read_path(state['CausePath'], data, context) if 'CausePath' in state else state.get('Cause', '')
+            raise StatesError(error, cause)
+
+        if state_type in ('Task', 'Map', 'Parallel'):
+            return (yield from self.run_with_retry(name, state, data, context, record))
+
+        raise SimulationError(f"Unsupported state type {state_type} in state {name}")
+
+    def run_with_retry(self, name, state, data, context, record):
+        """
+        Task / Map / Parallel を Retry と Catch の定義に従って実行する
+        """
+        attempts = {}
+        while True:
+            try:
+                effective = self.input_of(state, data, context)
+                if state['Type'] == 'Task':
+                    result = yield from self.run_task(name, state, effective, context, record)
+                elif state['Type'] == 'Map':
+                    result = yield from self.run_map(name, state, effective, context)
+                else:
+                    result = yield from self.run_parallel(state, effective, context)
+                if 'ResultSelector' in state:
+                    result = evaluate_parameters(state['ResultSelector'], result, context)
+                return self.output_of(state, data, result, context), self.next_of(state)
+            except StatesError as e:
+                retrier = next((r for r in state.get('Retry', []) if error_matches(r['ErrorEquals'], e.error)), None)
+                if retrier is not None:
+                    index = state['Retry'].index(retrier)
+                    attempts[index] = attempts.get(index, 0) + 1
+                    if attempts[index] <= retrier.get('MaxAttempts', 3):
+                        interval = retrier.get('IntervalSeconds', 1) * retrier.get('BackoffRate', 2.0) ** (attempts[index] - 1)
+                        interval = min(interval, retrier.get('MaxDelaySeconds', interval))
+                        started_at = self.scheduler.now
+                        yield Sleep(interval)
+                        record['waitSeconds'] += self.scheduler.now - started_at
+                        continue
+                catcher = next((c for c in state.get('Catch', []) if error_matches(c['ErrorEquals'], e.error)), None)
+                if catcher is None:
+                    raise
+                error_output = {'Error': e.error, 'Cause': e.cause}
+                return write_path(data, catcher.get('ResultPath', '$'), error_output), catcher['Next']
+
+    def run_task(self, name, state, effective, context, record):
+        resource = state['Resource']
+        wait_for_token = resource.endswith(WAIT_FOR_TASK_TOKEN)
+        base_resource = resource[:-len(WAIT_FOR_TASK_TOKEN)] if wait_for_token else resource
+
+        task_context = context
+        token = None
+        if wait_for_token:
+            token = self.scheduler.tokens.create()
+            task_context = dict(context, Task={'Token': token})
+
+        parameters = evaluate_parameters(state['Parameters'], effective, task_context) if 'Parameters' in state else effective
+
+        if base_resource == LAMBDA_INVOKE:
+            function_arn = parameters['FunctionName']
+            payload = parameters.get('Payload', {})
+        elif base_resource.startswith('arn:aws:lambda:'):
+            function_arn = base_resource
+            payload = parameters
+        else:
+            raise SimulationError(f"Unsupported Task resource {resource} in state {name}")
+
+        self.history_event('TaskScheduled', 'taskScheduledEventDetails', **task_details(resource, parameters=json.dumps(parameters)))
+        self.history_event('TaskStarted', 'taskStartedEventDetails', **task_details(resource))
+        previous = self.recorder.current
+        self.recorder.current = name
+        try:
+            response, work_seconds = self.invoke_lambda(function_arn, payload)
+        finally:
+            self.recorder.current = previous
+        started_at = self.scheduler.now
+        yield Sleep(work_seconds)
+        record['workSeconds'] += self.scheduler.now - started_at
+        if isinstance(response, StatesError):
+            if token:
+                self.scheduler.tokens.complete(token, ('failure', response))
+            self.history_event('TaskFailed', 'taskFailedEventDetails', **task_details(resource, error=response.error, cause=response.cause))
+            raise response
+
+        if base_resource == LAMBDA_INVOKE:
+            response = {'ExecutedVersion': '$LATEST', 'Payload': response, 'StatusCode': 200}
+        if not wait_for_token:
+            self.history_event('TaskSucceeded', 'taskSucceededEventDetails', **task_details(resource, output=json.dumps(response)))
+            return response
+
+        self.history_event('TaskSubmitted', 'taskSubmittedEventDetails', **task_details(resource, output=json.dumps(response)))
+        started_at = self.scheduler.now
+        try:
+            output = yield WaitForToken(token, state.get('TimeoutSeconds'))
+        except StatesError as e:
+            event_type = 'TaskTimedOut' if e.error == 'States.Timeout' else 'TaskFailed'
+            self.history_event(event_type, f"{event_type[0].lower()}{event_type[1:]}EventDetails", **task_details(resource, error=e.error, cause=e.cause))
+            raise
+        finally:
+            record['waitSeconds'] += self.scheduler.now - started_at
+        self.history_event('TaskSucceeded', 'taskSucceededEventDetails', **task_details(resource, output=output if isinstance(output, str) else json.dumps(output)))
+        return json.loads(output) if isinstance(output, str) else output
+
+    def run_map(self, name, state, effective, context):
+        items = read_path(state.get('ItemsPath', '$'), effective, context)
+        if not isinstance(items, list):
+            raise StatesError('States.Runtime', f"Map items are not an array: {items!r}")
+        processor = state.get('ItemProcessor') or state['Iterator']
+        selector = state.get('ItemSelector', state.get('Parameters'))
+        max_concurrency = state.get('MaxConcurrency', 0) or len(items)
+
+        results = [None] * len(items)
+        pending = list(range(len(items)))
+
+        def worker():
+            while pending:
+                index = pending.pop(0)
+                item_context = dict(context, Map={'Item': {'Index': index, 'Value': items[index]}})
+                item_input = evaluate_parameters(selector, effective, item_context) if selector is not None else items[index]
+                self.history_event('MapIterationStarted', 'mapIterationStartedEventDetails', name=name, index=index)
+                try:
+                    results[index] = yield from self.run_states(processor, item_input, item_context)
+                except StatesError:
+                    self.history_event('MapIterationFailed', 'mapIterationFailedEventDetails', name=name, index=index)
+                    raise
+                self.history_event('MapIterationSucceeded', 'mapIterationSucceededEventDetails', name=name, index=index)
+
+        self.history_event('MapStateStarted', 'mapStateStartedEventDetails', length=len(items))
+        workers = [self.scheduler.spawn(worker(), name=f"map-worker-{i}") for i in range(min(max_concurrency, len(items)))]
+        try:
+            yield Join(workers)
+        except StatesError:
+            self.history_event('MapStateFailed')
+            raise
+        self.history_event('MapStateSucceeded')
+        return results
+
+    def run_parallel(self, state, effective, context):
+        branches = [self.scheduler.spawn(self.run_states(branch, effective, context), name=f"branch-{i}")
+                    for i, branch in enumerate(state['Branches'])]
+        return (yield Join(branches))
+
+    # --- 入出力の処理 ---
+    def input_of(self, state, data, context):
+        if 'InputPath' in state:
+            return data if state['InputPath'] is None else read_path(state['InputPath'], data, context)
+        return data
+
+    def output_of(self, state, data, result, context):
+        output = write_path(data, state.get('ResultPath', '$'), result)
+        return self.filter_output(state, output, context)
+
+    def filter_output(self, state, output, context):
+        if 'OutputPath' in state:
+            return {} if state['OutputPath'] is None else read_path(state['OutputPath'], output, context)
+        return output
+
+    @staticmethod
+    def next_of(state):
+        return None if state.get('End') else state['Next']
+
+
+def validate_definition(machine, path='$'):
+    """
+    Next / Default / Catch の遷移先が存在するかを確認する（存在しない場合は SimulationError）
+    """
+    states = machine.get('States', {})
+    if machine.get('StartAt') not in states:
+        raise SimulationError(f"{path}: StartAt {machine.get('StartAt')} is not defined")
+    for name, state in states.items():
+        targets = [state.get('Next'), state.get('Default')]
+        targets += [rule.get('Next') for rule in state.get('Choices', [])]
+        targets += [catcher.get('Next') for catcher in state.get('Catch', [])]
+        for target in targets:
+            if target is not None and target not in states:
+                raise SimulationError(f"{path}.{name}: transition to undefined state {target}")
+        if not state.get('End') and state['Type'] not in ('Choice', 'Succeed', 'Fail') and 'Next' not in state:
+            raise SimulationError(f"{path}.{name}: state has neither Next nor End")
+        for child in [state.get('ItemProcessor') or state.get('Iterator')] + state.get('Branches', []):
+            if child:
+                validate_definition(child, f"{path}.{name}")
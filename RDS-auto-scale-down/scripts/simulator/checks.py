@@ -0,0 +1,75 @@
+"""
+検証スクリプト（scripts/check_*.py）の共通部分: シナリオの判定と実行、レポート・API呼び出しの確認
+
+各スクリプトはシナリオ関数（scenario_<名前>、失敗時は AssertionError などの例外）の一覧を
+run_scenarios に渡す。コマンドラインの -k（名前に含むシナリオのみ実行）・-v（Lambdaのログも表示）もここで扱う。
+"""
+import argparse
+import sys
+import traceback
+
+from simulator.runner import quiet_lambda_logs
+
+
+def check(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+def entries(report, state_name):
+    """
+    レポートのステートの実行回数（実行されなかった場合は 0）
+    """
+    return next((s['entries'] for s in report['states'] if s['state'] == state_name), 0)
+
+
+def record_requests(fake, method_name, capture, records=None, once_per=None):
+    """
+    fake（FakeRds など）のメソッドを置き換え、呼び出しごとに capture(引数の dict) の値を records に追加してから元のメソッドを呼ぶ
+    records（省略時は新しいリスト）を渡すと、複数のメソッドの呼び出しを1つのリストに順に記録できる
+    once_per に引数名を指定した場合は、その引数の値ごとに最初の呼び出しのみ記録する（同じインスタンスへの再要求など）
+    """
+    records = [] if records is None else records
+    original = getattr(fake, method_name)
+    seen = set()
+
+    def recording(**kwargs):
+        if once_per is not None:
+            if kwargs.get(once_per) in seen:
+                return original(**kwargs)
+            seen.add(kwargs.get(once_per))
+        records.append(capture(kwargs))
+        return original(**kwargs)
+
+    setattr(fake, method_name, recording)
+    return records
+
+
+def run_scenarios(scenarios, description):
+    """
+    シナリオを順に実行して PASS / FAIL を表示する。いずれかが失敗した場合は終了コード 1 で終了する
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('-k', dest='keyword', help='run only scenarios whose name contains this keyword')
+    parser.add_argument('-v', dest='verbose', action='store_true', help='show Lambda logs')
+    args = parser.parse_args()
+
+    quiet_lambda_logs(args.verbose)
+
+    failures = 0
+    for scenario in scenarios:
+        name = scenario.__name__.replace('scenario_', '')
+        if args.keyword and args.keyword not in name:
+            continue
+        try:
+            scenario()
+            print(f"PASS  {name}")
+        except Exception:
+            failures += 1
+            print(f"FAIL  {name}")
+            traceback.print_exc()
+
+    if failures:
+        print(f"{failures} scenario(s) failed")
+        sys.exit(1)
+    print('All scenarios passed')
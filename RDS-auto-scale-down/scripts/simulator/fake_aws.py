@@ -0,0 +1,1210 @@
+"""
+シミュレーター用のAWS APIの代替（RDS / SSM / SNS / DynamoDB / Step Functions / EventBridge / CloudWatch / Application Auto Scaling）
+
+FakeRds はクラスターとインスタンスの状態を仮想時計上で遷移させる:
+  - modify_db_instance: modifying（resizeSeconds）-> rebooting（rebootSeconds）-> available
+  - failover_db_cluster: クラスターが failing-over（failoverSeconds）-> Writerが切り替わり available
+    元のWriterは rebooting（rebootSeconds）-> available
+  - modify_db_cluster_endpoint: カスタムエンドポイントが modifying（endpointModifySeconds）-> available
+    除外したインスタンスの DatabaseConnections は drainSeconds で 0 まで減る（FakeCloudWatch）
+  - create_blue_green_deployment: グリーン環境（<cluster>-green-xxxxxx）が PROVISIONING（blueGreenProvisionSeconds）-> AVAILABLE
+    switchover_blue_green_deployment: SWITCHOVER_IN_PROGRESS（switchoverSeconds）-> SWITCHOVER_COMPLETED
+    切り替え後はグリーン環境が元の識別子になり、元のクラスター・インスタンスは -old1 の識別子で残る
+    switchoverSeconds が SwitchoverTimeout を超える場合は SWITCHOVER_FAILED（ブルー環境のまま）
+状態遷移に合わせて RDS イベント（EventBridge の形式）を発行する。
+describe_orderable_db_instance_options は cluster の orderableClasses（省略時は DEFAULT_ORDERABLE_CLASSES）のタイプを返す。
+クラスターパラメータグループは cluster の logicalReplication（rds.logical_replication = 1、省略時は false）と
+parameterGroupStatus（メンバーの DBClusterParameterGroupStatus、省略時は in-sync）で指定する。
+障害の注入（API エラー、変更が終わらないインスタンス、開始されないフェイルオーバー、イベントの欠落）に対応する。
+
+FakeCloudWatch はシナリオの metrics 設定から合成したメトリクスの時系列を GetMetricData の形式で返す。
+
+FakeApplicationAutoScaling は Reader 台数のスケーラブルターゲットの一時停止の状態（SuspendedState）を保持する。
+一時停止中は、シナリオの clusterChanges による Reader の追加・削除（AutoScaling の動作）を行わない。
+"""
+import copy
+import hashlib
+import json
+import random
+import re
+from datetime import datetime, timedelta, timezone
+
+from botocore.exceptions import ClientError
+
+DEFAULT_MAX_RECORDS = 100
+
+DEFAULT_ENGINE_VERSION = '15.4'
+# エンジン・バージョンで注文可能なインスタンスタイプ（シナリオの cluster.orderableClasses で上書きできる）
+DEFAULT_ORDERABLE_CLASSES = [
+    'db.t4g.medium', 'db.t4g.large',
+    'db.r6g.large', 'db.r6g.xlarge', 'db.r6g.2xlarge', 'db.r6g.4xlarge',
+    'db.r7g.large', 'db.r7g.xlarge', 'db.r7g.2xlarge', 'db.r7g.4xlarge'
+]
+
+
+def client_error(code, message, operation):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+
+def operation_name(method_name):
+    """
+    modify_db_instance -> ModifyDBInstance
+    """
+    special = {'db': 'DB', 'sns': 'SNS'}
+    return ''.join(special.get(part, part.capitalize()) for part in method_name.split('_'))
+
+
+class Paginator:
+    """
+    Marker によるページングを最後まで辿る（botocore の Paginator の代替）
+    """
+
+    def __init__(self, method):
+        self.method = method
+
+    def paginate(self, **kwargs):
+        marker = None
+        while True:
+            params = dict(kwargs)
+            if marker:
+                params['Marker'] = marker
+            page = self.method(**params)
+            yield page
+            marker = page.get('Marker')
+            if not marker:
+                return
+
+
+class RecordingClient:
+    """
+    代替クライアントの呼び出しを記録し、障害を注入する
+    faults: [{"service": "rds", "operation": "ModifyDBInstance", "code": "...", "count": 1, "probability": 1.0, "match": {...}}]
+    リトライは行わない（Lambda 側の scaling_common.api_calls がリトライする）
+    """
+
+    def __init__(self, service, fake, recorder, faults, rng):
+        self._service = service
+        self._fake = fake
+        self._recorder = recorder
+        self._faults = [f for f in faults if f.get('service', 'rds') == service]
+        self._rng = rng
+
+    def get_paginator(self, method_name):
+        return Paginator(getattr(self, method_name))
+
+    def __getattr__(self, method_name):
+        method = getattr(self._fake, method_name)
+        operation = operation_name(method_name)
+
+        def call(**kwargs):
+            self._recorder.api_call(self._service, operation)
+            fault = self._matching_fault(operation, kwargs)
+            if fault is None:
+                return method(**kwargs)
+            raise client_error(fault['code'], fault.get('message', f"Injected fault for {operation}"), operation)
+
+        return call
+
+    def _matching_fault(self, operation, kwargs):
+        for fault in self._faults:
+            if fault.get('operation') not in (None, operation):
+                continue
+            if any(kwargs.get(key) != value for key, value in fault.get('match', {}).items()):
+                continue
+            if fault.get('count', 1) <= 0:
+                continue
+            if self._rng.random() >= fault.get('probability', 1.0):
+                continue
+            fault['count'] = fault.get('count', 1) - 1
+            return fault
+        return None
+
+
+class FakeRds:
+    def __init__(self, scheduler, cluster_config, latency, rng, emit_event, region='ap-northeast-1', time_source=None):
+        self.scheduler = scheduler
+        # 現在の仮想時刻（Lambda 内の待機を含む、省略時は scheduler.now）
+        self.time_source = time_source or (lambda: scheduler.now)
+        self.latency = latency
+        self.rng = rng
+        self.emit_event = emit_event
+        self.region = region
+        self.stuck_instances = set(cluster_config.get('stuckInstances', []))
+        self.ignored_failovers = cluster_config.get('ignoredFailovers', 0)
+        self.resize_seconds_by_class = latency.get('resizeSecondsByClass', {})
+        self.orderable_classes = cluster_config.get('orderableClasses', DEFAULT_ORDERABLE_CLASSES)
+        self.failed_blue_green_provisions = cluster_config.get('failedBlueGreenProvisions', 0)
+        self.failed_blue_green_switchovers = cluster_config.get('failedBlueGreenSwitchovers', 0)
+        self.cluster = {
+            'DBClusterIdentifier': cluster_config['identifier'],
+            'DBClusterArn': self.cluster_arn(cluster_config['identifier']),
+            'DbClusterResourceId': resource_id('cluster', cluster_config['identifier']),
+            'Status': 'available',
+            'DeletionProtection': cluster_config.get('deletionProtection', False),
+            'Engine': 'aurora-postgresql',
+            'EngineVersion': cluster_config.get('engineVersion', DEFAULT_ENGINE_VERSION),
+            'DBClusterParameterGroup': (
+                f"{cluster_config['identifier']}-blue-green" if cluster_config.get('logicalReplication')
+                else f"default.aurora-postgresql{cluster_config.get('engineVersion', DEFAULT_ENGINE_VERSION).split('.')[0]}"
+            ),
+            'TagList': [{'Key': k, 'Value': v} for k, v in cluster_config.get('tags', {}).items()]
+        }
+        self.logical_replication = bool(cluster_config.get('logicalReplication'))
+        self.parameter_group_status = cluster_config.get('parameterGroupStatus', 'in-sync')
+        self.instances = {}
+        self.writer_instance_id = None
+        for spec in cluster_config['instances']:
+            self.add_instance(spec)
+        self.resize_log = []
+        # 置き換え（replace_instance）で作成・削除したインスタンス
+        self.created_instances = []
+        self.deleted_instances = []
+        # カスタムエンドポイント（Reader のドレイン: drain_reader）
+        self.cluster_endpoints = {}
+        self.endpoint_available_at = {}
+        # インスタンスごとの、エンドポイントから除外されていた期間 [開始, 終了]（終了が None の場合は除外中）
+        self.exclusions = {}
+        # Blue/Green デプロイと、現在のクラスター以外のクラスター（グリーン環境・切り替え前の -old1）
+        # {識別子: {'cluster': ..., 'instances': {ID: ...}, 'sourceIds': {ID: 切り替え後のID}}}
+        self.blue_green_deployments = {}
+        self.other_clusters = {}
+        self.switchover_log = []
+        self.deleted_clusters = []
+
+    def add_instance(self, spec):
+        instance_id = spec['id']
+        self.instances[instance_id] = {
+            'DBInstanceIdentifier': instance_id,
+            'DBInstanceClass': spec['class'],
+            'DBInstanceStatus': spec.get('status', 'available'),
+            'DBClusterIdentifier': self.cluster['DBClusterIdentifier'],
+            'DBInstanceArn': f"arn:aws:rds:{self.region}:000000000000:db:{instance_id}",
+            'Engine': 'aurora-postgresql',
+            'EngineVersion': self.cluster['EngineVersion'],
+            'PromotionTier': spec.get('promotionTier', 1),
+            'TagList': [{'Key': 'Role', 'Value': spec['role']}] if spec.get('role') else []
+        }
+        if spec.get('writer'):
+            self.writer_instance_id = instance_id
+
+    def remove_instance(self, instance_id):
+        """
+        インスタンスをクラスターから削除する（AutoScaling のスケールインなど）
+        """
+        self.instances.pop(instance_id, None)
+
+    # --- describe ---
+    def cluster_arn(self, identifier):
+        return f"arn:aws:rds:{self.region}:000000000000:cluster:{identifier}"
+
+    def all_clusters(self):
+        """
+        (クラスター, インスタンス, Writer のID) の一覧（現在のクラスター、グリーン環境・-old1 のクラスターの順）
+        """
+        clusters = [(self.cluster, self.instances, self.writer_instance_id)]
+        for other in self.other_clusters.values():
+            clusters.append((other['cluster'], other['instances'], other['writer']))
+        return clusters
+
+    def describe_db_clusters(self, DBClusterIdentifier=None, Filters=None, Marker=None, MaxRecords=None):
+        identifiers = [DBClusterIdentifier] if DBClusterIdentifier else None
+        resource_ids = None
+        for f in Filters or []:
+            if f['Name'] == 'db-cluster-id':
+                identifiers = f['Values']
+            elif f['Name'] == 'db-cluster-resource-id':
+                resource_ids = f['Values']
+        clusters = []
+        for cluster, instances, writer_instance_id in self.all_clusters():
+            if identifiers is not None and not {cluster['DBClusterIdentifier'], cluster['DBClusterArn']} & set(identifiers):
+                continue
+            if resource_ids is not None and cluster['DbClusterResourceId'] not in resource_ids:
+                continue
+            cluster = copy.deepcopy(cluster)
+            cluster['DBClusterMembers'] = [
+                {
+                    'DBInstanceIdentifier': instance_id,
+                    'IsClusterWriter': instance_id == writer_instance_id,
+                    'DBClusterParameterGroupStatus': self.parameter_group_status,
+                    'PromotionTier': instance['PromotionTier']
+                }
+                for instance_id, instance in instances.items()
+            ]
+            clusters.append(cluster)
+        if DBClusterIdentifier and not clusters:
+            raise client_error('DBClusterNotFoundFault', f"DBCluster {DBClusterIdentifier} not found.", 'DescribeDBClusters')
+        return {'DBClusters': clusters}
+
+    def describe_db_instances(self, DBInstanceIdentifier=None, Filters=None, Marker=None, MaxRecords=None):
+        all_instances = {}
+        for _, instances, _ in self.all_clusters():
+            all_instances.update(instances)
+        if DBInstanceIdentifier:
+            if DBInstanceIdentifier not in all_instances:
+                raise client_error('DBInstanceNotFound', f"DBInstance {DBInstanceIdentifier} not found.", 'DescribeDBInstances')
+            return {'DBInstances': [copy.deepcopy(all_instances[DBInstanceIdentifier])]}
+
+        matched = list(all_instances.values())
+        for f in Filters or []:
+            if f['Name'] == 'db-instance-id':
+                matched = [i for i in matched if i['DBInstanceIdentifier'] in f['Values'] or i['DBInstanceArn'] in f['Values']]
+            elif f['Name'] == 'db-cluster-id':
+                # クラスターは識別子・ARNのどちらでも指定できる
+                values = set(f['Values'])
+                matched = [
+                    i for i in matched
+                    if i['DBClusterIdentifier'] in values or self.cluster_arn(i['DBClusterIdentifier']) in values
+                ]
+
+        start = int(Marker or 0)
+        page_size = MaxRecords or DEFAULT_MAX_RECORDS
+        page = matched[start:start + page_size]
+        response = {'DBInstances': [copy.deepcopy(i) for i in page]}
+        if start + page_size < len(matched):
+            response['Marker'] = str(start + page_size)
+        return response
+
+    def describe_db_cluster_parameters(self, DBClusterParameterGroupName, Marker=None, MaxRecords=None, **kwargs):
+        """
+        クラスターのパラメータグループの rds.logical_replication のみ返す
+        """
+        if DBClusterParameterGroupName != self.cluster['DBClusterParameterGroup']:
+            raise client_error('DBParameterGroupNotFound', f"DBClusterParameterGroup {DBClusterParameterGroupName} not found.",
+                               'DescribeDBClusterParameters')
+        return {'Parameters': [{
+            'ParameterName': 'rds.logical_replication',
+            'ParameterValue': '1' if self.logical_replication else '0',
+            'ApplyMethod': 'pending-reboot'
+        }]}
+
+    def describe_orderable_db_instance_options(self, Engine, EngineVersion=None, DBInstanceClass=None, Marker=None, MaxRecords=None, **kwargs):
+        matched = []
+        if Engine == self.cluster['Engine'] and EngineVersion in (None, self.cluster['EngineVersion']):
+            matched = [c for c in self.orderable_classes if DBInstanceClass in (None, c)]
+        start = int(Marker or 0)
+        page_size = MaxRecords or DEFAULT_MAX_RECORDS
+        response = {
+            'OrderableDBInstanceOptions': [
+                {'Engine': Engine, 'EngineVersion': self.cluster['EngineVersion'], 'DBInstanceClass': c}
+                for c in matched[start:start + page_size]
+            ]
+        }
+        if start + page_size < len(matched):
+            response['Marker'] = str(start + page_size)
+        return response
+
+    # --- 変更 ---
+    def modify_db_instance(self, DBInstanceIdentifier, DBInstanceClass=None, ApplyImmediately=False, **kwargs):
+        instance = self.instances.get(DBInstanceIdentifier)
+        if instance is None:
+            raise client_error('DBInstanceNotFound', f"DBInstance {DBInstanceIdentifier} not found.", 'ModifyDBInstance')
+        if instance['DBInstanceStatus'] != 'available':
+            raise client_error(
+                'InvalidDBInstanceState',
+                f"Database instance is not in available state (current: {instance['DBInstanceStatus']}).",
+                'ModifyDBInstance'
+            )
+        if DBInstanceClass and DBInstanceClass not in self.orderable_classes:
+            raise client_error(
+                'InvalidParameterCombination',
+                f"RDS does not support creating a DB instance with the following combination: DBInstanceClass={DBInstanceClass}, "
+                f"Engine={self.cluster['Engine']}, EngineVersion={self.cluster['EngineVersion']}.",
+                'ModifyDBInstance'
+            )
+        if DBInstanceClass and DBInstanceClass != instance['DBInstanceClass']:
+            from_class = instance['DBInstanceClass']
+            instance['DBInstanceStatus'] = 'modifying'
+            instance['PendingModifiedValues'] = {'DBInstanceClass': DBInstanceClass}
+            self.emit_instance_event(DBInstanceIdentifier, 'RDS-EVENT-0012', 'Applying modification to database instance class')
+            if DBInstanceIdentifier not in self.stuck_instances:
+                seconds = self.jittered(self.resize_seconds_by_class.get(DBInstanceClass, self.latency['resizeSeconds']))
+                self.scheduler.call_later(seconds, self.finish_resize, DBInstanceIdentifier, from_class, DBInstanceClass, self.scheduler.now)
+        return {'DBInstance': copy.deepcopy(instance)}
+
+    def create_db_instance(self, DBInstanceIdentifier, DBClusterIdentifier, DBInstanceClass, Engine, PromotionTier=1, Tags=None, **kwargs):
+        """
+        クラスターに Reader を追加する（creating -> available、置き換え: replace_instance）
+        """
+        if DBClusterIdentifier != self.cluster['DBClusterIdentifier']:
+            raise client_error('DBClusterNotFoundFault', f"DBCluster {DBClusterIdentifier} not found.", 'CreateDBInstance')
+        if DBInstanceIdentifier in self.instances:
+            raise client_error('DBInstanceAlreadyExists', f"DB instance already exists: {DBInstanceIdentifier}", 'CreateDBInstance')
+        if DBInstanceClass not in self.orderable_classes:
+            raise client_error(
+                'InvalidParameterCombination',
+                f"RDS does not support creating a DB instance with the following combination: DBInstanceClass={DBInstanceClass}, "
+                f"Engine={Engine}, EngineVersion={self.cluster['EngineVersion']}.",
+                'CreateDBInstance'
+            )
+        role = next((tag['Value'] for tag in Tags or [] if tag['Key'] == 'Role'), None)
+        self.add_instance({
+            'id': DBInstanceIdentifier,
+            'class': DBInstanceClass,
+            'status': 'creating',
+            'promotionTier': PromotionTier,
+            'role': role
+        })
+        self.instances[DBInstanceIdentifier]['TagList'] = [dict(tag) for tag in Tags or []]
+        self.created_instances.append(DBInstanceIdentifier)
+        self.scheduler.call_later(
+            self.jittered(self.latency['createSeconds']), self.finish_create, DBInstanceIdentifier, self.scheduler.now
+        )
+        return {'DBInstance': copy.deepcopy(self.instances[DBInstanceIdentifier])}
+
+    def finish_create(self, instance_id, started_at):
+        instance = self.instances.get(instance_id)
+        if instance is None:
+            return
+        instance['DBInstanceStatus'] = 'available'
+        self.emit_instance_event(instance_id, 'RDS-EVENT-0005', 'DB instance created')
+
+    def delete_db_instance(self, DBInstanceIdentifier, **kwargs):
+        """
+        インスタンスを削除する（deleting の後にクラスターから外れる）。Writer は削除しない
+        """
+        other = next((o for o in self.other_clusters.values() if DBInstanceIdentifier in o['instances']), None)
+        if other is not None:
+            return self.delete_other_instance(other, DBInstanceIdentifier)
+        instance = self.instances.get(DBInstanceIdentifier)
+        if instance is None:
+            raise client_error('DBInstanceNotFound', f"DBInstance {DBInstanceIdentifier} not found.", 'DeleteDBInstance')
+        if DBInstanceIdentifier == self.writer_instance_id:
+            raise client_error('InvalidDBClusterStateFault', f"Cannot delete the writer instance {DBInstanceIdentifier}.", 'DeleteDBInstance')
+        if instance['DBInstanceStatus'] != 'available':
+            raise client_error(
+                'InvalidDBInstanceState',
+                f"Database instance is not in available state (current: {instance['DBInstanceStatus']}).",
+                'DeleteDBInstance'
+            )
+        instance['DBInstanceStatus'] = 'deleting'
+        self.deleted_instances.append(DBInstanceIdentifier)
+        self.scheduler.call_later(self.jittered(self.latency['deleteSeconds']), self.remove_instance, DBInstanceIdentifier)
+        return {'DBInstance': copy.deepcopy(instance)}
+
+    def finish_resize(self, instance_id, from_class, to_class, started_at):
+        instance = self.instances[instance_id]
+        instance['DBInstanceClass'] = to_class
+        instance.pop('PendingModifiedValues', None)
+        reboot_seconds = self.latency.get('rebootSeconds', 0)
+        if reboot_seconds:
+            instance['DBInstanceStatus'] = 'rebooting'
+            self.scheduler.call_later(reboot_seconds, self.finish_reboot, instance_id, from_class, to_class, started_at)
+        else:
+            self.finish_reboot(instance_id, from_class, to_class, started_at)
+
+    def finish_reboot(self, instance_id, from_class, to_class, started_at):
+        self.instances[instance_id]['DBInstanceStatus'] = 'available'
+        self.resize_log.append({
+            'instanceId': instance_id,
+            'fromClass': from_class,
+            'toClass': to_class,
+            'seconds': round(self.scheduler.now - started_at, 1)
+        })
+        self.emit_instance_event(instance_id, 'RDS-EVENT-0014', 'Finished applying modification to DB instance class.')
+
+    def failover_db_cluster(self, DBClusterIdentifier, TargetDBInstanceIdentifier=None):
+        if DBClusterIdentifier != self.cluster['DBClusterIdentifier']:
+            raise client_error('DBClusterNotFoundFault', f"DBCluster {DBClusterIdentifier} not found.", 'FailoverDBCluster')
+        if self.cluster['Status'] != 'available':
+            raise client_error('InvalidDBClusterStateFault', f"DBCluster {DBClusterIdentifier} is in {self.cluster['Status']} state.", 'FailoverDBCluster')
+        target = self.instances.get(TargetDBInstanceIdentifier)
+        if target is None or target['DBInstanceStatus'] != 'available':
+            raise client_error('InvalidDBInstanceState', f"Target instance {TargetDBInstanceIdentifier} is not available.", 'FailoverDBCluster')
+
+        if self.ignored_failovers > 0:
+            # 要求は受け付けたが、フェイルオーバーが開始されない
+            self.ignored_failovers -= 1
+        else:
+            self.cluster['Status'] = 'failing-over'
+            self.emit_cluster_event('RDS-EVENT-0073', f"Started cross AZ failover to DB instance: {TargetDBInstanceIdentifier}")
+            self.scheduler.call_later(self.jittered(self.latency['failoverSeconds']), self.finish_failover, TargetDBInstanceIdentifier)
+        cluster = copy.deepcopy(self.cluster)
+        return {'DBCluster': cluster}
+
+    def finish_failover(self, target_instance_id):
+        old_writer = self.writer_instance_id
+        self.writer_instance_id = target_instance_id
+        self.cluster['Status'] = 'available'
+        reboot_seconds = self.latency.get('rebootSeconds', 0)
+        if reboot_seconds and old_writer:
+            self.instances[old_writer]['DBInstanceStatus'] = 'rebooting'
+            self.scheduler.call_later(reboot_seconds, self.set_status, old_writer, 'available')
+        self.emit_cluster_event('RDS-EVENT-0071', f"Completed failover to DB instance: {target_instance_id}")
+
+    def set_status(self, instance_id, status):
+        self.instances[instance_id]['DBInstanceStatus'] = status
+
+    # --- Blue/Green デプロイ ---
+    def create_blue_green_deployment(self, BlueGreenDeploymentName, Source, TargetDBInstanceClass=None, Tags=None, **kwargs):
+        """
+        全インスタンスのコピー（TargetDBInstanceClass）のグリーン環境を作成する（PROVISIONING -> AVAILABLE）
+        """
+        if Source != self.cluster['DBClusterArn']:
+            raise client_error('DBClusterNotFoundFault', f"DBCluster {Source} not found.", 'CreateBlueGreenDeployment')
+        if any(d['BlueGreenDeploymentName'] == BlueGreenDeploymentName for d in self.blue_green_deployments.values()):
+            raise client_error(
+                'BlueGreenDeploymentAlreadyExistsFault', f"A blue/green deployment named {BlueGreenDeploymentName} already exists.",
+                'CreateBlueGreenDeployment'
+            )
+        if any(d['Source'] == Source for d in self.blue_green_deployments.values()):
+            raise client_error(
+                'InvalidDBClusterStateFault', f"DBCluster {Source} already has a blue/green deployment.", 'CreateBlueGreenDeployment'
+            )
+        if TargetDBInstanceClass and TargetDBInstanceClass not in self.orderable_classes:
+            raise client_error(
+                'InvalidParameterCombination',
+                f"RDS does not support creating a DB instance with the following combination: DBInstanceClass={TargetDBInstanceClass}, "
+                f"Engine={self.cluster['Engine']}, EngineVersion={self.cluster['EngineVersion']}.",
+                'CreateBlueGreenDeployment'
+            )
+
+        digest = hashlib.sha1(BlueGreenDeploymentName.encode()).hexdigest()
+        deployment_id = f"bgd-{digest[:16]}"
+        green_id = f"{self.cluster['DBClusterIdentifier']}-green-{digest[16:22]}"
+        green = {
+            'cluster': dict(copy.deepcopy(self.cluster), DBClusterIdentifier=green_id, DBClusterArn=self.cluster_arn(green_id),
+                            DbClusterResourceId=resource_id('cluster', green_id), Status='creating'),
+            'instances': {},
+            'sourceIds': {},
+            'writer': None
+        }
+        for instance_id, instance in self.instances.items():
+            green_instance_id = f"{instance_id}-green-{digest[16:22]}"
+            green['instances'][green_instance_id] = dict(
+                copy.deepcopy(instance),
+                DBInstanceIdentifier=green_instance_id,
+                DBInstanceArn=f"arn:aws:rds:{self.region}:000000000000:db:{green_instance_id}",
+                DBClusterIdentifier=green_id,
+                DBInstanceClass=TargetDBInstanceClass or instance['DBInstanceClass'],
+                DBInstanceStatus='creating'
+            )
+            green['sourceIds'][green_instance_id] = instance_id
+            if instance_id == self.writer_instance_id:
+                green['writer'] = green_instance_id
+        self.other_clusters[green_id] = green
+
+        deployment = {
+            'BlueGreenDeploymentIdentifier': deployment_id,
+            'BlueGreenDeploymentName': BlueGreenDeploymentName,
+            'Source': Source,
+            'Target': green['cluster']['DBClusterArn'],
+            'SwitchoverDetails': [
+                {'SourceMember': Source, 'TargetMember': green['cluster']['DBClusterArn'], 'Status': 'PROVISIONING'}
+            ] + [
+                {'SourceMember': self.instances[source_id]['DBInstanceArn'], 'TargetMember': i['DBInstanceArn'], 'Status': 'PROVISIONING'}
+                for green_instance_id, i in green['instances'].items()
+                for source_id in [green['sourceIds'][green_instance_id]]
+            ],
+            'Status': 'PROVISIONING',
+            'CreateTime': datetime.fromtimestamp(self.scheduler.now, timezone.utc),
+            'TagList': [dict(tag) for tag in Tags or []]
+        }
+        self.blue_green_deployments[deployment_id] = deployment
+        self.scheduler.call_later(
+            self.jittered(self.latency['blueGreenProvisionSeconds']), self.finish_blue_green_provision, deployment_id
+        )
+        return {'BlueGreenDeployment': copy.deepcopy(deployment)}
+
+    def finish_blue_green_provision(self, deployment_id):
+        deployment = self.blue_green_deployments.get(deployment_id)
+        if deployment is None or deployment['Status'] != 'PROVISIONING':
+            return
+        if self.failed_blue_green_provisions > 0:
+            self.failed_blue_green_provisions -= 1
+            deployment['Status'] = 'PROVISIONING_FAILED'
+            deployment['StatusDetails'] = 'Creating the green environment failed.'
+            return
+        green = self.other_clusters[self.cluster_identifier_from_arn(deployment['Target'])]
+        green['cluster']['Status'] = 'available'
+        for instance in green['instances'].values():
+            instance['DBInstanceStatus'] = 'available'
+        self.set_switchover_details(deployment, 'AVAILABLE')
+        deployment['Status'] = 'AVAILABLE'
+
+    def describe_blue_green_deployments(self, BlueGreenDeploymentIdentifier=None, Filters=None, Marker=None, MaxRecords=None):
+        if BlueGreenDeploymentIdentifier and BlueGreenDeploymentIdentifier not in self.blue_green_deployments:
+            raise client_error(
+                'BlueGreenDeploymentNotFoundFault', f"Blue/green deployment {BlueGreenDeploymentIdentifier} not found.",
+                'DescribeBlueGreenDeployments'
+            )
+        fields = {
+            'blue-green-deployment-identifier': 'BlueGreenDeploymentIdentifier',
+            'blue-green-deployment-name': 'BlueGreenDeploymentName',
+            'source': 'Source',
+            'target': 'Target'
+        }
+        matched = [
+            d for d in self.blue_green_deployments.values()
+            if BlueGreenDeploymentIdentifier in (None, d['BlueGreenDeploymentIdentifier'])
+            and all(d[fields[f['Name']]] in f['Values'] for f in Filters or [])
+        ]
+        return {'BlueGreenDeployments': copy.deepcopy(matched)}
+
+    def switchover_blue_green_deployment(self, BlueGreenDeploymentIdentifier, SwitchoverTimeout=300):
+        deployment = self.blue_green_deployments.get(BlueGreenDeploymentIdentifier)
+        if deployment is None:
+            raise client_error(
+                'BlueGreenDeploymentNotFoundFault', f"Blue/green deployment {BlueGreenDeploymentIdentifier} not found.",
+                'SwitchoverBlueGreenDeployment'
+            )
+        if deployment['Status'] != 'AVAILABLE':
+            raise client_error(
+                'InvalidBlueGreenDeploymentStateFault',
+                f"Blue/green deployment {BlueGreenDeploymentIdentifier} is in {deployment['Status']} state.",
+                'SwitchoverBlueGreenDeployment'
+            )
+        deployment['Status'] = 'SWITCHOVER_IN_PROGRESS'
+        self.set_switchover_details(deployment, 'SWITCHOVER_IN_PROGRESS')
+        seconds = self.jittered(self.latency['switchoverSeconds'])
+        if self.failed_blue_green_switchovers > 0 or seconds > SwitchoverTimeout:
+            # レプリケーションが追いつかない: タイムアウトで RDS が切り替えを取り消す
+            self.failed_blue_green_switchovers = max(0, self.failed_blue_green_switchovers - 1)
+            self.scheduler.call_later(min(seconds, SwitchoverTimeout), self.fail_switchover, BlueGreenDeploymentIdentifier)
+        else:
+            self.scheduler.call_later(seconds, self.finish_switchover, BlueGreenDeploymentIdentifier, self.scheduler.now)
+        return {'BlueGreenDeployment': copy.deepcopy(deployment)}
+
+    def fail_switchover(self, deployment_id):
+        deployment = self.blue_green_deployments[deployment_id]
+        deployment['Status'] = 'SWITCHOVER_FAILED'
+        deployment['StatusDetails'] = 'Switchover timed out; changes were rolled back.'
+        self.set_switchover_details(deployment, 'AVAILABLE')
+
+    def finish_switchover(self, deployment_id, started_at):
+        """
+        グリーン環境を元の識別子に、元のクラスター・インスタンスを -old1 の識別子に変更する
+        前回の切り替え前のクラスター（-old1）が残っている場合は -old2, -old3, ... にする（RDS と同じ）
+        """
+        deployment = self.blue_green_deployments[deployment_id]
+        name = self.cluster['DBClusterIdentifier']
+        green = self.other_clusters.pop(self.cluster_identifier_from_arn(deployment['Target']))
+
+        number = 1
+        while f"{name}-old{number}" in self.other_clusters:
+            number += 1
+        suffix = f"-old{number}"
+        old_id = f"{name}{suffix}"
+        old_instances = {}
+        for instance_id, instance in self.instances.items():
+            old_instance_id = f"{instance_id}{suffix}"
+            old_instances[old_instance_id] = dict(
+                instance,
+                DBInstanceIdentifier=old_instance_id,
+                DBInstanceArn=f"arn:aws:rds:{self.region}:000000000000:db:{old_instance_id}",
+                DBClusterIdentifier=old_id
+            )
+        self.other_clusters[old_id] = {
+            'cluster': dict(self.cluster, DBClusterIdentifier=old_id, DBClusterArn=self.cluster_arn(old_id)),
+            'instances': old_instances,
+            'sourceIds': {},
+            'writer': f"{self.writer_instance_id}{suffix}" if self.writer_instance_id else None
+        }
+
+        from_classes = {instance_id: instance['DBInstanceClass'] for instance_id, instance in self.instances.items()}
+        self.instances = {}
+        for green_instance_id, instance in green['instances'].items():
+            instance_id = green['sourceIds'][green_instance_id]
+            self.instances[instance_id] = dict(
+                instance,
+                DBInstanceIdentifier=instance_id,
+                DBInstanceArn=f"arn:aws:rds:{self.region}:000000000000:db:{instance_id}",
+                DBClusterIdentifier=name
+            )
+        self.cluster = dict(green['cluster'], DBClusterIdentifier=name, DBClusterArn=self.cluster_arn(name))
+
+        deployment['Source'] = self.cluster_arn(old_id)
+        deployment['Target'] = self.cluster['DBClusterArn']
+        deployment['Status'] = 'SWITCHOVER_COMPLETED'
+        self.set_switchover_details(deployment, 'SWITCHOVER_COMPLETED')
+        self.switchover_log.append({
+            'blueGreenDeploymentName': deployment['BlueGreenDeploymentName'],
+            'fromClasses': from_classes,
+            'toClasses': {instance_id: instance['DBInstanceClass'] for instance_id, instance in self.instances.items()},
+            'seconds': round(self.scheduler.now - started_at, 1)
+        })
+
+    def delete_blue_green_deployment(self, BlueGreenDeploymentIdentifier, DeleteTarget=False):
+        """
+        デプロイを削除する（DeleteTarget: true の場合はグリーン環境も削除する。スイッチオーバーの後は指定できない）
+        """
+        deployment = self.blue_green_deployments.get(BlueGreenDeploymentIdentifier)
+        if deployment is None:
+            raise client_error(
+                'BlueGreenDeploymentNotFoundFault', f"Blue/green deployment {BlueGreenDeploymentIdentifier} not found.",
+                'DeleteBlueGreenDeployment'
+            )
+        if deployment['Status'] == 'SWITCHOVER_IN_PROGRESS' or (DeleteTarget and deployment['Status'] == 'SWITCHOVER_COMPLETED'):
+            raise client_error(
+                'InvalidBlueGreenDeploymentStateFault',
+                f"Blue/green deployment {BlueGreenDeploymentIdentifier} is in {deployment['Status']} state.",
+                'DeleteBlueGreenDeployment'
+            )
+        del self.blue_green_deployments[BlueGreenDeploymentIdentifier]
+        if DeleteTarget:
+            green_id = self.cluster_identifier_from_arn(deployment['Target'])
+            green = self.other_clusters.get(green_id)
+            if green is not None:
+                green['cluster']['Status'] = 'deleting'
+                for instance in green['instances'].values():
+                    instance['DBInstanceStatus'] = 'deleting'
+                self.deleted_clusters.append({'clusterIdentifier': green_id, 'finalSnapshotIdentifier': None})
+                self.scheduler.call_later(self.jittered(self.latency['deleteSeconds']), self.other_clusters.pop, green_id, None)
+        return {'BlueGreenDeployment': dict(copy.deepcopy(deployment), Status='DELETING')}
+
+    def delete_other_instance(self, other, instance_id):
+        instance = other['instances'][instance_id]
+        if instance['DBInstanceStatus'] != 'available':
+            raise client_error(
+                'InvalidDBInstanceState',
+                f"Database instance is not in available state (current: {instance['DBInstanceStatus']}).",
+                'DeleteDBInstance'
+            )
+        instance['DBInstanceStatus'] = 'deleting'
+        self.scheduler.call_later(self.jittered(self.latency['deleteSeconds']), other['instances'].pop, instance_id, None)
+        return {'DBInstance': copy.deepcopy(instance)}
+
+    def delete_db_cluster(self, DBClusterIdentifier, SkipFinalSnapshot=False, FinalDBSnapshotIdentifier=None, **kwargs):
+        """
+        グリーン環境・-old1 のクラスターを削除する（インスタンスがすべて削除された後のみ）
+        """
+        other = self.other_clusters.get(DBClusterIdentifier)
+        if other is None:
+            code = 'InvalidDBClusterStateFault' if DBClusterIdentifier == self.cluster['DBClusterIdentifier'] else 'DBClusterNotFoundFault'
+            raise client_error(code, f"DBCluster {DBClusterIdentifier} cannot be deleted.", 'DeleteDBCluster')
+        if other['instances']:
+            raise client_error(
+                'InvalidDBClusterStateFault', f"Cluster {DBClusterIdentifier} cannot be deleted, it still contains DB instances.",
+                'DeleteDBCluster'
+            )
+        if other['cluster'].get('DeletionProtection'):
+            raise client_error(
+                'InvalidParameterCombination', f"Cannot delete protected Cluster {DBClusterIdentifier}.", 'DeleteDBCluster'
+            )
+        if not SkipFinalSnapshot and not FinalDBSnapshotIdentifier:
+            raise client_error(
+                'InvalidParameterValue', 'FinalDBSnapshotIdentifier is required unless SkipFinalSnapshot is specified.', 'DeleteDBCluster'
+            )
+        other['cluster']['Status'] = 'deleting'
+        self.deleted_clusters.append({
+            'clusterIdentifier': DBClusterIdentifier,
+            'finalSnapshotIdentifier': None if SkipFinalSnapshot else FinalDBSnapshotIdentifier
+        })
+        self.scheduler.call_later(self.jittered(self.latency['deleteSeconds']), self.other_clusters.pop, DBClusterIdentifier, None)
+        return {'DBCluster': copy.deepcopy(other['cluster'])}
+
+    def set_switchover_details(self, deployment, status):
+        for detail in deployment['SwitchoverDetails']:
+            detail['Status'] = status
+
+    def cluster_identifier_from_arn(self, arn):
+        return arn.split(':cluster:', 1)[1]
+
+    # --- カスタムエンドポイント ---
+    def add_cluster_endpoint(self, identifier, custom_endpoint_type='READER'):
+        self.cluster_endpoints[identifier] = {
+            'DBClusterEndpointIdentifier': identifier,
+            'DBClusterIdentifier': self.cluster['DBClusterIdentifier'],
+            'Endpoint': f"{identifier}.cluster-custom-sim.{self.region}.rds.amazonaws.com",
+            'Status': 'available',
+            'EndpointType': 'CUSTOM',
+            'CustomEndpointType': custom_endpoint_type,
+            'StaticMembers': [],
+            'ExcludedMembers': []
+        }
+
+    def describe_db_cluster_endpoints(self, DBClusterIdentifier=None, DBClusterEndpointIdentifier=None, Filters=None, Marker=None, MaxRecords=None):
+        endpoints = [
+            e for e in map(self.cluster_endpoint, list(self.cluster_endpoints))
+            if DBClusterEndpointIdentifier in (None, e['DBClusterEndpointIdentifier'])
+            and DBClusterIdentifier in (None, e['DBClusterIdentifier'])
+        ]
+        return {'DBClusterEndpoints': copy.deepcopy(endpoints)}
+
+    def modify_db_cluster_endpoint(self, DBClusterEndpointIdentifier, StaticMembers=None, ExcludedMembers=None, **kwargs):
+        """
+        除外リストを変更する（modifying（endpointModifySeconds）の後に接続の割り当てに反映される）
+        Lambda 内の待機（clock.sleep）の間にも反映されるよう、状態は参照時に仮想時刻（time_source）から求める
+        """
+        endpoint = self.cluster_endpoint(DBClusterEndpointIdentifier)
+        if endpoint is None:
+            raise client_error('DBClusterEndpointNotFoundFault', f"DBClusterEndpoint {DBClusterEndpointIdentifier} not found.", 'ModifyDBClusterEndpoint')
+        if endpoint['Status'] != 'available':
+            raise client_error(
+                'InvalidDBClusterEndpointStateFault',
+                f"DBClusterEndpoint {DBClusterEndpointIdentifier} is in {endpoint['Status']} state.",
+                'ModifyDBClusterEndpoint'
+            )
+        members = list(StaticMembers or []) + list(ExcludedMembers or [])
+        unknown = [i for i in members if i not in self.instances]
+        if unknown:
+            raise client_error('InvalidParameterValue', f"DB instances {unknown} are not members of the cluster.", 'ModifyDBClusterEndpoint')
+        if StaticMembers is not None:
+            endpoint['StaticMembers'] = list(StaticMembers)
+        if ExcludedMembers is not None:
+            endpoint['ExcludedMembers'] = list(ExcludedMembers)
+        endpoint['Status'] = 'modifying'
+        self.endpoint_available_at[DBClusterEndpointIdentifier] = self.time_source() + self.jittered(self.latency['endpointModifySeconds'])
+        return copy.deepcopy(endpoint)
+
+    def cluster_endpoint(self, identifier):
+        """
+        変更中のカスタムエンドポイントは、endpointModifySeconds を過ぎていれば available にして除外リストを反映する
+        """
+        endpoint = self.cluster_endpoints.get(identifier)
+        available_at = self.endpoint_available_at.get(identifier)
+        if endpoint is None or available_at is None or self.time_source() < available_at:
+            return endpoint
+        del self.endpoint_available_at[identifier]
+        endpoint['Status'] = 'available'
+        for instance_id in endpoint['ExcludedMembers']:
+            intervals = self.exclusions.setdefault(instance_id, [])
+            if not intervals or intervals[-1][1] is not None:
+                intervals.append([available_at, None])
+        for instance_id, intervals in self.exclusions.items():
+            if instance_id not in endpoint['ExcludedMembers'] and intervals[-1][1] is None:
+                intervals[-1][1] = available_at
+        return endpoint
+
+    def connection_factor(self, instance_id, timestamp):
+        """
+        エンドポイントから除外されたインスタンスの接続数の割合（drainSeconds で 0 まで直線的に減る）
+        """
+        for identifier in list(self.cluster_endpoints):
+            self.cluster_endpoint(identifier)
+        for start, end in self.exclusions.get(instance_id, []):
+            if start <= timestamp and (end is None or timestamp < end):
+                drain_seconds = self.latency['drainSeconds']
+                return max(0.0, 1 - (timestamp - start) / drain_seconds) if drain_seconds else 0.0
+        return 1.0
+
+    def jittered(self, seconds):
+        jitter = self.latency.get('jitter', 0)
+        return max(1, seconds * (1 + self.rng.uniform(-jitter, jitter)))
+
+    # --- イベント ---
+    def emit_instance_event(self, instance_id, event_id, message):
+        self.emit_event({
+            'source': 'aws.rds',
+            'detail-type': 'RDS DB Instance Event',
+            'detail': {
+                'EventCategories': ['configuration change'],
+                'SourceType': 'DB_INSTANCE',
+                'SourceIdentifier': instance_id,
+                'EventID': event_id,
+                'Message': message
+            }
+        })
+
+    def emit_cluster_event(self, event_id, message):
+        self.emit_event({
+            'source': 'aws.rds',
+            'detail-type': 'RDS DB Cluster Event',
+            'detail': {
+                'EventCategories': ['failover'],
+                'SourceType': 'CLUSTER',
+                'SourceIdentifier': self.cluster['DBClusterIdentifier'],
+                'EventID': event_id,
+                'Message': message
+            }
+        })
+
+
+def resource_id(prefix, identifier):
+    """
+    識別子から決まるリソースID（例: cluster-3F2A...）。識別子の変更（スイッチオーバー）では変わらない
+    """
+    return f"{prefix}-{hashlib.sha1(identifier.encode()).hexdigest()[:26].upper()}"
+
+
+class FakeSsm:
+    def __init__(self, parameters=None):
+        self.parameters = dict(parameters or {})
+
+    def get_parameter(self, Name, WithDecryption=False):
+        if Name not in self.parameters:
+            raise client_error('ParameterNotFound', f"Parameter {Name} not found.", 'GetParameter')
+        return {'Parameter': {'Name': Name, 'Value': self.parameters[Name], 'Type': 'String'}}
+
+    def put_parameter(self, Name, Value, Type='String', Overwrite=False, **kwargs):
+        if Name in self.parameters and not Overwrite:
+            raise client_error('ParameterAlreadyExists', f"Parameter {Name} already exists.", 'PutParameter')
+        self.parameters[Name] = Value
+        return {'Version': 1}
+
+
+class FakeSns:
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, TopicArn, Message, Subject=None, **kwargs):
+        self.messages.append({'TopicArn': TopicArn, 'Subject': Subject, 'Message': Message})
+        return {'MessageId': f"sim-message-{len(self.messages)}"}
+
+
+class FakeDynamoDB:
+    """
+    低レベルクライアントの put_item / get_item / delete_item / update_item / query（項目はテーブルごとのキー属性で保持する）
+    key_schemas: {テーブル名: [パーティションキー, ソートキー]}（指定のないテーブルは項目の最初の属性をキーとする）
+    query はパーティションキーの一致のみ（ソートキーの順、Limit・ExclusiveStartKey によるページング）
+    """
+
+    def __init__(self, key_schemas=None, page_size=None):
+        self.tables = {}
+        self.key_schemas = dict(key_schemas or {})
+        self.page_size = page_size
+
+    @staticmethod
+    def key_of(item_or_key):
+        return json.dumps(item_or_key, sort_keys=True)
+
+    def key_names(self, table_name, item):
+        return self.key_schemas.get(table_name) or [next(iter(item))]
+
+    def put_item(self, TableName, Item, **kwargs):
+        key = {name: Item[name] for name in self.key_names(TableName, Item)}
+        self.tables.setdefault(TableName, {})[self.key_of(key)] = copy.deepcopy(Item)
+        return {}
+
+    def get_item(self, TableName, Key, **kwargs):
+        item = self.tables.get(TableName, {}).get(self.key_of(Key))
+        return {'Item': copy.deepcopy(item)} if item else {}
+
+    def delete_item(self, TableName, Key, ReturnValues='NONE', **kwargs):
+        item = self.tables.get(TableName, {}).pop(self.key_of(Key), None)
+        if ReturnValues == 'ALL_OLD' and item:
+            return {'Attributes': item}
+        return {}
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeValues=None, ConditionExpression=None,
+                    ReturnValues='NONE', **kwargs):
+        """
+        SET <属性> = <値> / SET <属性> = if_not_exists(<属性>, <値>)（カンマ区切り）、
+        SET <属性> = list_append(if_not_exists(<属性>, <値>), <値>)、REMOVE <属性>[<番号>], ...と
+        ConditionExpression の attribute_exists(<属性>) / size(<属性>) = <値> のみ対応
+        """
+        table = self.tables.setdefault(TableName, {})
+        item = table.get(self.key_of(Key))
+        values = ExpressionAttributeValues or {}
+        if ConditionExpression and not self.condition_holds(ConditionExpression.strip(), item, values):
+            raise client_error('ConditionalCheckFailedException', 'The conditional request failed', 'UpdateItem')
+        item = item or copy.deepcopy(Key)
+        updated = {}
+        expression = UpdateExpression.strip()
+        if expression.startswith('REMOVE '):
+            for name, index in sorted(re.findall(r'(\w+)\[(\d+)\]', expression), key=lambda pair: -int(pair[1])):
+                del item[name]['L'][int(index)]
+                updated[name] = item[name]
+        else:
+            appends = re.findall(r'(\w+)\s*=\s*list_append\(\s*if_not_exists\(\s*\w+\s*,\s*(:\w+)\s*\)\s*,\s*(:\w+)\s*\)', expression)
+            for name, empty, value in appends:
+                current = item.get(name, values[empty])
+                item[name] = {'L': copy.deepcopy(current['L']) + copy.deepcopy(values[value]['L'])}
+                updated[name] = item[name]
+            if not appends:
+                for name, if_not_exists, value in re.findall(r'(\w+)\s*=\s*(if_not_exists\(\s*\w+\s*,\s*)?(:\w+)', expression):
+                    if if_not_exists and name in item:
+                        continue
+                    item[name] = copy.deepcopy(values[value])
+                    updated[name] = item[name]
+        table[self.key_of(Key)] = item
+        if ReturnValues == 'UPDATED_NEW':
+            return {'Attributes': copy.deepcopy(updated)}
+        return {}
+
+    @staticmethod
+    def condition_holds(condition, item, values):
+        size = re.fullmatch(r'size\(\s*(\w+)\s*\)\s*=\s*(:\w+)', condition)
+        if size:
+            name, placeholder = size.groups()
+            current = len(item[name]['L']) if item and name in item else 0
+            return current == int(values[placeholder]['N'])
+        name = condition[len('attribute_exists('):-1]
+        return bool(item) and name in item
+
+    def query(self, TableName, KeyConditionExpression, ExpressionAttributeValues, ScanIndexForward=True,
+              Limit=None, ExclusiveStartKey=None, ProjectionExpression=None, **kwargs):
+        partition_key, _, placeholder = (part.strip() for part in KeyConditionExpression.partition('='))
+        key_names = self.key_schemas.get(TableName, [partition_key])
+        value = ExpressionAttributeValues[placeholder]
+        items = [item for item in self.tables.get(TableName, {}).values() if item.get(partition_key) == value]
+        if len(key_names) > 1:
+            items.sort(key=lambda item: next(iter(item[key_names[1]].values())), reverse=not ScanIndexForward)
+
+        if ExclusiveStartKey:
+            keys = [{name: item[name] for name in key_names} for item in items]
+            items = items[keys.index(ExclusiveStartKey) + 1:]
+        limit = Limit or self.page_size
+        page = items[:limit] if limit else items
+        response = {'Items': copy.deepcopy(page), 'Count': len(page)}
+        if limit and len(items) > limit:
+            response['LastEvaluatedKey'] = {name: copy.deepcopy(page[-1][name]) for name in key_names}
+        if ProjectionExpression:
+            names = [name.strip() for name in ProjectionExpression.split(',')]
+            response['Items'] = [{name: item[name] for name in names if name in item} for item in response['Items']]
+        return response
+
+
+class FakeStepFunctions:
+    """
+    SendTaskSuccess / SendTaskFailure をシミュレーターのタスクトークンに届ける
+    """
+
+    def __init__(self, tokens, states_error):
+        self.tokens = tokens
+        self.states_error = states_error
+        self.executions = []
+
+    def send_task_success(self, taskToken, output):
+        if not self.tokens.complete(taskToken, ('success', output)):
+            raise client_error('TaskTimedOut', 'Task Timed Out', 'SendTaskSuccess')
+        return {}
+
+    def send_task_failure(self, taskToken, error='', cause=''):
+        if not self.tokens.complete(taskToken, ('failure', self.states_error(error, cause))):
+            raise client_error('TaskTimedOut', 'Task Timed Out', 'SendTaskFailure')
+        return {}
+
+    def start_execution(self, stateMachineArn, input, name=None):
+        self.executions.append({'stateMachineArn': stateMachineArn, 'name': name, 'input': json.loads(input)})
+        return {'executionArn': f"{stateMachineArn}:{name}", 'startDate': None}
+
+
+class FakeEvents:
+    def __init__(self):
+        self.rules = {}
+        self.targets = {}
+
+    def describe_rule(self, Name):
+        if Name not in self.rules:
+            raise client_error('ResourceNotFoundException', f"Rule {Name} does not exist.", 'DescribeRule')
+        return dict(self.rules[Name], Name=Name)
+
+    def put_rule(self, Name, **kwargs):
+        self.rules[Name] = kwargs
+        return {'RuleArn': f"arn:aws:events:local:000000000000:rule/{Name}"}
+
+    def list_targets_by_rule(self, Rule, **kwargs):
+        return {'Targets': copy.deepcopy(self.targets.get(Rule, []))}
+
+    def put_targets(self, Rule, Targets):
+        existing = {target['Id']: target for target in self.targets.get(Rule, [])}
+        existing.update({target['Id']: copy.deepcopy(target) for target in Targets})
+        self.targets[Rule] = list(existing.values())
+        return {'FailedEntryCount': 0, 'FailedEntries': []}
+
+
+class FakeApplicationAutoScaling:
+    """
+    Reader 台数（rds:cluster:ReadReplicaCount）のスケーラブルターゲット
+    シナリオの autoScaling 設定: {"registered": true, "minCapacity": 1, "maxCapacity": 15, "suspendedState": {...}}
+    （省略時は一時停止していないターゲットが登録されている）
+    """
+
+    DIMENSION = 'rds:cluster:ReadReplicaCount'
+
+    def __init__(self, cluster_identifier, config=None):
+        config = config or {}
+        self.resource_id = f"cluster:{cluster_identifier}"
+        self.targets = {}
+        # SuspendedState の変更履歴（検証用）
+        self.changes = []
+        if config.get('registered', True):
+            self.targets[self.resource_id] = {
+                'ServiceNamespace': 'rds',
+                'ResourceId': self.resource_id,
+                'ScalableDimension': self.DIMENSION,
+                'MinCapacity': config.get('minCapacity', 1),
+                'MaxCapacity': config.get('maxCapacity', 15),
+                'SuspendedState': dict({
+                    'DynamicScalingInSuspended': False,
+                    'DynamicScalingOutSuspended': False,
+                    'ScheduledScalingSuspended': False
+                }, **config.get('suspendedState', {}))
+            }
+
+    def describe_scalable_targets(self, ServiceNamespace, ResourceIds=None, ScalableDimension=None, NextToken=None, **kwargs):
+        targets = [
+            copy.deepcopy(target)
+            for resource_id, target in self.targets.items()
+            if target['ServiceNamespace'] == ServiceNamespace
+            and (ResourceIds is None or resource_id in ResourceIds)
+            and ScalableDimension in (None, target['ScalableDimension'])
+        ]
+        return {'ScalableTargets': targets}
+
+    def register_scalable_target(self, ServiceNamespace, ResourceId, ScalableDimension, MinCapacity=None, MaxCapacity=None, SuspendedState=None, **kwargs):
+        target = self.targets.get(ResourceId)
+        if target is None:
+            raise client_error('ValidationException', f"Scalable target {ResourceId} is not registered in the simulator.", 'RegisterScalableTarget')
+        if MinCapacity is not None:
+            target['MinCapacity'] = MinCapacity
+        if MaxCapacity is not None:
+            target['MaxCapacity'] = MaxCapacity
+        if SuspendedState is not None:
+            target['SuspendedState'].update(SuspendedState)
+            self.changes.append(dict(target['SuspendedState']))
+        return {}
+
+    def suspended(self, key):
+        """
+        key: DynamicScalingOutSuspended（Reader の追加）/ DynamicScalingInSuspended（Reader の削除）
+        """
+        target = self.targets.get(self.resource_id)
+        return bool(target and target['SuspendedState'].get(key))
+
+
+class FakeCloudWatch:
+    """
+    GetMetricData（AWS/RDS のインスタンス・クラスターのメトリクス）を合成した時系列で返す
+    metrics 設定（シナリオの "metrics"）:
+      days:               シミュレーション開始時刻より前の何日分のデータがあるか（デフォルト 14）
+      offPeakHours:       offPeak の値を使う時間帯（JST の時、[開始, 終了)、デフォルト [0, 7]）
+      noise:              値の揺らぎ（割合、デフォルト 0.1）
+      maxDatapointsPerPage: 1ページのデータポイント数の上限（NextToken のページングの確認用）
+      default / roles.<ロール> / instances.<インスタンスID>: メトリクスごとの {"peak": 値, "offPeak": 値}
+        メトリクス: cpu（%）, freeableMemoryGiB, connections, writeIops, replicaLagMs（Writer には出力しない）
+        spikes: [{"fromSeconds": -600, "toSeconds": 900, "value": 値}] でシミュレーション開始時刻からの秒数の範囲の値（書き込みの集中など）
+        batch: {"startHour": 2, "hours": 1, "<メトリクス>": 値} で毎晩のバッチ処理の負荷を表す
+        byHour: {"<JST の時>": 値} で時刻ごとの値、byWeekday: {"SUN": 倍率} で曜日ごとの倍率を指定する
+      cluster: クラスター単位（DBClusterIdentifier ディメンション）のメトリクス（default に重ねる）
+    """
+
+    METRIC_KEYS = {
+        'CPUUtilization': ('cpu', 1),
+        'FreeableMemory': ('freeableMemoryGiB', 1024 ** 3),
+        'DatabaseConnections': ('connections', 1),
+        'WriteIOPS': ('writeIops', 1),
+        'AuroraReplicaLag': ('replicaLagMs', 1)
+    }
+    DEFAULT_MAX_DATAPOINTS_PER_PAGE = 100800
+    JST = timezone(timedelta(hours=9))
+    WEEKDAYS = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+
+    def __init__(self, scheduler, metrics, roles, seed=0, connection_factor=None):
+        self.scheduler = scheduler
+        self.metrics = metrics or {}
+        self.roles = roles
+        self.seed = seed
+        self.start = scheduler.now
+        # カスタムエンドポイントから除外したインスタンスの接続数の割合（FakeRds.connection_factor）
+        self.connection_factor = connection_factor
+        self.max_datapoints_per_page = self.metrics.get('maxDatapointsPerPage', self.DEFAULT_MAX_DATAPOINTS_PER_PAGE)
+        self.requests = []
+
+    def profile(self, instance_id=None):
+        if instance_id is None:
+            layers = (self.metrics.get('default', {}), self.metrics.get('cluster', {}))
+        else:
+            layers = (
+                self.metrics.get('default', {}),
+                self.metrics.get('roles', {}).get(self.roles.get(instance_id), {}),
+                self.metrics.get('instances', {}).get(instance_id, {})
+            )
+        profile = {}
+        for layer in layers:
+            for key, value in layer.items():
+                profile[key] = dict(profile.get(key, {}), **value)
+        return profile
+
+    def series(self, query, start_time, end_time):
+        stat = query['MetricStat']
+        dimensions = {d['Name']: d['Value'] for d in stat['Metric']['Dimensions']}
+        instance_id = dimensions.get('DBInstanceIdentifier')
+        key, scale = self.METRIC_KEYS[stat['Metric']['MetricName']]
+        if instance_id is not None and instance_id not in self.roles:
+            return [], []
+        profile = self.profile(instance_id)
+        if key not in profile:
+            return [], []
+        if key == 'replicaLagMs' and self.roles.get(instance_id) == 'writer':
+            return [], []
+
+        level = profile[key]
+        batch = profile.get('batch', {})
+        off_peak_start, off_peak_end = self.metrics.get('offPeakHours', [0, 7])
+        noise = self.metrics.get('noise', 0.1)
+        rng = random.Random(f"{self.seed}-{instance_id or dimensions.get('DBClusterIdentifier')}-{key}")
+
+        first = datetime.fromtimestamp(self.scheduler.now, timezone.utc) - timedelta(days=self.metrics.get('days', 14))
+        period = timedelta(seconds=stat['Period'])
+        timestamp = max(start_time, first)
+        timestamps, values = [], []
+        while timestamp < end_time:
+            local = timestamp.astimezone(self.JST)
+            hour = local.hour
+            value = level['offPeak'] if off_peak_start <= hour < off_peak_end else level['peak']
+            value = level.get('byHour', {}).get(str(hour), value)
+            value *= level.get('byWeekday', {}).get(self.WEEKDAYS[local.weekday()], 1)
+            if key in batch and batch['startHour'] <= hour < batch['startHour'] + batch.get('hours', 1):
+                value = batch[key]
+            offset = timestamp.timestamp() - self.start
+            for spike in level.get('spikes', []):
+                if spike['fromSeconds'] <= offset < spike['toSeconds']:
+                    value = spike['value']
+            value *= 1 + rng.uniform(-noise, noise)
+            if key == 'connections' and instance_id is not None and self.connection_factor:
+                value *= self.connection_factor(instance_id, timestamp.timestamp())
+            timestamps.append(timestamp)
+            values.append(value * scale)
+            timestamp += period
+        return timestamps, values
+
+    def get_metric_data(self, MetricDataQueries, StartTime, EndTime, ScanBy='TimestampDescending', NextToken=None, **kwargs):
+        self.requests.append({'queries': len(MetricDataQueries), 'nextToken': NextToken})
+        # NextToken: "<クエリの位置>:<データポイントの位置>"
+        query_index, point_index = map(int, (NextToken or '0:0').split(':'))
+        remaining = self.max_datapoints_per_page
+        results = []
+        while query_index < len(MetricDataQueries) and remaining > 0:
+            query = MetricDataQueries[query_index]
+            timestamps, values = self.series(query, StartTime, EndTime)
+            if ScanBy == 'TimestampDescending':
+                timestamps, values = timestamps[::-1], values[::-1]
+            chunk = slice(point_index, point_index + remaining)
+            results.append({
+                'Id': query['Id'],
+                'Label': query['MetricStat']['Metric']['MetricName'],
+                'Timestamps': timestamps[chunk],
+                'Values': values[chunk],
+                'StatusCode': 'Complete'
+            })
+            remaining -= len(timestamps[chunk])
+            if point_index + len(timestamps[chunk]) < len(timestamps):
+                point_index += len(timestamps[chunk])
+                results[-1]['StatusCode'] = 'PartialData'
+                break
+            query_index += 1
+            point_index = 0
+
+        response = {'MetricDataResults': results, 'Messages': []}
+        if query_index < len(MetricDataQueries):
+            response['NextToken'] = f"{query_index}:{point_index}"
+        return response
+
+
+def build_cluster_config(scenario):
+    """
+    シナリオの cluster 設定からインスタンスの一覧を組み立てる
+    instances を直接指定するか、writer / dedicatedReader / autoScalingReaders で指定する
+    """
+    cluster = dict(scenario['cluster'])
+    if 'instances' in cluster:
+        return cluster
+
+    name = cluster['identifier']
+    instances = [
+        {'id': f"{name}-writer", 'class': cluster.get('writerClass', 'db.r6g.large'), 'writer': True,
+         'promotionTier': 0, 'role': 'writer'},
+        {'id': f"{name}-dedicated-reader", 'class': cluster.get('dedicatedReaderClass', cluster.get('writerClass', 'db.r6g.large')),
+         'promotionTier': 0, 'role': 'dedicated-reader'}
+    ]
+    for i in range(cluster.get('autoScalingReaders', 0)):
+        instances.append({
+            'id': f"application-autoscaling-{name}-{i + 1:02d}",
+            'class': cluster.get('autoScalingReaderClass', cluster.get('writerClass', 'db.r6g.large')),
+            'promotionTier': 15,
+            'role': 'autoscaling-reader'
+        })
+    cluster['instances'] = instances
+    return cluster
+
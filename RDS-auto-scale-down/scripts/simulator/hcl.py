@@ -0,0 +1,550 @@
+"""
+Terraform（HCL）のサブセットを読み込み、式を評価する
+
+stepfunction.tf の jsonencode({...}) からステートマシン定義（ASL）を組み立てるために使う。
+対応している構文:
+  - 属性（name = 式）とブロック（type "label" ... { ... }）
+  - オブジェクト / タプル / 文字列（${...} の埋め込み）/ 数値 / true / false / null
+  - 参照（var.x, aws_lambda_function.x.arn, path.module など）、関数呼び出し、演算子、条件式
+評価できない参照は resolver に委ねる（resolver が None を返した場合は "${参照}" の文字列にする）
+"""
+import json
+import os
+import re
+
+TOKEN_PATTERN = re.compile(r'''
+    (?P<ws>[ \t\r]+)
+  | (?P<newline>\n)
+  | (?P<comment>\#[^\n]*|//[^\n]*|/\*.*?\*/)
+  | (?P<heredoc><<-?(?P<heredoc_tag>[A-Za-z_]+)\n)
+  | (?P<number>\d+(\.\d+)?([eE][+-]?\d+)?)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_\-]*)
+  | (?P<string>")
+  | (?P<op>==|!=|<=|>=|&&|\|\||=>|\.\.\.|[{}\[\]()=:,.?<>+\-*/%!])
+''', re.VERBOSE | re.DOTALL)
+
+
+class HclError(Exception):
+    pass
+
+
+class Token:
+    def __init__(self, kind, value, line):
+        self.kind = kind
+        self.value = value
+        self.line = line
+
+    def __repr__(self):
+        return f"Token({self.kind}, {self.value!r}, line {self.line})"
+
+
+def read_string(text, pos, line):
+    """
+    pos（開始の " の直後）から文字列を読み、テンプレートの部品（文字列 / 式のソース）の一覧を返す
+    """
+    parts = []
+    buffer = []
+    while pos < len(text):
+        char = text[pos]
+        if char == '"':
+            if buffer or not parts:
+                parts.append(('str', ''.join(buffer)))
+            return parts, pos + 1, line
+        if char == '\\':
+            escape = text[pos + 1]
+            if escape == 'u':
+                buffer.append(chr(int(text[pos + 2:pos + 6], 16)))
+                pos += 6
+                continue
+            buffer.append({'n': '\n', 't': '\t', 'r': '\r', '"': '"', '\\': '\\'}.get(escape, escape))
+            pos += 2
+            continue
+        if text.startswith('$${', pos) or text.startswith('%%{', pos):
+            buffer.append(text[pos + 1:pos + 3])
+            pos += 3
+            continue
+        if text.startswith('${', pos):
+            depth = 1
+            end = pos + 2
+            while depth:
+                if end >= len(text):
+                    raise HclError(f"line {line}: unterminated template interpolation")
+                if text[end] == '{':
+                    depth += 1
+                elif text[end] == '}':
+                    depth -= 1
+                end += 1
+            if buffer:
+                parts.append(('str', ''.join(buffer)))
+                buffer = []
+            parts.append(('expr', text[pos + 2:end - 1]))
+            pos = end
+            continue
+        if char == '\n':
+            line += 1
+        buffer.append(char)
+        pos += 1
+    raise HclError(f"line {line}: unterminated string")
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    line = 1
+    while pos < len(text):
+        match = TOKEN_PATTERN.match(text, pos)
+        if not match:
+            raise HclError(f"line {line}: unexpected character {text[pos]!r}")
+        kind = match.lastgroup if match.lastgroup != 'heredoc_tag' else 'heredoc'
+        value = match.group(kind)
+        if kind == 'string':
+            parts, pos, line = read_string(text, match.end(), line)
+            tokens.append(Token('string', parts, line))
+            continue
+        if kind == 'heredoc':
+            tag = match.group('heredoc_tag')
+            end = re.compile(rf'^\s*{tag}\s*$', re.MULTILINE).search(text, match.end())
+            if not end:
+                raise HclError(f"line {line}: unterminated heredoc {tag}")
+            body = text[match.end():end.start()]
+            if value.startswith('<<-'):
+                lines = body.split('\n')
+                indent = min((len(l) - len(l.lstrip()) for l in lines if l.strip()), default=0)
+                body = '\n'.join(l[indent:] for l in lines)
+            tokens.append(Token('string', [('str', body)], line))
+            line += text[match.start():end.end()].count('\n')
+            pos = end.end()
+            continue
+        if kind == 'newline':
+            tokens.append(Token('newline', '\n', line))
+            line += 1
+        elif kind == 'comment':
+            line += value.count('\n')
+        elif kind != 'ws':
+            tokens.append(Token(kind, value, line))
+        pos = match.end()
+    tokens.append(Token('eof', None, line))
+    return tokens
+
+
+class Parser:
+    """
+    トークン列を AST（タプル）に変換する
+    ('literal', 値) / ('template', 部品) / ('object', [(キー, 値)]) / ('tuple', [値])
+    ('ref', 名前) / ('call', 関数名, [引数]) / ('binary', 演算子, 左, 右) / ('unary', 演算子, 値)
+    ('conditional', 条件, 真, 偽) / ('index', 対象, キー) / ('attr', 対象, 名前) / ('splat', 対象, [])
+    for 式は未対応
+    """
+
+    BINARY_PRECEDENCE = [
+        ['||'], ['&&'], ['==', '!='], ['<', '>', '<=', '>='], ['+', '-'], ['*', '/', '%']
+    ]
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    # --- トークン操作 ---
+    def peek(self, skip_newlines=True):
+        pos = self.pos
+        while skip_newlines and self.tokens[pos].kind == 'newline':
+            pos += 1
+        return self.tokens[pos]
+
+    def peek_after(self):
+        """
+        次のトークン（改行を除く）の直後のトークン
+        """
+        pos = self.pos
+        while self.tokens[pos].kind == 'newline':
+            pos += 1
+        return self.tokens[pos + 1]
+
+    def next(self, skip_newlines=True):
+        while skip_newlines and self.tokens[self.pos].kind == 'newline':
+            self.pos += 1
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def accept(self, value, skip_newlines=True):
+        token = self.peek(skip_newlines)
+        if token.kind == 'op' and token.value == value:
+            self.next(skip_newlines)
+            return True
+        return False
+
+    def expect(self, value):
+        token = self.next()
+        if token.kind != 'op' or token.value != value:
+            raise HclError(f"line {token.line}: expected {value!r}, got {token.value!r}")
+        return token
+
+    # --- 本体（属性とブロック） ---
+    def parse_body(self, closing=None):
+        items = []
+        while True:
+            token = self.peek()
+            if token.kind == 'eof' or (closing and token.kind == 'op' and token.value == closing):
+                return items
+            name = self.next()
+            if name.kind != 'ident':
+                raise HclError(f"line {name.line}: expected attribute or block name, got {name.value!r}")
+            if self.accept('=', skip_newlines=False):
+                items.append(('attribute', name.value, self.parse_expression()))
+                continue
+            labels = []
+            while self.peek().kind in ('string', 'ident'):
+                label = self.next()
+                labels.append(label.value if label.kind == 'ident' else ''.join(v for _, v in label.value))
+            self.expect('{')
+            body = self.parse_body('}')
+            self.expect('}')
+            items.append(('block', name.value, labels, body))
+
+    # --- 式 ---
+    def parse_expression(self):
+        condition = self.parse_binary(0)
+        if self.accept('?'):
+            when_true = self.parse_expression()
+            self.expect(':')
+            when_false = self.parse_expression()
+            return ('conditional', condition, when_true, when_false)
+        return condition
+
+    def parse_binary(self, level):
+        if level == len(self.BINARY_PRECEDENCE):
+            return self.parse_unary()
+        left = self.parse_binary(level + 1)
+        while True:
+            token = self.peek(skip_newlines=False)
+            if token.kind == 'op' and token.value in self.BINARY_PRECEDENCE[level]:
+                self.next(skip_newlines=False)
+                left = ('binary', token.value, left, self.parse_binary(level + 1))
+            else:
+                return left
+
+    def parse_unary(self):
+        if self.accept('!'):
+            return ('unary', '!', self.parse_unary())
+        if self.accept('-'):
+            return ('unary', '-', self.parse_unary())
+        return self.parse_postfix(self.parse_primary())
+
+    def parse_postfix(self, node):
+        while True:
+            token = self.peek(skip_newlines=False)
+            if token.kind == 'op' and token.value == '.':
+                self.next()
+                name = self.next()
+                if name.kind == 'op' and name.value == '*':
+                    node = ('splat', node, [])
+                elif name.kind == 'number':
+                    node = ('index', node, ('literal', int(name.value)))
+                else:
+                    node = ('attr', node, name.value)
+            elif token.kind == 'op' and token.value == '[':
+                self.next()
+                if self.accept('*'):
+                    self.expect(']')
+                    node = ('splat', node, [])
+                else:
+                    key = self.parse_expression()
+                    self.expect(']')
+                    node = ('index', node, key)
+            else:
+                return node
+
+    def parse_primary(self):
+        token = self.next()
+        if token.kind == 'number':
+            value = float(token.value)
+            return ('literal', int(value) if value.is_integer() and '.' not in token.value else value)
+        if token.kind == 'string':
+            if len(token.value) == 1 and token.value[0][0] == 'str':
+                return ('literal', token.value[0][1])
+            return ('template', [
+                (kind, value if kind == 'str' else Parser(tokenize(value)).parse_expression())
+                for kind, value in token.value
+            ])
+        if token.kind == 'ident':
+            if token.value in ('true', 'false'):
+                return ('literal', token.value == 'true')
+            if token.value == 'null':
+                return ('literal', None)
+            if self.accept('(', skip_newlines=False):
+                args = []
+                while not self.accept(')'):
+                    args.append(self.parse_expression())
+                    if not self.accept(','):
+                        self.accept('...')
+                        self.expect(')')
+                        break
+                return ('call', token.value, args)
+            return ('ref', token.value)
+        if token.kind == 'op' and token.value == '(':
+            node = self.parse_expression()
+            self.expect(')')
+            return node
+        if token.kind == 'op' and token.value == '[':
+            items = []
+            while not self.accept(']'):
+                items.append(self.parse_expression())
+                if not self.accept(','):
+                    self.expect(']')
+                    break
+            return ('tuple', items)
+        if token.kind == 'op' and token.value == '{':
+            entries = []
+            while not self.accept('}'):
+                key_token = self.peek()
+                if key_token.kind == 'ident' and self.peek_after().value in ('=', ':'):
+                    self.next()
+                    key = ('literal', key_token.value)
+                else:
+                    key = self.parse_expression()
+                if not (self.accept('=', skip_newlines=False) or self.accept(':', skip_newlines=False)):
+                    raise HclError(f"line {key_token.line}: expected '=' or ':' after object key")
+                entries.append((key, self.parse_expression()))
+                self.accept(',', skip_newlines=False)
+            return ('object', entries)
+        raise HclError(f"line {token.line}: unexpected token {token.value!r}")
+
+
+def parse(text):
+    parser = Parser(tokenize(text))
+    body = parser.parse_body()
+    return body
+
+
+def parse_file(path):
+    with open(path, encoding='utf-8') as f:
+        return parse(f.read())
+
+
+def reference_path(node):
+    """
+    参照の AST（ref / attr / index / splat）を ['aws_lambda_function', 'x', 'arn'] のようなパスにする
+    """
+    if node[0] == 'ref':
+        return [node[1]]
+    if node[0] == 'attr':
+        base = reference_path(node[1])
+        return base + [node[2]] if base is not None else None
+    if node[0] == 'splat':
+        base = reference_path(node[1])
+        return base + ['*'] if base is not None else None
+    if node[0] == 'index' and node[2][0] == 'literal':
+        base = reference_path(node[1])
+        return base + [str(node[2][1])] if base is not None else None
+    return None
+
+
+def to_template_string(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return '' if value is None else str(value)
+
+
+FUNCTIONS = {
+    'jsonencode': lambda value: value,
+    'tostring': to_template_string,
+    'tonumber': lambda value: float(value) if '.' in str(value) else int(value),
+    'contains': lambda values, value: value in values,
+    'length': len,
+    'lower': lambda value: value.lower(),
+    'upper': lambda value: value.upper(),
+    'merge': lambda *maps: {k: v for m in maps for k, v in m.items()},
+    'concat': lambda *lists: [v for l in lists for v in l],
+    'join': lambda separator, values: separator.join(to_template_string(v) for v in values),
+    'format': lambda fmt, *args: fmt.replace('%s', '{}').replace('%d', '{}').format(*args),
+    'min': min,
+    'max': max,
+}
+
+BINARY_OPERATORS = {
+    '||': lambda a, b: a or b,
+    '&&': lambda a, b: a and b,
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '>': lambda a, b: a > b,
+    '<=': lambda a, b: a <= b,
+    '>=': lambda a, b: a >= b,
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+    '%': lambda a, b: a % b,
+}
+
+
+def evaluate(node, resolver):
+    """
+    AST を Python の値に評価する
+    resolver(パス) は参照の値を返す（未知の参照は None）
+    """
+    kind = node[0]
+    if kind == 'literal':
+        return node[1]
+    if kind == 'template':
+        return ''.join(
+            value if part == 'str' else to_template_string(evaluate(value, resolver))
+            for part, value in node[1]
+        )
+    if kind == 'object':
+        result = {}
+        for key, value in node[1]:
+            # 同じキーが重複した場合は後の値を使う
+            result[to_template_string(evaluate(key, resolver))] = evaluate(value, resolver)
+        return result
+    if kind == 'tuple':
+        return [evaluate(item, resolver) for item in node[1]]
+    if kind in ('ref', 'attr', 'splat') or (kind == 'index' and node[2][0] == 'literal' and reference_path(node) is not None):
+        path = reference_path(node)
+        if path is not None:
+            value = resolver(path)
+            if value is not None:
+                return value
+            return '${' + '.'.join(path) + '}'
+    if kind == 'index':
+        return evaluate(node[1], resolver)[evaluate(node[2], resolver)]
+    if kind == 'attr':
+        return evaluate(node[1], resolver)[node[2]]
+    if kind == 'call':
+        if node[1] not in FUNCTIONS:
+            raise HclError(f"function {node[1]}() is not supported by the simulator")
+        return FUNCTIONS[node[1]](*[evaluate(arg, resolver) for arg in node[2]])
+    if kind == 'binary':
+        return BINARY_OPERATORS[node[1]](evaluate(node[2], resolver), evaluate(node[3], resolver))
+    if kind == 'unary':
+        value = evaluate(node[2], resolver)
+        return (not value) if node[1] == '!' else -value
+    if kind == 'conditional':
+        return evaluate(node[2] if evaluate(node[1], resolver) else node[3], resolver)
+    raise HclError(f"cannot evaluate {kind} expression")
+
+
+def find_blocks(body, block_type, *labels):
+    return [
+        item for item in body
+        if item[0] == 'block' and item[1] == block_type and list(item[2][:len(labels)]) == list(labels)
+    ]
+
+
+def attribute(body, name):
+    for item in body:
+        if item[0] == 'attribute' and item[1] == name:
+            return item[2]
+    return None
+
+
+class TerraformModule:
+    """
+    モジュールのディレクトリ内の *.tf と terraform.tfvars を読み込み、変数と参照を解決する
+    """
+
+    def __init__(self, root, tfvars=None, overrides=None):
+        self.root = root
+        self.bodies = {}
+        for name in sorted(os.listdir(root)):
+            if name.endswith('.tf'):
+                self.bodies[name] = parse_file(os.path.join(root, name))
+        self.variables = self.load_variables(tfvars, overrides or {})
+
+    def load_variables(self, tfvars, overrides):
+        values = {}
+        for body in self.bodies.values():
+            for _, _, labels, block_body in find_blocks(body, 'variable'):
+                default = attribute(block_body, 'default')
+                values[labels[0]] = evaluate(default, lambda path: None) if default is not None else None
+        tfvars = tfvars if tfvars is not None else os.path.join(self.root, 'terraform.tfvars')
+        if tfvars and os.path.exists(tfvars):
+            for item in parse_file(tfvars):
+                if item[0] == 'attribute':
+                    values[item[1]] = evaluate(item[2], lambda path: None)
+        values.update(overrides)
+        return values
+
+    def resource(self, resource_type, name):
+        for body in self.bodies.values():
+            blocks = find_blocks(body, 'resource', resource_type, name)
+            if blocks:
+                return blocks[0][3]
+        return None
+
+    def resolve(self, path):
+        if path[0] == 'var' and len(path) > 1:
+            return self.variables.get(path[1])
+        if path[:2] == ['path', 'module'] or path[:2] == ['path', 'root']:
+            return self.root
+        if path[0] == 'aws_lambda_function' and len(path) > 2 and path[2] == 'arn':
+            return lambda_arn(path[1])
+        if path[0] == 'aws_lambda_function' and len(path) > 2 and path[2] == 'function_name':
+            return path[1]
+        if len(path) == 3:
+            # 他のリソースの属性（name など）は、定義に書かれていればその値を使う
+            body = self.resource(path[0], path[1])
+            value = attribute(body, path[2]) if body is not None else None
+            if value is not None:
+                return self.evaluate(value)
+        return None
+
+    def evaluate(self, node):
+        return evaluate(node, self.resolve)
+
+    def state_machine_definition(self, name='aurora_scaling'):
+        body = self.resource('aws_sfn_state_machine', name)
+        if body is None:
+            raise HclError(f"aws_sfn_state_machine.{name} not found in {self.root}")
+        return self.evaluate(attribute(body, 'definition'))
+
+    def lambda_environment(self, name):
+        """
+        aws_lambda_function の environment.variables（評価できない参照は "${参照}" のまま）
+        """
+        body = self.resource('aws_lambda_function', name)
+        if body is None:
+            return {}
+        for _, _, _, environment in find_blocks(body, 'environment'):
+            variables = attribute(environment, 'variables')
+            if variables is not None:
+                return {key: to_template_string(value) for key, value in self.evaluate(variables).items()}
+        return {}
+
+    def lambda_timeout(self, name, default=3):
+        """
+        aws_lambda_function の timeout（秒、未指定の場合は Lambda の既定の3秒）
+        """
+        body = self.resource('aws_lambda_function', name)
+        timeout = attribute(body, 'timeout') if body is not None else None
+        return int(self.evaluate(timeout)) if timeout is not None else default
+
+    def lambda_source_dir(self, name):
+        """
+        aws_lambda_function が参照している data.archive_file の source_dir
+        """
+        for body in self.bodies.values():
+            blocks = find_blocks(body, 'data', 'archive_file', name)
+            if blocks:
+                source_dir = attribute(blocks[0][3], 'source_dir')
+                if source_dir is not None:
+                    return os.path.normpath(self.evaluate(source_dir))
+        return os.path.join(self.root, 'lambda_functions', name)
+
+
+LAMBDA_ARN_PREFIX = 'arn:aws:lambda:local:000000000000:function:'
+
+
+def lambda_arn(name):
+    return f"{LAMBDA_ARN_PREFIX}{name}"
+
+
+def lambda_name_from_arn(arn):
+    if arn.startswith(LAMBDA_ARN_PREFIX):
+        return arn[len(LAMBDA_ARN_PREFIX):]
+    return arn.split(':')[-1]
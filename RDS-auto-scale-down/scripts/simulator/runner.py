@@ -0,0 +1,479 @@
+"""
+シミュレーションの実行: Terraform の定義からステートマシンを組み立て、実際の lambda_handler を
+仮想時計と代替のAWS API（fake_aws）の上で実行し、所要時間とAPI呼び出しのレポートを作る
+"""
+import copy
+import importlib.util
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+
+from simulator.asl import ExecutionHistory, Interpreter, Recorder, Scheduler, SimulationError, StatesError, isoformat, parse_timestamp, validate_definition
+from simulator.fake_aws import (
+    FakeApplicationAutoScaling, FakeCloudWatch, FakeDynamoDB, FakeEvents, FakeRds, FakeSns, FakeSsm, FakeStepFunctions, RecordingClient, build_cluster_config
+)
+from simulator.hcl import TerraformModule, lambda_name_from_arn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LAYER_DIR = os.path.join(ROOT, 'lambda_functions', 'common_layer', 'python')
+
+# Lambdaレイヤー（/opt/python）の代わりに共通モジュールを読み込む
+if LAYER_DIR not in sys.path:
+    sys.path.insert(0, LAYER_DIR)
+
+from scaling_common import api_calls, aws_clients, clock, emf, orderability, resize_history  # noqa: E402
+from simulator.fake_aws import operation_name  # noqa: E402
+
+DEFAULT_LATENCY = {
+    'resizeSeconds': 600,           # インスタンスタイプの変更（modifying の時間）
+    'resizeSecondsByClass': {},     # 変更先のインスタンスタイプごとの時間
+    'rebootSeconds': 0,             # 変更・フェイルオーバー後の rebooting の時間
+    'failoverSeconds': 45,          # フェイルオーバー（failing-over の時間）
+    'createSeconds': 900,           # インスタンスの作成（creating の時間、置き換え）
+    'deleteSeconds': 300,           # インスタンスの削除（deleting の時間、置き換え）
+    'endpointModifySeconds': 30,    # カスタムエンドポイントの変更（modifying の時間、ドレイン）
+    'drainSeconds': 120,            # エンドポイントから除外した Reader の接続数が 0 になるまで
+    'blueGreenProvisionSeconds': 1800,  # Blue/Green デプロイのグリーン環境の作成（PROVISIONING の時間）
+    'switchoverSeconds': 60,        # Blue/Green デプロイのスイッチオーバー（SWITCHOVER_IN_PROGRESS の時間）
+    'jitter': 0.0,                  # 上記の時間のばらつき（割合、例: 0.1 = ±10%）
+    'eventDelaySeconds': 5,         # RDSイベントが EventBridge 経由で Lambda に届くまで
+    'lambdaInvokeSeconds': 0.1,     # Lambda の呼び出し1回あたりのオーバーヘッド
+    'lambdaColdStartSeconds': 1.0,  # Lambda 関数ごとの初回呼び出しの追加時間
+    'apiCallSeconds': 0.05          # AWS API 呼び出し1回あたりの時間
+}
+
+DEFAULT_START_TIME = '2025-01-18T15:00:00Z'
+
+# シミュレーションの上限（仮想時間）: 無限ループを検出するため
+DEFAULT_MAX_SECONDS = 48 * 60 * 60
+
+EVENT_HANDLER = 'rds_event_handler'
+SCHEDULER_FUNCTION = 'schedule_scaling'
+EVENT_HANDLER_STATE = f"({EVENT_HANDLER})"
+
+
+class LambdaContext:
+    """
+    Lambda の context（残り時間は time_source の仮想時刻から計算する。省略時は常にタイムアウトの秒数）
+    """
+
+    def __init__(self, function_name, timeout_seconds=60, time_source=None):
+        self.function_name = function_name
+        self.memory_limit_in_mb = 128
+        self.aws_request_id = 'simulation'
+        self.timeout_seconds = timeout_seconds
+        self.time_source = time_source
+        self.started_at = time_source() if time_source else None
+
+    def get_remaining_time_in_millis(self):
+        elapsed = self.time_source() - self.started_at if self.time_source else 0
+        return max(0, int((self.timeout_seconds - elapsed) * 1000))
+
+
+_loaded_modules = {}
+
+
+def load_lambda(source_dir, name):
+    """
+    Lambda関数の index.py を読み込む（プロセス内で1回のみ = ウォームスタートのコンテナ相当）
+    """
+    if name not in _loaded_modules:
+        spec = importlib.util.spec_from_file_location(f"simulated_{name}", os.path.join(source_dir, 'index.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded_modules[name] = module
+    return _loaded_modules[name]
+
+
+@contextmanager
+def lambda_environment(variables):
+    saved = {key: os.environ.get(key) for key in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def merge_latency(scenario):
+    latency = dict(DEFAULT_LATENCY)
+    latency.update(scenario.get('latency', {}))
+    return latency
+
+
+class Simulation:
+    """
+    1回分のシミュレーション（ステートマシンの実行1回）
+    scenario: クラスター構成・所要時間・障害の注入（scripts/simulator/scenarios/*.json を参照）
+    record_history: 実行履歴（GetExecutionHistory 形式のイベント）を記録する（execution_history() で取り出す）
+    """
+
+    def __init__(self, scenario, root=ROOT, tfvars=None, variables=None, seed=None, record_history=False):
+        self.scenario = copy.deepcopy(scenario)
+        self.terraform = TerraformModule(root, tfvars, variables)
+        self.definition = self.terraform.state_machine_definition(self.scenario.get('stateMachine', 'aurora_scaling'))
+        validate_definition(self.definition)
+
+        self.seed = self.scenario.get('seed', 0) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.latency = merge_latency(self.scenario)
+        self.scheduler = Scheduler(parse_timestamp(self.scenario.get('startTime', DEFAULT_START_TIME)))
+        self.recorder = Recorder()
+        self.history = ExecutionHistory(self.scheduler) if record_history else None
+        self.execution_name = f"simulation-{self.seed}"
+        self.status = None
+        self.invoked = set()
+        self.events = []
+        self.dropped_events = []
+        self.planned_seconds = None
+        # Lambda 内の待機（api_calls のバックオフ・レート制限）の合計（呼び出しごとにリセット）
+        self.lambda_sleep_seconds = 0.0
+        # Lambda 関数が出力した EMF のレコード（scripts/check_emf_metrics.py で検証する）
+        self.emf_records = []
+
+        cluster_config = build_cluster_config(self.scenario)
+        self.rds = FakeRds(self.scheduler, cluster_config, self.latency, self.rng, self.emit_event, time_source=self.virtual_time)
+        # Reader のドレインに使うカスタムエンドポイント（aurora.tf の aws_rds_cluster_endpoint.reader_drain）
+        self.rds.add_cluster_endpoint(self.terraform.lambda_environment('drain_reader')['DRAIN_ENDPOINT_IDENTIFIER'])
+        self.autoscaling = FakeApplicationAutoScaling(cluster_config['identifier'], self.scenario.get('autoScaling'))
+        # 実行中のクラスター構成の変化（AutoScaling による Reader の追加・削除）
+        self.skipped_cluster_changes = []
+        for change in self.scenario.get('clusterChanges', []):
+            self.scheduler.call_later(change['atSeconds'], self.apply_cluster_change, change)
+        self.ssm = FakeSsm()
+        self.sns = FakeSns()
+        # 所要時間の履歴のテーブル（lambda.tf の aws_dynamodb_table.duration_history）はパーティションキー + ソートキー
+        duration_table = self.terraform.lambda_environment('modify_instance').get('DURATION_HISTORY_TABLE')
+        self.dynamodb = FakeDynamoDB({duration_table: ['historyKey', 'sampleKey']} if duration_table else None, page_size=25)
+        self.sfn = FakeStepFunctions(self.scheduler.tokens, StatesError)
+        self.events_client = FakeEvents()
+        # targetClass: "auto" の推奨に使うメトリクス（シナリオの metrics 設定から合成する）
+        self.cloudwatch = FakeCloudWatch(
+            self.scheduler, self.scenario.get('metrics'),
+            {spec['id']: spec.get('role', '') for spec in cluster_config['instances']}, self.seed,
+            connection_factor=self.rds.connection_factor
+        )
+
+        # 過去の所要時間の履歴（resize_history の要約の項目として所要時間の履歴のテーブルに入れる）
+        self.duration_table = duration_table
+        for transition, durations in (self.scenario.get('resizeHistory') or {}).items():
+            if duration_table:
+                self.dynamodb.put_item(TableName=duration_table, Item={
+                    'historyKey': {'S': resize_history.SUMMARY_HISTORY_KEY},
+                    'sampleKey': {'S': transition},
+                    'samples': {'L': [{'N': str(seconds)} for seconds in durations]}
+                })
+
+        faults = copy.deepcopy(self.scenario.get('faults', []))
+        fakes = {
+            'rds': self.rds,
+            'ssm': self.ssm,
+            'sns': self.sns,
+            'dynamodb': self.dynamodb,
+            'stepfunctions': self.sfn,
+            'events': self.events_client,
+            'cloudwatch': self.cloudwatch,
+            'application-autoscaling': self.autoscaling
+        }
+        self.clients = {
+            service: RecordingClient(service, fake, self.recorder, faults, self.rng)
+            for service, fake in fakes.items()
+        }
+
+    def apply_cluster_change(self, change):
+        """
+        clusterChanges の Reader の追加・削除を行う
+        Application Auto Scaling が一時停止中の場合は行わない（ignoresSuspension: 一時停止の前に始まっていたスケールアウトや手動の変更）
+        """
+        if 'add' in change:
+            if self.autoscaling.suspended('DynamicScalingOutSuspended') and not change.get('ignoresSuspension'):
+                self.skipped_cluster_changes.append(change)
+            else:
+                self.rds.add_instance(change['add'])
+        if 'remove' in change:
+            if self.autoscaling.suspended('DynamicScalingInSuspended') and not change.get('ignoresSuspension'):
+                self.skipped_cluster_changes.append(change)
+            else:
+                self.rds.remove_instance(change['remove'])
+
+    # --- Lambda の呼び出し ---
+    def invoke_lambda(self, function_arn, payload):
+        """
+        Lambda関数を呼び出す（戻り値: (応答 または StatesError, 仮想時間での処理時間)）
+        """
+        name = lambda_name_from_arn(function_arn)
+        calls_before = self.total_api_calls()
+        seconds = self.latency['lambdaInvokeSeconds']
+        if name not in self.invoked:
+            self.invoked.add(name)
+            seconds += self.latency['lambdaColdStartSeconds']
+
+        module = load_lambda(self.terraform.lambda_source_dir(name), name)
+        self.lambda_sleep_seconds = 0.0
+        try:
+            with lambda_environment(self.terraform.lambda_environment(name)):
+                context = LambdaContext(name, self.terraform.lambda_timeout(name), self.virtual_time)
+                response = module.lambda_handler(copy.deepcopy(payload), context)
+            response = json.loads(json.dumps(response, default=str))
+        except Exception as e:
+            response = StatesError(type(e).__name__, json.dumps({'errorMessage': str(e), 'errorType': type(e).__name__}))
+        finally:
+            self.record_retries(api_calls.api_metrics())
+
+        seconds += (self.total_api_calls() - calls_before) * self.latency['apiCallSeconds']
+        seconds += self.lambda_sleep_seconds
+        self.lambda_sleep_seconds = 0.0
+        return response, seconds
+
+    def record_retries(self, metrics):
+        """
+        Lambda の apiMetrics（api_calls が行ったリトライ）をステートごとの記録に加える
+        """
+        for key, entry in metrics['operations'].items():
+            service, _, method_name = key.partition(':')
+            for _ in range(entry['retries']):
+                self.recorder.api_call(service, f"{operation_name(method_name)}(retried)")
+
+    def virtual_time(self):
+        return self.scheduler.now + self.lambda_sleep_seconds
+
+    def virtual_sleep(self, seconds):
+        self.lambda_sleep_seconds += seconds
+
+    def resize_history_summary(self):
+        """
+        所要時間の履歴の要約（resize_history.load_resize_history と同じ形式、件数の上限なし）
+        """
+        return {
+            item['sampleKey']['S']: [int(value['N']) for value in item['samples']['L']]
+            for item in self.dynamodb.tables.get(self.duration_table, {}).values()
+            if item['historyKey']['S'] == resize_history.SUMMARY_HISTORY_KEY
+        }
+
+    @contextmanager
+    def fake_aws(self):
+        """
+        代替クライアントと仮想時計を共通モジュールに設定する（終了時に元に戻す）
+        """
+        for service, client in self.clients.items():
+            aws_clients.set_client(service, client)
+        clock.set_time_source(self.virtual_time, self.virtual_sleep)
+        emf.set_sink(lambda line: self.emf_records.append(json.loads(line)))
+        api_calls.reset()
+        # リトライのジッターもシードで再現できるようにする
+        random.seed(self.seed)
+        # コンテナ再利用時のキャッシュ（所要時間の履歴・注文可能なインスタンスタイプ）はシミュレーションごとに破棄する
+        resize_history._cache['history'] = None
+        orderability._cache['index'] = None
+        try:
+            yield
+        finally:
+            clock.reset_time_source()
+            emf.reset_sink()
+            aws_clients.reset_clients()
+            api_calls.reset()
+
+    def total_api_calls(self):
+        return sum(
+            count
+            for entry in self.recorder.states.values()
+            for operation, count in entry['apiCalls'].items()
+            if not operation.endswith('(retried)')
+        )
+
+    # --- RDSイベント（EventBridge -> rds_event_handler） ---
+    def emit_event(self, event):
+        event = dict(event, time=isoformat(self.scheduler.now))
+        event['detail'] = dict(event['detail'], Date=isoformat(self.scheduler.now))
+        dropped = self.scenario.get('droppedEvents', {})
+        if event['detail']['EventID'] in dropped.get('eventIds', []) or self.rng.random() < dropped.get('probability', 0):
+            self.dropped_events.append(event['detail'])
+            return
+        self.scheduler.call_later(self.latency['eventDelaySeconds'], self.deliver_event, event)
+
+    def deliver_event(self, event):
+        self.events.append(event['detail'])
+        record = self.recorder.entry(EVENT_HANDLER_STATE)
+        record['type'] = 'EventBridge'
+        record['entries'] += 1
+        previous = self.recorder.current
+        self.recorder.current = EVENT_HANDLER_STATE
+        try:
+            response, seconds = self.invoke_lambda(f"function:{EVENT_HANDLER}", event)
+        finally:
+            self.recorder.current = previous
+        record['workSeconds'] += seconds
+
+    # --- 実行 ---
+    def invoke_scheduler(self, plan_only=False):
+        """
+        schedule_scaling Lambda を呼び出す（plan_only の場合はプランモード）
+        """
+        event = {
+            'clusterIdentifier': self.rds.cluster['DBClusterIdentifier'],
+            'targetClass': self.scenario.get('targetClass')
+        }
+        # schedulerEvent: schedule_scaling のイベントに追加する項目（例: オンデマンドのロールバック rollback: true）
+        event.update(self.scenario.get('schedulerEvent', {}))
+        if plan_only:
+            event['plan'] = True
+        record = self.recorder.entry(f"({SCHEDULER_FUNCTION})")
+        record['type'] = 'Lambda'
+        record['entries'] += 1
+        self.recorder.current = f"({SCHEDULER_FUNCTION})"
+        try:
+            response, _ = self.invoke_lambda(f"function:{SCHEDULER_FUNCTION}", event)
+        finally:
+            self.recorder.current = None
+        if isinstance(response, StatesError):
+            raise SimulationError(f"{SCHEDULER_FUNCTION} failed: {response.cause}")
+        return json.loads(response['body'])
+
+    def plan(self):
+        """
+        schedule_scaling のプランモードの結果を返す（ステートマシンは実行しない）
+        """
+        with self.fake_aws():
+            return self.invoke_scheduler(plan_only=True)['plan']
+
+    def execution_input(self):
+        """
+        schedule_scaling Lambda を呼び出して Step Functions の入力を作る（StartExecution の入力を取り出す）
+        """
+        started = len(self.sfn.executions)
+        body = self.invoke_scheduler()
+        self.planned_seconds = body.get('plan', {}).get('estimatedDurationSeconds')
+        if len(self.sfn.executions) == started:
+            raise SimulationError(f"{SCHEDULER_FUNCTION} did not start an execution: {body.get('message')}")
+        execution_input = self.sfn.executions[-1]['input']
+        execution_input.update(self.scenario.get('input', {}))
+        return execution_input
+
+    def run(self, max_seconds=DEFAULT_MAX_SECONDS):
+        wall_started = time.perf_counter()
+        started_at = self.scheduler.now
+        status, error, output = 'SUCCEEDED', None, None
+        with self.fake_aws():
+            try:
+                execution_input = self.execution_input()
+                interpreter = Interpreter(
+                    self.definition, self.scheduler, self.invoke_lambda, self.recorder,
+                    transition_seconds=self.latency.get('transitionSeconds', 0.0), history=self.history
+                )
+                execution = interpreter.start(execution_input, execution_name=self.execution_name)
+                self.scheduler.run(execution, max_seconds=max_seconds)
+                if execution.error is not None:
+                    raise execution.error
+                output = execution.result
+            except StatesError as e:
+                status, error = 'FAILED', {'error': e.error, 'cause': e.cause}
+            except SimulationError as e:
+                status, error = 'ERROR', {'error': 'SimulationError', 'cause': str(e)}
+
+        self.status = status
+        return self.report(status, error, output, self.scheduler.now - started_at, time.perf_counter() - wall_started)
+
+    def execution_history(self):
+        """
+        記録した実行履歴（scripts/analyze_executions.py が読み込める形式: DescribeExecution の項目 + events）
+        """
+        events = self.history.events if self.history else []
+        return {
+            'executionArn': f"arn:aws:states:local:000000000000:execution:simulation:{self.execution_name}",
+            'name': self.execution_name,
+            'status': self.status,
+            'startDate': events[0]['timestamp'] if events else None,
+            'stopDate': events[-1]['timestamp'] if events else None,
+            'events': events
+        }
+
+    def report(self, status, error, output, duration_seconds, wall_seconds):
+        states = []
+        calls_by_operation = {}
+        for name, entry in self.recorder.states.items():
+            calls = {op: n for op, n in entry['apiCalls'].items() if not op.endswith('(retried)')}
+            for operation, count in calls.items():
+                calls_by_operation[operation] = calls_by_operation.get(operation, 0) + count
+            states.append({
+                'state': name,
+                'type': entry['type'],
+                'entries': entry['entries'],
+                'seconds': round(entry['seconds'], 1),
+                'waitSeconds': round(entry['waitSeconds'], 1),
+                'workSeconds': round(entry['workSeconds'], 1),
+                'apiCalls': calls,
+                'retriedApiCalls': sum(n for op, n in entry['apiCalls'].items() if op.endswith('(retried)'))
+            })
+
+        execution_states = [s for s in states if not s['state'].startswith('(')]
+        wait_seconds = sum(s['waitSeconds'] for s in execution_states)
+        work_seconds = sum(s['workSeconds'] for s in execution_states)
+
+        return {
+            'scenario': self.scenario.get('name', 'unnamed'),
+            'seed': self.seed,
+            'status': status,
+            'error': error,
+            'durationSeconds': round(duration_seconds, 1),
+            'plannedDurationSeconds': self.planned_seconds,
+            'waitSeconds': round(wait_seconds, 1),
+            'workSeconds': round(work_seconds, 1),
+            'otherSeconds': round(max(0.0, duration_seconds - wait_seconds - work_seconds), 1),
+            'wallSeconds': round(wall_seconds, 3),
+            'stateTransitions': self.recorder.transitions,
+            'apiCallCount': sum(calls_by_operation.values()),
+            'apiCalls': dict(sorted(calls_by_operation.items())),
+            'states': states,
+            'rdsEvents': {'delivered': len(self.events), 'dropped': len(self.dropped_events)},
+            'resizes': self.rds.resize_log,
+            'replacements': {'created': self.rds.created_instances, 'deleted': self.rds.deleted_instances},
+            'readerEndpoints': {
+                identifier: {'excludedMembers': endpoint['ExcludedMembers'], 'status': endpoint['Status']}
+                for identifier, endpoint in ((i, self.rds.cluster_endpoint(i)) for i in list(self.rds.cluster_endpoints))
+            },
+            'drainedInstances': sorted(self.rds.exclusions),
+            'blueGreen': {
+                'deployments': {
+                    d['BlueGreenDeploymentName']: d['Status'] for d in self.rds.blue_green_deployments.values()
+                },
+                'switchovers': self.rds.switchover_log,
+                'remainingClusters': sorted(
+                    identifier for identifier, other in self.rds.other_clusters.items() if other['cluster']['Status'] != 'deleting'
+                ),
+                'deletedClusters': self.rds.deleted_clusters
+            },
+            'finalInstances': {
+                instance_id: {
+                    'class': instance['DBInstanceClass'],
+                    'status': instance['DBInstanceStatus'],
+                    'writer': instance_id == self.rds.writer_instance_id
+                }
+                for instance_id, instance in self.rds.instances.items()
+            },
+            'autoScaling': {
+                'suspendedState': self.autoscaling.targets.get(self.autoscaling.resource_id, {}).get('SuspendedState'),
+                'changes': len(self.autoscaling.changes),
+                'skippedClusterChanges': len(self.skipped_cluster_changes)
+            },
+            'notifications': len(self.sns.messages),
+            'output': output
+        }
+
+
+def quiet_lambda_logs(verbose):
+    """
+    Lambda関数は import 時にルートロガーを INFO にするため、ログの出力は logging.disable で抑止する
+    """
+    if verbose:
+        logging.basicConfig(format='%(levelname)s %(message)s')
+        logging.disable(logging.NOTSET)
+    else:
+        logging.disable(logging.CRITICAL)
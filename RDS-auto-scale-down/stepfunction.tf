@@ -5,9 +5,47 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
 
   definition = jsonencode({
     Comment = "Aurora PostgreSQL Instance Scaling Workflow"
-    StartAt = "ValidateInput"
+    StartAt = "SetInputDefaults"
     
     States = {
+      # 省略可能な入力のデフォルト値（入力で指定された値が優先される）
+      SetInputDefaults = {
+        Type = "Pass"
+        Result = {
+          completionMode    = var.completion_mode
+          rollbackOnFailure = var.rollback_on_failure
+          readerStrategy    = var.reader_strategy
+          readerDrain       = var.reader_drain_enabled
+          scalingStrategy   = var.scaling_strategy
+          mode              = "scale"
+          direction         = "down"
+        }
+        ResultPath = "$.defaults"
+        Next       = "ApplyInputDefaults"
+      },
+      
+      ApplyInputDefaults = {
+        Type = "Pass"
+        Parameters = {
+          "merged.$" = "States.JsonMerge($.defaults, $, false)"
+        }
+        OutputPath = "$.merged"
+        Next       = "ChooseExecutionMode"
+      },
+      
+      # mode: "rollback" の場合は、スケーリングせずに最後に保存したスナップショットに戻す（オンデマンドのロールバック）
+      ChooseExecutionMode = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable     = "$.mode"
+            StringEquals = "rollback"
+            Next         = "PrepareOnDemandRollback"
+          }
+        ]
+        Default = "ValidateInput"
+      },
+      
       ValidateInput = {
         Type = "Pass"
         Parameters = {
@@ -23,192 +61,434 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
           "oldWriterRetryCount"           = 0
           "autoScalingReaderRetryCount"  = 0
           "overallRetryCount"            = 0
+          "reconcileCount"               = 0
+          "completionMode.$"             = "$.completionMode"
+          "rollbackOnFailure.$"          = "$.rollbackOnFailure"
+          "readerStrategy.$"             = "$.readerStrategy"
+          "readerDrain.$"                = "$.readerDrain"
+          "scalingStrategy.$"            = "$.scalingStrategy"
+          "direction.$"                  = "$.direction"
+          "phase" = {
+            "name"        = "assess-progress"
+            "startedAt.$" = "$$.Execution.StartTime"
+          }
         }
-        Next = "ScaleDedicatedReader"
+        Next = "SuspendAutoScaling"
       },
       
-      # 1. プライマリリーダーインスタンス（Dedicated Reader）をスケールダウン
-      ScaleDedicatedReader = {
+      # 実行中は Reader の Application Auto Scaling（ターゲット追跡ポリシー・スケジュールされたアクション）を一時停止する
+      # （変更前のタイプの Reader が追加されると最終確認が完了しないため）。終了時（失敗時を含む）に元の状態に戻す
+      # 一時停止できなかった場合も実行は継続する（追加された Reader は最終確認の前の差分確認で変更する）
+      SuspendAutoScaling = {
         Type     = "Task"
         Resource = "arn:aws:states:::lambda:invoke"
         Parameters = {
-          FunctionName = aws_lambda_function.modify_instance.arn
+          FunctionName = aws_lambda_function.manage_autoscaling.arn
           Payload = {
-            "instanceId.$"  = "$.dedicatedReaderInstanceId"
-            "targetClass.$" = "$.targetClass"
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "action"              = "suspend"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase"               = "autoscaling-suspend"
           }
         }
-        ResultPath = "$.dedicatedReaderResult"
+        ResultSelector = {
+          "registered.$"             = "$.Payload.registered"
+          "suspended.$"              = "$.Payload.suspended"
+          "previousSuspendedState.$" = "$.Payload.previousSuspendedState"
+        }
+        ResultPath = "$.autoScaling"
         Catch = [
           {
             ErrorEquals = ["States.ALL"]
-            ResultPath = "$.error"
-            Next = "CheckDedicatedReaderStatus"
+            ResultPath  = "$.autoScalingError"
+            Next        = "AutoScalingNotSuspended"
           }
         ]
-        Next = "WaitForDedicatedReader"
+        Next = "RecordRollbackSnapshot"
       },
       
-      WaitForDedicatedReader = {
-        Type    = "Wait"
-        Seconds = 60
-        Next    = "CheckDedicatedReaderStatus"
+      AutoScalingNotSuspended = {
+        Type = "Pass"
+        Result = {
+          registered             = false
+          suspended              = false
+          previousSuspendedState = {}
+        }
+        ResultPath = "$.autoScaling"
+        Next       = "RecordRollbackSnapshot"
       },
       
-      CheckDedicatedReaderStatus = {
+      # 変更要求の前に、全インスタンスのタイプと Writer を保存する（失敗時・オンデマンドのロールバックで使用）
+      # 保存できなかった場合もスケーリングは続ける（この実行の失敗時は、保存したスナップショットがないためロールバックしない）
+      RecordRollbackSnapshot = {
         Type     = "Task"
         Resource = "arn:aws:states:::lambda:invoke"
         Parameters = {
-          FunctionName = aws_lambda_function.check_instance_status.arn
+          FunctionName = aws_lambda_function.rollback_cluster.arn
           Payload = {
-            "instanceIds.$" = "States.Array($.dedicatedReaderInstanceId)"
-            "targetClass.$" = "$.targetClass"
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "action"              = "snapshot"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase"               = "rollback-snapshot"
           }
         }
-        ResultPath = "$.statusCheckResult"
-        Next       = "EvaluateDedicatedReaderStatus"
+        ResultSelector = {
+          "writerInstanceId.$" = "$.Payload.writerInstanceId"
+          "instanceCount.$"    = "$.Payload.instanceCount"
+          "preserved.$"        = "$.Payload.preserved"
+        }
+        ResultPath = "$.rollbackSnapshot"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.rollbackSnapshotError"
+            Next        = "AssessScalingProgress"
+          }
+        ]
+        Next = "AssessScalingProgress"
       },
       
-      EvaluateDedicatedReaderStatus = {
+      # 完了済みのフェーズを判定する（全体リトライ時は最終確認の判定を使う）
+      # 変更先のタイプで available のインスタンスのフェーズは、変更要求・待機なしでスキップする
+      # Writer / Dedicated Reader は入力のIDで判定する（クラスター構成から分類し直すとフェイルオーバー後に入れ替わるため）
+      AssessScalingProgress = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.get_cluster_instances.arn
+          Payload = {
+            "clusterIdentifier.$"            = "$.clusterIdentifier"
+            "targetClass.$"                  = "$.targetClass"
+            "writerInstanceId.$"             = "$.writerInstanceId"
+            "dedicatedReaderInstanceId.$"    = "$.dedicatedReaderInstanceId"
+            "autoScalingReaderInstanceIds.$" = "$.autoScalingReaderInstanceIds"
+            "direction.$"                    = "$.direction"
+            "executionName.$"                = "$.executionName"
+            "startTime.$"                    = "$.startTime"
+            "phase.$"                        = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "dedicatedReaderComplete.$"             = "$.Payload.progress.dedicatedReaderComplete"
+          "failoverComplete.$"                    = "$.Payload.progress.failoverComplete"
+          "oldWriterComplete.$"                   = "$.Payload.progress.oldWriterComplete"
+          "autoScalingReadersComplete.$"          = "$.Payload.progress.autoScalingReadersComplete"
+          "pendingAutoScalingReaderInstanceIds.$" = "$.Payload.progress.pendingAutoScalingReaderInstanceIds"
+          "resumeFrom.$"                          = "$.Payload.progress.resumeFrom"
+        }
+        ResultPath = "$.progress"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "ChooseRollbackOnFailure"
+          }
+        ]
+        Next       = "ChooseScalingStrategy"
+      },
+      
+      # scalingStrategy: "blue-green" の場合は、インスタンスごとの変更とフェイルオーバーの代わりに
+      # Blue/Green デプロイで変更先のタイプのクラスター（グリーン環境）を作成し、スイッチオーバーする
+      # 全インスタンスが変更済みの場合は、グリーン環境を作成せずに最終確認に進む
+      ChooseScalingStrategy = {
         Type    = "Choice"
         Choices = [
           {
-            Variable      = "$.statusCheckResult.Payload.allAvailable"
-            BooleanEquals = true
-            Next          = "FailoverToDedicatedReader"
+            And = [
+              {
+                Variable     = "$.scalingStrategy"
+                StringEquals = "blue-green"
+              },
+              {
+                Not = {
+                  Variable     = "$.progress.resumeFrom"
+                  StringEquals = "complete"
+                }
+              }
+            ]
+            Next = "BeginBlueGreenProvisionPhase"
+          }
+        ]
+        Default = "ResumeFromFirstIncompleteStep"
+      },
+      
+      # 最初の未完了のフェーズから再開する（各フェーズの完了後もここに戻り、次のフェーズを選ぶ）
+      # 全体リトライ時は、最終確認で完了していなかったインスタンスのフェーズのみ再実行する
+      # direction: "up"（スケールアップ）の場合は、AutoScaling Reader をフェイルオーバーの前に変更する
+      # （Reader のキャパシティを先に確保し、拡大した Dedicated Reader にフェイルオーバーしてから旧Writer を拡大する）
+      ResumeFromFirstIncompleteStep = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.progress.dedicatedReaderComplete"
+            BooleanEquals = false
+            Next          = "BeginDedicatedReaderPhase"
           },
           {
-            Variable      = "$.dedicatedReaderRetryCount"
-            NumericGreaterThanEquals = 5
-            Next          = "DedicatedReaderStatusError"
+            And = [
+              {
+                Variable     = "$.direction"
+                StringEquals = "up"
+              },
+              {
+                Variable      = "$.progress.autoScalingReadersComplete"
+                BooleanEquals = false
+              }
+            ]
+            Next = "PlanAutoScalingReaderWaves"
+          },
+          {
+            Variable      = "$.progress.failoverComplete"
+            BooleanEquals = false
+            Next          = "BeginFailoverGatePhase"
+          },
+          {
+            Variable      = "$.progress.oldWriterComplete"
+            BooleanEquals = false
+            Next          = "BeginOldWriterPhase"
+          },
+          {
+            Variable      = "$.progress.autoScalingReadersComplete"
+            BooleanEquals = false
+            Next          = "PlanAutoScalingReaderWaves"
           }
         ]
-        Default = "IncrementDedicatedReaderRetry"
+        Default = "ReconcileClusterMembers"
       },
       
-      IncrementDedicatedReaderRetry = {
+      # 1. プライマリリーダーインスタンス（Dedicated Reader）をスケールダウン（direction: "up" ではスケールアップ）
+      # フェーズの開始時刻を記録（ステータス確認で経過時間から次回ポーリングまでの待機時間を見積もる）
+      BeginDedicatedReaderPhase = {
         Type = "Pass"
         Parameters = {
-          "targetClass.$"                = "$.targetClass"
-          "writerInstanceId.$"           = "$.writerInstanceId"
-          "dedicatedReaderInstanceId.$"    = "$.dedicatedReaderInstanceId"
-          "autoScalingReaderInstanceIds.$" = "$.autoScalingReaderInstanceIds"
-          "clusterIdentifier.$"          = "$.clusterIdentifier"
-          "executionName.$"              = "$.executionName"
-          "startTime.$"                  = "$.startTime"
-          "dedicatedReaderRetryCount.$"   = "States.MathAdd($.dedicatedReaderRetryCount, 1)"
-          "failoverRetryCount.$"         = "$.failoverRetryCount"
-          "oldWriterRetryCount.$"         = "$.oldWriterRetryCount"
-          "autoScalingReaderRetryCount.$" = "$.autoScalingReaderRetryCount"
-          "overallRetryCount.$"          = "$.overallRetryCount"
+          "name"        = "dedicated-reader"
+          "startedAt.$" = "$$.State.EnteredTime"
         }
-        Next = "WaitForDedicatedReaderRetry"
+        ResultPath = "$.phase"
+        Next       = "ChooseDedicatedReaderDrain"
       },
       
-      WaitForDedicatedReaderRetry = {
-        Type    = "Wait"
-        Seconds = 600
-        Next    = "RefreshDedicatedReaderInfo"
+      ChooseDedicatedReaderDrain = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.readerDrain"
+            BooleanEquals = true
+            Next          = "ExcludeDedicatedReaderFromReaderEndpoint"
+          }
+        ]
+        Default = "ChooseDedicatedReaderCompletionMode"
       },
       
-      RefreshDedicatedReaderInfo = {
+      # 変更の前に、カスタム Reader エンドポイントから外して接続が減るのを待つ（失敗した場合は待たずに変更する）
+      ExcludeDedicatedReaderFromReaderEndpoint = {
         Type     = "Task"
         Resource = "arn:aws:states:::lambda:invoke"
         Parameters = {
-          FunctionName = aws_lambda_function.get_cluster_instances.arn
+          FunctionName = aws_lambda_function.drain_reader.arn
           Payload = {
-            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "action"          = "exclude"
+            "instanceIds.$"   = "States.Array($.dedicatedReaderInstanceId)"
+            "executionName.$" = "$.executionName"
+            "startTime.$"     = "$.startTime"
+            "phase.$"         = "$.phase.name"
           }
         }
-        ResultPath = "$.refreshedInstanceInfo"
-        Next       = "UpdateDedicatedReaderInfo"
+        ResultSelector = {
+          "excludedInstanceIds.$" = "$.Payload.excludedInstanceIds"
+          "drainStartedAt.$"      = "$.Payload.drainStartedAt"
+          "drained.$"             = "$.Payload.drained"
+          "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.drain"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.drainError"
+            Next        = "ChooseDedicatedReaderCompletionMode"
+          }
+        ]
+        Next = "EvaluateDedicatedReaderDrain"
       },
       
-      UpdateDedicatedReaderInfo = {
-        Type = "Pass"
+      EvaluateDedicatedReaderDrain = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.drain.drained"
+            BooleanEquals = true
+            Next          = "ChooseDedicatedReaderCompletionMode"
+          }
+        ]
+        Default = "WaitForDedicatedReaderDrain"
+      },
+      
+      WaitForDedicatedReaderDrain = {
+        Type        = "Wait"
+        SecondsPath = "$.drain.nextPollSeconds"
+        Next        = "CheckDedicatedReaderDrain"
+      },
+      
+      # 接続数が閾値以下になるか、reader_drain_timeout_seconds を過ぎると drained: true
+      CheckDedicatedReaderDrain = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
         Parameters = {
-          "targetClass.$"                = "$.targetClass"
-          "writerInstanceId.$"           = "$.refreshedInstanceInfo.Payload.writerInstanceId"
-          "dedicatedReaderInstanceId.$"    = "$.refreshedInstanceInfo.Payload.dedicatedReaderInstanceId"
-          "autoScalingReaderInstanceIds.$" = "$.refreshedInstanceInfo.Payload.autoScalingReaderInstanceIds"
-          "clusterIdentifier.$"          = "$.clusterIdentifier"
-          "executionName.$"              = "$.executionName"
-          "startTime.$"                  = "$.startTime"
-          "dedicatedReaderRetryCount.$"   = "$.dedicatedReaderRetryCount"
-          "failoverRetryCount.$"         = "$.failoverRetryCount"
-          "oldWriterRetryCount.$"         = "$.oldWriterRetryCount"
-          "autoScalingReaderRetryCount.$" = "$.autoScalingReaderRetryCount"
-          "overallRetryCount.$"          = "$.overallRetryCount"
+          FunctionName = aws_lambda_function.drain_reader.arn
+          Payload = {
+            "action"           = "check"
+            "instanceIds.$"    = "$.drain.excludedInstanceIds"
+            "drainStartedAt.$" = "$.drain.drainStartedAt"
+            "executionName.$"  = "$.executionName"
+            "startTime.$"      = "$.startTime"
+            "phase.$"          = "$.phase.name"
+          }
         }
-        Next = "CheckDedicatedReaderStatus"
+        ResultSelector = {
+          "excludedInstanceIds.$" = "$.Payload.excludedInstanceIds"
+          "drainStartedAt.$"      = "$.Payload.drainStartedAt"
+          "drained.$"             = "$.Payload.drained"
+          "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.drain"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.drainError"
+            Next        = "ChooseDedicatedReaderCompletionMode"
+          }
+        ]
+        Next = "EvaluateDedicatedReaderDrain"
       },
       
-      DedicatedReaderStatusError = {
-        Type = "Fail"
-        Error = "DedicatedReaderStatusTimeout"
-        Cause = "Dedicated Reader instance did not become available after 5 retries (50 minutes)"
+      ChooseDedicatedReaderCompletionMode = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable     = "$.completionMode"
+            StringEquals = "event"
+            Next         = "ScaleDedicatedReaderAndWaitForEvent"
+          }
+        ]
+        Default = "ScaleDedicatedReader"
       },
       
-      # 2. スケールダウンしたプライマリリーダーインスタンスをライターインスタンスにフェイルオーバー
-      FailoverToDedicatedReader = {
+      # イベント駆動モード: 変更完了のRDSイベントを待つ
+      # イベントが届かない場合（タイムアウト・エラー）はステータス確認のポーリングにフォールバックする
+      ScaleDedicatedReaderAndWaitForEvent = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke.waitForTaskToken"
+        Parameters = {
+          FunctionName = aws_lambda_function.modify_instance.arn
+          Payload = {
+            "instanceId.$"    = "$.dedicatedReaderInstanceId"
+            "targetClass.$"   = "$.targetClass"
+            "taskToken.$"     = "$$.Task.Token"
+            "executionName.$" = "$.executionName"
+            "startTime.$"     = "$.startTime"
+            "phase.$"         = "$.phase.name"
+          }
+        }
+        TimeoutSeconds = var.event_wait_timeout_seconds
+        ResultPath     = "$.dedicatedReaderEventResult"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.error"
+            Next        = "CheckDedicatedReaderStatus"
+          }
+        ]
+        Next = "CheckDedicatedReaderStatus"
+      },
+      
+      ScaleDedicatedReader = {
         Type     = "Task"
         Resource = "arn:aws:states:::lambda:invoke"
         Parameters = {
-          FunctionName = aws_lambda_function.failover_cluster.arn
+          FunctionName = aws_lambda_function.modify_instance.arn
           Payload = {
-            "clusterIdentifier.$" = "$.clusterIdentifier"
-            "targetInstanceId.$"   = "$.dedicatedReaderInstanceId"
+            "instanceId.$"    = "$.dedicatedReaderInstanceId"
+            "targetClass.$"   = "$.targetClass"
+            "executionName.$" = "$.executionName"
+            "startTime.$"     = "$.startTime"
+            "phase.$"         = "$.phase.name"
           }
         }
-        ResultPath = "$.failoverResult"
+        ResultPath = "$.dedicatedReaderResult"
         Catch = [
           {
             ErrorEquals = ["States.ALL"]
             ResultPath = "$.error"
-            Next = "CheckFailoverStatus"
+            Next = "CheckDedicatedReaderStatus"
           }
         ]
-        Next       = "WaitForFailover"
+        Next = "WaitForDedicatedReader"
       },
       
-      WaitForFailover = {
-        Type    = "Wait"
-        Seconds = 120
-        Next    = "CheckFailoverStatus"
+      WaitForDedicatedReader = {
+        Type        = "Wait"
+        SecondsPath = "$.dedicatedReaderResult.Payload.nextPollSeconds"
+        Next        = "CheckDedicatedReaderStatus"
       },
       
-      CheckFailoverStatus = {
+      CheckDedicatedReaderStatus = {
         Type     = "Task"
         Resource = "arn:aws:states:::lambda:invoke"
         Parameters = {
           FunctionName = aws_lambda_function.check_instance_status.arn
           Payload = {
-            "instanceIds.$" = "States.Array($.dedicatedReaderInstanceId)"
-            "targetClass.$" = "$.targetClass"
+            "instanceIds.$"    = "States.Array($.dedicatedReaderInstanceId)"
+            "targetClass.$"    = "$.targetClass"
+            "phaseStartTime.$" = "$.phase.startedAt"
+            "executionName.$"  = "$.executionName"
+            "startTime.$"      = "$.startTime"
+            "phase.$"          = "$.phase.name"
           }
         }
-        ResultPath = "$.failoverStatusCheck"
-        Next       = "EvaluateFailoverStatus"
+        ResultPath = "$.statusCheckResult"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "ChooseRollbackOnFailure"
+          }
+        ]
+        Next       = "EvaluateDedicatedReaderStatus"
       },
       
-      EvaluateFailoverStatus = {
+      EvaluateDedicatedReaderStatus = {
         Type    = "Choice"
         Choices = [
           {
-            Variable      = "$.failoverStatusCheck.Payload.allAvailable"
+            And = [
+              {
+                Variable      = "$.statusCheckResult.Payload.allAvailable"
+                BooleanEquals = true
+              },
+              {
+                Variable      = "$.readerDrain"
+                BooleanEquals = true
+              }
+            ]
+            Next = "IncludeDedicatedReaderInReaderEndpoint"
+          },
+          {
+            Variable      = "$.statusCheckResult.Payload.allAvailable"
             BooleanEquals = true
-            Next          = "ScaleOldWriter"
+            Next          = "MarkDedicatedReaderComplete"
           },
           {
-            Variable      = "$.failoverRetryCount"
-            NumericGreaterThanEquals = 5
-            Next          = "FailoverStatusError"
+            Variable      = "$.statusCheckResult.Payload.phaseElapsedSeconds"
+            NumericGreaterThanEquals = var.phase_timeout_seconds
+            Next          = "DedicatedReaderStatusError"
           }
         ]
-        Default = "IncrementFailoverRetry"
+        Default = "IncrementDedicatedReaderRetry"
       },
       
-      IncrementFailoverRetry = {
+      IncrementDedicatedReaderRetry = {
         Type = "Pass"
         Parameters = {
           "targetClass.$"                = "$.targetClass"
@@ -218,68 +498,507 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
           "clusterIdentifier.$"          = "$.clusterIdentifier"
           "executionName.$"              = "$.executionName"
           "startTime.$"                  = "$.startTime"
-          "dedicatedReaderRetryCount.$"   = "$.dedicatedReaderRetryCount"
-          "failoverRetryCount.$"          = "States.MathAdd($.failoverRetryCount, 1)"
+          "dedicatedReaderRetryCount.$"   = "States.MathAdd($.dedicatedReaderRetryCount, 1)"
+          "failoverRetryCount.$"         = "$.failoverRetryCount"
           "oldWriterRetryCount.$"         = "$.oldWriterRetryCount"
           "autoScalingReaderRetryCount.$" = "$.autoScalingReaderRetryCount"
           "overallRetryCount.$"          = "$.overallRetryCount"
+          "reconcileCount.$"             = "$.reconcileCount"
+          "autoScaling.$"                = "$.autoScaling"
+          "rollbackOnFailure.$"          = "$.rollbackOnFailure"
+          "readerStrategy.$"             = "$.readerStrategy"
+          "readerDrain.$"                = "$.readerDrain"
+          "scalingStrategy.$"            = "$.scalingStrategy"
+          "direction.$"                  = "$.direction"
+          "phase.$"                      = "$.phase"
+          "completionMode.$"             = "$.completionMode"
+          "progress.$"                   = "$.progress"
+          "nextPollSeconds.$"            = "$.statusCheckResult.Payload.nextPollSeconds"
+          "modifyRequired.$"             = "$.statusCheckResult.Payload.modifyRequired"
         }
-        Next = "WaitForFailoverRetry"
+        Next = "WaitForDedicatedReaderRetry"
       },
       
-      WaitForFailoverRetry = {
-        Type    = "Wait"
-        Seconds = 600
-        Next    = "RefreshFailoverInfo"
+      WaitForDedicatedReaderRetry = {
+        Type        = "Wait"
+        SecondsPath = "$.nextPollSeconds"
+        Next        = "RetryDedicatedReaderModifyIfRequired"
+      },
+      
+      # 変更要求が受け付けられていない場合（変更要求の失敗など）は変更を再要求する
+      # クラスター構成は再取得しない（フェイルオーバー後に再取得すると Writer / Dedicated Reader の分類が入れ替わるため）
+      RetryDedicatedReaderModifyIfRequired = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.modifyRequired"
+            BooleanEquals = true
+            Next          = "ChooseDedicatedReaderCompletionMode"
+          }
+        ]
+        Default = "CheckDedicatedReaderStatus"
       },
       
-      RefreshFailoverInfo = {
+      # 変更先のタイプで available になった後に、カスタム Reader エンドポイントに戻す
+      # 戻せなかった場合は $.endpointIncludeError に残して続ける（変更は完了しているため、ロールバックしない）
+      IncludeDedicatedReaderInReaderEndpoint = {
         Type     = "Task"
         Resource = "arn:aws:states:::lambda:invoke"
         Parameters = {
-          FunctionName = aws_lambda_function.get_cluster_instances.arn
+          FunctionName = aws_lambda_function.drain_reader.arn
           Payload = {
-            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "action"          = "include"
+            "instanceIds.$"   = "States.Array($.dedicatedReaderInstanceId)"
+            "executionName.$" = "$.executionName"
+            "startTime.$"     = "$.startTime"
+            "phase.$"         = "$.phase.name"
           }
         }
-        ResultPath = "$.refreshedInstanceInfo"
-        Next       = "UpdateFailoverInfo"
+        ResultPath = "$.endpointInclude"
+        Retry = [
+          {
+            ErrorEquals     = ["Lambda.ServiceException", "Lambda.AWSLambdaException", "Lambda.SdkClientException", "Lambda.TooManyRequestsException"]
+            IntervalSeconds = 2
+            MaxAttempts     = 3
+            BackoffRate     = 2
+          }
+        ]
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.endpointIncludeError"
+            Next        = "MarkDedicatedReaderComplete"
+          }
+        ]
+        Next = "MarkDedicatedReaderComplete"
       },
       
-      UpdateFailoverInfo = {
+      MarkDedicatedReaderComplete = {
+        Type       = "Pass"
+        Result     = true
+        ResultPath = "$.progress.dedicatedReaderComplete"
+        Next       = "ResumeFromFirstIncompleteStep"
+      },
+      
+      DedicatedReaderStatusError = {
+        Type = "Pass"
+        Result = {
+          Error = "DedicatedReaderStatusTimeout"
+          Cause = "Dedicated Reader instance did not become available within ${var.phase_timeout_seconds} seconds"
+        }
+        ResultPath = "$.failure"
+        Next       = "ChooseRollbackOnFailure"
+      },
+      
+      # 2. スケールダウンしたプライマリリーダーインスタンスをライターインスタンスにフェイルオーバー
+      # フェイルオーバーの前に、Writer の書き込み（WriteIOPS）・接続数とフェイルオーバー先のレプリカラグが落ち着くのを待つ
+      # （failover_gate_max_wait_seconds を過ぎた場合、または確認に失敗した場合は待たずにフェイルオーバーする）
+      BeginFailoverGatePhase = {
+        Type = "Pass"
+        Parameters = {
+          "name"        = "failover-gate"
+          "startedAt.$" = "$$.State.EnteredTime"
+        }
+        ResultPath = "$.phase"
+        Next       = "CheckFailoverReadiness"
+      },
+      
+      CheckFailoverReadiness = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.check_failover_readiness.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "targetInstanceId.$"  = "$.dedicatedReaderInstanceId"
+            "phaseStartTime.$"    = "$.phase.startedAt"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase.$"             = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "ready.$"           = "$.Payload.ready"
+          "timedOut.$"        = "$.Payload.timedOut"
+          "conditions.$"      = "$.Payload.conditions"
+          "elapsedSeconds.$"  = "$.Payload.elapsedSeconds"
+          "nextPollSeconds.$" = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.failoverGate"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failoverGateError"
+            Next        = "BeginFailoverPhase"
+          }
+        ]
+        Next = "EvaluateFailoverReadiness"
+      },
+      
+      EvaluateFailoverReadiness = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.failoverGate.ready"
+            BooleanEquals = true
+            Next          = "BeginFailoverPhase"
+          }
+        ]
+        Default = "WaitForFailoverReadiness"
+      },
+      
+      WaitForFailoverReadiness = {
+        Type        = "Wait"
+        SecondsPath = "$.failoverGate.nextPollSeconds"
+        Next        = "CheckFailoverReadiness"
+      },
+      
+      BeginFailoverPhase = {
+        Type = "Pass"
+        Parameters = {
+          "name"        = "failover"
+          "startedAt.$" = "$$.State.EnteredTime"
+        }
+        ResultPath = "$.phase"
+        Next       = "ChooseFailoverCompletionMode"
+      },
+      
+      ChooseFailoverCompletionMode = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable     = "$.completionMode"
+            StringEquals = "event"
+            Next         = "FailoverToDedicatedReaderAndWaitForEvent"
+          }
+        ]
+        Default = "FailoverToDedicatedReader"
+      },
+      
+      # イベント駆動モード: フェイルオーバー完了のRDSイベントを待つ
+      # イベントが届かない場合（タイムアウト・エラー）はステータス確認のポーリングにフォールバックする
+      FailoverToDedicatedReaderAndWaitForEvent = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke.waitForTaskToken"
+        Parameters = {
+          FunctionName = aws_lambda_function.failover_cluster.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "targetInstanceId.$"  = "$.dedicatedReaderInstanceId"
+            "taskToken.$"         = "$$.Task.Token"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase.$"             = "$.phase.name"
+          }
+        }
+        TimeoutSeconds = var.event_wait_timeout_seconds
+        ResultPath     = "$.failoverEventResult"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.error"
+            Next        = "CheckFailoverStatus"
+          }
+        ]
+        Next = "CheckFailoverStatus"
+      },
+      
+      FailoverToDedicatedReader = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.failover_cluster.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "targetInstanceId.$"  = "$.dedicatedReaderInstanceId"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase.$"             = "$.phase.name"
+          }
+        }
+        ResultPath = "$.failoverResult"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath = "$.error"
+            Next = "CheckFailoverStatus"
+          }
+        ]
+        Next       = "WaitForFailover"
+      },
+      
+      WaitForFailover = {
+        Type        = "Wait"
+        SecondsPath = "$.failoverResult.Payload.nextPollSeconds"
+        Next        = "CheckFailoverStatus"
+      },
+      
+      # フェイルオーバーの完了確認: クラスターのWriterがDedicated Readerに切り替わったかを確認する
+      CheckFailoverStatus = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.check_failover_status.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "targetInstanceId.$"  = "$.dedicatedReaderInstanceId"
+            "phaseStartTime.$"    = "$.phase.startedAt"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase.$"             = "$.phase.name"
+          }
+        }
+        ResultPath = "$.failoverStatusCheck"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "ChooseRollbackOnFailure"
+          }
+        ]
+        Next       = "EvaluateFailoverStatus"
+      },
+      
+      EvaluateFailoverStatus = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.failoverStatusCheck.Payload.failoverComplete"
+            BooleanEquals = true
+            Next          = "MarkFailoverComplete"
+          },
+          {
+            Variable      = "$.failoverStatusCheck.Payload.phaseElapsedSeconds"
+            NumericGreaterThanEquals = var.phase_timeout_seconds
+            Next          = "FailoverStatusError"
+          }
+        ]
+        Default = "IncrementFailoverRetry"
+      },
+      
+      IncrementFailoverRetry = {
         Type = "Pass"
         Parameters = {
           "targetClass.$"                = "$.targetClass"
-          "writerInstanceId.$"           = "$.refreshedInstanceInfo.Payload.writerInstanceId"
-          "dedicatedReaderInstanceId.$"    = "$.refreshedInstanceInfo.Payload.dedicatedReaderInstanceId"
-          "autoScalingReaderInstanceIds.$" = "$.refreshedInstanceInfo.Payload.autoScalingReaderInstanceIds"
+          "writerInstanceId.$"           = "$.writerInstanceId"
+          "dedicatedReaderInstanceId.$"    = "$.dedicatedReaderInstanceId"
+          "autoScalingReaderInstanceIds.$" = "$.autoScalingReaderInstanceIds"
           "clusterIdentifier.$"          = "$.clusterIdentifier"
           "executionName.$"              = "$.executionName"
           "startTime.$"                  = "$.startTime"
           "dedicatedReaderRetryCount.$"   = "$.dedicatedReaderRetryCount"
-          "failoverRetryCount.$"         = "$.failoverRetryCount"
+          "failoverRetryCount.$"          = "States.MathAdd($.failoverRetryCount, 1)"
           "oldWriterRetryCount.$"         = "$.oldWriterRetryCount"
           "autoScalingReaderRetryCount.$" = "$.autoScalingReaderRetryCount"
           "overallRetryCount.$"          = "$.overallRetryCount"
+          "reconcileCount.$"             = "$.reconcileCount"
+          "autoScaling.$"                = "$.autoScaling"
+          "rollbackOnFailure.$"          = "$.rollbackOnFailure"
+          "readerStrategy.$"             = "$.readerStrategy"
+          "readerDrain.$"                = "$.readerDrain"
+          "scalingStrategy.$"            = "$.scalingStrategy"
+          "direction.$"                  = "$.direction"
+          "phase.$"                      = "$.phase"
+          "completionMode.$"             = "$.completionMode"
+          "progress.$"                   = "$.progress"
+          "nextPollSeconds.$"            = "$.failoverStatusCheck.Payload.nextPollSeconds"
+          "failoverRequired.$"           = "$.failoverStatusCheck.Payload.failoverRequired"
         }
-        Next = "CheckFailoverStatus"
+        Next = "WaitForFailoverRetry"
+      },
+      
+      WaitForFailoverRetry = {
+        Type        = "Wait"
+        SecondsPath = "$.nextPollSeconds"
+        Next        = "RetryFailoverIfRequired"
+      },
+      
+      # フェイルオーバーが開始されていない場合（ターゲットが available でなかった場合など）は再実行する
+      # クラスター構成は再取得しない（フェイルオーバー後に再取得すると Writer / Dedicated Reader の分類が入れ替わるため）
+      RetryFailoverIfRequired = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.failoverRequired"
+            BooleanEquals = true
+            Next          = "ChooseFailoverCompletionMode"
+          }
+        ]
+        Default = "CheckFailoverStatus"
+      },
+      
+      MarkFailoverComplete = {
+        Type       = "Pass"
+        Result     = true
+        ResultPath = "$.progress.failoverComplete"
+        Next       = "ResumeFromFirstIncompleteStep"
       },
       
       FailoverStatusError = {
-        Type = "Fail"
-        Error = "FailoverStatusTimeout"
-        Cause = "Failover did not complete after 5 retries (50 minutes)"
+        Type = "Pass"
+        Result = {
+          Error = "FailoverStatusTimeout"
+          Cause = "Failover did not complete within ${var.phase_timeout_seconds} seconds"
+        }
+        ResultPath = "$.failure"
+        Next       = "ChooseRollbackOnFailure"
       },
       
       # 3. 元ライターインスタンスをスケールダウン
+      BeginOldWriterPhase = {
+        Type = "Pass"
+        Parameters = {
+          "name"        = "old-writer"
+          "startedAt.$" = "$$.State.EnteredTime"
+        }
+        ResultPath = "$.phase"
+        Next       = "ChooseOldWriterDrain"
+      },
+      
+      ChooseOldWriterDrain = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.readerDrain"
+            BooleanEquals = true
+            Next          = "ExcludeOldWriterFromReaderEndpoint"
+          }
+        ]
+        Default = "ChooseOldWriterCompletionMode"
+      },
+      
+      # 変更の前に、カスタム Reader エンドポイントから外して接続が減るのを待つ（失敗した場合は待たずに変更する）
+      ExcludeOldWriterFromReaderEndpoint = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.drain_reader.arn
+          Payload = {
+            "action"          = "exclude"
+            "instanceIds.$"   = "States.Array($.writerInstanceId)"
+            "executionName.$" = "$.executionName"
+            "startTime.$"     = "$.startTime"
+            "phase.$"         = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "excludedInstanceIds.$" = "$.Payload.excludedInstanceIds"
+          "drainStartedAt.$"      = "$.Payload.drainStartedAt"
+          "drained.$"             = "$.Payload.drained"
+          "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.drain"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.drainError"
+            Next        = "ChooseOldWriterCompletionMode"
+          }
+        ]
+        Next = "EvaluateOldWriterDrain"
+      },
+      
+      EvaluateOldWriterDrain = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.drain.drained"
+            BooleanEquals = true
+            Next          = "ChooseOldWriterCompletionMode"
+          }
+        ]
+        Default = "WaitForOldWriterDrain"
+      },
+      
+      WaitForOldWriterDrain = {
+        Type        = "Wait"
+        SecondsPath = "$.drain.nextPollSeconds"
+        Next        = "CheckOldWriterDrain"
+      },
+      
+      # 接続数が閾値以下になるか、reader_drain_timeout_seconds を過ぎると drained: true
+      CheckOldWriterDrain = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.drain_reader.arn
+          Payload = {
+            "action"           = "check"
+            "instanceIds.$"    = "$.drain.excludedInstanceIds"
+            "drainStartedAt.$" = "$.drain.drainStartedAt"
+            "executionName.$"  = "$.executionName"
+            "startTime.$"      = "$.startTime"
+            "phase.$"          = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "excludedInstanceIds.$" = "$.Payload.excludedInstanceIds"
+          "drainStartedAt.$"      = "$.Payload.drainStartedAt"
+          "drained.$"             = "$.Payload.drained"
+          "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.drain"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.drainError"
+            Next        = "ChooseOldWriterCompletionMode"
+          }
+        ]
+        Next = "EvaluateOldWriterDrain"
+      },
+      
+      ChooseOldWriterCompletionMode = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable     = "$.completionMode"
+            StringEquals = "event"
+            Next         = "ScaleOldWriterAndWaitForEvent"
+          }
+        ]
+        Default = "ScaleOldWriter"
+      },
+      
+      # イベント駆動モード: 変更完了のRDSイベントを待つ
+      # イベントが届かない場合（タイムアウト・エラー）はステータス確認のポーリングにフォールバックする
+      ScaleOldWriterAndWaitForEvent = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke.waitForTaskToken"
+        Parameters = {
+          FunctionName = aws_lambda_function.modify_instance.arn
+          Payload = {
+            "instanceId.$"    = "$.writerInstanceId"
+            "targetClass.$"   = "$.targetClass"
+            "taskToken.$"     = "$$.Task.Token"
+            "executionName.$" = "$.executionName"
+            "startTime.$"     = "$.startTime"
+            "phase.$"         = "$.phase.name"
+          }
+        }
+        TimeoutSeconds = var.event_wait_timeout_seconds
+        ResultPath     = "$.oldWriterEventResult"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.error"
+            Next        = "CheckOldWriterStatus"
+          }
+        ]
+        Next = "CheckOldWriterStatus"
+      },
+      
       ScaleOldWriter = {
         Type     = "Task"
         Resource = "arn:aws:states:::lambda:invoke"
         Parameters = {
           FunctionName = aws_lambda_function.modify_instance.arn
           Payload = {
-            "instanceId.$"  = "$.writerInstanceId"
-            "targetClass.$" = "$.targetClass"
+            "instanceId.$"    = "$.writerInstanceId"
+            "targetClass.$"   = "$.targetClass"
+            "executionName.$" = "$.executionName"
+            "startTime.$"     = "$.startTime"
+            "phase.$"         = "$.phase.name"
           }
         }
         ResultPath = "$.oldWriterResult"
@@ -294,9 +1013,9 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
       },
       
       WaitForOldWriter = {
-        Type    = "Wait"
-        Seconds = 60
-        Next    = "CheckOldWriterStatus"
+        Type        = "Wait"
+        SecondsPath = "$.oldWriterResult.Payload.nextPollSeconds"
+        Next        = "CheckOldWriterStatus"
       },
       
       CheckOldWriterStatus = {
@@ -305,25 +1024,49 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
         Parameters = {
           FunctionName = aws_lambda_function.check_instance_status.arn
           Payload = {
-            "instanceIds.$" = "States.Array($.writerInstanceId)"
-            "targetClass.$" = "$.targetClass"
+            "instanceIds.$"    = "States.Array($.writerInstanceId)"
+            "targetClass.$"    = "$.targetClass"
+            "phaseStartTime.$" = "$.phase.startedAt"
+            "executionName.$"  = "$.executionName"
+            "startTime.$"      = "$.startTime"
+            "phase.$"          = "$.phase.name"
           }
         }
         ResultPath = "$.statusCheckResult"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "ChooseRollbackOnFailure"
+          }
+        ]
         Next       = "EvaluateOldWriterStatus"
       },
       
       EvaluateOldWriterStatus = {
         Type    = "Choice"
         Choices = [
+          {
+            And = [
+              {
+                Variable      = "$.statusCheckResult.Payload.allAvailable"
+                BooleanEquals = true
+              },
+              {
+                Variable      = "$.readerDrain"
+                BooleanEquals = true
+              }
+            ]
+            Next = "IncludeOldWriterInReaderEndpoint"
+          },
           {
             Variable      = "$.statusCheckResult.Payload.allAvailable"
             BooleanEquals = true
-            Next          = "ProcessAutoScalingReaders"
+            Next          = "MarkOldWriterComplete"
           },
           {
-            Variable      = "$.oldWriterRetryCount"
-            NumericGreaterThanEquals = 5
+            Variable      = "$.statusCheckResult.Payload.phaseElapsedSeconds"
+            NumericGreaterThanEquals = var.phase_timeout_seconds
             Next          = "OldWriterStatusError"
           }
         ]
@@ -345,61 +1088,127 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
           "oldWriterRetryCount.$"         = "States.MathAdd($.oldWriterRetryCount, 1)"
           "autoScalingReaderRetryCount.$" = "$.autoScalingReaderRetryCount"
           "overallRetryCount.$"          = "$.overallRetryCount"
+          "reconcileCount.$"             = "$.reconcileCount"
+          "autoScaling.$"                = "$.autoScaling"
+          "rollbackOnFailure.$"          = "$.rollbackOnFailure"
+          "readerStrategy.$"             = "$.readerStrategy"
+          "readerDrain.$"                = "$.readerDrain"
+          "scalingStrategy.$"            = "$.scalingStrategy"
+          "direction.$"                  = "$.direction"
+          "phase.$"                      = "$.phase"
+          "completionMode.$"             = "$.completionMode"
+          "progress.$"                   = "$.progress"
+          "nextPollSeconds.$"            = "$.statusCheckResult.Payload.nextPollSeconds"
+          "modifyRequired.$"             = "$.statusCheckResult.Payload.modifyRequired"
         }
         Next = "WaitForOldWriterRetry"
       },
       
       WaitForOldWriterRetry = {
-        Type    = "Wait"
-        Seconds = 600
-        Next    = "RefreshOldWriterInfo"
+        Type        = "Wait"
+        SecondsPath = "$.nextPollSeconds"
+        Next        = "RetryOldWriterModifyIfRequired"
+      },
+      
+      # 変更要求が受け付けられていない場合（変更要求の失敗など）は変更を再要求する
+      # クラスター構成は再取得しない（フェイルオーバー後に再取得すると Writer / Dedicated Reader の分類が入れ替わるため）
+      RetryOldWriterModifyIfRequired = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.modifyRequired"
+            BooleanEquals = true
+            Next          = "ChooseOldWriterCompletionMode"
+          }
+        ]
+        Default = "CheckOldWriterStatus"
       },
       
-      RefreshOldWriterInfo = {
+      # 変更先のタイプで available になった後に、カスタム Reader エンドポイントに戻す
+      # 戻せなかった場合は $.endpointIncludeError に残して続ける（変更は完了しているため、ロールバックしない）
+      IncludeOldWriterInReaderEndpoint = {
         Type     = "Task"
         Resource = "arn:aws:states:::lambda:invoke"
         Parameters = {
-          FunctionName = aws_lambda_function.get_cluster_instances.arn
+          FunctionName = aws_lambda_function.drain_reader.arn
           Payload = {
-            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "action"          = "include"
+            "instanceIds.$"   = "States.Array($.writerInstanceId)"
+            "executionName.$" = "$.executionName"
+            "startTime.$"     = "$.startTime"
+            "phase.$"         = "$.phase.name"
           }
         }
-        ResultPath = "$.refreshedInstanceInfo"
-        Next       = "UpdateOldWriterInfo"
+        ResultPath = "$.endpointInclude"
+        Retry = [
+          {
+            ErrorEquals     = ["Lambda.ServiceException", "Lambda.AWSLambdaException", "Lambda.SdkClientException", "Lambda.TooManyRequestsException"]
+            IntervalSeconds = 2
+            MaxAttempts     = 3
+            BackoffRate     = 2
+          }
+        ]
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.endpointIncludeError"
+            Next        = "MarkOldWriterComplete"
+          }
+        ]
+        Next = "MarkOldWriterComplete"
+      },
+      
+      MarkOldWriterComplete = {
+        Type       = "Pass"
+        Result     = true
+        ResultPath = "$.progress.oldWriterComplete"
+        Next       = "ResumeFromFirstIncompleteStep"
       },
       
-      UpdateOldWriterInfo = {
+      OldWriterStatusError = {
         Type = "Pass"
-        Parameters = {
-          "targetClass.$"                = "$.targetClass"
-          "writerInstanceId.$"           = "$.refreshedInstanceInfo.Payload.writerInstanceId"
-          "dedicatedReaderInstanceId.$"    = "$.refreshedInstanceInfo.Payload.dedicatedReaderInstanceId"
-          "autoScalingReaderInstanceIds.$" = "$.refreshedInstanceInfo.Payload.autoScalingReaderInstanceIds"
-          "clusterIdentifier.$"          = "$.clusterIdentifier"
-          "executionName.$"              = "$.executionName"
-          "startTime.$"                  = "$.startTime"
-          "dedicatedReaderRetryCount.$"   = "$.dedicatedReaderRetryCount"
-          "failoverRetryCount.$"         = "$.failoverRetryCount"
-          "oldWriterRetryCount.$"         = "$.oldWriterRetryCount"
-          "autoScalingReaderRetryCount.$" = "$.autoScalingReaderRetryCount"
-          "overallRetryCount.$"          = "$.overallRetryCount"
+        Result = {
+          Error = "OldWriterStatusTimeout"
+          Cause = "Old Writer instance did not become available within ${var.phase_timeout_seconds} seconds"
         }
-        Next = "CheckOldWriterStatus"
+        ResultPath = "$.failure"
+        Next       = "ChooseRollbackOnFailure"
       },
       
-      OldWriterStatusError = {
-        Type = "Fail"
-        Error = "OldWriterStatusTimeout"
-        Cause = "Old Writer instance did not become available after 5 retries (50 minutes)"
+      # 4. AutoScaling Reader（未完了のもののみ）をキャパシティ予算内のウェーブに分割
+      PlanAutoScalingReaderWaves = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.plan_reader_waves.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "instanceIds.$"       = "$.progress.pendingAutoScalingReaderInstanceIds"
+            "readerStrategy.$"    = "$.readerStrategy"
+          }
+        }
+        ResultSelector = {
+          "waves.$"     = "$.Payload.waves"
+          "waveCount.$" = "$.Payload.waveCount"
+        }
+        ResultPath = "$.autoScalingWavePlan"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "ChooseRollbackOnFailure"
+          }
+        ]
+        Next       = "ProcessAutoScalingReaders"
       },
       
       ProcessAutoScalingReaders = {
         Type           = "Map"
-        Comment        = "AutoScaling Readerを1台ずつ順次変更"
-        ItemsPath      = "$.autoScalingReaderInstanceIds"
+        Comment        = "AutoScaling Readerをウェーブ単位で順次変更（ウェーブ内のReaderは同時に変更）"
+        ItemsPath      = "$.autoScalingWavePlan.waves"
         MaxConcurrency = 1
         Parameters = {
-          "instanceId.$"  = "$$.Map.Item.Value"
+          "instanceIds.$" = "$$.Map.Item.Value"
           "targetClass.$" = "$.targetClass"
           "autoScalingReaderRetryCount" = 0
           "overallRetryCount.$" = "$.overallRetryCount"
@@ -412,19 +1221,457 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
           "dedicatedReaderRetryCount.$" = "$.dedicatedReaderRetryCount"
           "failoverRetryCount.$" = "$.failoverRetryCount"
           "oldWriterRetryCount.$" = "$.oldWriterRetryCount"
+          "completionMode.$" = "$.completionMode"
+          "readerStrategy.$" = "$.readerStrategy"
+          "readerDrain.$" = "$.readerDrain"
+          "replacementRetry" = {
+            "count" = 0
+          }
         }
         ResultPath = "$.autoScalingResults"
         Iterator = {
-          StartAt = "ScaleAutoScalingReader"
+          StartAt = "BeginAutoScalingReaderWave"
           States = {
+            BeginAutoScalingReaderWave = {
+              Type = "Pass"
+              Parameters = {
+                "name"        = "autoscaling-reader-wave"
+                "startedAt.$" = "$$.State.EnteredTime"
+              }
+              ResultPath = "$.phase"
+              Next       = "ChooseAutoScalingReaderStrategy"
+            },
+            
+            # readerStrategy: "replace" の場合は、インスタンスタイプを変更せずに新しい Reader に置き換える
+            ChooseAutoScalingReaderStrategy = {
+              Type    = "Choice"
+              Choices = [
+                {
+                  Variable     = "$.readerStrategy"
+                  StringEquals = "replace"
+                  Next         = "CreateReplacementReaders"
+                }
+              ]
+              Default = "ChooseAutoScalingReaderDrain"
+            },
+            
+            ChooseAutoScalingReaderDrain = {
+              Type    = "Choice"
+              Choices = [
+                {
+                  Variable      = "$.readerDrain"
+                  BooleanEquals = true
+                  Next          = "ExcludeAutoScalingReadersFromReaderEndpoint"
+                }
+              ]
+              Default = "ChooseAutoScalingReaderCompletionMode"
+            },
+            
+            # 変更の前に、カスタム Reader エンドポイントから外して接続が減るのを待つ（失敗した場合は待たずに変更する）
+            ExcludeAutoScalingReadersFromReaderEndpoint = {
+              Type     = "Task"
+              Resource = "arn:aws:states:::lambda:invoke"
+              Parameters = {
+                FunctionName = aws_lambda_function.drain_reader.arn
+                Payload = {
+                  "action"          = "exclude"
+                  "instanceIds.$"   = "$.instanceIds"
+                  "executionName.$" = "$.executionName"
+                  "startTime.$"     = "$.startTime"
+                  "phase.$"         = "$.phase.name"
+                }
+              }
+              ResultSelector = {
+                "excludedInstanceIds.$" = "$.Payload.excludedInstanceIds"
+                "drainStartedAt.$"      = "$.Payload.drainStartedAt"
+                "drained.$"             = "$.Payload.drained"
+                "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+              }
+              ResultPath = "$.drain"
+              Catch = [
+                {
+                  ErrorEquals = ["States.ALL"]
+                  ResultPath  = "$.drainError"
+                  Next        = "ChooseAutoScalingReaderCompletionMode"
+                }
+              ]
+              Next = "EvaluateAutoScalingReaderDrain"
+            },
+            
+            EvaluateAutoScalingReaderDrain = {
+              Type    = "Choice"
+              Choices = [
+                {
+                  Variable      = "$.drain.drained"
+                  BooleanEquals = true
+                  Next          = "ChooseAutoScalingReaderCompletionMode"
+                }
+              ]
+              Default = "WaitForAutoScalingReaderDrain"
+            },
+            
+            WaitForAutoScalingReaderDrain = {
+              Type        = "Wait"
+              SecondsPath = "$.drain.nextPollSeconds"
+              Next        = "CheckAutoScalingReaderDrain"
+            },
+            
+            # 接続数が閾値以下になるか、reader_drain_timeout_seconds を過ぎると drained: true
+            CheckAutoScalingReaderDrain = {
+              Type     = "Task"
+              Resource = "arn:aws:states:::lambda:invoke"
+              Parameters = {
+                FunctionName = aws_lambda_function.drain_reader.arn
+                Payload = {
+                  "action"           = "check"
+                  "instanceIds.$"    = "$.drain.excludedInstanceIds"
+                  "drainStartedAt.$" = "$.drain.drainStartedAt"
+                  "executionName.$"  = "$.executionName"
+                  "startTime.$"      = "$.startTime"
+                  "phase.$"          = "$.phase.name"
+                }
+              }
+              ResultSelector = {
+                "excludedInstanceIds.$" = "$.Payload.excludedInstanceIds"
+                "drainStartedAt.$"      = "$.Payload.drainStartedAt"
+                "drained.$"             = "$.Payload.drained"
+                "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+              }
+              ResultPath = "$.drain"
+              Catch = [
+                {
+                  ErrorEquals = ["States.ALL"]
+                  ResultPath  = "$.drainError"
+                  Next        = "ChooseAutoScalingReaderCompletionMode"
+                }
+              ]
+              Next = "EvaluateAutoScalingReaderDrain"
+            },
+            
+            # ウェーブ内の Reader ごとに、変更先のタイプの新しいインスタンスを作成する（作成済みの場合は作成しない）
+            CreateReplacementReaders = {
+              Type     = "Task"
+              Resource = "arn:aws:states:::lambda:invoke"
+              Parameters = {
+                FunctionName = aws_lambda_function.replace_instance.arn
+                Payload = {
+                  "action"          = "create"
+                  "instanceIds.$"   = "$.instanceIds"
+                  "targetClass.$"   = "$.targetClass"
+                  "executionName.$" = "$.executionName"
+                  "startTime.$"     = "$.startTime"
+                  "phase.$"         = "$.phase.name"
+                }
+              }
+              ResultSelector = {
+                "replacementInstanceIds.$" = "$.Payload.replacementInstanceIds"
+                "replacementCount.$"       = "$.Payload.replacementCount"
+                "nextPollSeconds.$"        = "$.Payload.nextPollSeconds"
+              }
+              ResultPath = "$.replacement"
+              Retry = [
+                {
+                  ErrorEquals     = ["Lambda.ServiceException", "Lambda.AWSLambdaException", "Lambda.SdkClientException", "Lambda.TooManyRequestsException"]
+                  IntervalSeconds = 2
+                  MaxAttempts     = 3
+                  BackoffRate     = 2
+                }
+              ]
+              Catch = [
+                {
+                  ErrorEquals = ["States.ALL"]
+                  ResultPath  = "$.error"
+                  Next        = "CountReplacementRetry"
+                }
+              ]
+              Next       = "ChooseReplacementWait"
+            },
+            
+            # スケールインで全ての Reader が削除されていた場合は置き換えるものがない
+            ChooseReplacementWait = {
+              Type    = "Choice"
+              Choices = [
+                {
+                  Variable     = "$.replacement.replacementCount"
+                  NumericEquals = 0
+                  Next         = "AutoScalingReaderComplete"
+                }
+              ]
+              Default = "WaitForReplacementReaders"
+            },
+            
+            WaitForReplacementReaders = {
+              Type        = "Wait"
+              SecondsPath = "$.replacement.nextPollSeconds"
+              Next        = "CheckReplacementReaderStatus"
+            },
+            
+            CheckReplacementReaderStatus = {
+              Type     = "Task"
+              Resource = "arn:aws:states:::lambda:invoke"
+              Parameters = {
+                FunctionName = aws_lambda_function.check_instance_status.arn
+                Payload = {
+                  "instanceIds.$"    = "$.replacement.replacementInstanceIds"
+                  "targetClass.$"    = "$.targetClass"
+                  "phaseStartTime.$" = "$.phase.startedAt"
+                  "executionName.$"  = "$.executionName"
+                  "startTime.$"      = "$.startTime"
+                  "phase.$"          = "$.phase.name"
+                }
+              }
+              ResultSelector = {
+                "allAvailable.$"        = "$.Payload.allAvailable"
+                "phaseElapsedSeconds.$" = "$.Payload.phaseElapsedSeconds"
+                "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+              }
+              ResultPath = "$.replacementStatus"
+              Next       = "EvaluateReplacementReaderStatus"
+            },
+            
+            EvaluateReplacementReaderStatus = {
+              Type    = "Choice"
+              Choices = [
+                {
+                  And = [
+                    {
+                      Variable      = "$.replacementStatus.allAvailable"
+                      BooleanEquals = true
+                    },
+                    {
+                      Variable      = "$.readerDrain"
+                      BooleanEquals = true
+                    }
+                  ]
+                  Next = "ExcludeReplacedReadersFromReaderEndpoint"
+                },
+                {
+                  Variable      = "$.replacementStatus.allAvailable"
+                  BooleanEquals = true
+                  Next          = "RetireReplacedReaders"
+                },
+                {
+                  Variable      = "$.replacementStatus.phaseElapsedSeconds"
+                  NumericGreaterThanEquals = var.phase_timeout_seconds
+                  Next          = "AutoScalingReaderStatusError"
+                }
+              ]
+              Default = "WaitForReplacementReaderRetry"
+            },
+            
+            WaitForReplacementReaderRetry = {
+              Type        = "Wait"
+              SecondsPath = "$.replacementStatus.nextPollSeconds"
+              Next        = "CheckReplacementReaderStatus"
+            },
+            
+            # 削除の前に、置き換え元をカスタム Reader エンドポイントから外して接続が減るのを待つ（失敗した場合は待たずに削除する）
+            ExcludeReplacedReadersFromReaderEndpoint = {
+              Type     = "Task"
+              Resource = "arn:aws:states:::lambda:invoke"
+              Parameters = {
+                FunctionName = aws_lambda_function.drain_reader.arn
+                Payload = {
+                  "action"          = "exclude"
+                  "instanceIds.$"   = "$.instanceIds"
+                  "executionName.$" = "$.executionName"
+                  "startTime.$"     = "$.startTime"
+                  "phase.$"         = "$.phase.name"
+                }
+              }
+              ResultSelector = {
+                "excludedInstanceIds.$" = "$.Payload.excludedInstanceIds"
+                "drainStartedAt.$"      = "$.Payload.drainStartedAt"
+                "drained.$"             = "$.Payload.drained"
+                "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+              }
+              ResultPath = "$.drain"
+              Catch = [
+                {
+                  ErrorEquals = ["States.ALL"]
+                  ResultPath  = "$.drainError"
+                  Next        = "RetireReplacedReaders"
+                }
+              ]
+              Next = "EvaluateReplacedReaderDrain"
+            },
+            
+            EvaluateReplacedReaderDrain = {
+              Type    = "Choice"
+              Choices = [
+                {
+                  Variable      = "$.drain.drained"
+                  BooleanEquals = true
+                  Next          = "RetireReplacedReaders"
+                }
+              ]
+              Default = "WaitForReplacedReaderDrain"
+            },
+            
+            WaitForReplacedReaderDrain = {
+              Type        = "Wait"
+              SecondsPath = "$.drain.nextPollSeconds"
+              Next        = "CheckReplacedReaderDrain"
+            },
+            
+            # 接続数が閾値以下になるか、reader_drain_timeout_seconds を過ぎると drained: true
+            CheckReplacedReaderDrain = {
+              Type     = "Task"
+              Resource = "arn:aws:states:::lambda:invoke"
+              Parameters = {
+                FunctionName = aws_lambda_function.drain_reader.arn
+                Payload = {
+                  "action"           = "check"
+                  "instanceIds.$"    = "$.drain.excludedInstanceIds"
+                  "drainStartedAt.$" = "$.drain.drainStartedAt"
+                  "executionName.$"  = "$.executionName"
+                  "startTime.$"      = "$.startTime"
+                  "phase.$"          = "$.phase.name"
+                }
+              }
+              ResultSelector = {
+                "excludedInstanceIds.$" = "$.Payload.excludedInstanceIds"
+                "drainStartedAt.$"      = "$.Payload.drainStartedAt"
+                "drained.$"             = "$.Payload.drained"
+                "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+              }
+              ResultPath = "$.drain"
+              Catch = [
+                {
+                  ErrorEquals = ["States.ALL"]
+                  ResultPath  = "$.drainError"
+                  Next        = "RetireReplacedReaders"
+                }
+              ]
+              Next = "EvaluateReplacedReaderDrain"
+            },
+            
+            # 置き換え後の Reader が全て available になってから、置き換え元の Reader を削除する
+            RetireReplacedReaders = {
+              Type     = "Task"
+              Resource = "arn:aws:states:::lambda:invoke"
+              Parameters = {
+                FunctionName = aws_lambda_function.replace_instance.arn
+                Payload = {
+                  "action"          = "retire"
+                  "instanceIds.$"   = "$.instanceIds"
+                  "targetClass.$"   = "$.targetClass"
+                  "executionName.$" = "$.executionName"
+                  "startTime.$"     = "$.startTime"
+                  "phase.$"         = "$.phase.name"
+                }
+              }
+              ResultPath = "$.retireResult"
+              Retry = [
+                {
+                  ErrorEquals     = ["Lambda.ServiceException", "Lambda.AWSLambdaException", "Lambda.SdkClientException", "Lambda.TooManyRequestsException"]
+                  IntervalSeconds = 2
+                  MaxAttempts     = 3
+                  BackoffRate     = 2
+                }
+              ]
+              Catch = [
+                {
+                  ErrorEquals = ["States.ALL"]
+                  ResultPath  = "$.error"
+                  Next        = "CountReplacementRetry"
+                }
+              ]
+              Next       = "AutoScalingReaderComplete"
+            },
+            
+            # 置き換え後の Reader の作成・置き換え元の削除に失敗した場合は、replace_reader_max_retries 回まで再試行する
+            # 作成前（$.replacement がない）は作成をやり直し（作成済みのインスタンスは作成しない）、
+            # 作成後はステータス確認のループに戻る（全て available であれば置き換え元の削除をやり直す）
+            CountReplacementRetry = {
+              Type = "Pass"
+              Parameters = {
+                "count.$" = "States.MathAdd($.replacementRetry.count, 1)"
+              }
+              ResultPath = "$.replacementRetry"
+              Next       = "ChooseReplacementRetry"
+            },
+            
+            ChooseReplacementRetry = {
+              Type    = "Choice"
+              Choices = [
+                {
+                  Variable           = "$.replacementRetry.count"
+                  NumericGreaterThan = var.replace_reader_max_retries
+                  Next               = "ReplacementReaderError"
+                },
+                {
+                  Variable  = "$.replacement"
+                  IsPresent = true
+                  Next      = "WaitForReplacementReaderRetry"
+                }
+              ]
+              Default = "WaitForReplacementCreateRetry"
+            },
+            
+            WaitForReplacementCreateRetry = {
+              Type    = "Wait"
+              Seconds = var.replace_reader_retry_interval_seconds
+              Next    = "CreateReplacementReaders"
+            },
+            
+            ReplacementReaderError = {
+              Type      = "Fail"
+              ErrorPath = "$.error.Error"
+              CausePath = "$.error.Cause"
+            },
+            
+            ChooseAutoScalingReaderCompletionMode = {
+              Type    = "Choice"
+              Choices = [
+                {
+                  Variable     = "$.completionMode"
+                  StringEquals = "event"
+                  Next         = "ScaleAutoScalingReaderAndWaitForEvent"
+                }
+              ]
+              Default = "ScaleAutoScalingReader"
+            },
+            
+            # イベント駆動モード: ウェーブ内の全インスタンスの変更完了イベントを待つ
+            # イベントが届かない場合（タイムアウト・エラー）はステータス確認のポーリングにフォールバックする
+            ScaleAutoScalingReaderAndWaitForEvent = {
+              Type     = "Task"
+              Resource = "arn:aws:states:::lambda:invoke.waitForTaskToken"
+              Parameters = {
+                FunctionName = aws_lambda_function.modify_instance.arn
+                Payload = {
+                  "instanceIds.$"   = "$.instanceIds"
+                  "targetClass.$"   = "$.targetClass"
+                  "taskToken.$"     = "$$.Task.Token"
+                  "executionName.$" = "$.executionName"
+                  "startTime.$"     = "$.startTime"
+                  "phase.$"         = "$.phase.name"
+                }
+              }
+              TimeoutSeconds = var.event_wait_timeout_seconds
+              ResultPath     = "$.scaleEventResult"
+              Catch = [
+                {
+                  ErrorEquals = ["States.ALL"]
+                  ResultPath  = "$.error"
+                  Next        = "CheckAutoScalingReaderStatus"
+                }
+              ]
+              Next = "CheckAutoScalingReaderStatus"
+            },
+            
             ScaleAutoScalingReader = {
               Type     = "Task"
               Resource = "arn:aws:states:::lambda:invoke"
               Parameters = {
                 FunctionName = aws_lambda_function.modify_instance.arn
                 Payload = {
-                  "instanceId.$"  = "$.instanceId"
-                  "targetClass.$" = "$.targetClass"
+                  "instanceIds.$"   = "$.instanceIds"
+                  "targetClass.$"   = "$.targetClass"
+                  "executionName.$" = "$.executionName"
+                  "startTime.$"     = "$.startTime"
+                  "phase.$"         = "$.phase.name"
                 }
               }
               ResultPath = "$.scaleResult"
@@ -439,19 +1686,25 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
             },
             
             WaitForAutoScalingReader = {
-              Type    = "Wait"
-              Seconds = 60
-              Next    = "CheckAutoScalingReaderStatus"
+              Type        = "Wait"
+              SecondsPath = "$.scaleResult.Payload.nextPollSeconds"
+              Next        = "CheckAutoScalingReaderStatus"
             },
             
+            # スケールインで削除された Reader は確認の対象外にする（ignoreMissing）
             CheckAutoScalingReaderStatus = {
               Type     = "Task"
               Resource = "arn:aws:states:::lambda:invoke"
               Parameters = {
                 FunctionName = aws_lambda_function.check_instance_status.arn
                 Payload = {
-                  "instanceIds.$" = "States.Array($.instanceId)"
-                  "targetClass.$" = "$.targetClass"
+                  "instanceIds.$"    = "$.instanceIds"
+                  "targetClass.$"    = "$.targetClass"
+                  "phaseStartTime.$" = "$.phase.startedAt"
+                  "ignoreMissing"    = true
+                  "executionName.$"  = "$.executionName"
+                  "startTime.$"      = "$.startTime"
+                  "phase.$"          = "$.phase.name"
                 }
               }
               ResultPath = "$.statusCheckResult"
@@ -461,14 +1714,27 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
             EvaluateAutoScalingReaderStatus = {
               Type    = "Choice"
               Choices = [
+                {
+                  And = [
+                    {
+                      Variable      = "$.statusCheckResult.Payload.allAvailable"
+                      BooleanEquals = true
+                    },
+                    {
+                      Variable      = "$.readerDrain"
+                      BooleanEquals = true
+                    }
+                  ]
+                  Next = "IncludeAutoScalingReadersInReaderEndpoint"
+                },
                 {
                   Variable      = "$.statusCheckResult.Payload.allAvailable"
                   BooleanEquals = true
                   Next          = "AutoScalingReaderComplete"
                 },
                 {
-                  Variable      = "$.autoScalingReaderRetryCount"
-                  NumericGreaterThanEquals = 5
+                  Variable      = "$.statusCheckResult.Payload.phaseElapsedSeconds"
+                  NumericGreaterThanEquals = var.phase_timeout_seconds
                   Next          = "AutoScalingReaderStatusError"
                 }
               ]
@@ -478,23 +1744,79 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
             IncrementAutoScalingReaderRetry = {
               Type = "Pass"
               Parameters = {
-                "instanceId.$"  = "$.instanceId"
+                "instanceIds.$" = "$.instanceIds"
                 "targetClass.$" = "$.targetClass"
                 "autoScalingReaderRetryCount.$" = "States.MathAdd($.autoScalingReaderRetryCount, 1)"
+                "executionName.$"   = "$.executionName"
+                "startTime.$"       = "$.startTime"
+                "phase.$"           = "$.phase"
+                "completionMode.$"  = "$.completionMode"
+                "readerDrain.$"     = "$.readerDrain"
+                "nextPollSeconds.$" = "$.statusCheckResult.Payload.nextPollSeconds"
+                "modifyRequired.$"  = "$.statusCheckResult.Payload.modifyRequired"
               }
               Next = "WaitForAutoScalingReaderRetry"
             },
             
             WaitForAutoScalingReaderRetry = {
-              Type    = "Wait"
-              Seconds = 600
-              Next    = "CheckAutoScalingReaderStatus"
+              Type        = "Wait"
+              SecondsPath = "$.nextPollSeconds"
+              Next        = "RetryAutoScalingReaderModifyIfRequired"
+            },
+            
+            # 変更要求が受け付けられていないReaderがある場合は、ウェーブの変更を再要求する
+            # （変更中・変更済みのReaderは modify_instance 側で変更要求を出さない）
+            RetryAutoScalingReaderModifyIfRequired = {
+              Type    = "Choice"
+              Choices = [
+                {
+                  Variable      = "$.modifyRequired"
+                  BooleanEquals = true
+                  Next          = "ChooseAutoScalingReaderCompletionMode"
+                }
+              ]
+              Default = "CheckAutoScalingReaderStatus"
             },
             
             AutoScalingReaderStatusError = {
               Type = "Fail"
               Error = "AutoScalingReaderStatusTimeout"
-              Cause = "AutoScaling Reader instance did not become available after 5 retries (50 minutes)"
+              Cause = "AutoScaling Reader wave did not become available within ${var.phase_timeout_seconds} seconds"
+            },
+            
+            # 変更先のタイプで available になった後に、カスタム Reader エンドポイントに戻す
+            # 戻せなかった場合は $.endpointIncludeError に残して続ける（変更は完了しているため、ロールバックしない）
+      # 戻せなかった場合は $.endpointIncludeError に残して続ける（変更は完了しているため、ロールバックしない）
+            IncludeAutoScalingReadersInReaderEndpoint = {
+              Type     = "Task"
+              Resource = "arn:aws:states:::lambda:invoke"
+              Parameters = {
+                FunctionName = aws_lambda_function.drain_reader.arn
+                Payload = {
+                  "action"          = "include"
+                  "instanceIds.$"   = "$.instanceIds"
+                  "executionName.$" = "$.executionName"
+                  "startTime.$"     = "$.startTime"
+                  "phase.$"         = "$.phase.name"
+                }
+              }
+              ResultPath = "$.endpointInclude"
+              Retry = [
+                {
+                  ErrorEquals     = ["Lambda.ServiceException", "Lambda.AWSLambdaException", "Lambda.SdkClientException", "Lambda.TooManyRequestsException"]
+                  IntervalSeconds = 2
+                  MaxAttempts     = 3
+                  BackoffRate     = 2
+                }
+              ]
+              Catch = [
+                {
+                  ErrorEquals = ["States.ALL"]
+                  ResultPath  = "$.endpointIncludeError"
+                  Next        = "AutoScalingReaderComplete"
+                }
+              ]
+              Next = "AutoScalingReaderComplete"
             },
             
             AutoScalingReaderComplete = {
@@ -504,64 +1826,482 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
           }
         }
         ResultPath = "$.autoScalingResults"
-        Next       = "PrepareFinalVerification"
-      },
-      
-      # 最終確認: 全てのインスタンスがスケールダウンできているか確認
-      PrepareFinalVerification = {
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "ChooseRollbackOnFailure"
+          }
+        ]
+        Next       = "MarkAutoScalingReadersComplete"
+      },
+      
+      # 次のフェーズを選ぶ（direction: "down" では最後のフェーズのため、ReconcileClusterMembers に進む）
+      MarkAutoScalingReadersComplete = {
+        Type       = "Pass"
+        Result     = true
+        ResultPath = "$.progress.autoScalingReadersComplete"
+        Next       = "ResumeFromFirstIncompleteStep"
+      },
+      
+      # Blue/Green デプロイ（scalingStrategy: "blue-green"）
+      # 1. 全インスタンスが変更先のタイプのグリーン環境を作成し、準備ができるまで待つ
+      # 失敗・タイムアウト（blue_green_timeout_seconds）の場合はグリーン環境を削除して失敗する（ブルー環境は変更されていない）
+      BeginBlueGreenProvisionPhase = {
         Type = "Pass"
         Parameters = {
-          "targetClass.$"                = "$.targetClass"
-          "writerInstanceId.$"           = "$.writerInstanceId"
-          "dedicatedReaderInstanceId.$"    = "$.dedicatedReaderInstanceId"
-          "autoScalingReaderInstanceIds.$" = "$.autoScalingReaderInstanceIds"
-          "clusterIdentifier.$"          = "$.clusterIdentifier"
-          "executionName.$"              = "$.executionName"
-          "startTime.$"                  = "$.startTime"
-          "dedicatedReaderRetryCount.$"   = "$.dedicatedReaderRetryCount"
-          "failoverRetryCount.$"         = "$.failoverRetryCount"
-          "oldWriterRetryCount.$"         = "$.oldWriterRetryCount"
-          "autoScalingReaderRetryCount.$" = "$.autoScalingReaderRetryCount"
-          "overallRetryCount"             = 0
+          "name"        = "blue-green-provision"
+          "startedAt.$" = "$$.State.EnteredTime"
         }
-        Next = "FinalVerification"
+        ResultPath = "$.phase"
+        Next       = "CreateBlueGreenDeployment"
       },
       
-      FinalVerification = {
+      CreateBlueGreenDeployment = {
         Type     = "Task"
         Resource = "arn:aws:states:::lambda:invoke"
         Parameters = {
-          FunctionName = aws_lambda_function.check_instance_status.arn
+          FunctionName = aws_lambda_function.blue_green_deployment.arn
           Payload = {
-            "instanceIds.$" = "States.Array($.writerInstanceId, $.dedicatedReaderInstanceId)"
-            "targetClass.$" = "$.targetClass"
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "targetClass.$"       = "$.targetClass"
+            "action"              = "create"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase.$"             = "$.phase.name"
           }
         }
-        ResultPath = "$.finalVerificationResult"
-        Next       = "FinalVerificationAutoScaling"
+        ResultSelector = {
+          "blueGreenDeploymentIdentifier.$" = "$.Payload.blueGreenDeploymentIdentifier"
+          "blueGreenDeploymentName.$"       = "$.Payload.blueGreenDeploymentName"
+          "sourceClusterResourceId.$"       = "$.Payload.sourceClusterResourceId"
+          "created.$"                       = "$.Payload.created"
+        }
+        ResultPath = "$.blueGreen"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "AbortBlueGreenDeployment"
+          }
+        ]
+        Next = "CheckGreenEnvironment"
       },
       
-      FinalVerificationAutoScaling = {
+      CheckGreenEnvironment = {
         Type     = "Task"
         Resource = "arn:aws:states:::lambda:invoke"
         Parameters = {
-          FunctionName = aws_lambda_function.check_instance_status.arn
+          FunctionName = aws_lambda_function.blue_green_deployment.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "targetClass.$"       = "$.targetClass"
+            "action"              = "check"
+            "phaseStartTime.$"    = "$.phase.startedAt"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase.$"             = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "status.$"              = "$.Payload.status"
+          "readyForSwitchover.$"  = "$.Payload.readyForSwitchover"
+          "switchoverComplete.$"  = "$.Payload.switchoverComplete"
+          "failed.$"              = "$.Payload.failed"
+          "laggingInstanceIds.$"  = "$.Payload.laggingInstanceIds"
+          "phaseElapsedSeconds.$" = "$.Payload.phaseElapsedSeconds"
+          "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.blueGreenStatus"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "AbortBlueGreenDeployment"
+          }
+        ]
+        Next = "EvaluateGreenEnvironment"
+      },
+      
+      EvaluateGreenEnvironment = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.blueGreenStatus.readyForSwitchover"
+            BooleanEquals = true
+            Next          = "BeginBlueGreenSwitchoverPhase"
+          },
+          {
+            Variable      = "$.blueGreenStatus.failed"
+            BooleanEquals = true
+            Next          = "GreenEnvironmentError"
+          },
+          {
+            Variable                 = "$.blueGreenStatus.phaseElapsedSeconds"
+            NumericGreaterThanEquals = var.blue_green_timeout_seconds
+            Next                     = "GreenEnvironmentTimeoutError"
+          }
+        ]
+        Default = "WaitForGreenEnvironment"
+      },
+      
+      WaitForGreenEnvironment = {
+        Type        = "Wait"
+        SecondsPath = "$.blueGreenStatus.nextPollSeconds"
+        Next        = "CheckGreenEnvironment"
+      },
+      
+      GreenEnvironmentError = {
+        Type = "Pass"
+        Result = {
+          Error = "BlueGreenProvisioningFailed"
+          Cause = "The green environment of the blue/green deployment could not be created"
+        }
+        ResultPath = "$.failure"
+        Next       = "AbortBlueGreenDeployment"
+      },
+      
+      GreenEnvironmentTimeoutError = {
+        Type = "Pass"
+        Result = {
+          Error = "BlueGreenProvisioningTimeout"
+          Cause = "The green environment was not ready within ${var.blue_green_timeout_seconds} seconds"
+        }
+        ResultPath = "$.failure"
+        Next       = "AbortBlueGreenDeployment"
+      },
+      
+      # 2. スイッチオーバー（SwitchoverTimeout までにレプリケーションが追いつかない場合は RDS が取り消し、ブルー環境のまま）
+      BeginBlueGreenSwitchoverPhase = {
+        Type = "Pass"
+        Parameters = {
+          "name"        = "blue-green-switchover"
+          "startedAt.$" = "$$.State.EnteredTime"
+        }
+        ResultPath = "$.phase"
+        Next       = "SwitchoverBlueGreenDeployment"
+      },
+      
+      SwitchoverBlueGreenDeployment = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.blue_green_deployment.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "action"              = "switchover"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase.$"             = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "started.$"                  = "$.Payload.started"
+          "switchoverTimeoutSeconds.$" = "$.Payload.switchoverTimeoutSeconds"
+          "nextPollSeconds.$"          = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.blueGreenSwitchover"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "AbortBlueGreenDeployment"
+          }
+        ]
+        Next = "WaitForSwitchover"
+      },
+      
+      WaitForSwitchover = {
+        Type        = "Wait"
+        SecondsPath = "$.blueGreenSwitchover.nextPollSeconds"
+        Next        = "CheckSwitchoverStatus"
+      },
+      
+      CheckSwitchoverStatus = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.blue_green_deployment.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "targetClass.$"       = "$.targetClass"
+            "action"              = "check"
+            "phaseStartTime.$"    = "$.phase.startedAt"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase.$"             = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "status.$"              = "$.Payload.status"
+          "readyForSwitchover.$"  = "$.Payload.readyForSwitchover"
+          "switchoverComplete.$"  = "$.Payload.switchoverComplete"
+          "failed.$"              = "$.Payload.failed"
+          "laggingInstanceIds.$"  = "$.Payload.laggingInstanceIds"
+          "phaseElapsedSeconds.$" = "$.Payload.phaseElapsedSeconds"
+          "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.blueGreenStatus"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "AbortBlueGreenDeployment"
+          }
+        ]
+        Next = "EvaluateSwitchoverStatus"
+      },
+      
+      # スイッチオーバーが RDS のタイムアウトを過ぎても終わらない場合（想定外）は、10分の余裕をみて失敗する
+      EvaluateSwitchoverStatus = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.blueGreenStatus.switchoverComplete"
+            BooleanEquals = true
+            Next          = "BeginBlueGreenCleanupPhase"
+          },
+          {
+            Variable      = "$.blueGreenStatus.failed"
+            BooleanEquals = true
+            Next          = "SwitchoverError"
+          },
+          {
+            Variable                 = "$.blueGreenStatus.phaseElapsedSeconds"
+            NumericGreaterThanEquals = var.blue_green_switchover_timeout_seconds + 600
+            Next                     = "SwitchoverTimeoutError"
+          }
+        ]
+        Default = "WaitForSwitchoverRetry"
+      },
+      
+      WaitForSwitchoverRetry = {
+        Type        = "Wait"
+        SecondsPath = "$.blueGreenStatus.nextPollSeconds"
+        Next        = "CheckSwitchoverStatus"
+      },
+      
+      SwitchoverError = {
+        Type = "Pass"
+        Result = {
+          Error = "BlueGreenSwitchoverFailed"
+          Cause = "The blue/green switchover was rolled back (the blue environment is still serving)"
+        }
+        ResultPath = "$.failure"
+        Next       = "AbortBlueGreenDeployment"
+      },
+      
+      SwitchoverTimeoutError = {
+        Type = "Pass"
+        Result = {
+          Error = "BlueGreenSwitchoverTimeout"
+          Cause = "The blue/green switchover did not finish within ${var.blue_green_switchover_timeout_seconds + 600} seconds"
+        }
+        ResultPath = "$.failure"
+        Next       = "AbortBlueGreenDeployment"
+      },
+      
+      # 3. デプロイと切り替え前のクラスター（ブルー環境、<cluster>-old1）を削除する
+      # スケーリングは完了しているため、削除に失敗・タイムアウトした場合もエラーを記録して最終確認に進む
+      BeginBlueGreenCleanupPhase = {
+        Type = "Pass"
+        Parameters = {
+          "name"        = "blue-green-cleanup"
+          "startedAt.$" = "$$.State.EnteredTime"
+        }
+        ResultPath = "$.phase"
+        Next       = "CleanupBlueEnvironment"
+      },
+      
+      CleanupBlueEnvironment = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.blue_green_deployment.arn
+          Payload = {
+            "clusterIdentifier.$"       = "$.clusterIdentifier"
+            "action"                    = "cleanup"
+            "sourceClusterResourceId.$" = "$.blueGreen.sourceClusterResourceId"
+            "phaseStartTime.$"          = "$.phase.startedAt"
+            "executionName.$"           = "$.executionName"
+            "startTime.$"               = "$.startTime"
+            "phase.$"                   = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "cleanupComplete.$"         = "$.Payload.cleanupComplete"
+          "oldClusterIdentifier.$"    = "$.Payload.oldClusterIdentifier"
+          "retained.$"                = "$.Payload.retained"
+          "finalSnapshotIdentifier.$" = "$.Payload.finalSnapshotIdentifier"
+          "phaseElapsedSeconds.$"     = "$.Payload.phaseElapsedSeconds"
+          "nextPollSeconds.$"         = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.blueGreenCleanup"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.blueGreenCleanupError"
+            Next        = "FinalVerification"
+          }
+        ]
+        Next = "EvaluateBlueGreenCleanup"
+      },
+      
+      EvaluateBlueGreenCleanup = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.blueGreenCleanup.cleanupComplete"
+            BooleanEquals = true
+            Next          = "FinalVerification"
+          },
+          {
+            Variable                 = "$.blueGreenCleanup.phaseElapsedSeconds"
+            NumericGreaterThanEquals = var.blue_green_timeout_seconds
+            Next                     = "BlueGreenCleanupTimeoutError"
+          }
+        ]
+        Default = "WaitForBlueGreenCleanup"
+      },
+      
+      WaitForBlueGreenCleanup = {
+        Type        = "Wait"
+        SecondsPath = "$.blueGreenCleanup.nextPollSeconds"
+        Next        = "CleanupBlueEnvironment"
+      },
+      
+      BlueGreenCleanupTimeoutError = {
+        Type = "Pass"
+        Result = {
+          Error = "BlueGreenCleanupTimeout"
+          Cause = "The old cluster was not deleted within ${var.blue_green_timeout_seconds} seconds; delete it manually"
+        }
+        ResultPath = "$.blueGreenCleanupError"
+        Next       = "FinalVerification"
+      },
+      
+      # 失敗時: スイッチオーバーの前であれば、デプロイとグリーン環境を削除する（ブルー環境は変更されていないためロールバックしない）
+      AbortBlueGreenDeployment = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.blue_green_deployment.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "action"              = "abort"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase"               = "blue-green-abort"
+          }
+        }
+        ResultSelector = {
+          "aborted.$" = "$.Payload.aborted"
+          "status.$"  = "$.Payload.status"
+        }
+        ResultPath = "$.blueGreenAbort"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.blueGreenAbortError"
+            Next        = "ResumeAutoScalingAfterFailure"
+          }
+        ]
+        Next = "ResumeAutoScalingAfterFailure"
+      },
+      
+      # 最終確認の前に、実行開始時の AutoScaling Reader の一覧と現在のクラスターメンバーの差分を確認する
+      # 実行中に追加された（変更前のタイプの）Reader は、全体リトライを待たずに同じ実行の中で変更する
+      ReconcileClusterMembers = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.get_cluster_instances.arn
           Payload = {
-            "instanceIds.$" = "$.autoScalingReaderInstanceIds"
-            "targetClass.$" = "$.targetClass"
+            "clusterIdentifier.$"            = "$.clusterIdentifier"
+            "targetClass.$"                  = "$.targetClass"
+            "writerInstanceId.$"             = "$.writerInstanceId"
+            "dedicatedReaderInstanceId.$"    = "$.dedicatedReaderInstanceId"
+            "autoScalingReaderInstanceIds.$" = "$.autoScalingReaderInstanceIds"
+            "direction.$"                    = "$.direction"
+            "reconcile"                      = true
+            "executionName.$"                = "$.executionName"
+            "startTime.$"                    = "$.startTime"
+            "phase"                          = "reconcile-members"
+          }
+        }
+        ResultSelector = {
+          "autoScalingReaderInstanceIds.$" = "$.Payload.members.autoScalingReaderInstanceIds"
+          "addedInstanceIds.$"             = "$.Payload.members.addedInstanceIds"
+          "removedInstanceIds.$"           = "$.Payload.members.removedInstanceIds"
+          "progress.$"                     = "$.Payload.progress"
+        }
+        ResultPath = "$.reconciliation"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "ChooseRollbackOnFailure"
+          }
+        ]
+        Next       = "EvaluateReconciliation"
+      },
+      
+      # 未完了のインスタンス（追加された Reader など）があれば、そのフェーズから再開する（差分確認は最大3回）
+      EvaluateReconciliation = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable     = "$.reconciliation.progress.resumeFrom"
+            StringEquals = "complete"
+            Next         = "PrepareFinalVerification"
+          },
+          {
+            Variable      = "$.reconcileCount"
+            NumericGreaterThanEquals = 3
+            Next          = "PrepareFinalVerification"
           }
+        ]
+        Default = "AdoptReconciledMembers"
+      },
+      
+      AdoptReconciledMembers = {
+        Type = "Pass"
+        Parameters = {
+          "targetClass.$"                = "$.targetClass"
+          "writerInstanceId.$"           = "$.writerInstanceId"
+          "dedicatedReaderInstanceId.$"    = "$.dedicatedReaderInstanceId"
+          "autoScalingReaderInstanceIds.$" = "$.reconciliation.autoScalingReaderInstanceIds"
+          "clusterIdentifier.$"          = "$.clusterIdentifier"
+          "executionName.$"              = "$.executionName"
+          "startTime.$"                  = "$.startTime"
+          "dedicatedReaderRetryCount.$"   = "$.dedicatedReaderRetryCount"
+          "failoverRetryCount.$"         = "$.failoverRetryCount"
+          "oldWriterRetryCount.$"         = "$.oldWriterRetryCount"
+          "autoScalingReaderRetryCount.$" = "$.autoScalingReaderRetryCount"
+          "overallRetryCount.$"          = "$.overallRetryCount"
+          "reconcileCount.$"             = "States.MathAdd($.reconcileCount, 1)"
+          "autoScaling.$"                = "$.autoScaling"
+          "rollbackOnFailure.$"          = "$.rollbackOnFailure"
+          "readerStrategy.$"             = "$.readerStrategy"
+          "readerDrain.$"                = "$.readerDrain"
+          "scalingStrategy.$"            = "$.scalingStrategy"
+          "direction.$"                  = "$.direction"
+          "phase.$"                      = "$.phase"
+          "completionMode.$"             = "$.completionMode"
+          "progress.$"                   = "$.reconciliation.progress"
         }
-        ResultPath = "$.finalVerificationAutoScalingResult"
-        Next       = "EvaluateFinalVerification"
+        Next = "ResumeFromFirstIncompleteStep"
       },
       
-      EvaluateFinalVerification = {
+      # 最終確認: 全てのインスタンスがスケールダウンできているか確認
+      # AutoScaling Reader は差分確認の結果を使う（置き換えた Reader・実行中に追加された Reader を含む）
+      PrepareFinalVerification = {
         Type = "Pass"
         Parameters = {
           "targetClass.$"                = "$.targetClass"
           "writerInstanceId.$"           = "$.writerInstanceId"
           "dedicatedReaderInstanceId.$"    = "$.dedicatedReaderInstanceId"
-          "autoScalingReaderInstanceIds.$" = "$.autoScalingReaderInstanceIds"
+          "autoScalingReaderInstanceIds.$" = "$.reconciliation.autoScalingReaderInstanceIds"
           "clusterIdentifier.$"          = "$.clusterIdentifier"
           "executionName.$"              = "$.executionName"
           "startTime.$"                  = "$.startTime"
@@ -570,27 +2310,62 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
           "oldWriterRetryCount.$"         = "$.oldWriterRetryCount"
           "autoScalingReaderRetryCount.$" = "$.autoScalingReaderRetryCount"
           "overallRetryCount.$"          = "$.overallRetryCount"
-          "writerAndReaderAvailable.$"   = "$.finalVerificationResult.Payload.allAvailable"
-          "autoScalingAvailable.$"       = "$.finalVerificationAutoScalingResult.Payload.allAvailable"
+          "reconcileCount.$"             = "$.reconcileCount"
+          "autoScaling.$"                = "$.autoScaling"
+          "rollbackOnFailure.$"          = "$.rollbackOnFailure"
+          "readerStrategy.$"             = "$.readerStrategy"
+          "readerDrain.$"                = "$.readerDrain"
+          "scalingStrategy.$"            = "$.scalingStrategy"
+          "direction.$"                  = "$.direction"
+          "phase.$"                      = "$.phase"
+          "completionMode.$"             = "$.completionMode"
+          "progress.$"                   = "$.progress"
+        }
+        Next = "FinalVerification"
+      },
+      
+      # クラスターの全メンバーを1回の確認（describe_db_instances のページング）で検証し、ロールごとの判定を返す
+      FinalVerification = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.check_instance_status.arn
+          Payload = {
+            "clusterIdentifier.$"            = "$.clusterIdentifier"
+            "targetClass.$"                  = "$.targetClass"
+            "writerInstanceId.$"             = "$.writerInstanceId"
+            "dedicatedReaderInstanceId.$"    = "$.dedicatedReaderInstanceId"
+            "autoScalingReaderInstanceIds.$" = "$.autoScalingReaderInstanceIds"
+            "executionName.$"                = "$.executionName"
+            "startTime.$"                    = "$.startTime"
+            "phase"                          = "final-verification"
+          }
         }
-        Next = "CheckFinalVerificationResult"
+        ResultSelector = {
+          "allAvailable.$"       = "$.Payload.allAvailable"
+          "roles.$"              = "$.Payload.roles"
+          "laggingInstanceIds.$" = "$.Payload.laggingInstanceIds"
+          "removedInstanceIds.$" = "$.Payload.removedInstanceIds"
+          "progress.$"           = "$.Payload.progress"
+        }
+        ResultPath = "$.finalVerification"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.failure"
+            Next        = "ChooseRollbackOnFailure"
+          }
+        ]
+        Next       = "CheckFinalVerificationResult"
       },
       
       CheckFinalVerificationResult = {
         Type    = "Choice"
         Choices = [
           {
-            And = [
-              {
-                Variable      = "$.writerAndReaderAvailable"
-                BooleanEquals = true
-              },
-              {
-                Variable      = "$.autoScalingAvailable"
-                BooleanEquals = true
-              }
-            ]
-            Next = "SendCompletionNotification"
+            Variable      = "$.finalVerification.allAvailable"
+            BooleanEquals = true
+            Next          = "ResumeAutoScaling"
           },
           {
             Variable      = "$.overallRetryCount"
@@ -616,6 +2391,17 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
           "oldWriterRetryCount"           = 0
           "autoScalingReaderRetryCount"  = 0
           "overallRetryCount.$"          = "States.MathAdd($.overallRetryCount, 1)"
+          "reconcileCount.$"             = "$.reconcileCount"
+          "autoScaling.$"                = "$.autoScaling"
+          "rollbackOnFailure.$"          = "$.rollbackOnFailure"
+          "readerStrategy.$"             = "$.readerStrategy"
+          "readerDrain.$"                = "$.readerDrain"
+          "scalingStrategy.$"            = "$.scalingStrategy"
+          "direction.$"                  = "$.direction"
+          "phase.$"                      = "$.phase"
+          "completionMode.$"             = "$.completionMode"
+          "progress.$"                   = "$.finalVerification.progress"
+          "lastVerification.$"           = "$.finalVerification"
         }
         Next = "WaitBeforeRetry"
       },
@@ -623,13 +2409,546 @@ resource "aws_sfn_state_machine" "aurora_scaling" {
       WaitBeforeRetry = {
         Type    = "Wait"
         Seconds = 60
-        Next    = "ScaleDedicatedReader"
+        Next    = "ResumeFromFirstIncompleteStep"
       },
       
       OverallRetryError = {
-        Type = "Fail"
-        Error = "OverallRetryTimeout"
-        Cause = "All instances did not scale down successfully after 3 overall retries"
+        Type = "Pass"
+        Result = {
+          Error = "OverallRetryTimeout"
+          Cause = "All instances did not scale down successfully after 3 overall retries"
+        }
+        ResultPath = "$.failure"
+        Next       = "ChooseRollbackOnFailure"
+      },
+      
+      # Application Auto Scaling を実行前の状態に戻す（再開に失敗しても完了通知は送る）
+      ResumeAutoScaling = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.manage_autoscaling.arn
+          Payload = {
+            "clusterIdentifier.$"      = "$.clusterIdentifier"
+            "action"                   = "resume"
+            "suspended.$"              = "$.autoScaling.suspended"
+            "previousSuspendedState.$" = "$.autoScaling.previousSuspendedState"
+            "executionName.$"          = "$.executionName"
+            "startTime.$"              = "$.startTime"
+            "phase"                    = "autoscaling-resume"
+          }
+        }
+        ResultPath = "$.autoScalingResume"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.autoScalingResumeError"
+            Next        = "CompleteRollbackSnapshot"
+          }
+        ]
+        Next = "CompleteRollbackSnapshot"
+      },
+      
+      # 完了した実行のスナップショットは completed にする（次の実行は新しいスナップショットを保存する）
+      CompleteRollbackSnapshot = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.rollback_cluster.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "action"              = "complete"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase"               = "rollback-snapshot"
+          }
+        }
+        ResultPath = null
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.rollbackSnapshotError"
+            Next        = "SendCompletionNotification"
+          }
+        ]
+        Next = "SendCompletionNotification"
+      },
+      
+      # 失敗時: rollbackOnFailure が true の場合は、実行前のインスタンスタイプと Writer に戻してから失敗する
+      ChooseRollbackOnFailure = {
+        Type    = "Choice"
+        Choices = [
+          {
+            And = [
+              {
+                Variable  = "$.rollbackOnFailure"
+                IsPresent = true
+              },
+              {
+                Variable      = "$.rollbackOnFailure"
+                BooleanEquals = true
+              }
+            ]
+            Next = "BeginRollbackAfterFailure"
+          }
+        ]
+        Default = "ResumeAutoScalingAfterFailure"
+      },
+      
+      # この実行が保存したスナップショットのみ使う（保存に失敗した場合に、古いスナップショットに戻さないため）
+      BeginRollbackAfterFailure = {
+        Type = "Pass"
+        Parameters = {
+          "stepCount"               = 0
+          "expectedExecutionName.$" = "$.executionName"
+          "startedAt.$"             = "$$.State.EnteredTime"
+        }
+        ResultPath = "$.rollback"
+        Next       = "PlanRollbackStep"
+      },
+      
+      # オンデマンドのロールバック（mode: "rollback"）: 最後に保存したスナップショットに戻す
+      PrepareOnDemandRollback = {
+        Type = "Pass"
+        Parameters = {
+          "clusterIdentifier.$" = "$.clusterIdentifier"
+          "executionName.$"     = "$$.Execution.Name"
+          "startTime.$"         = "$$.Execution.StartTime"
+          "rollback" = {
+            "stepCount"             = 0
+            "expectedExecutionName" = null
+            "startedAt.$"           = "$$.Execution.StartTime"
+          }
+        }
+        Next = "PlanRollbackStep"
+      },
+      
+      # ロールバックの次の手順（resize / failover / complete）を現在のクラスター構成から決める
+      # 手順ごとに完了を確認してから次の手順を決め直す（途中で失敗しても、再実行すると残りの手順から続ける）
+      PlanRollbackStep = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.rollback_cluster.arn
+          Payload = {
+            "clusterIdentifier.$"     = "$.clusterIdentifier"
+            "action"                  = "plan"
+            "expectedExecutionName.$" = "$.rollback.expectedExecutionName"
+            "executionName.$"         = "$.executionName"
+            "startTime.$"             = "$.startTime"
+            "phase"                   = "rollback"
+          }
+        }
+        ResultSelector = {
+          "action.$"               = "$.Payload.action"
+          "instanceIds.$"          = "$.Payload.instanceIds"
+          "targetClass.$"          = "$.Payload.targetClass"
+          "targetInstanceId.$"     = "$.Payload.targetInstanceId"
+          "remainingInstanceIds.$" = "$.Payload.remainingInstanceIds"
+          "missingInstanceIds.$"   = "$.Payload.missingInstanceIds"
+        }
+        ResultPath = "$.rollback.step"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.rollback.failure"
+            Next        = "RollbackFinished"
+          }
+        ]
+        Next = "ChooseRollbackStep"
+      },
+      
+      ChooseRollbackStep = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable     = "$.rollback.step.action"
+            StringEquals = "complete"
+            Next         = "RollbackFinished"
+          },
+          {
+            Variable      = "$.rollback.stepCount"
+            NumericGreaterThanEquals = 20
+            Next          = "RollbackStepLimitError"
+          },
+          {
+            Variable     = "$.rollback.step.action"
+            StringEquals = "failover"
+            Next         = "BeginRollbackFailover"
+          }
+        ]
+        Default = "BeginRollbackResize"
+      },
+      
+      # 元のタイプへの変更: ウェーブ内のインスタンスを並列に変更し、ステータス確認で完了を待つ
+      BeginRollbackResize = {
+        Type = "Pass"
+        Parameters = {
+          "name"        = "rollback-resize"
+          "startedAt.$" = "$$.State.EnteredTime"
+        }
+        ResultPath = "$.phase"
+        Next       = "RollbackResize"
+      },
+      
+      RollbackResize = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.modify_instance.arn
+          Payload = {
+            "instanceIds.$"   = "$.rollback.step.instanceIds"
+            "targetClass.$"   = "$.rollback.step.targetClass"
+            "executionName.$" = "$.executionName"
+            "startTime.$"     = "$.startTime"
+            "phase.$"         = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "nextPollSeconds.$" = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.rollback.resizeResult"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.rollback.error"
+            Next        = "CheckRollbackResizeStatus"
+          }
+        ]
+        Next = "WaitForRollbackResize"
+      },
+      
+      WaitForRollbackResize = {
+        Type        = "Wait"
+        SecondsPath = "$.rollback.resizeResult.nextPollSeconds"
+        Next        = "CheckRollbackResizeStatus"
+      },
+      
+      CheckRollbackResizeStatus = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.check_instance_status.arn
+          Payload = {
+            "instanceIds.$"    = "$.rollback.step.instanceIds"
+            "targetClass.$"    = "$.rollback.step.targetClass"
+            "phaseStartTime.$" = "$.phase.startedAt"
+            "ignoreMissing"    = true
+            "executionName.$"  = "$.executionName"
+            "startTime.$"      = "$.startTime"
+            "phase.$"          = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "allAvailable.$"        = "$.Payload.allAvailable"
+          "modifyRequired.$"      = "$.Payload.modifyRequired"
+          "phaseElapsedSeconds.$" = "$.Payload.phaseElapsedSeconds"
+          "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.rollback.status"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.rollback.failure"
+            Next        = "RollbackFinished"
+          }
+        ]
+        Next = "EvaluateRollbackResizeStatus"
+      },
+      
+      EvaluateRollbackResizeStatus = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.rollback.status.allAvailable"
+            BooleanEquals = true
+            Next          = "RecordRollbackStep"
+          },
+          {
+            Variable      = "$.rollback.status.phaseElapsedSeconds"
+            NumericGreaterThanEquals = var.phase_timeout_seconds
+            Next          = "RollbackStepTimeoutError"
+          }
+        ]
+        Default = "WaitForRollbackResizeRetry"
+      },
+      
+      WaitForRollbackResizeRetry = {
+        Type        = "Wait"
+        SecondsPath = "$.rollback.status.nextPollSeconds"
+        Next        = "RetryRollbackResizeIfRequired"
+      },
+      
+      # 失敗した実行の変更が完了した後（変更中は変更要求を出せない）、元のタイプへの変更を再要求する
+      RetryRollbackResizeIfRequired = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.rollback.status.modifyRequired"
+            BooleanEquals = true
+            Next          = "RollbackResize"
+          }
+        ]
+        Default = "CheckRollbackResizeStatus"
+      },
+      
+      # 元の Writer へのフェイルバック
+      BeginRollbackFailover = {
+        Type = "Pass"
+        Parameters = {
+          "name"        = "rollback-failover"
+          "startedAt.$" = "$$.State.EnteredTime"
+        }
+        ResultPath = "$.phase"
+        Next       = "RollbackFailover"
+      },
+      
+      RollbackFailover = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.failover_cluster.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "targetInstanceId.$"  = "$.rollback.step.targetInstanceId"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase.$"             = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "nextPollSeconds.$" = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.rollback.failoverResult"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.rollback.error"
+            Next        = "CheckRollbackFailoverStatus"
+          }
+        ]
+        Next = "WaitForRollbackFailover"
+      },
+      
+      WaitForRollbackFailover = {
+        Type        = "Wait"
+        SecondsPath = "$.rollback.failoverResult.nextPollSeconds"
+        Next        = "CheckRollbackFailoverStatus"
+      },
+      
+      CheckRollbackFailoverStatus = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.check_failover_status.arn
+          Payload = {
+            "clusterIdentifier.$" = "$.clusterIdentifier"
+            "targetInstanceId.$"  = "$.rollback.step.targetInstanceId"
+            "phaseStartTime.$"    = "$.phase.startedAt"
+            "executionName.$"     = "$.executionName"
+            "startTime.$"         = "$.startTime"
+            "phase.$"             = "$.phase.name"
+          }
+        }
+        ResultSelector = {
+          "failoverComplete.$"    = "$.Payload.failoverComplete"
+          "failoverRequired.$"    = "$.Payload.failoverRequired"
+          "phaseElapsedSeconds.$" = "$.Payload.phaseElapsedSeconds"
+          "nextPollSeconds.$"     = "$.Payload.nextPollSeconds"
+        }
+        ResultPath = "$.rollback.status"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.rollback.failure"
+            Next        = "RollbackFinished"
+          }
+        ]
+        Next = "EvaluateRollbackFailoverStatus"
+      },
+      
+      EvaluateRollbackFailoverStatus = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.rollback.status.failoverComplete"
+            BooleanEquals = true
+            Next          = "RecordRollbackStep"
+          },
+          {
+            Variable      = "$.rollback.status.phaseElapsedSeconds"
+            NumericGreaterThanEquals = var.phase_timeout_seconds
+            Next          = "RollbackStepTimeoutError"
+          }
+        ]
+        Default = "WaitForRollbackFailoverRetry"
+      },
+      
+      WaitForRollbackFailoverRetry = {
+        Type        = "Wait"
+        SecondsPath = "$.rollback.status.nextPollSeconds"
+        Next        = "RetryRollbackFailoverIfRequired"
+      },
+      
+      RetryRollbackFailoverIfRequired = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable      = "$.rollback.status.failoverRequired"
+            BooleanEquals = true
+            Next          = "RollbackFailover"
+          }
+        ]
+        Default = "CheckRollbackFailoverStatus"
+      },
+      
+      # 手順が完了したら、次の手順を決め直す
+      RecordRollbackStep = {
+        Type = "Pass"
+        Parameters = {
+          "stepCount.$"             = "States.MathAdd($.rollback.stepCount, 1)"
+          "expectedExecutionName.$" = "$.rollback.expectedExecutionName"
+          "startedAt.$"             = "$.rollback.startedAt"
+        }
+        ResultPath = "$.rollback"
+        Next       = "PlanRollbackStep"
+      },
+      
+      RollbackStepTimeoutError = {
+        Type = "Pass"
+        Result = {
+          Error = "RollbackStepTimeout"
+          Cause = "A rollback step did not complete within ${var.phase_timeout_seconds} seconds"
+        }
+        ResultPath = "$.rollback.failure"
+        Next       = "RollbackFinished"
+      },
+      
+      RollbackStepLimitError = {
+        Type = "Pass"
+        Result = {
+          Error = "RollbackStepLimitExceeded"
+          Cause = "Rollback did not converge within 20 steps"
+        }
+        ResultPath = "$.rollback.failure"
+        Next       = "RollbackFinished"
+      },
+      
+      # 失敗時のロールバック: Application Auto Scaling を戻してから元のエラーで失敗する（ロールバックの失敗は $.rollback.failure に残す）
+      # オンデマンドのロールバック: 完了通知を送る（失敗した場合はロールバックのエラーで失敗する）
+      RollbackFinished = {
+        Type    = "Choice"
+        Choices = [
+          {
+            Variable  = "$.failure"
+            IsPresent = true
+            Next      = "ResumeAutoScalingAfterFailure"
+          },
+          {
+            Variable  = "$.rollback.failure"
+            IsPresent = true
+            Next      = "FailRollback"
+          }
+        ]
+        Default = "SendRollbackNotification"
+      },
+      
+      FailRollback = {
+        Type      = "Fail"
+        ErrorPath = "$.rollback.failure.Error"
+        CausePath = "$.rollback.failure.Cause"
+      },
+      
+      SendRollbackNotification = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.send_notification.arn
+          Payload = {
+            "status"          = "rolled-back"
+            "executionName.$" = "$.executionName"
+            "startTime.$"     = "$.startTime"
+            "results.$"       = "$"
+          }
+        }
+        End = true
+      },
+      
+      # 失敗時: Application Auto Scaling を実行前の状態に戻してから、元のエラーで失敗する
+      ResumeAutoScalingAfterFailure = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.manage_autoscaling.arn
+          Payload = {
+            "clusterIdentifier.$"      = "$.clusterIdentifier"
+            "action"                   = "resume"
+            "suspended.$"              = "$.autoScaling.suspended"
+            "previousSuspendedState.$" = "$.autoScaling.previousSuspendedState"
+            "executionName.$"          = "$.executionName"
+            "startTime.$"              = "$.startTime"
+            "phase"                    = "autoscaling-resume"
+          }
+        }
+        ResultPath = "$.autoScalingResume"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.autoScalingResumeError"
+            Next        = "ChooseReaderEndpointReleaseAfterFailure"
+          }
+        ]
+        Next = "ChooseReaderEndpointReleaseAfterFailure"
+      },
+      
+      # readerDrain: true の場合は、カスタム Reader エンドポイントから外したままの Reader を戻してから失敗する
+      ChooseReaderEndpointReleaseAfterFailure = {
+        Type    = "Choice"
+        Choices = [
+          {
+            And = [
+              {
+                Variable  = "$.readerDrain"
+                IsPresent = true
+              },
+              {
+                Variable      = "$.readerDrain"
+                BooleanEquals = true
+              }
+            ]
+            Next = "ReleaseReaderEndpointAfterFailure"
+          }
+        ]
+        Default = "FailExecution"
+      },
+      
+      ReleaseReaderEndpointAfterFailure = {
+        Type     = "Task"
+        Resource = "arn:aws:states:::lambda:invoke"
+        Parameters = {
+          FunctionName = aws_lambda_function.drain_reader.arn
+          Payload = {
+            "action"          = "release"
+            "executionName.$" = "$.executionName"
+            "startTime.$"     = "$.startTime"
+            "phase"           = "reader-drain-release"
+          }
+        }
+        ResultPath = "$.endpointRelease"
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"]
+            ResultPath  = "$.endpointReleaseError"
+            Next        = "FailExecution"
+          }
+        ]
+        Next = "FailExecution"
+      },
+      
+      FailExecution = {
+        Type      = "Fail"
+        ErrorPath = "$.failure.Error"
+        CausePath = "$.failure.Cause"
       },
       
       SendCompletionNotification = {
@@ -669,7 +2988,15 @@ resource "aws_iam_policy" "stepfunctions_execution_extended" {
           aws_lambda_function.modify_instance.arn,
           aws_lambda_function.check_instance_status.arn,
           aws_lambda_function.send_notification.arn,
-          aws_lambda_function.failover_cluster.arn
+          aws_lambda_function.failover_cluster.arn,
+          aws_lambda_function.check_failover_status.arn,
+          aws_lambda_function.check_failover_readiness.arn,
+          aws_lambda_function.plan_reader_waves.arn,
+          aws_lambda_function.replace_instance.arn,
+          aws_lambda_function.blue_green_deployment.arn,
+          aws_lambda_function.drain_reader.arn,
+          aws_lambda_function.manage_autoscaling.arn,
+          aws_lambda_function.rollback_cluster.arn
         ]
       }
     ]
@@ -77,6 +77,281 @@ variable "scale_down_cpu_threshold" {
   default     = 30
 }
 
+variable "reader_wave_max_readers" {
+  description = "Maximum number of AutoScaling readers modified at the same time (per wave)"
+  type        = number
+  default     = 2
+}
+
+variable "reader_wave_max_capacity_percent" {
+  description = "Maximum percentage of total reader capacity taken out of service at the same time (per wave)"
+  type        = number
+  default     = 50
+}
+
+variable "phase_timeout_seconds" {
+  description = "Maximum time (seconds) each scaling phase may take before the workflow fails"
+  type        = number
+  default     = 3000
+}
+
+variable "fleet_max_concurrency" {
+  description = "Maximum number of concurrent StartExecution calls in fleet mode (schedule-scaling)"
+  type        = number
+  default     = 8
+}
+
+variable "recommendation_lookback_days" {
+  description = "Days of CloudWatch metrics used to recommend the target class when targetClass is \"auto\" (schedule-scaling)"
+  type        = number
+  default     = 14
+}
+
+variable "recommendation_off_peak_window" {
+  description = "Off-peak window (JST, HH:MM-HH:MM) whose load the recommended target class must cover"
+  type        = string
+  default     = "00:00-07:00"
+
+  validation {
+    condition     = can(regex("^\\d{2}:\\d{2}-\\d{2}:\\d{2}$", var.recommendation_off_peak_window))
+    error_message = "recommendation_off_peak_window must be in HH:MM-HH:MM format."
+  }
+}
+
+variable "recommendation_candidate_classes" {
+  description = "Instance classes the recommender may choose from when targetClass is \"auto\""
+  type        = list(string)
+  default     = ["db.t4g.medium", "db.t4g.large", "db.r6g.large", "db.r6g.xlarge", "db.r6g.2xlarge"]
+}
+
+variable "recommendation_headroom_percent" {
+  description = "Headroom (%) added to the observed off-peak CPU and memory load when recommending the target class"
+  type        = number
+  default     = 30
+}
+
+variable "orderability_cache_ttl_hours" {
+  description = "Hours a describe-orderable-db-instance-options result is reused by the schedule-scaling pre-flight check before the RDS API is asked again"
+  type        = number
+  default     = 168
+}
+
+variable "reader_strategy" {
+  description = "How AutoScaling readers are moved to the target class: modify (in place) or replace (create new readers, then delete the old ones; can be overridden per execution with readerStrategy)"
+  type        = string
+  default     = "modify"
+
+  validation {
+    condition     = contains(["modify", "replace"], var.reader_strategy)
+    error_message = "reader_strategy must be modify or replace."
+  }
+}
+
+variable "replace_wave_max_readers" {
+  description = "Maximum number of AutoScaling readers replaced at the same time (per wave) with reader_strategy = replace (also limited by the 15-reader cluster limit)"
+  type        = number
+  default     = 4
+}
+
+variable "replace_reader_max_retries" {
+  description = "Number of times a failed replacement create or retire step is retried (per wave) with reader_strategy = replace before the wave fails"
+  type        = number
+  default     = 3
+}
+
+variable "replace_reader_retry_interval_seconds" {
+  description = "Seconds to wait before retrying a failed replacement create step with reader_strategy = replace"
+  type        = number
+  default     = 60
+}
+
+variable "reader_drain_enabled" {
+  description = "Exclude readers from the custom reader endpoint and wait for their connections to drain before resizing them (can be overridden per execution with readerDrain)"
+  type        = bool
+  default     = false
+}
+
+variable "reader_drain_connection_threshold" {
+  description = "Readers whose DatabaseConnections (maximum per minute) is at or below this value are treated as drained"
+  type        = number
+  default     = 0
+}
+
+variable "reader_drain_timeout_seconds" {
+  description = "Maximum time (seconds) to wait for connections to drain before resizing a reader anyway"
+  type        = number
+  default     = 300
+}
+
+variable "failover_gate_max_wait_seconds" {
+  description = "Maximum time (seconds) to wait for a quiet moment (low write IOPS, connections and replica lag) before failing over to the dedicated reader (0 disables the gate)"
+  type        = number
+  default     = 600
+}
+
+variable "failover_gate_max_replica_lag_ms" {
+  description = "Failover waits until AuroraReplicaLag of the dedicated reader is at or below this value (milliseconds)"
+  type        = number
+  default     = 100
+}
+
+variable "failover_gate_baseline_minutes" {
+  description = "Writer WriteIOPS and DatabaseConnections are compared against their distribution over this many recent minutes"
+  type        = number
+  default     = 60
+}
+
+variable "failover_gate_burst_ratio" {
+  description = "Failover waits while writer WriteIOPS or DatabaseConnections is above this multiple of its median over the recent baseline"
+  type        = number
+  default     = 1.5
+
+  validation {
+    condition     = var.failover_gate_burst_ratio >= 1
+    error_message = "failover_gate_burst_ratio must be at least 1."
+  }
+}
+
+variable "scale_up_target_class" {
+  description = "Instance class restored by the scheduled scale-up (direction \"up\") when the event does not specify targetClass"
+  type        = string
+  default     = "db.r6g.large"
+}
+
+variable "scale_up_deadline" {
+  description = "Time (HH:MM JST) by which the scheduled scale-up must finish, e.g. before the morning Application Auto Scaling action scale_up_morning"
+  type        = string
+  default     = "08:00"
+}
+
+variable "deadline_estimate_percentile" {
+  description = "Percentile of the recorded resize / failover durations used when computing the start time backward from a deadline"
+  type        = number
+  default     = 90
+
+  validation {
+    condition     = var.deadline_estimate_percentile >= 50 && var.deadline_estimate_percentile <= 100
+    error_message = "deadline_estimate_percentile must be between 50 and 100."
+  }
+}
+
+variable "deadline_margin_minutes" {
+  description = "Extra minutes kept between the estimated end of a deadline-driven scaling and the deadline"
+  type        = number
+  default     = 15
+}
+
+variable "duration_history_retention_days" {
+  description = "Days to keep resize / failover duration samples in the duration history table (DynamoDB TTL)"
+  type        = number
+  default     = 180
+}
+
+variable "duration_history_max_samples" {
+  description = "Maximum number of duration samples kept per cluster, engine version and class transition (older samples are deleted)"
+  type        = number
+  default     = 100
+}
+
+variable "slow_duration_factor" {
+  description = "A resize or failover is reported as slow (SlowResizes / SlowFailovers) when it exceeds this multiple of the p90 of past samples"
+  type        = number
+  default     = 2
+}
+
+variable "scaling_strategy" {
+  description = "How instance classes are changed: in-place (modify readers, then fail over) or blue-green (switch over to a green cluster created at the target class; can be overridden per execution with scalingStrategy)"
+  type        = string
+  default     = "in-place"
+
+  validation {
+    condition     = contains(["in-place", "blue-green"], var.scaling_strategy)
+    error_message = "scaling_strategy must be in-place or blue-green."
+  }
+}
+
+variable "blue_green_timeout_seconds" {
+  description = "Maximum seconds to wait for the green environment to become ready, and for the old cluster to be deleted after switchover"
+  type        = number
+  default     = 7200
+}
+
+variable "blue_green_switchover_timeout_seconds" {
+  description = "SwitchoverTimeout of the blue/green switchover; RDS cancels the switchover when replication has not caught up within it"
+  type        = number
+  default     = 300
+
+  validation {
+    condition     = var.blue_green_switchover_timeout_seconds >= 30
+    error_message = "blue_green_switchover_timeout_seconds must be at least 30."
+  }
+}
+
+variable "blue_green_delete_old_cluster" {
+  description = "Delete the old (blue) cluster after a successful blue/green switchover; when false (default) it is kept as <cluster>-old1 (-old2, -old3, ... when an earlier one is still kept)"
+  type        = bool
+  default     = false
+}
+
+variable "blue_green_final_snapshot" {
+  description = "Take a final cluster snapshot when deleting the old (blue) cluster"
+  type        = bool
+  default     = true
+}
+
+variable "rollback_on_failure" {
+  description = "Restore the original instance classes and writer automatically when the scaling workflow fails (can be overridden per execution with rollbackOnFailure)"
+  type        = bool
+  default     = false
+}
+
+variable "rollback_wave_max_readers" {
+  description = "Maximum number of instances restored at the same time during a rollback (0 = no limit)"
+  type        = number
+  default     = 0
+}
+
+variable "rollback_wave_max_capacity_percent" {
+  description = "Maximum percentage of total reader capacity taken out of service at the same time during a rollback"
+  type        = number
+  default     = 50
+}
+
+variable "rollback_snapshot_prefix" {
+  description = "SSM parameter path prefix under which the pre-scaling instance classes and writer of each cluster are recorded for rollback"
+  type        = string
+  default     = "/aurora-scaling/rollback-snapshots"
+
+  # Lambda の IAMポリシーは /aurora-scaling/* のパラメータのみ許可している
+  validation {
+    condition     = startswith(var.rollback_snapshot_prefix, "/aurora-scaling/")
+    error_message = "rollback_snapshot_prefix must be under /aurora-scaling/."
+  }
+}
+
+variable "schedule_window_lookback_days" {
+  description = "Days of cluster CPU / connection metrics folded by weekday and hour when update-schedule searches for the quietest window (scheduleTime \"auto\")"
+  type        = number
+  default     = 28
+}
+
+variable "completion_mode" {
+  description = "Default completion mode of the scaling workflow: polling (status check loops) or event (wait for RDS events via task tokens)"
+  type        = string
+  default     = "polling"
+
+  validation {
+    condition     = contains(["polling", "event"], var.completion_mode)
+    error_message = "completion_mode must be either polling or event."
+  }
+}
+
+variable "event_wait_timeout_seconds" {
+  description = "Maximum time (seconds) to wait for an RDS event before falling back to status polling (event mode)"
+  type        = number
+  default     = 2400
+}
+
 variable "backup_retention_period" {
   description = "Backup retention period in days"
   type        = number
@@ -64,4 +64,44 @@ resource "aws_vpc_endpoint" "states" {
   tags = merge(var.tags, {
     Name = "${var.project_name}-${var.environment}-states-endpoint"
   })
-}
\ No newline at end of file
+}
+
+# SSM VPCエンドポイント（Lambda関数からパラメータストアを参照するため）
+resource "aws_vpc_endpoint" "ssm" {
+  vpc_id              = aws_vpc.main.id
+  service_name        = "com.amazonaws.${var.region}.ssm"
+  vpc_endpoint_type   = "Interface"
+  subnet_ids          = aws_subnet.lambda[*].id
+  security_group_ids  = [aws_security_group.vpc_endpoints.id]
+  private_dns_enabled = true
+
+  tags = merge(var.tags, {
+    Name = "${var.project_name}-${var.environment}-ssm-endpoint"
+  })
+}
+
+# CloudWatch VPCエンドポイント（変更先の推奨・ドレイン・フェイルオーバー前の負荷の確認のためにメトリクスを取得するため）
+resource "aws_vpc_endpoint" "monitoring" {
+  vpc_id              = aws_vpc.main.id
+  service_name        = "com.amazonaws.${var.region}.monitoring"
+  vpc_endpoint_type   = "Interface"
+  subnet_ids          = aws_subnet.lambda[*].id
+  security_group_ids  = [aws_security_group.vpc_endpoints.id]
+  private_dns_enabled = true
+
+  tags = merge(var.tags, {
+    Name = "${var.project_name}-${var.environment}-monitoring-endpoint"
+  })
+}
+
+# DynamoDB VPCエンドポイント（Gateway型: タスクトークンの登録のため）
+resource "aws_vpc_endpoint" "dynamodb" {
+  vpc_id            = aws_vpc.main.id
+  service_name      = "com.amazonaws.${var.region}.dynamodb"
+  vpc_endpoint_type = "Gateway"
+  route_table_ids   = [aws_route_table.private.id]
+
+  tags = merge(var.tags, {
+    Name = "${var.project_name}-${var.environment}-dynamodb-endpoint"
+  })
+}